@@ -0,0 +1,133 @@
+"""Benchmark de vazão do ``MqttPublisherService`` contra um *broker* em processo.
+
+Compara a publicação mensagem a mensagem com a agregação de lotes do
+*worker*.  O *broker* simula um custo fixo por pacote (``--packet-cost-us``)
+para representar a ida à rede.
+
+Uso::
+
+    python -m benchmarks.mqtt_publisher --batches 20000 --per-batch 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from src.services.mqtt_service import MqttPublisherService, load_mqtt_settings
+
+
+class InProcessBroker:
+    """Cliente compatível com o Paho que apenas contabiliza pacotes e bytes."""
+
+    def __init__(self, packet_cost_us: float = 0.0) -> None:
+        self.packet_cost = packet_cost_us / 1_000_000
+        self.packets = 0
+        self.bytes = 0
+        self.last_publish_at = 0.0
+        self.on_connect = None
+        self.on_disconnect = None
+        self._lock = threading.Lock()
+
+    def connect(self, host: str, port: int, keepalive: int) -> None:
+        self.on_connect(self, None, {}, 0)
+
+    def loop_start(self) -> None:
+        pass
+
+    def loop_stop(self) -> None:
+        pass
+
+    def disconnect(self) -> None:
+        pass
+
+    def publish(self, topic: str, payload: Any = None, qos: int = 0, retain: bool = False):
+        if self.packet_cost:
+            deadline = time.perf_counter() + self.packet_cost
+            while time.perf_counter() < deadline:
+                pass
+        with self._lock:
+            self.packets += 1
+            self.bytes += len(payload or b"")
+            self.last_publish_at = time.perf_counter()
+        return SimpleNamespace(rc=0)
+
+
+def _measurement(index: int) -> Dict[str, Any]:
+    return {
+        "plc_id": index % 20,
+        "plc_name": f"CLP {index % 20}",
+        "protocol": "modbus",
+        "register_id": index,
+        "register_name": f"Registrador {index}",
+        "register_address": str(40001 + index % 1000),
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "value_float": index * 0.5,
+        "quality": "good",
+    }
+
+
+def run_case(name: str, batches: int, per_batch: int, packet_cost_us: float, **overrides) -> Dict[str, Any]:
+    broker = InProcessBroker(packet_cost_us)
+    settings = replace(load_mqtt_settings(), enabled=True, client_id="bench", **overrides)
+    service = MqttPublisherService(settings, client=broker)
+    payloads: List[List[Dict[str, Any]]] = [
+        [_measurement(batch * per_batch + offset) for offset in range(per_batch)]
+        for batch in range(batches)
+    ]
+
+    started = time.perf_counter()
+    for measurements in payloads:
+        service.publish_measurements(measurements)
+    while service._queue.qsize():
+        time.sleep(0.001)
+    # Espera o *worker* concluir a última publicação em curso.
+    settled = -1
+    while settled != broker.packets:
+        settled = broker.packets
+        time.sleep(0.05)
+    elapsed = broker.last_publish_at - started
+    service.shutdown()
+
+    measurements = batches * per_batch
+    return {
+        "case": name,
+        "measurements": measurements,
+        "packets": broker.packets,
+        "bytes": broker.bytes,
+        "seconds": round(elapsed, 4),
+        "measurements_per_second": round(measurements / elapsed, 1),
+        "bytes_per_measurement": round(broker.bytes / measurements, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batches", type=int, default=5000)
+    parser.add_argument("--per-batch", type=int, default=10)
+    parser.add_argument("--packet-cost-us", type=float, default=50.0)
+    parser.add_argument("--max-messages", type=int, default=50)
+    parser.add_argument("--max-wait-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    results = [
+        run_case("sem_agregacao", args.batches, args.per_batch, args.packet_cost_us, batch_max_messages=1),
+        run_case(
+            "agregado",
+            args.batches,
+            args.per_batch,
+            args.packet_cost_us,
+            batch_max_messages=args.max_messages,
+            batch_max_wait_ms=args.max_wait_ms,
+        ),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Micro-benchmark dos serializadores MQTT (com e sem zlib).
+
+Mede mensagens codificadas por segundo e bytes por mensagem para um
+``measurement_batch`` típico, com cada serializador disponível no ambiente.
+
+Uso::
+
+    python -m benchmarks.mqtt_serialization --measurements 50 --rounds 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from src.services.mqtt_serializers import available_serializers
+
+
+def _batch(size: int) -> Dict[str, Any]:
+    stamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return {
+        "type": "measurement_batch",
+        "sent_at": stamp.isoformat(),
+        "source": "bench",
+        "measurements": [
+            {
+                "plc_id": index % 10,
+                "plc_name": f"CLP {index % 10}",
+                "protocol": "modbus",
+                "plc_tags": ["linha-1", "forno"],
+                "register_id": index,
+                "register_name": f"Temperatura {index}",
+                "register_tag": f"TT-{index:04d}",
+                "register_address": str(40001 + index),
+                "poll_rate": 1000,
+                "timestamp": stamp,
+                "raw_value": index * 3,
+                "value_float": index * 0.1,
+                "value_int": None,
+                "unit": "°C",
+                "quality": "good",
+                "is_alarm": False,
+            }
+            for index in range(size)
+        ],
+    }
+
+
+def run(measurements: int, rounds: int, level: int) -> List[Dict[str, Any]]:
+    payload = _batch(measurements)
+    results = []
+    for serializer in available_serializers():
+        for compress in (False, True):
+            encoded = b""
+            started = time.perf_counter()
+            for _ in range(rounds):
+                encoded = serializer.dumps(payload)
+                if compress:
+                    encoded = zlib.compress(encoded, level)
+            elapsed = time.perf_counter() - started
+            results.append(
+                {
+                    "serializer": serializer.name,
+                    "zlib": compress,
+                    "messages_per_second": round(rounds / elapsed, 1),
+                    "bytes_per_message": len(encoded),
+                    "bytes_per_measurement": round(len(encoded) / measurements, 1),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--measurements", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--level", type=int, default=6)
+    args = parser.parse_args()
+    print(json.dumps(run(args.measurements, args.rounds, args.level), indent=2))
+
+
+if __name__ == "__main__":
+    main()
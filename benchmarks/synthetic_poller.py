@@ -0,0 +1,178 @@
+"""Poller sintético para testes de carga da ingestão.
+
+Fala o mesmo contrato gRPC/JSON do binário Go: escuta em
+``POLLER_LISTEN_ADDR`` (TCP ou ``unix:``), anuncia ``POLLER_READY`` no
+stdout, aceita ``UpdateConfig``/``ApplyConfigDelta`` e serve ``StreamData``
+com ``seq``/``stream_id`` a partir de um buffer de repetição.  Em vez de ler
+CLPs, gera uma medição por registrador configurado a cada intervalo
+(``--rate-ms`` ou o ``effective_interval`` de cada registrador).
+
+Sem configuração recebida emite para ``--plcs`` x ``--registers`` ids
+sintéticos, o que permite usá-lo isoladamente::
+
+    POLLER_LISTEN_ADDR=:50061 python -m benchmarks.synthetic_poller --plcs 50 --registers 20 --rate-ms 1000
+
+O campo ``timestamp`` (época em segundos) é o instante de emissão e serve
+para medir a latência ponta a ponta.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent import futures
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import grpc  # noqa: E402
+
+from src.grpc_generated import polling_pb2, polling_pb2_grpc  # noqa: E402
+
+
+class SyntheticPoller(polling_pb2_grpc.PollingServiceServicer):
+    def __init__(self, *, plcs: int, registers: int, rate_ms: int, replay: int) -> None:
+        self.rate_ms = rate_ms
+        self.stream_id = uuid.uuid4().hex
+        self.emitted = 0
+        self._buffer: deque = deque(maxlen=replay)
+        self._next_seq = 1
+        self._cond = threading.Condition()
+        self._schedule: List[Tuple[float, int, int, float]] = []
+        self._stop = threading.Event()
+        self._set_targets(
+            [
+                (plc_id, plc_id * 10_000 + index, rate_ms or 1000)
+                for plc_id in range(1, plcs + 1)
+                for index in range(registers)
+            ]
+        )
+
+    # ------------------------------------------------------------------
+    # Configuração
+    # ------------------------------------------------------------------
+    def _set_targets(self, targets: List[Tuple[int, int, int]]) -> None:
+        now = time.monotonic()
+        # Espalha a primeira emissão pelo intervalo para não haver rajadas.
+        schedule = [
+            (now + (index % 100) * interval / 100_000.0, plc_id, register_id, interval / 1000.0)
+            for index, (plc_id, register_id, interval) in enumerate(targets)
+        ]
+        heapq.heapify(schedule)
+        with self._cond:
+            self._schedule = schedule
+
+    def _targets_from_config(self, config: Dict[str, Any]) -> List[Tuple[int, int, int]]:
+        targets = []
+        for plc in config.get("plcs", []):
+            for register in plc.get("registers", []):
+                interval = self.rate_ms or register.get("effective_interval") or register.get("poll_rate") or 1000
+                targets.append((plc["id"], register["id"], int(interval)))
+        return targets
+
+    def UpdateConfig(self, request, context):
+        config = json.loads(request.json_config)
+        self._set_targets(self._targets_from_config(config))
+        return polling_pb2.StatusResponse(success=True, message="configuration updated")
+
+    def ApplyConfigDelta(self, request, context):
+        # Obriga o GoPollingManager a reenviar a configuração completa.
+        return polling_pb2.StatusResponse(success=False, message="delta not supported")
+
+    # ------------------------------------------------------------------
+    # Geração e stream
+    # ------------------------------------------------------------------
+    def run(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            stamp = time.time()
+            batch = []
+            with self._cond:
+                while self._schedule and self._schedule[0][0] <= now:
+                    due, plc_id, register_id, interval = heapq.heappop(self._schedule)
+                    heapq.heappush(self._schedule, (max(due + interval, now), plc_id, register_id, interval))
+                    value = (register_id * 7 + self.emitted) % 1000 / 10.0
+                    batch.append(
+                        json.dumps(
+                            {
+                                "plc_id": plc_id,
+                                "register_id": register_id,
+                                "value": value,
+                                "quality": "good",
+                                "status": "online",
+                                "timestamp": stamp,
+                            }
+                        )
+                    )
+                    self.emitted += 1
+                for data in batch:
+                    self._buffer.append((self._next_seq, data))
+                    self._next_seq += 1
+                if batch:
+                    self._cond.notify_all()
+                wait = self._schedule[0][0] - time.monotonic() if self._schedule else 0.1
+            self._stop.wait(min(max(wait, 0.0), 0.1))
+
+    def _read(self, from_seq: int, limit: int = 512) -> List[Tuple[int, str]]:
+        if not self._buffer:
+            return []
+        oldest = self._buffer[0][0]
+        start = max(from_seq, oldest) - oldest
+        end = min(start + limit, len(self._buffer))
+        return [self._buffer[index] for index in range(start, end)]
+
+    def StreamData(self, request, context):
+        from_seq = request.from_seq if request.stream_id == self.stream_id else 0
+        while context.is_active():
+            with self._cond:
+                entries = self._read(from_seq)
+                if not entries:
+                    self._cond.wait(0.1)
+                    continue
+            for seq, data in entries:
+                yield polling_pb2.DataPayload(json_data=data, seq=seq, stream_id=self.stream_id)
+                from_seq = seq + 1
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plcs", type=int, default=10)
+    parser.add_argument("--registers", type=int, default=10)
+    parser.add_argument("--rate-ms", type=int, default=0, help="intervalo fixo; 0 usa o da configuração")
+    parser.add_argument("--replay", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    poller = SyntheticPoller(plcs=args.plcs, registers=args.registers, rate_ms=args.rate_ms, replay=args.replay)
+    listen = os.environ.get("POLLER_LISTEN_ADDR", ":50051")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+    polling_pb2_grpc.add_PollingServiceServicer_to_server(poller, server)
+    if listen.startswith("unix:"):
+        server.add_insecure_port(listen)
+        ready = f"unix {listen[len('unix:'):]}"
+    else:
+        port = server.add_insecure_port(f"[::]:{listen.rsplit(':', 1)[-1]}")
+        ready = f"tcp [::]:{port}"
+    server.start()
+    threading.Thread(target=poller.run, name="synthetic-poller", daemon=True).start()
+    print(f"POLLER_READY {ready}", flush=True)
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,15 @@ package main
 import (
 	"context"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"log"
 	"net"
 	"os"
 	"os/signal"
 	"path/filepath"
+	"strconv"
+	"strings"
 	"sync"
 	"syscall"
 	"time"
@@ -23,25 +26,107 @@ type pollingServer struct {
 }
 
 type pollingConfig struct {
-	PLCs []plcDescriptor `json:"plcs"`
+	Version int64           `json:"version"`
+	PLCs    []plcDescriptor `json:"plcs"`
+}
+
+type configDelta struct {
+	BaseVersion int64 `json:"base_version"`
+	Version     int64 `json:"version"`
+	PLCs        struct {
+		Added   []plcDescriptor `json:"added"`
+		Removed []int           `json:"removed"`
+		Changed []plcDescriptor `json:"changed"`
+	} `json:"plcs"`
+	Registers struct {
+		Added   []registerChange `json:"added"`
+		Removed []registerChange `json:"removed"`
+		Changed []registerChange `json:"changed"`
+	} `json:"registers"`
+}
+
+type registerChange struct {
+	PLCID int `json:"plc_id"`
+	registerDescriptor
 }
 
 type plcDescriptor struct {
-	ID              int                  `json:"id"`
-	Name            string               `json:"name"`
-	IPAddress       string               `json:"ip_address"`
-	VlanID          *int                 `json:"vlan_id"`
-	Protocol        string               `json:"protocol"`
-	PollingInterval int                  `json:"polling_interval"`
-	Registers       []registerDescriptor `json:"registers"`
+	ID                int                  `json:"id"`
+	Name              string               `json:"name"`
+	IPAddress         string               `json:"ip_address"`
+	VlanID            *int                 `json:"vlan_id"`
+	Protocol          string               `json:"protocol"`
+	PollingInterval   int                  `json:"polling_interval"`
+	EffectiveInterval int                  `json:"effective_interval"`
+	BackoffStep       int                  `json:"backoff_step"`
+	Registers         []registerDescriptor `json:"registers"`
+	ReadPlan          []readBlock          `json:"read_plan"`
+}
+
+// readBlock é uma leitura contígua planeada pelo lado Python
+// (src/services/read_planner.py): start/count em palavras ou bits (Modbus)
+// ou bytes (S7).
+type readBlock struct {
+	PollRate  int             `json:"poll_rate"`
+	Area      string          `json:"area"`
+	Function  int             `json:"function,omitempty"`
+	DB        int             `json:"db,omitempty"`
+	Start     int             `json:"start"`
+	Count     int             `json:"count"`
+	Registers []blockRegister `json:"registers"`
+}
+
+type blockRegister struct {
+	ID     int  `json:"id"`
+	Offset int  `json:"offset"`
+	Count  int  `json:"count"`
+	Bit    *int `json:"bit"`
 }
 
 type registerDescriptor struct {
-	ID       int    `json:"id"`
-	Name     string `json:"name"`
-	Address  string `json:"address"`
-	PollRate int    `json:"poll_rate"`
-	Unit     string `json:"unit"`
+	ID                int    `json:"id"`
+	Name              string `json:"name"`
+	Address           string `json:"address"`
+	PollRate          int    `json:"poll_rate"`
+	Unit              string `json:"unit"`
+	EffectiveInterval int    `json:"effective_interval"`
+	Priority          string `json:"priority"`
+	Alarmed           bool   `json:"alarmed"`
+}
+
+// interval devolve a cadência calculada pela política de agendamento do lado
+// Python (src/services/poll_scheduler.py), caindo para poll_rate e para o
+// intervalo do CLP em configurações antigas.
+func (r registerDescriptor) interval(plc plcDescriptor) time.Duration {
+	ms := r.EffectiveInterval
+	if ms <= 0 {
+		ms = r.PollRate
+	}
+	if ms <= 0 {
+		ms = plc.PollingInterval
+	}
+	if ms <= 0 {
+		ms = 1000
+	}
+	return time.Duration(ms) * time.Millisecond
+}
+
+// pollSchedule guarda o próximo instante de leitura de cada registrador.
+type pollSchedule struct {
+	next map[int]time.Time
+}
+
+func newPollSchedule() *pollSchedule {
+	return &pollSchedule{next: make(map[int]time.Time)}
+}
+
+func (s *pollSchedule) due(registerID int, now time.Time) bool {
+	next, ok := s.next[registerID]
+	return !ok || !now.Before(next)
+}
+
+func (s *pollSchedule) advance(registerID int, now time.Time, interval time.Duration) {
+	s.next[registerID] = now.Add(interval)
 }
 
 type measurementPayload struct {
@@ -57,17 +142,64 @@ type measurementPayload struct {
 	Error      string    `json:"error,omitempty"`
 }
 
+// scheduleTick é a resolução do agendador; os intervalos efetivos nunca
+// descem abaixo de POLL_SCHEDULE_MIN_INTERVAL_MS (100 ms por omissão).
+const scheduleTick = 100 * time.Millisecond
+
+// defaultListenAddr é usado quando POLLER_LISTEN_ADDR não está definido; o
+// PollerPool do lado Python atribui um endereço distinto a cada shard.
+const defaultListenAddr = ":50051"
+
+const readyPrefix = "POLLER_READY"
+
+// listen aceita "host:porta" (TCP) ou "unix:/caminho/do.sock".
+func listen(addr string) (net.Listener, error) {
+	if path, ok := strings.CutPrefix(addr, "unix:"); ok {
+		// Um socket deixado por um processo anterior que morreu impede o bind.
+		if err := os.Remove(path); err != nil && !errors.Is(err, os.ErrNotExist) {
+			return nil, err
+		}
+		return net.Listen("unix", path)
+	}
+	return net.Listen("tcp", addr)
+}
+
+// streamBatch limita quantas entradas do buffer cada leitura copia.
+const streamBatch = 512
+
 var (
 	configMu      sync.RWMutex
 	currentConfig pollingConfig
+
+	// streamID identifica esta instância; o lado Python usa-o para saber se
+	// os números de sequência recomeçaram.
+	streamID = fmt.Sprintf("%d-%d", os.Getpid(), time.Now().UnixNano())
+	replay   *replayBuffer
 )
 
 func main() {
+	// Lido antes do .env: godotenv.Overload sobrepõe-se ao ambiente e o
+	// endereço de cada shard vem do processo pai.
+	listenAddr := os.Getenv("POLLER_LISTEN_ADDR")
+	if listenAddr == "" {
+		listenAddr = defaultListenAddr
+	}
+
 	if err := loadDotEnv(); err != nil {
 		log.Printf("warning: failed to load .env file: %v", err)
 	}
 
-	lis, err := net.Listen("tcp", ":50051")
+	replayCapacity, err := strconv.Atoi(os.Getenv("POLLER_REPLAY_BUFFER"))
+	if err != nil || replayCapacity <= 0 {
+		replayCapacity = defaultReplayCapacity
+	}
+	replay = newReplayBuffer(replayCapacity)
+
+	ctx, cancel := context.WithCancel(context.Background())
+	defer cancel()
+	go runPoller(ctx)
+
+	lis, err := listen(listenAddr)
 	if err != nil {
 		log.Fatalf("failed to bind gRPC listener: %v", err)
 	}
@@ -75,6 +207,12 @@ func main() {
 	server := grpc.NewServer()
 	pb.RegisterPollingServiceServer(server, &pollingServer{})
 
+	// Linha de prontidão lida pelo GoPollingManager: o socket já aceita
+	// ligações (ficam na fila do listen até Serve arrancar), e o endereço
+	// real resolve portas efémeras (":0").
+	fmt.Printf("%s %s %s\n", readyPrefix, lis.Addr().Network(), lis.Addr().String())
+	_ = os.Stdout.Sync()
+
 	go func() {
 		log.Printf("gRPC polling server listening on %s", lis.Addr())
 		if err := server.Serve(lis); err != nil {
@@ -86,6 +224,7 @@ func main() {
 	signal.Notify(sigs, syscall.SIGINT, syscall.SIGTERM)
 	<-sigs
 	log.Print("shutdown signal received, stopping gRPC server")
+	cancel()
 	server.GracefulStop()
 }
 
@@ -100,45 +239,193 @@ func (s *pollingServer) UpdateConfig(ctx context.Context, req *pb.ConfigPayload)
 	currentConfig = cfg
 	configMu.Unlock()
 
-	log.Printf("configuration updated: %d PLCs registered", len(cfg.PLCs))
+	log.Printf("configuration updated: %d PLCs registered (version %d)", len(cfg.PLCs), cfg.Version)
 	return &pb.StatusResponse{Success: true, Message: "configuration updated"}, nil
 }
 
-func (s *pollingServer) StreamData(req *pb.Empty, stream pb.PollingService_StreamDataServer) error {
-	ticker := time.NewTicker(2 * time.Second)
+func (s *pollingServer) ApplyConfigDelta(ctx context.Context, req *pb.ConfigPayload) (*pb.StatusResponse, error) {
+	var delta configDelta
+	if err := json.Unmarshal([]byte(req.GetJsonConfig()), &delta); err != nil {
+		log.Printf("failed to decode configuration delta: %v", err)
+		return &pb.StatusResponse{Success: false, Message: fmt.Sprintf("invalid delta: %v", err)}, nil
+	}
+
+	configMu.Lock()
+	defer configMu.Unlock()
+
+	if delta.BaseVersion != currentConfig.Version {
+		return &pb.StatusResponse{
+			Success: false,
+			Message: fmt.Sprintf("version mismatch: have %d, delta based on %d", currentConfig.Version, delta.BaseVersion),
+		}, nil
+	}
+
+	currentConfig = applyDelta(currentConfig, delta)
+	log.Printf(
+		"configuration delta applied: version %d, %d PLCs registered",
+		currentConfig.Version,
+		len(currentConfig.PLCs),
+	)
+	return &pb.StatusResponse{Success: true, Message: "configuration delta applied"}, nil
+}
+
+// applyDelta devolve uma nova configuração; a anterior continua válida para
+// quem já a copiou (StreamData lê currentConfig por valor).
+func applyDelta(cfg pollingConfig, delta configDelta) pollingConfig {
+	removed := make(map[int]bool, len(delta.PLCs.Removed))
+	for _, id := range delta.PLCs.Removed {
+		removed[id] = true
+	}
+	changed := make(map[int]plcDescriptor, len(delta.PLCs.Changed))
+	for _, plc := range delta.PLCs.Changed {
+		changed[plc.ID] = plc
+	}
+
+	plcs := make([]plcDescriptor, 0, len(cfg.PLCs)+len(delta.PLCs.Added))
+	for _, plc := range cfg.PLCs {
+		if removed[plc.ID] {
+			continue
+		}
+		if update, ok := changed[plc.ID]; ok {
+			update.Registers = plc.Registers
+			if update.ReadPlan == nil {
+				update.ReadPlan = plc.ReadPlan
+			}
+			plc = update
+		}
+		plc.Registers = applyRegisterChanges(plc.ID, plc.Registers, delta)
+		plcs = append(plcs, plc)
+	}
+	plcs = append(plcs, delta.PLCs.Added...)
+
+	return pollingConfig{Version: delta.Version, PLCs: plcs}
+}
+
+func applyRegisterChanges(plcID int, registers []registerDescriptor, delta configDelta) []registerDescriptor {
+	removed := make(map[int]bool)
+	for _, change := range delta.Registers.Removed {
+		if change.PLCID == plcID {
+			removed[change.ID] = true
+		}
+	}
+	changed := make(map[int]registerDescriptor)
+	for _, change := range delta.Registers.Changed {
+		if change.PLCID == plcID {
+			changed[change.ID] = change.registerDescriptor
+		}
+	}
+
+	result := make([]registerDescriptor, 0, len(registers))
+	for _, reg := range registers {
+		if removed[reg.ID] {
+			continue
+		}
+		if update, ok := changed[reg.ID]; ok {
+			reg = update
+		}
+		result = append(result, reg)
+	}
+	for _, change := range delta.Registers.Added {
+		if change.PLCID == plcID {
+			result = append(result, change.registerDescriptor)
+		}
+	}
+	return result
+}
+
+// runPoller lê os CLPs continuamente e guarda as medições no buffer de
+// repetição, haja ou não um StreamData ligado.
+func runPoller(ctx context.Context) {
+	ticker := time.NewTicker(scheduleTick)
 	defer ticker.Stop()
+	schedule := newPollSchedule()
 
 	for {
 		select {
-		case <-stream.Context().Done():
-			return stream.Context().Err()
-		case <-ticker.C:
+		case <-ctx.Done():
+			return
+		case now := <-ticker.C:
 			configMu.RLock()
 			cfg := currentConfig
 			configMu.RUnlock()
 
-			measurements := pollAllPLCs(stream.Context(), cfg)
-			for _, measurement := range measurements {
+			for _, measurement := range pollAllPLCs(ctx, cfg, schedule, now) {
 				data, err := json.Marshal(measurement)
 				if err != nil {
 					log.Printf("failed to marshal measurement: %v", err)
 					continue
 				}
-				if err := stream.Send(&pb.DataPayload{JsonData: string(data)}); err != nil {
-					return err
-				}
+				replay.append(string(data))
 			}
 		}
 	}
 }
 
-func pollAllPLCs(ctx context.Context, cfg pollingConfig) []measurementPayload {
+func (s *pollingServer) StreamData(req *pb.StreamRequest, stream pb.PollingService_StreamDataServer) error {
+	from := req.GetFromSeq()
+	if req.GetStreamId() != "" && req.GetStreamId() != streamID {
+		// Sequência de outra instância (o poller reiniciou): tudo o que há.
+		from = 0
+	}
+
+	for {
+		entries, err := replay.read(stream.Context(), from, streamBatch)
+		if err != nil {
+			return err
+		}
+		for _, entry := range entries {
+			payload := &pb.DataPayload{JsonData: entry.data, Seq: entry.seq, StreamId: streamID}
+			if err := stream.Send(payload); err != nil {
+				return err
+			}
+			from = entry.seq + 1
+		}
+	}
+}
+
+func pollAllPLCs(ctx context.Context, cfg pollingConfig, schedule *pollSchedule, now time.Time) []measurementPayload {
 	results := make([]measurementPayload, 0)
 	for _, plc := range cfg.PLCs {
 		if len(plc.Registers) == 0 {
 			continue
 		}
+
+		dueRegisters := make(map[int]bool, len(plc.Registers))
+		for _, reg := range plc.Registers {
+			if schedule.due(reg.ID, now) {
+				dueRegisters[reg.ID] = true
+				schedule.advance(reg.ID, now, reg.interval(plc))
+			}
+		}
+		if len(dueRegisters) == 0 {
+			continue
+		}
+
+		blockValues := make(map[int]float64)
+		blockErrors := make(map[int]error)
+		for _, block := range plc.ReadPlan {
+			select {
+			case <-ctx.Done():
+				return results
+			default:
+			}
+			if !blockDue(block, dueRegisters) {
+				continue
+			}
+			values, err := readBlockValues(plc, block)
+			for _, reg := range block.Registers {
+				if err != nil {
+					blockErrors[reg.ID] = err
+					continue
+				}
+				blockValues[reg.ID] = values[reg.ID]
+			}
+		}
+
 		for _, reg := range plc.Registers {
+			if !dueRegisters[reg.ID] {
+				continue
+			}
 			select {
 			case <-ctx.Done():
 				return results
@@ -146,7 +433,15 @@ func pollAllPLCs(ctx context.Context, cfg pollingConfig) []measurementPayload {
 			}
 
 			measurementTime := time.Now().UTC()
-			value, err := readRegister(plc, reg)
+			var value float64
+			var err error
+			if planned, ok := blockValues[reg.ID]; ok {
+				value = planned
+			} else if blockErr, ok := blockErrors[reg.ID]; ok {
+				err = blockErr
+			} else {
+				value, err = readRegister(plc, reg)
+			}
 			payload := measurementPayload{
 				PLCID:      plc.ID,
 				RegisterID: reg.ID,
@@ -174,6 +469,29 @@ func pollAllPLCs(ctx context.Context, cfg pollingConfig) []measurementPayload {
 	return results
 }
 
+// blockDue indica se algum registrador do bloco está na hora de ser lido; os
+// registradores de um bloco partilham o intervalo efetivo.
+func blockDue(block readBlock, dueRegisters map[int]bool) bool {
+	for _, reg := range block.Registers {
+		if dueRegisters[reg.ID] {
+			return true
+		}
+	}
+	return false
+}
+
+// readBlockValues faz um único pedido para o bloco inteiro e separa o valor
+// de cada registrador pelo seu offset.
+func readBlockValues(plc plcDescriptor, block readBlock) (map[int]float64, error) {
+	_ = plc
+	values := make(map[int]float64, len(block.Registers))
+	base := float64(time.Now().UnixNano()%100_000) / 1000.0
+	for _, reg := range block.Registers {
+		values[reg.ID] = base + float64(reg.Offset)
+	}
+	return values, nil
+}
+
 func readRegister(plc plcDescriptor, reg registerDescriptor) (float64, error) {
 	_ = plc
 	_ = reg
@@ -0,0 +1,101 @@
+package main
+
+import (
+	"context"
+	"sync"
+)
+
+// defaultReplayCapacity é o número de medições guardadas para retoma quando
+// POLLER_REPLAY_BUFFER não está definido.
+const defaultReplayCapacity = 100_000
+
+type replayEntry struct {
+	seq  int64
+	data string
+}
+
+// replayBuffer é um anel limitado de medições já serializadas, numeradas
+// com uma sequência monotónica.  Cada StreamData lê-o de forma independente a
+// partir do from_seq pedido, pelo que uma ligação perdida pode retomar sem
+// perdas enquanto as mensagens ainda estiverem no anel.
+type replayBuffer struct {
+	mu      sync.Mutex
+	entries []replayEntry
+	head    int // posição da entrada mais antiga
+	size    int
+	nextSeq int64
+	notify  chan struct{}
+}
+
+func newReplayBuffer(capacity int) *replayBuffer {
+	if capacity <= 0 {
+		capacity = defaultReplayCapacity
+	}
+	return &replayBuffer{
+		entries: make([]replayEntry, capacity),
+		nextSeq: 1,
+		notify:  make(chan struct{}),
+	}
+}
+
+// append guarda data com o próximo número de sequência e acorda os leitores.
+func (b *replayBuffer) append(data string) int64 {
+	b.mu.Lock()
+	seq := b.nextSeq
+	b.nextSeq++
+	capacity := len(b.entries)
+	if b.size < capacity {
+		b.entries[(b.head+b.size)%capacity] = replayEntry{seq: seq, data: data}
+		b.size++
+	} else {
+		b.entries[b.head] = replayEntry{seq: seq, data: data}
+		b.head = (b.head + 1) % capacity
+	}
+	wake := b.notify
+	b.notify = make(chan struct{})
+	b.mu.Unlock()
+
+	close(wake)
+	return seq
+}
+
+// oldestLocked devolve a sequência mais antiga ainda disponível (nextSeq se
+// vazio); exige b.mu.
+func (b *replayBuffer) oldestLocked() int64 {
+	return b.nextSeq - int64(b.size)
+}
+
+// read devolve até max entradas com seq >= from, bloqueando até haver alguma
+// ou o contexto terminar.  from <= 0 ou anterior ao anel começa no mais
+// antigo disponível (o cliente deteta o salto pela sequência).
+func (b *replayBuffer) read(ctx context.Context, from int64, max int) ([]replayEntry, error) {
+	for {
+		b.mu.Lock()
+		oldest := b.oldestLocked()
+		if from < oldest {
+			from = oldest
+		}
+		if from < b.nextSeq {
+			count := int(b.nextSeq - from)
+			if count > max {
+				count = max
+			}
+			out := make([]replayEntry, count)
+			offset := int(from - oldest)
+			capacity := len(b.entries)
+			for i := 0; i < count; i++ {
+				out[i] = b.entries[(b.head+offset+i)%capacity]
+			}
+			b.mu.Unlock()
+			return out, nil
+		}
+		wake := b.notify
+		b.mu.Unlock()
+
+		select {
+		case <-ctx.Done():
+			return nil, ctx.Err()
+		case <-wake:
+		}
+	}
+}
@@ -19,8 +19,9 @@ import (
 const _ = grpc.SupportPackageIsVersion7
 
 const (
-	PollingService_UpdateConfig_FullMethodName = "/polling.PollingService/UpdateConfig"
-	PollingService_StreamData_FullMethodName   = "/polling.PollingService/StreamData"
+	PollingService_UpdateConfig_FullMethodName     = "/polling.PollingService/UpdateConfig"
+	PollingService_ApplyConfigDelta_FullMethodName = "/polling.PollingService/ApplyConfigDelta"
+	PollingService_StreamData_FullMethodName       = "/polling.PollingService/StreamData"
 )
 
 // PollingServiceClient is the client API for PollingService service.
@@ -28,7 +29,11 @@ const (
 // For semantics around ctx use and closing/ending streaming RPCs, please refer to https://pkg.go.dev/google.golang.org/grpc/?tab=doc#ClientConn.NewStream.
 type PollingServiceClient interface {
 	UpdateConfig(ctx context.Context, in *ConfigPayload, opts ...grpc.CallOption) (*StatusResponse, error)
-	StreamData(ctx context.Context, in *Empty, opts ...grpc.CallOption) (PollingService_StreamDataClient, error)
+	// Aplica apenas as diferenças (JSON com base_version/version) à configuração atual.
+	ApplyConfigDelta(ctx context.Context, in *ConfigPayload, opts ...grpc.CallOption) (*StatusResponse, error)
+	// Retoma a partir de from_seq (inclusive) enquanto a mensagem estiver no
+	// buffer de repetição do poller; from_seq = 0 começa no mais antigo.
+	StreamData(ctx context.Context, in *StreamRequest, opts ...grpc.CallOption) (PollingService_StreamDataClient, error)
 }
 
 type pollingServiceClient struct {
@@ -48,7 +53,16 @@ func (c *pollingServiceClient) UpdateConfig(ctx context.Context, in *ConfigPaylo
 	return out, nil
 }
 
-func (c *pollingServiceClient) StreamData(ctx context.Context, in *Empty, opts ...grpc.CallOption) (PollingService_StreamDataClient, error) {
+func (c *pollingServiceClient) ApplyConfigDelta(ctx context.Context, in *ConfigPayload, opts ...grpc.CallOption) (*StatusResponse, error) {
+	out := new(StatusResponse)
+	err := c.cc.Invoke(ctx, PollingService_ApplyConfigDelta_FullMethodName, in, out, opts...)
+	if err != nil {
+		return nil, err
+	}
+	return out, nil
+}
+
+func (c *pollingServiceClient) StreamData(ctx context.Context, in *StreamRequest, opts ...grpc.CallOption) (PollingService_StreamDataClient, error) {
 	stream, err := c.cc.NewStream(ctx, &PollingService_ServiceDesc.Streams[0], PollingService_StreamData_FullMethodName, opts...)
 	if err != nil {
 		return nil, err
@@ -85,7 +99,11 @@ func (x *pollingServiceStreamDataClient) Recv() (*DataPayload, error) {
 // for forward compatibility
 type PollingServiceServer interface {
 	UpdateConfig(context.Context, *ConfigPayload) (*StatusResponse, error)
-	StreamData(*Empty, PollingService_StreamDataServer) error
+	// Aplica apenas as diferenças (JSON com base_version/version) à configuração atual.
+	ApplyConfigDelta(context.Context, *ConfigPayload) (*StatusResponse, error)
+	// Retoma a partir de from_seq (inclusive) enquanto a mensagem estiver no
+	// buffer de repetição do poller; from_seq = 0 começa no mais antigo.
+	StreamData(*StreamRequest, PollingService_StreamDataServer) error
 	mustEmbedUnimplementedPollingServiceServer()
 }
 
@@ -96,7 +114,10 @@ type UnimplementedPollingServiceServer struct {
 func (UnimplementedPollingServiceServer) UpdateConfig(context.Context, *ConfigPayload) (*StatusResponse, error) {
 	return nil, status.Errorf(codes.Unimplemented, "method UpdateConfig not implemented")
 }
-func (UnimplementedPollingServiceServer) StreamData(*Empty, PollingService_StreamDataServer) error {
+func (UnimplementedPollingServiceServer) ApplyConfigDelta(context.Context, *ConfigPayload) (*StatusResponse, error) {
+	return nil, status.Errorf(codes.Unimplemented, "method ApplyConfigDelta not implemented")
+}
+func (UnimplementedPollingServiceServer) StreamData(*StreamRequest, PollingService_StreamDataServer) error {
 	return status.Errorf(codes.Unimplemented, "method StreamData not implemented")
 }
 func (UnimplementedPollingServiceServer) mustEmbedUnimplementedPollingServiceServer() {}
@@ -130,8 +151,26 @@ func _PollingService_UpdateConfig_Handler(srv interface{}, ctx context.Context,
 	return interceptor(ctx, in, info, handler)
 }
 
+func _PollingService_ApplyConfigDelta_Handler(srv interface{}, ctx context.Context, dec func(interface{}) error, interceptor grpc.UnaryServerInterceptor) (interface{}, error) {
+	in := new(ConfigPayload)
+	if err := dec(in); err != nil {
+		return nil, err
+	}
+	if interceptor == nil {
+		return srv.(PollingServiceServer).ApplyConfigDelta(ctx, in)
+	}
+	info := &grpc.UnaryServerInfo{
+		Server:     srv,
+		FullMethod: PollingService_ApplyConfigDelta_FullMethodName,
+	}
+	handler := func(ctx context.Context, req interface{}) (interface{}, error) {
+		return srv.(PollingServiceServer).ApplyConfigDelta(ctx, req.(*ConfigPayload))
+	}
+	return interceptor(ctx, in, info, handler)
+}
+
 func _PollingService_StreamData_Handler(srv interface{}, stream grpc.ServerStream) error {
-	m := new(Empty)
+	m := new(StreamRequest)
 	if err := stream.RecvMsg(m); err != nil {
 		return err
 	}
@@ -162,6 +201,10 @@ var PollingService_ServiceDesc = grpc.ServiceDesc{
 			MethodName: "UpdateConfig",
 			Handler:    _PollingService_UpdateConfig_Handler,
 		},
+		{
+			MethodName: "ApplyConfigDelta",
+			Handler:    _PollingService_ApplyConfigDelta_Handler,
+		},
 	},
 	Streams: []grpc.StreamDesc{
 		{
@@ -9,12 +9,20 @@ from typing import Dict, List, Optional
 
 from src.app import create_app
 from src.app.settings import get_app_settings
-from src.manager.go_polling_manager import GoPollingManager, is_go_available
+from src.consumers.data_processor import PLCDataProcessor
+from src.manager.async_polling_engine import AsyncPollingEngine
+from src.manager.go_polling_manager import is_go_available
+from src.manager.poller_pool import PollerPool
 from src.models import PLC, Register
 from src.models.Alarms import AlarmDefinition
 from src.repository.Alarms_repository import AlarmDefinitionRepo
 from src.repository.PLC_repository import Plcrepo
 from src.repository.Registers_repository import RegRepo
+from src.services.Alarms_service import start_pending_alarm_flusher
+from src.services.alarm_flood_service import get_alarm_flood_manager
+from src.services.connectivity_service import sweep_stale_plcs
+from src.services.poll_scheduler import load_schedule_settings
+from src.services.poller_config_service import build_poller_config
 from src.services.polling_runtime import PollingRuntime, register_runtime
 from src.services.poller_ingest_service import (
     PollerIngestError,
@@ -33,6 +41,9 @@ from src.services.mqtt_service import get_mqtt_publisher
 # ===========================================================
 CLPS_POR_PROTOCOLO = 10
 MAX_THREADS = 4  # reservado para futura paralelização
+# "go" (poller Go via gRPC) ou "python" (motor asyncio); por omissão usa o
+# Go quando a toolchain existe.
+POLLING_ENGINE_ENV = "POLLING_ENGINE"
 
 
 # ===========================================================
@@ -462,44 +473,48 @@ def ensure_alarm(
 # ===========================================================
 def build_go_poller_config() -> Dict[str, object]:
     with app.app_context():
-        plcs = []
-        for plc in Plcrepo.list_all():
-            if not plc.is_active:
-                continue
-            registers = []
-            for register in RegRepo.list_by_plc(plc.id):
-                if not register.is_active:
-                    continue
-                registers.append(
-                    {
-                        "id": register.id,
-                        "name": register.name,
-                        "address": register.address,
-                        "poll_rate": register.poll_rate or plc.polling_interval,
-                        "unit": register.unit or "",
-                    }
-                )
-            plcs.append(
-                {
-                    "id": plc.id,
-                    "name": plc.name,
-                    "ip_address": plc.ip_address,
-                    "vlan_id": plc.vlan_id,
-                    "protocol": plc.protocol,
-                    "polling_interval": plc.polling_interval or 1000,
-                    "registers": registers,
-                }
-            )
-    return {"plcs": plcs}
+        return build_poller_config()
+
+
+def select_polling_engine() -> str:
+    engine = os.getenv(POLLING_ENGINE_ENV, "").strip().lower()
+    if engine == "go" and not is_go_available():
+        raise RuntimeError(
+            "POLLING_ENGINE=go mas a toolchain Go não está disponível."
+        )
+    if engine in {"go", "python"}:
+        return engine
+    return "go" if is_go_available() else "python"
+
+
+def start_python_engine(app, initial_config: Dict[str, object]) -> AsyncPollingEngine:
+    """Arranca o motor asyncio com o processador em lote no mesmo loop."""
+
+    processor = PLCDataProcessor(app=app, source="direct")
+    engine = AsyncPollingEngine(processor.ingest, companions=(processor.start,))
+    engine.start(initial_config)
+    return engine
 
 
 def start_stream_consumer(
     app, data_queue: Queue[str]
 ) -> tuple[threading.Thread, threading.Event]:
     stop_event = threading.Event()
+    sweep_interval = 5.0
+
+    def _sweep_connectivity() -> None:
+        try:
+            with app.app_context():
+                sweep_stale_plcs()
+        except Exception:
+            logger.exception("Erro ao verificar CLPs sem leituras.")
 
     def _worker() -> None:
+        last_sweep = time.monotonic()
         while not stop_event.is_set():
+            if time.monotonic() - last_sweep >= sweep_interval:
+                _sweep_connectivity()
+                last_sweep = time.monotonic()
             try:
                 raw_payload = data_queue.get(timeout=0.5)
             except Empty:
@@ -643,32 +658,50 @@ if __name__ == "__main__":
     for protocolo, quantidade in resultados.items():
         logger.info("Protocolo %s: %d CLPs ativos.", protocolo, quantidade)
 
-    if not is_go_available():
-        raise RuntimeError(
-            "Go toolchain não disponível; o poller Go é obrigatório nesta versão."
+    engine = select_polling_engine()
+    initial_config = build_go_poller_config()
+    if engine == "python":
+        try:
+            polling_manager = start_python_engine(app, initial_config)
+        except Exception:
+            logger.exception("Falha ao iniciar o motor de polling Python.")
+            raise
+        logger.process(
+            "Motor de polling Python inicializado (%d CLP(s)).",
+            len(polling_manager.workers),
+        )
+        runtime = PollingRuntime(
+            manager=polling_manager,
+            config_builder=build_go_poller_config,
+        )
+    else:
+        data_queue: Queue[str] = Queue()
+        polling_manager = PollerPool(data_queue)
+        try:
+            polling_manager.start(initial_config)
+        except Exception:
+            logger.exception("Falha ao iniciar o serviço de polling Go via gRPC.")
+            raise
+        logger.process(
+            "Serviço de polling Go inicializado (gRPC, %d shard(s)).",
+            len(polling_manager.shards),
         )
 
-    data_queue: Queue[str] = Queue()
-    initial_config = build_go_poller_config()
-    polling_manager = GoPollingManager(data_queue)
-    try:
-        polling_manager.start(initial_config)
-    except Exception:
-        logger.exception("Falha ao iniciar o serviço de polling Go via gRPC.")
-        raise
-    logger.process("Serviço de polling Go inicializado (gRPC).")
-
-    consumer_thread, consumer_stop = start_stream_consumer(app, data_queue)
-
-    runtime = PollingRuntime(
-        manager=polling_manager,
-        data_queue=data_queue,
-        consumer_thread=consumer_thread,
-        consumer_stop_event=consumer_stop,
-    )
+        consumer_thread, consumer_stop = start_stream_consumer(app, data_queue)
+
+        runtime = PollingRuntime(
+            manager=polling_manager,
+            data_queue=data_queue,
+            consumer_thread=consumer_thread,
+            consumer_stop_event=consumer_stop,
+            config_builder=build_go_poller_config,
+        )
     with app.app_context():
         runtime.set_enabled(get_polling_enabled())
     register_runtime(app, runtime)
+    runtime.start_config_refresh(load_schedule_settings().refresh_seconds)
+    if get_alarm_flood_manager().enabled:
+        start_pending_alarm_flusher(app)
 
     mqtt_publisher = get_mqtt_publisher()
     if mqtt_publisher.is_enabled:
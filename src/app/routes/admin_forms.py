@@ -142,6 +142,12 @@ class AlarmDefinitionForm(FlaskForm):
             ("outside_range", "Fora do intervalo"),
             ("inside_range", "Dentro do intervalo"),
             ("change", "Mudança brusca"),
+            ("rate_above", "Taxa de variação acima do limite"),
+            ("rate_below", "Taxa de variação abaixo do limite"),
+            ("average_above", "Média móvel acima do limite"),
+            ("average_below", "Média móvel abaixo do limite"),
+            ("window_max_above", "Máximo da janela acima do limite"),
+            ("window_min_below", "Mínimo da janela abaixo do limite"),
         ],
         validators=[DataRequired()],
         default="above",
@@ -150,6 +156,20 @@ class AlarmDefinitionForm(FlaskForm):
     threshold_low = FloatField("Limite inferior", validators=[Optional()])
     threshold_high = FloatField("Limite superior", validators=[Optional()])
     deadband = FloatField("Histérese", validators=[Optional()], default=0.0)
+    window_size = IntegerField(
+        "Amostras na janela",
+        validators=[Optional(), NumberRange(min=2, max=10000)],
+    )
+    on_delay_seconds = FloatField(
+        "Atraso de activação (s)",
+        validators=[Optional(), NumberRange(min=0)],
+        default=0.0,
+    )
+    off_delay_seconds = FloatField(
+        "Atraso de normalização (s)",
+        validators=[Optional(), NumberRange(min=0)],
+        default=0.0,
+    )
     priority = SelectField(
         "Prioridade",
         choices=[
@@ -23,7 +23,7 @@ from src.services.alarm_admin_service import (
     delete_alarm_definition as delete_alarm_definition_entry,
 )
 from src.services.plc_admin_service import create_plc, delete_plc, update_plc
-from src.services.polling_admin_service import update_polling_state
+from src.services.polling_admin_service import polling_schedule_overview, update_polling_state
 from src.services.register_admin_service import (
     create_register,
     delete_register as delete_register_entry,
@@ -441,6 +441,7 @@ def manage_polling_control():
         form=form,
         db_enabled=persisted_enabled,
         runtime_enabled=runtime_enabled,
+        schedule=polling_schedule_overview(runtime),
     )
 
 
@@ -535,6 +536,9 @@ def manage_alarm_definitions():
                     "threshold_low": form.threshold_low.data,
                     "threshold_high": form.threshold_high.data,
                     "deadband": form.deadband.data,
+                    "window_size": form.window_size.data,
+                    "on_delay_seconds": form.on_delay_seconds.data,
+                    "off_delay_seconds": form.off_delay_seconds.data,
                     "priority": form.priority.data,
                     "severity": form.severity.data,
                     "is_active": form.is_active.data,
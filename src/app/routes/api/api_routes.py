@@ -25,6 +25,12 @@ from src.services.tag_simulation_service import get_simulated_tags
 from src.services.manual_control_service import ManualControlService
 from src.services.historian_sync_service import HistorianSyncService
 from src.services.Alarms_service import AlarmService
+from src.services.alarm_kpi_service import AlarmKpiService
+from src.services.alarm_admin_service import (
+    acknowledge_alarm,
+    shelve_alarm_definition,
+    unshelve_alarm_definition,
+)
 from src.services.poller_ingest_service import (
     PollerIngestError,
     PollerIngestProcessingError,
@@ -54,6 +60,7 @@ register_service = RegisterImportExportService()
 script_engine = ScriptEngine()
 manual_control_service = ManualControlService()
 historian_sync_service = HistorianSyncService()
+alarm_kpis = AlarmKpiService()
 
 
 @api_bp.route("/v1/internal/poller-data", methods=["POST"])
@@ -361,10 +368,7 @@ def dashboard_summary():
         "offline_clps": int(totals_row[2] or 0),
         "inactive_clps": int(totals_row[3] or 0),
         "total_registers": db.session.query(func.count(Register.id)).scalar() or 0,
-        "active_alarms": db.session.query(func.count(Alarm.id))
-        .filter(Alarm.state == "ACTIVE")
-        .scalar()
-        or 0,
+        "active_alarms": alarm_kpis.active_total(),
         "active_vlans": (
             db.session.query(func.count(func.distinct(PLC.vlan_id)))
             .filter(PLC.vlan_id.isnot(None))
@@ -399,15 +403,8 @@ def dashboard_summary():
         for day, count in log_volume_query
     ]
 
-    alarms_by_priority_query = (
-        db.session.query(Alarm.priority, func.count(Alarm.id))
-        .filter(Alarm.state == "ACTIVE")
-        .group_by(Alarm.priority)
-    )
-    alarms_by_priority = {
-        (priority or "Sem prioridade"): count
-        for priority, count in alarms_by_priority_query
-    }
+    alarms_by_priority = alarm_kpis.active_by_priority()
+    alarm_volume = alarm_kpis.daily_triggers(days=14)
 
     offline_clps = (
         db.session.query(PLC)
@@ -435,6 +432,7 @@ def dashboard_summary():
             "totals": totals,
             "log_volume": log_volume,
             "alarms_by_priority": alarms_by_priority,
+            "alarm_volume": alarm_volume,
             "offline_clps": offline_payload,
         }
     )
@@ -443,12 +441,7 @@ def dashboard_summary():
 @api_bp.route("/dashboard/plcs", methods=["GET"])
 @login_required
 def dashboard_plc_collection():
-    alarm_by_plc = {
-        plc_id: count
-        for plc_id, count in db.session.query(Alarm.plc_id, func.count(Alarm.id))
-        .filter(Alarm.state == "ACTIVE")
-        .group_by(Alarm.plc_id)
-    }
+    alarm_by_plc = alarm_kpis.active_by_plc()
 
     latest_logs = {
         plc_id: ts
@@ -510,20 +503,8 @@ def dashboard_layout():
             y = 60 + (fallback_index // column_count) * spacing_y
             node["position"] = {"x": x, "y": y}
 
-    alarm_by_plc = {
-        plc_id: count
-        for plc_id, count in db.session.query(Alarm.plc_id, func.count(Alarm.id))
-        .filter(Alarm.state == "ACTIVE")
-        .group_by(Alarm.plc_id)
-    }
-    alarm_by_register = {
-        register_id: count
-        for register_id, count in db.session.query(
-            Alarm.register_id, func.count(Alarm.id)
-        )
-        .filter(Alarm.state == "ACTIVE", Alarm.register_id.isnot(None))
-        .group_by(Alarm.register_id)
-    }
+    alarm_by_plc = alarm_kpis.active_by_plc()
+    alarm_by_register = alarm_kpis.active_by_register()
 
     plcs = (
         db.session.query(PLC)
@@ -773,24 +754,8 @@ def dashboard_plc_details(plc_id: int):
     if plc is None:
         return jsonify({"message": "CLP não encontrado."}), 404
 
-    register_ids = [register.id for register in plc.registers]
-    alarm_by_register = {}
-    if register_ids:
-        alarm_by_register = {
-            register_id: count
-            for register_id, count in db.session.query(
-                Alarm.register_id, func.count(Alarm.id)
-            )
-            .filter(Alarm.state == "ACTIVE", Alarm.register_id.in_(register_ids))
-            .group_by(Alarm.register_id)
-        }
-
-    plc_alarm_total = (
-        db.session.query(func.count(Alarm.id))
-        .filter(Alarm.state == "ACTIVE", Alarm.plc_id == plc.id)
-        .scalar()
-        or 0
-    )
+    alarm_by_register = alarm_kpis.active_by_register()
+    plc_alarm_total = alarm_kpis.active_by_plc().get(plc.id, 0)
 
     status = _plc_status(plc, {plc.id: plc_alarm_total})
 
@@ -1245,21 +1210,9 @@ def delete_plc_script(plc_id: int, script_id: int):
 def hmi_overview():
     """Aggregates data for the synoptic HMI view and performance metrics."""
 
-    alarm_by_plc = {
-        plc_id: count
-        for plc_id, count in db.session.query(Alarm.plc_id, func.count(Alarm.id))
-        .filter(Alarm.state == "ACTIVE")
-        .group_by(Alarm.plc_id)
-    }
+    alarm_by_plc = alarm_kpis.active_by_plc()
 
-    alarm_by_register = {
-        register_id: count
-        for register_id, count in db.session.query(
-            Alarm.register_id, func.count(Alarm.id)
-        )
-        .filter(Alarm.state == "ACTIVE", Alarm.register_id.isnot(None))
-        .group_by(Alarm.register_id)
-    }
+    alarm_by_register = alarm_kpis.active_by_register()
 
     plcs = (
         db.session.query(PLC)
@@ -1330,10 +1283,7 @@ def hmi_overview():
     horizon_24h = datetime.now(timezone.utc) - timedelta(hours=24)
     report_metrics = {
         "clp_availability": round(availability, 1),
-        "active_alarms": db.session.query(func.count(Alarm.id))
-        .filter(Alarm.state == "ACTIVE")
-        .scalar()
-        or 0,
+        "active_alarms": alarm_kpis.active_total(),
         "manual_commands_24h": db.session.query(func.count(ManualCommand.id))
         .filter(ManualCommand.created_at >= horizon_24h)
         .scalar()
@@ -1390,6 +1340,71 @@ def hmi_active_alarms():
     return jsonify({"alarms": payload})
 
 
+@api_bp.route("/alarms/definitions/<int:definition_id>/shelve", methods=["POST"])
+@login_required
+@api_role_required("operator")
+def shelve_alarm_definition_route(definition_id: int):
+    """Put an alarm definition on the shelf for a limited time."""
+
+    definition = db.session.get(AlarmDefinition, definition_id)
+    if definition is None:
+        return jsonify({"message": "Definição de alarme não encontrada."}), 404
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        minutes = float(payload.get("minutes", 60))
+        definition = shelve_alarm_definition(
+            definition,
+            minutes=minutes,
+            actor=current_user.username,
+            reason=payload.get("reason"),
+        )
+    except (TypeError, ValueError) as exc:
+        return jsonify({"message": str(exc)}), 400
+
+    return jsonify(
+        {
+            "id": definition.id,
+            "shelved_until": definition.shelved_until.isoformat(),
+            "shelved_by": definition.shelved_by,
+        }
+    )
+
+
+@api_bp.route("/alarms/definitions/<int:definition_id>/shelve", methods=["DELETE"])
+@login_required
+@api_role_required("operator")
+def unshelve_alarm_definition_route(definition_id: int):
+    """Return a shelved alarm definition to normal evaluation."""
+
+    definition = db.session.get(AlarmDefinition, definition_id)
+    if definition is None:
+        return jsonify({"message": "Definição de alarme não encontrada."}), 404
+
+    unshelve_alarm_definition(definition)
+    return jsonify({"id": definition_id, "shelved_until": None})
+
+
+@api_bp.route("/alarms/<int:alarm_id>/ack", methods=["POST"])
+@login_required
+@api_role_required("operator")
+def acknowledge_alarm_route(alarm_id: int):
+    """Acknowledge an alarm on behalf of the current operator."""
+
+    alarm = db.session.get(Alarm, alarm_id)
+    if alarm is None:
+        return jsonify({"message": "Alarme não encontrado."}), 404
+
+    alarm = acknowledge_alarm(alarm, actor=current_user.username)
+    return jsonify(
+        {
+            "id": alarm.id,
+            "acknowledged_at": alarm.acknowledged_at.isoformat(),
+            "acknowledged_by": alarm.acknowledged_by,
+        }
+    )
+
+
 @api_bp.route("/hmi/manual-commands", methods=["GET"])
 @login_required
 def hmi_manual_history():
@@ -2,15 +2,16 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from flask_wtf import FlaskForm
 from wtforms import BooleanField, SubmitField
 
 from src.models.Users import UserRole
 from src.services import discovery_service
+from src.services.polling_runtime import trigger_polling_refresh
 from src.utils import role_required
 from src.utils.logs import logger
 
@@ -21,6 +22,57 @@ class DiscoveryControlForm(FlaskForm):
     run_scan = SubmitField("Executar varredura agora")
 
 
+class PromoteDevicesForm(FlaskForm):
+    submit = SubmitField("Promover selecionados a CLP")
+
+
+INDUSTRIAL_FILTERS = {"1": True, "0": False}
+PER_PAGE_DEFAULT = 50
+# Parâmetros da listagem preservados ao voltar de ``promote``.
+LIST_ARGS = ("q", "industrial", "manufacturer", "page", "per_page")
+# IPs listados por categoria na mensagem de fim de varredura.
+DIFF_PREVIEW = 5
+
+
+def _preview(ips: List[str]) -> str:
+    shown = ", ".join(ips[:DIFF_PREVIEW])
+    return f"{shown} (+{len(ips) - DIFF_PREVIEW})" if len(ips) > DIFF_PREVIEW else shown
+
+
+def _scan_message(result: Dict[str, Any]) -> str:
+    """Resumo da varredura com a diferença para a anterior."""
+
+    diff = result["diff"]
+    added = [device["ip"] for device in diff["added"]]
+    removed = [device["ip"] for device in diff["removed"]]
+    changed = [item["ip"] for item in diff["changed"]]
+    parts = [
+        f"Varredura concluída: {len(result['devices'])} dispositivos identificados "
+        f"({result['probed']} sondados, {result['reused']} da cache)."
+    ]
+    for label, ips in (("Novos", added), ("Removidos", removed), ("Alterados", changed)):
+        if ips:
+            parts.append(f"{label}: {_preview(ips)}.")
+    if not (added or removed or changed):
+        parts.append("Sem alterações desde a varredura anterior.")
+    return " ".join(parts)
+
+
+def _int_arg(name: str, default: int, minimum: int = 1, maximum: Optional[int] = None) -> int:
+    try:
+        value = max(int(request.args.get(name, default) or default), minimum)
+    except (TypeError, ValueError):
+        return default
+    return min(value, maximum) if maximum else value
+
+
+def _back_to_list():
+    """Volta à listagem com os filtros recebidos na query string."""
+
+    filters = {name: request.args[name] for name in LIST_ARGS if request.args.get(name)}
+    return redirect(url_for("coleta.control", **filters))
+
+
 coleta_bp = Blueprint("coleta", __name__)
 
 
@@ -32,9 +84,7 @@ def control():
 
     persisted_enabled = discovery_service.is_discovery_enabled()
     last_run = discovery_service.get_last_run_time()
-    summary = discovery_service.load_discovery_summary()
-    total_devices = len(summary)
-    industrial_count = discovery_service.count_industrial_devices(summary)
+    counts = discovery_service.discovery_counts()
     has_privileges = discovery_service.has_network_privileges()
 
     if request.method == "GET":
@@ -64,11 +114,8 @@ def control():
                 )
             else:
                 try:
-                    devices = discovery_service.execute_discovery(actor=actor)
-                    flash(
-                        f"Varredura concluída: {len(devices)} dispositivos identificados.",
-                        "success",
-                    )
+                    result = discovery_service.execute_discovery(actor=actor)
+                    flash(_scan_message(result), "success")
                     return redirect(url_for("coleta.control"))
                 except Exception as exc:  # pragma: no cover - defensivo
                     logger.exception("Erro ao executar varredura de rede")
@@ -78,15 +125,59 @@ def control():
     if last_run:
         last_run_display = last_run.astimezone().strftime("%d/%m/%Y %H:%M:%S %Z")
 
-    summary_preview = summary[:20]
+    search_term = (request.args.get("q") or "").strip()
+    industrial_arg = request.args.get("industrial", "")
+    manufacturer = (request.args.get("manufacturer") or "").strip()
+    page_data = discovery_service.list_discovered_devices(
+        _int_arg("page", 1),
+        _int_arg("per_page", PER_PAGE_DEFAULT, maximum=200),
+        industrial=INDUSTRIAL_FILTERS.get(industrial_arg),
+        search=search_term or None,
+        manufacturer=manufacturer or None,
+    )
 
     return render_template(
         "coleta/control.html",
         form=form,
+        promote_form=PromoteDevicesForm(),
         persisted_enabled=persisted_enabled,
-        total_devices=total_devices,
-        industrial_count=industrial_count,
+        total_devices=counts["total"],
+        industrial_count=counts["industrial"],
+        promoted_count=counts["promoted"],
         last_run_display=last_run_display,
-        summary_preview=summary_preview,
+        devices=page_data["items"],
+        pagination=page_data["pagination"],
+        manufacturers=discovery_service.list_discovered_manufacturers(),
+        filters={"q": search_term, "industrial": industrial_arg, "manufacturer": manufacturer},
         has_privileges=has_privileges,
     )
+
+
+@coleta_bp.route("/promover", methods=["POST"])
+@login_required
+@role_required(UserRole.ENGINEER)
+def promote():
+    form = PromoteDevicesForm()
+    if not form.validate_on_submit():
+        flash("Pedido inválido. Actualize a página e tente novamente.", "danger")
+        return _back_to_list()
+
+    device_ids = [int(value) for value in request.form.getlist("device_ids") if value.isdigit()]
+    if not device_ids:
+        flash("Selecione pelo menos um dispositivo.", "warning")
+        return _back_to_list()
+
+    actor = current_user.username if current_user.is_authenticated else None
+    try:
+        created = discovery_service.promote_to_plcs(device_ids, actor=actor)
+    except Exception as exc:  # pragma: no cover - defensivo
+        logger.exception("Erro ao promover dispositivos a CLP")
+        flash(f"Erro ao criar CLPs: {exc}", "danger")
+        return _back_to_list()
+
+    if created:
+        flash(f"{len(created)} CLP(s) criados a partir da descoberta.", "success")
+        trigger_polling_refresh(current_app)
+    else:
+        flash("Nenhum CLP criado: os dispositivos já estão associados ou não têm protocolo industrial.", "info")
+    return _back_to_list()
@@ -3,6 +3,30 @@
 A arquitetura desacoplada envia leituras de CLPs para uma fila de mensagens.
 Este serviço inscreve-se no tópico de telemetria, executa a lógica de
 negócio (alarmes/MQTT) e realiza gravações em lote no banco de dados.
+
+A origem das mensagens é escolhida por ``PLC_DATA_SOURCE``: ``redis``
+(Pub/Sub, padrão), ``streams`` (Redis Streams com *consumer groups*),
+``mqtt`` (ver :mod:`src.consumers.mqtt_subscriber`) ou ``direct``, em que o
+:class:`~src.manager.async_polling_engine.AsyncPollingEngine` entrega as
+leituras a :meth:`PLCDataProcessor.ingest` no mesmo *event loop*.
+
+No modo ``streams`` várias instâncias do processador partilham o mesmo grupo
+e cada entrada é entregue a uma só delas.  O ``XACK`` é enviado em lote
+depois de o ``bulk_insert`` correspondente ter sido gravado; entradas de
+consumidores que caíram são recuperadas com ``XAUTOCLAIM``.
+
+O trabalho síncrono de base de dados não corre no *event loop*: a avaliação
+de alarmes usa uma *thread* dedicada e os ``bulk_insert`` outra, cada uma
+com um único *worker* para manter a ordem de chegada.  No máximo
+``PLC_DATA_MAX_INFLIGHT_FLUSHES`` lotes ficam em gravação ao mesmo tempo;
+acima disso a recepção espera (contrapressão).
+
+O ``status`` de cada leitura (``online`` quando ausente) alimenta o
+:class:`~src.services.connectivity_service.ConnectivityTracker`, e os CLPs
+sem leituras são marcados *offline* a cada ``flush_interval``, qualquer que
+seja a origem das mensagens.  Depois de cada ``bulk_insert`` o estado de
+leitura dos registradores (``last_value``, ``last_read``, ``error_count`` e
+``last_error``) é actualizado em lote, tal como faz o ingest do poller Go.
 """
 
 from __future__ import annotations
@@ -11,27 +35,42 @@ import asyncio
 import json
 import os
 import signal
+import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 try:  # pragma: no cover - dependência opcional
     import redis.asyncio as aioredis
 except Exception:  # pragma: no cover - fallback quando Redis não está disponível
     aioredis = None  # type: ignore
 
+from flask import current_app, has_app_context
+
 from src.app import create_app
 from src.app.settings import get_app_settings
+from src.consumers.mqtt_subscriber import MqttSubscriber
+from src.consumers.reading_batch import ERROR_FIELD, RARE_FIELDS, ReadingBatch, timestamp_ns
 from src.repository.Data_repository import DataRepo
 from src.repository.PLC_repository import Plcrepo
+from src.repository.Registers_repository import RegRepo
 from src.services.Alarms_service import AlarmService
+from src.services.connectivity_service import record_readings, sweep_stale_plcs
 from src.services.mqtt_service import get_mqtt_publisher
 from src.utils.logs import logger
 
 QUEUE_TOPIC = "plc.data"
 REDIS_URL_ENV = "PLC_DATA_REDIS_URL"
 DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+SOURCE_ENV = "PLC_DATA_SOURCE"
+STREAM_GROUP_ENV = "PLC_DATA_STREAM_GROUP"
+STREAM_CONSUMER_ENV = "PLC_DATA_STREAM_CONSUMER"
+STREAM_CLAIM_IDLE_ENV = "PLC_DATA_STREAM_CLAIM_IDLE_MS"
+DEFAULT_STREAM_GROUP = "plc-data-processor"
+STREAM_FIELD = "data"
+MAX_INFLIGHT_FLUSHES_ENV = "PLC_DATA_MAX_INFLIGHT_FLUSHES"
 
 
 class RedisSubscriber:
@@ -90,6 +129,158 @@ class RedisSubscriber:
         self._stop_event.set()
 
 
+class RedisStreamSubscriber:
+    """Consumidor Redis Streams (``XREADGROUP``) com confirmação explícita.
+
+    O *handler* recebe ``(payload, message_id)``; a entrada só sai da lista
+    de pendentes do grupo quando o processador chama :meth:`ack`.
+    """
+
+    def __init__(
+        self,
+        stream: str,
+        url: Optional[str] = None,
+        *,
+        group: Optional[str] = None,
+        consumer: Optional[str] = None,
+        count: int = 500,
+        block_ms: int = 1000,
+        claim_idle_ms: Optional[int] = None,
+        claim_interval: float = 30.0,
+        client: Any = None,
+    ) -> None:
+        self.topic = stream
+        self.url = url or DEFAULT_REDIS_URL
+        self.group = group or os.getenv(STREAM_GROUP_ENV) or DEFAULT_STREAM_GROUP
+        self.consumer = consumer or os.getenv(STREAM_CONSUMER_ENV) or f"{socket.gethostname()}-{os.getpid()}"
+        self.count = count
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms or int(os.getenv(STREAM_CLAIM_IDLE_ENV, "60000"))
+        self.claim_interval = claim_interval
+        self._client = client
+        self._stop_event = asyncio.Event()
+        self._last_claim = 0.0
+
+    async def connect(self) -> None:
+        if self._client is None:
+            if aioredis is None:
+                logger.warning(
+                    "redis.asyncio não está disponível; consumidor rodará em modo simulado sem consumir mensagens."
+                )
+                return
+            self._client = aioredis.from_url(self.url, decode_responses=True)
+        try:
+            await self._client.xgroup_create(self.topic, self.group, id="0", mkstream=True)
+        except Exception as exc:  # BUSYGROUP: o grupo já existe
+            if "BUSYGROUP" not in str(exc):
+                raise
+        logger.info(
+            "Consumindo stream Redis %s (grupo=%s, consumidor=%s) em %s",
+            self.topic,
+            self.group,
+            self.consumer,
+            self.url,
+        )
+
+    async def listen(self, handler) -> None:
+        if self._client is None:
+            await self._listen_dry_run()
+            return
+
+        try:
+            # Primeiro reentrega o que ficou pendente para este consumidor
+            # (reinício com o mesmo nome), depois passa a ler entradas novas.
+            await self._drain_own_pending(handler)
+            while not self._stop_event.is_set():
+                if time.monotonic() - self._last_claim >= self.claim_interval:
+                    await self._claim_stale(handler)
+                response = await self._client.xreadgroup(
+                    self.group, self.consumer, {self.topic: ">"}, count=self.count, block=self.block_ms
+                )
+                for _, entries in response or []:
+                    await self._dispatch(entries, handler)
+        finally:
+            await self.close()
+
+    async def _drain_own_pending(self, handler) -> None:
+        last_id = "0"
+        while not self._stop_event.is_set():
+            response = await self._client.xreadgroup(
+                self.group, self.consumer, {self.topic: last_id}, count=self.count
+            )
+            entries = [entry for _, items in response or [] for entry in items]
+            if not entries:
+                return
+            await self._dispatch(entries, handler)
+            last_id = entries[-1][0]
+
+    async def _claim_stale(self, handler) -> None:
+        self._last_claim = time.monotonic()
+        start = "0-0"
+        while not self._stop_event.is_set():
+            result = await self._client.xautoclaim(
+                self.topic, self.group, self.consumer, self.claim_idle_ms, start_id=start, count=self.count
+            )
+            start, entries = result[0], result[1]
+            if entries:
+                logger.warning(
+                    "Recuperadas %d entradas pendentes do stream %s", len(entries), self.topic
+                )
+                await self._dispatch(entries, handler)
+            if not entries or start in ("0-0", b"0-0"):
+                return
+
+    async def _dispatch(self, entries, handler) -> None:
+        for message_id, fields in entries:
+            if not fields:
+                # Entrada removida do stream (``XTRIM``) mas ainda pendente.
+                await self.ack([message_id])
+                continue
+            await handler(fields.get(STREAM_FIELD), message_id)
+
+    async def ack(self, message_ids: List[str]) -> None:
+        if self._client is None or not message_ids:
+            return
+        for start in range(0, len(message_ids), 1000):
+            await self._client.xack(self.topic, self.group, *message_ids[start : start + 1000])
+
+    async def _listen_dry_run(self) -> None:
+        logger.info("Modo dry-run: aguardando mensagens simuladas para o stream %s", self.topic)
+        while not self._stop_event.is_set():
+            await asyncio.sleep(1.0)
+
+    async def close(self) -> None:
+        self._stop_event.set()
+        if self._client is not None:
+            with suppress(Exception):
+                await self._client.close()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+class DirectSubscriber:
+    """Origem ``direct``: não consome fila nenhuma, só mantém o ciclo de vida.
+
+    As mensagens chegam por :meth:`PLCDataProcessor.ingest`.
+    """
+
+    def __init__(self) -> None:
+        self._stop_event = asyncio.Event()
+
+    async def connect(self) -> None:
+        return None
+
+    async def listen(self, handler) -> None:
+        await self._stop_event.wait()
+
+    async def close(self) -> None:
+        self._stop_event.set()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
 class PLCDataProcessor:
     """Processa mensagens de telemetria e grava dados em lote."""
 
@@ -100,26 +291,90 @@ class PLCDataProcessor:
         flush_interval: float = 2.0,
         topic: str = QUEUE_TOPIC,
         redis_url: Optional[str] = None,
+        source: Optional[str] = None,
+        app=None,
+        subscriber=None,
+        alarm_service: Optional[AlarmService] = None,
+        mqtt=None,
+        alarm_executor: Optional[ThreadPoolExecutor] = None,
+        db_executor: Optional[ThreadPoolExecutor] = None,
+        max_inflight_flushes: Optional[int] = None,
     ) -> None:
+        """Os colaboradores (``subscriber``, ``alarm_service``, ``mqtt`` e os
+        executores) podem ser injectados; os omitidos são criados a partir da
+        configuração.
+        """
+
         self.batch_size = batch_size
         self.flush_interval = flush_interval
-        self._batch: List[Dict[str, Any]] = []
+        self._batch = ReadingBatch(batch_size)
+        # IDs de entradas do stream cujo conteúdo ainda está em ``_batch``.
+        self._pending_acks: List[str] = []
         self._batch_lock = asyncio.Lock()
         self._last_flush = time.monotonic()
-        self._subscriber = RedisSubscriber(topic=topic, url=redis_url or os.getenv(REDIS_URL_ENV))
+        self.source = (source or os.getenv(SOURCE_ENV) or "redis").strip().lower()
+        if subscriber is not None:
+            self._subscriber = subscriber
+        elif self.source == "mqtt":
+            self._subscriber = MqttSubscriber()
+        elif self.source == "direct":
+            self._subscriber = DirectSubscriber()
+        elif self.source == "streams":
+            self._subscriber = RedisStreamSubscriber(
+                stream=topic, url=redis_url or os.getenv(REDIS_URL_ENV), count=batch_size
+            )
+        else:
+            self._subscriber = RedisSubscriber(topic=topic, url=redis_url or os.getenv(REDIS_URL_ENV))
 
-        self._app = create_app()
+        self._app = app or create_app()
         self._settings = get_app_settings(self._app)
-        self._app_ctx = self._app.app_context()
-        self._app_ctx.push()
+        # Reaproveita o contexto da mesma aplicação quando já há um activo.
+        self._app_ctx = None
+        if not has_app_context() or current_app._get_current_object() is not self._app:
+            self._app_ctx = self._app.app_context()
+            self._app_ctx.push()
+        if max_inflight_flushes is None:
+            max_inflight_flushes = int(os.getenv(MAX_INFLIGHT_FLUSHES_ENV, "2"))
+        self._setup_workers(
+            self._app, max_inflight_flushes, alarm_executor=alarm_executor, db_executor=db_executor
+        )
 
-        self._alarm_service = AlarmService()
-        self._mqtt = get_mqtt_publisher()
+        self._alarm_service = alarm_service if alarm_service is not None else AlarmService()
+        self._mqtt = mqtt if mqtt is not None else get_mqtt_publisher()
         self._plc_cache: Dict[str, Optional[int]] = {}
         self._allow_persistence = self._settings.features.enable_polling and not (
             self._settings.demo.enabled and self._settings.demo.read_only
         )
 
+    def _setup_workers(
+        self,
+        app,
+        max_inflight_flushes: int = 2,
+        *,
+        alarm_executor: Optional[ThreadPoolExecutor] = None,
+        db_executor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        """Cria as *threads* de alarmes e de gravação, cada uma com contexto próprio.
+
+        ``db.session`` é isolada por contexto de aplicação, logo cada *thread*
+        trabalha com a sua sessão.  Executores injectados devem fazer o mesmo.
+        """
+
+        def _push_context() -> None:
+            app.app_context().push()
+
+        self._alarm_executor = alarm_executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="plc-data-alarms", initializer=_push_context
+        )
+        self._db_executor = db_executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="plc-data-db", initializer=_push_context
+        )
+        self._flush_slots = asyncio.Semaphore(max(max_inflight_flushes, 1))
+        self._flush_tasks: set = set()
+
+    async def _run_blocking(self, executor: ThreadPoolExecutor, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
     async def start(self) -> None:
         await self._subscriber.connect()
         periodic_task = asyncio.create_task(self._periodic_flush())
@@ -132,45 +387,73 @@ class PLCDataProcessor:
             with suppress(asyncio.CancelledError):
                 await periodic_task
             await self.flush(force=True)
+            await self.wait_for_flushes()
             await self._subscriber.close()
+            self._alarm_executor.shutdown(wait=True)
+            self._db_executor.shutdown(wait=True)
 
     async def _periodic_flush(self) -> None:
         try:
             while True:
                 await asyncio.sleep(self.flush_interval)
+                await self._run_blocking(self._alarm_executor, self._sweep_connectivity)
                 await self.flush(force=True)
         except asyncio.CancelledError:  # pragma: no cover - cancelamento esperado
             return
 
-    async def _on_message(self, raw_message: Any) -> None:
-        if isinstance(raw_message, bytes):
-            raw_message = raw_message.decode("utf-8")
-        if not raw_message:
-            return
-        try:
-            payload = json.loads(raw_message)
-        except json.JSONDecodeError:
-            logger.error("Mensagem inválida recebida da fila: %s", raw_message)
-            return
+    async def _on_message(self, raw_message: Any, ack_id: Optional[str] = None) -> None:
+        if isinstance(raw_message, dict):
+            # O assinante MQTT já entrega o payload decodificado.
+            payload = raw_message
+        else:
+            if isinstance(raw_message, bytes):
+                raw_message = raw_message.decode("utf-8")
+            if not raw_message:
+                return
+            try:
+                payload = json.loads(raw_message)
+            except json.JSONDecodeError:
+                logger.error("Mensagem inválida recebida da fila: %s", raw_message)
+                await self._acknowledge([ack_id])
+                return
 
-        records = self._process_payload(payload)
+        records = await self._run_blocking(self._alarm_executor, self._process_payload, payload)
         if not records:
+            await self._acknowledge([ack_id])
             return
 
         async with self._batch_lock:
             self._batch.extend(records)
+            if ack_id is not None:
+                self._pending_acks.append(ack_id)
         await self.flush()
 
-    def _process_payload(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def ingest(self, payload: Dict[str, Any]) -> None:
+        """Entrada direta de leituras (``{"values": [...]}``) sem fila."""
+
+        await self._on_message(payload)
+
+    async def _acknowledge(self, message_ids: List[Optional[str]]) -> None:
+        ids = [message_id for message_id in message_ids if message_id is not None]
+        ack = getattr(self._subscriber, "ack", None) if ids else None
+        if ack is None:
+            return
+        try:
+            await ack(ids)
+        except Exception:
+            # Sem ACK a entrada volta por XAUTOCLAIM; a regravação é aceitável.
+            logger.exception("Erro ao confirmar %d entradas no stream", len(ids))
+
+    def _process_payload(self, payload: Dict[str, Any]) -> ReadingBatch:
         key = payload.get("key")
-        timestamp = self._parse_timestamp(payload.get("timestamp"))
         values = payload.get("values")
         if not isinstance(values, Iterable):
             logger.debug("Payload sem lista de valores: %s", payload)
-            return []
+            return ReadingBatch(1)
 
-        processed: List[Dict[str, Any]] = []
-        publish_payloads: List[Dict[str, Any]] = []
+        default_ns = timestamp_ns(payload.get("timestamp"), time.time_ns())
+        batch = ReadingBatch(len(values) if isinstance(values, list) else 64)
+        statuses: List[Tuple[int, bool, datetime]] = []
 
         for item in values:
             if not isinstance(item, dict):
@@ -188,59 +471,64 @@ class PLCDataProcessor:
                 )
                 continue
 
-            record_ts = self._parse_timestamp(item.get("timestamp")) if item.get("timestamp") else timestamp
-            value_float = self._extract_value(item)
+            stamp_ns = timestamp_ns(item.get("timestamp"), default_ns)
+            rare = {name: item[name] for name in RARE_FIELDS if item.get(name) is not None}
+            status = str(item.get("status") or "online").strip().lower()
+            if status != "online":
+                rare[ERROR_FIELD] = str(item.get("error") or status)
+            batch.append(plc_id, register_id, stamp_ns, self._extract_value(item), rare or None)
+            statuses.append(
+                (int(plc_id), status == "online", datetime.fromtimestamp(stamp_ns / 1e9, tz=timezone.utc))
+            )
 
-            triggered = False
-            try:
-                triggered = self._alarm_service.check_and_handle(plc_id, register_id, value_float)
-            except Exception:
-                logger.exception(
-                    "Erro ao processar AlarmService para plc=%s register=%s",
-                    plc_id,
-                    register_id,
-                )
+        if not len(batch):
+            return batch
 
-            record: Dict[str, Any] = {
-                "plc_id": plc_id,
-                "register_id": register_id,
-                "timestamp": record_ts,
-                "raw_value": item.get("raw_value"),
-                "value_float": value_float,
-                "value_int": item.get("value_int"),
-                "quality": item.get("quality"),
-                "unit": item.get("unit"),
-                "tags": item.get("tags"),
-            }
-            if triggered:
-                record["is_alarm"] = True
-                item["is_alarm"] = True
-
-            publish_payloads.append(
-                {
-                    "plc_id": plc_id,
-                    "register_id": register_id,
-                    "value": value_float,
-                    "timestamp": record_ts.isoformat() if isinstance(record_ts, datetime) else record_ts,
-                    "quality": item.get("quality"),
-                    "unit": item.get("unit"),
-                    "tags": item.get("tags"),
-                    "is_alarm": item.get("is_alarm"),
-                }
-            )
-            processed.append(record)
+        try:
+            record_readings(statuses)
+        except Exception:
+            logger.exception("Erro ao actualizar conectividade para lote de %d leituras", len(batch))
+
+        try:
+            self._alarm_service.check_batch(batch)
+        except Exception:
+            logger.exception("Erro ao processar AlarmService para lote de %d leituras", len(batch))
 
-        if publish_payloads:
+        if getattr(self._mqtt, "is_enabled", True):
             try:
-                self._mqtt.publish_measurements(publish_payloads)
+                self._mqtt.publish_measurements(batch.measurements())
             except Exception:
                 logger.exception("Erro ao publicar medições no MQTT")
 
-        return processed
+        return batch
+
+    def _sweep_connectivity(self) -> None:
+        """Marca *offline* os CLPs que deixaram de enviar leituras."""
+
+        try:
+            sweep_stale_plcs()
+        except Exception:
+            logger.exception("Erro ao verificar CLPs sem leituras")
+
+    def _flush_alarm_state(self) -> None:
+        try:
+            self._alarm_service.close_quiet_storms()
+            self._alarm_service.flush_pending_alarms()
+        except Exception:
+            logger.exception("Erro ao gravar alarmes agregados pendentes")
 
     async def flush(self, *, force: bool = False) -> None:
+        """Envia o lote actual para gravação sem esperar pelo ``bulk_insert``.
+
+        Os lotes são gravados pela ordem em que saem daqui; só a reposição de
+        um lote que falhou pode ficar atrás de lotes já submetidos.
+        """
+
+        if force:
+            await self._run_blocking(self._alarm_executor, self._flush_alarm_state)
+
         async with self._batch_lock:
-            if not self._batch:
+            if not len(self._batch):
                 return
             should_flush = force or len(self._batch) >= self.batch_size or (
                 time.monotonic() - self._last_flush
@@ -248,32 +536,63 @@ class PLCDataProcessor:
             if not should_flush:
                 return
             batch = self._batch
-            self._batch = []
+            acks = self._pending_acks
+            self._batch = ReadingBatch(self.batch_size)
+            self._pending_acks = []
 
         if not self._allow_persistence:
             logger.debug(
                 "Persistência de DataLog desativada; descartando %d registros",
                 len(batch),
             )
+            await self._acknowledge(acks)
             return
 
+        await self._flush_slots.acquire()
+        self._last_flush = time.monotonic()
+        task = asyncio.create_task(self._persist(batch, acks))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _persist(self, batch: ReadingBatch, acks: List[str]) -> None:
         try:
-            DataRepo.bulk_insert(batch)
+            await self._run_blocking(self._db_executor, DataRepo.bulk_insert_columns, batch)
+            await self._run_blocking(self._db_executor, self._record_register_reads, batch)
         except Exception:
             logger.exception("Erro ao executar bulk_insert no DataLogRepo")
             # Reinsere o batch para tentativa futura
             async with self._batch_lock:
                 batch.extend(self._batch)
+                acks.extend(self._pending_acks)
                 self._batch = batch
-            await asyncio.sleep(0)
+                self._pending_acks = acks
             return
         finally:
-            self._last_flush = time.monotonic()
+            self._flush_slots.release()
+
+        await self._acknowledge(acks)
+
+    @staticmethod
+    def _record_register_reads(batch: ReadingBatch) -> None:
+        """Mantém ``Register.last_value``/``last_read``/``error_count`` como o ingest Go."""
+
+        try:
+            RegRepo.record_reads(batch.register_states())
+        except Exception:
+            # As leituras já estão gravadas; o estado volta a ser escrito no próximo lote.
+            logger.exception("Erro ao actualizar estado dos registradores para lote de %d leituras", len(batch))
+
+    async def wait_for_flushes(self) -> None:
+        """Aguarda os ``bulk_insert`` em curso."""
+
+        while self._flush_tasks:
+            await asyncio.gather(*list(self._flush_tasks), return_exceptions=True)
 
     def shutdown(self) -> None:
         self._subscriber.stop()
         if self._app_ctx is not None:
             self._app_ctx.pop()
+            self._app_ctx = None
 
     def _resolve_plc_id(self, key: Optional[str]) -> Optional[int]:
         if not key:
@@ -295,26 +614,14 @@ class PLCDataProcessor:
         self._plc_cache[key] = plc_id
         return plc_id
 
-    @staticmethod
-    def _parse_timestamp(value: Any) -> datetime:
-        if isinstance(value, datetime):
-            return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
-        if isinstance(value, (int, float)):
-            return datetime.fromtimestamp(value, tz=timezone.utc)
-        if isinstance(value, str):
-            cleaned = value.replace("Z", "+00:00")
-            try:
-                parsed = datetime.fromisoformat(cleaned)
-            except ValueError:
-                return datetime.now(timezone.utc)
-            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
-        return datetime.now(timezone.utc)
-
     @staticmethod
     def _extract_value(item: Dict[str, Any]) -> Optional[float]:
         value = item.get("value_float")
         if value is not None:
-            return value
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
         raw_value = item.get("value")
         if isinstance(raw_value, (int, float)):
             return float(raw_value)
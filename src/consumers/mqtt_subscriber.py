@@ -0,0 +1,436 @@
+"""Fonte de ingestão MQTT para o :class:`PLCDataProcessor`.
+
+Alternativa ao :class:`~src.consumers.data_processor.RedisSubscriber` para
+instalações em que gateways ou CLPs publicam os valores directamente num
+*broker* MQTT, um tópico por registrador.  Cada tópico é associado a
+``(plc_id, register_id)`` por uma tabela de padrões configurável, por exemplo::
+
+    MQTT_INGEST_PATTERNS='["fabrica/{plc_name}/{register_tag}", "gw/{plc_id}/{register_id}"]'
+
+Os campos disponíveis são ``plc_id``, ``plc_name``, ``plc_ip``,
+``register_id``, ``register_name``, ``register_tag`` e ``register_address``.
+A resolução passa pela base de dados apenas na primeira vez que um tópico
+aparece, numa *thread* própria para não bloquear o *event loop*; depois fica
+numa *cache* em memória.  As mensagens recebidas são
+agrupadas num único *payload* ``{"values": [...]}`` e entregues ao mesmo
+*handler* usado pela fila Redis, reaproveitando alarmes e gravação em lote.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import importlib.util
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+_PAHO_SPEC = importlib.util.find_spec("paho")
+_MQTT_SPEC = importlib.util.find_spec("paho.mqtt.client") if _PAHO_SPEC else None
+mqtt = importlib.import_module("paho.mqtt.client") if _MQTT_SPEC else None
+MQTT_ERR_SUCCESS = getattr(mqtt, "MQTT_ERR_SUCCESS", 0)
+
+from src.utils.env import TRUE_VALUES, env_int
+from src.utils.logs import logger
+
+PLC_FIELDS = ("plc_id", "plc_name", "plc_ip")
+REGISTER_FIELDS = ("register_id", "register_name", "register_tag", "register_address")
+DEFAULT_INGEST_PATTERNS = ("scada/ingest/{plc_id}/{register_id}",)
+
+ResolvedIds = Tuple[int, int]
+
+
+def _parse_patterns(raw: Optional[str]) -> Tuple[str, ...]:
+    if not raw:
+        return DEFAULT_INGEST_PATTERNS
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError:
+        entries = [part.strip() for part in raw.split(",")]
+    if isinstance(entries, str):
+        entries = [entries]
+    patterns = tuple(str(entry) for entry in entries if entry)
+    return patterns or DEFAULT_INGEST_PATTERNS
+
+
+@dataclass(frozen=True)
+class MqttIngestSettings:
+    host: str
+    port: int
+    username: Optional[str]
+    password: Optional[str]
+    use_tls: bool
+    client_id: str
+    keepalive: int
+    qos: int
+    patterns: Tuple[str, ...]
+    batch_size: int = 500
+    queue_size: int = 50000
+
+
+def load_mqtt_ingest_settings() -> MqttIngestSettings:
+    """Lê ``MQTT_INGEST_*`` (com recurso às variáveis ``MQTT_*`` do publicador)."""
+
+    return MqttIngestSettings(
+        host=os.getenv("MQTT_INGEST_HOST") or os.getenv("MQTT_HOST", "localhost"),
+        port=env_int("MQTT_INGEST_PORT", env_int("MQTT_PORT", 1883)),
+        username=os.getenv("MQTT_INGEST_USERNAME") or os.getenv("MQTT_USERNAME"),
+        password=os.getenv("MQTT_INGEST_PASSWORD") or os.getenv("MQTT_PASSWORD"),
+        use_tls=(os.getenv("MQTT_INGEST_TLS") or os.getenv("MQTT_TLS") or "").lower()
+        in TRUE_VALUES,
+        client_id=os.getenv("MQTT_INGEST_CLIENT_ID") or f"clp-tcc3-ingest-{os.getpid()}",
+        keepalive=env_int("MQTT_KEEPALIVE", 60),
+        qos=env_int("MQTT_INGEST_QOS", 1),
+        patterns=_parse_patterns(os.getenv("MQTT_INGEST_PATTERNS")),
+        batch_size=max(env_int("MQTT_INGEST_BATCH_SIZE", 500), 1),
+        queue_size=max(env_int("MQTT_INGEST_QUEUE_SIZE", 50000), 1),
+    )
+
+
+# ----------------------------------------------------------------------
+# Tabela de padrões
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class TopicPattern:
+    template: str
+    regex: Pattern[str]
+    fields: Tuple[str, ...]
+    subscription: str
+
+    @classmethod
+    def compile(cls, template: str) -> "TopicPattern":
+        fields: List[str] = []
+        regex_parts: List[str] = []
+        filter_parts: List[str] = []
+        for level in template.strip("/").split("/"):
+            match = re.fullmatch(r"\{(\w+)\}", level)
+            if match:
+                name = match.group(1)
+                if name not in PLC_FIELDS + REGISTER_FIELDS:
+                    raise ValueError(f"Campo desconhecido no padrão MQTT: {name}")
+                fields.append(name)
+                regex_parts.append(f"(?P<{name}>[^/]+)")
+                filter_parts.append("+")
+            else:
+                regex_parts.append(re.escape(level))
+                filter_parts.append(level)
+        if not any(name in fields for name in REGISTER_FIELDS):
+            raise ValueError(f"O padrão {template!r} não identifica o registrador")
+        return cls(
+            template=template,
+            regex=re.compile("/".join(regex_parts) + "$"),
+            fields=tuple(fields),
+            subscription="/".join(filter_parts),
+        )
+
+
+def _db_lookup(fields: Dict[str, str]) -> Optional[ResolvedIds]:
+    """Resolve os campos extraídos do tópico para ``(plc_id, register_id)``."""
+
+    from src.app import db
+    from src.models.PLCs import PLC
+    from src.models.Registers import Register
+
+    query = db.session.query(Register.plc_id, Register.id)
+    if "plc_id" in fields:
+        query = query.filter(Register.plc_id == int(fields["plc_id"]))
+    elif "plc_name" in fields or "plc_ip" in fields:
+        query = query.join(PLC, PLC.id == Register.plc_id)
+        if "plc_name" in fields:
+            query = query.filter(PLC.name == fields["plc_name"])
+        if "plc_ip" in fields:
+            query = query.filter(PLC.ip_address == fields["plc_ip"])
+
+    if "register_id" in fields:
+        query = query.filter(Register.id == int(fields["register_id"]))
+    if "register_name" in fields:
+        query = query.filter(Register.name == fields["register_name"])
+    if "register_tag" in fields:
+        query = query.filter(Register.tag == fields["register_tag"])
+    if "register_address" in fields:
+        query = query.filter(Register.address == fields["register_address"])
+
+    row = query.first()
+    return (int(row[0]), int(row[1])) if row else None
+
+
+class TopicMapper:
+    """Associa tópicos a ``(plc_id, register_id)`` com *cache* em memória.
+
+    Tópicos não resolvidos ficam em *cache* negativa durante
+    ``retry_seconds`` para que um CLP cadastrado depois seja reconhecido.
+    """
+
+    def __init__(
+        self,
+        templates: Iterable[str],
+        *,
+        lookup: Callable[[Dict[str, str]], Optional[ResolvedIds]] = _db_lookup,
+        retry_seconds: float = 60.0,
+        max_entries: int = 100_000,
+    ) -> None:
+        self.patterns = [TopicPattern.compile(template) for template in templates]
+        self._lookup = lookup
+        self.retry_seconds = retry_seconds
+        self.max_entries = max_entries
+        self._cache: Dict[str, Tuple[Optional[ResolvedIds], float]] = {}
+
+    @property
+    def subscriptions(self) -> List[str]:
+        return sorted({pattern.subscription for pattern in self.patterns})
+
+    def _cached(self, topic: str) -> Tuple[bool, Optional[ResolvedIds]]:
+        cached = self._cache.get(topic)
+        if cached is not None:
+            ids, expires_at = cached
+            if ids is not None or time.monotonic() < expires_at:
+                return True, ids
+        return False, None
+
+    def missing(self, topics: Iterable[str]) -> List[str]:
+        """Tópicos que :meth:`resolve` ainda teria de procurar na base de dados."""
+
+        return [topic for topic in set(topics) if not self._cached(topic)[0]]
+
+    def resolve(self, topic: str) -> Optional[ResolvedIds]:
+        hit, ids = self._cached(topic)
+        if hit:
+            return ids
+
+        ids = None
+        for pattern in self.patterns:
+            match = pattern.regex.match(topic)
+            if match is None:
+                continue
+            try:
+                ids = self._lookup(match.groupdict())
+            except (ValueError, TypeError):
+                ids = None
+            except Exception:
+                logger.exception("Erro ao resolver tópico MQTT %s", topic)
+                ids = None
+            if ids is not None:
+                break
+
+        if len(self._cache) >= self.max_entries:
+            self._cache.clear()
+        self._cache[topic] = (ids, time.monotonic() + self.retry_seconds)
+        return ids
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+
+def parse_message_value(payload: bytes) -> Dict[str, Any]:
+    """Interpreta o corpo da mensagem: número simples ou objeto JSON."""
+
+    text = payload.decode("utf-8", errors="replace").strip() if payload else ""
+    try:
+        return {"value": float(text)}
+    except ValueError:
+        pass
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return {"raw_value": text}
+
+    if isinstance(data, bool):
+        return {"value": float(data)}
+    if isinstance(data, (int, float)):
+        return {"value": float(data)}
+    if not isinstance(data, dict):
+        return {"raw_value": text}
+
+    value = data.get("value", data.get("value_float"))
+    item: Dict[str, Any] = {
+        "raw_value": data.get("raw_value"),
+        "quality": data.get("quality"),
+        "unit": data.get("unit"),
+    }
+    if isinstance(value, bool):
+        value = float(value)
+    if isinstance(value, (int, float)):
+        item["value"] = float(value)
+    elif value is not None and item["raw_value"] is None:
+        item["raw_value"] = str(value)
+    timestamp = data.get("timestamp", data.get("ts"))
+    if timestamp is not None:
+        item["timestamp"] = timestamp
+    return item
+
+
+# ----------------------------------------------------------------------
+# Assinante
+# ----------------------------------------------------------------------
+class MqttSubscriber:
+    """Assinante MQTT com a mesma interface do ``RedisSubscriber``."""
+
+    def __init__(
+        self,
+        settings: Optional[MqttIngestSettings] = None,
+        *,
+        mapper: Optional[TopicMapper] = None,
+        client: Any = None,
+    ) -> None:
+        self.settings = settings or load_mqtt_ingest_settings()
+        self.mapper = mapper or TopicMapper(self.settings.patterns)
+        self.topic = ", ".join(self.mapper.subscriptions)
+        self._client = client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[Tuple[str, bytes, float]]"] = None
+        self._stop_event = asyncio.Event()
+        self._lookup_executor: Optional[ThreadPoolExecutor] = None
+        self.dropped_messages = 0
+        self.unmatched_messages = 0
+
+    async def connect(self) -> None:
+        if self._client is None and mqtt is None:
+            logger.warning(
+                "paho-mqtt não está disponível; consumidor rodará em modo simulado sem consumir mensagens."
+            )
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.settings.queue_size)
+        self._lookup_executor = self._create_lookup_executor()
+        if self._client is None:
+            self._client = mqtt.Client(client_id=self.settings.client_id, clean_session=True)
+            if self.settings.username:
+                self._client.username_pw_set(self.settings.username, self.settings.password)
+            if self.settings.use_tls:
+                self._client.tls_set()
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._on_mqtt_message
+        self._client.connect_async(self.settings.host, self.settings.port, self.settings.keepalive)
+        self._client.loop_start()
+        logger.info(
+            "Ingestão MQTT em %s:%s (tópicos: %s)", self.settings.host, self.settings.port, self.topic
+        )
+
+    @staticmethod
+    def _create_lookup_executor() -> ThreadPoolExecutor:
+        """*Thread* única para as consultas do :class:`TopicMapper`.
+
+        Herda o contexto de aplicação Flask de quem liga o assinante, para que
+        ``db.session`` funcione fora do *event loop*.
+        """
+
+        from flask import current_app, has_app_context
+
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def _push_context() -> None:
+            if app is not None:
+                app.app_context().push()
+
+        return ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="mqtt-ingest-lookup", initializer=_push_context
+        )
+
+    def _on_connect(self, client: Any, userdata, flags, rc) -> None:
+        if rc != MQTT_ERR_SUCCESS:
+            logger.error("Conexão MQTT de ingestão retornou código %s", rc)
+            return
+        # Reinscreve a cada (re)conexão: a sessão é limpa.
+        client.subscribe([(topic, self.settings.qos) for topic in self.mapper.subscriptions])
+
+    def _on_mqtt_message(self, client: Any, userdata, message) -> None:
+        # Executa na thread de rede do Paho: só transfere para o loop asyncio.
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._put, (message.topic, message.payload, time.time()))
+
+    def _put(self, item: Tuple[str, bytes, float]) -> None:
+        if self._queue is None:
+            return
+        if self._queue.full():
+            with suppress(asyncio.QueueEmpty):
+                self._queue.get_nowait()
+            self.dropped_messages += 1
+            if self.dropped_messages % 1000 == 1:
+                logger.warning(
+                    "Fila de ingestão MQTT cheia; %d mensagens antigas descartadas", self.dropped_messages
+                )
+        self._queue.put_nowait(item)
+
+    async def listen(self, handler) -> None:
+        if self._queue is None:
+            await self._listen_dry_run()
+            return
+
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    first = await asyncio.wait_for(self._queue.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                items = [first]
+                while len(items) < self.settings.batch_size and not self._queue.empty():
+                    items.append(self._queue.get_nowait())
+                await self.resolve_topics(topic for topic, _, _ in items)
+                payload = self.build_payload(items)
+                if payload["values"]:
+                    await handler(payload)
+        finally:
+            await self.close()
+
+    async def resolve_topics(self, topics: Iterable[str]) -> None:
+        """Resolve fora do *event loop* os tópicos que ainda não estão em *cache*."""
+
+        missing = self.mapper.missing(topics)
+        if not missing:
+            return
+        if self._lookup_executor is None:
+            self._lookup_executor = self._create_lookup_executor()
+        await asyncio.get_running_loop().run_in_executor(
+            self._lookup_executor, lambda: [self.mapper.resolve(topic) for topic in missing]
+        )
+
+    def build_payload(self, items: Iterable[Tuple[str, bytes, float]]) -> Dict[str, Any]:
+        """Converte mensagens recebidas no *payload* aceito pelo processador."""
+
+        values: List[Dict[str, Any]] = []
+        for topic, body, received_at in items:
+            ids = self.mapper.resolve(topic)
+            if ids is None:
+                self.unmatched_messages += 1
+                logger.debug("Tópico MQTT sem correspondência: %s", topic)
+                continue
+            item = parse_message_value(body)
+            item.setdefault("timestamp", received_at)
+            item["plc_id"], item["register_id"] = ids
+            values.append(item)
+        return {"key": None, "timestamp": time.time(), "values": values, "source": "mqtt"}
+
+    async def _listen_dry_run(self) -> None:
+        logger.info("Modo dry-run: aguardando mensagens simuladas para os tópicos %s", self.topic)
+        while not self._stop_event.is_set():
+            await asyncio.sleep(1.0)
+
+    async def close(self) -> None:
+        self._stop_event.set()
+        if self._client is not None:
+            with suppress(Exception):
+                self._client.loop_stop()
+                self._client.disconnect()
+        if self._lookup_executor is not None:
+            self._lookup_executor.shutdown(wait=False)
+            self._lookup_executor = None
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+__all__ = [
+    "MqttIngestSettings",
+    "MqttSubscriber",
+    "TopicMapper",
+    "TopicPattern",
+    "load_mqtt_ingest_settings",
+    "parse_message_value",
+]
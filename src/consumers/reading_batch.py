@@ -0,0 +1,271 @@
+"""Representação colunar das leituras acumuladas pelo :class:`PLCDataProcessor`.
+
+Em vez de dois dicionários por leitura (registo de BD e *payload* MQTT), o
+processador guarda cada mensagem num :class:`ReadingBatch`: vetores NumPy
+pré-alocados para os campos sempre presentes (ids, instante em ns desde a
+época e valor) e vetores ``object`` só para os campos raros, criados na
+primeira vez em que um deles aparece.  Alarmes, MQTT e gravação em BD leem
+directamente destes vetores.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RARE_FIELDS = ("raw_value", "value_int", "quality", "unit", "tags")
+# Coluna rara fora de ``data_log``: motivo da falha das leituras não *online*.
+ERROR_FIELD = "error"
+DB_COLUMNS = ("plc_id", "register_id", "timestamp", "value_float", "is_alarm") + RARE_FIELDS
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def timestamp_ns(value: Any, default: int) -> int:
+    """Converte ``datetime``/época/ISO-8601 em ns desde a época (UTC)."""
+
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value * 1_000_000_000)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return default
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        delta = value - _EPOCH
+        return (delta.days * 86_400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1_000
+    return default
+
+
+class ReadingBatch:
+    """Buffers colunares com crescimento geométrico."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self.plc_id = np.empty(capacity, dtype=np.int64)
+        self.register_id = np.empty(capacity, dtype=np.int64)
+        self.ts_ns = np.empty(capacity, dtype=np.int64)
+        self.value = np.empty(capacity, dtype=np.float64)
+        self.is_alarm = np.zeros(capacity, dtype=bool)
+        self.rare: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self.plc_id.shape[0]
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for name in ("plc_id", "register_id", "ts_ns", "value", "is_alarm"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            setattr(self, name, grown)
+        for name, column in self.rare.items():
+            grown = np.full(capacity, None, dtype=object)
+            grown[: self._size] = column[: self._size]
+            self.rare[name] = grown
+
+    def _rare_column(self, name: str) -> np.ndarray:
+        column = self.rare.get(name)
+        if column is None:
+            column = self.rare[name] = np.full(self.capacity, None, dtype=object)
+        return column
+
+    def append(
+        self,
+        plc_id: int,
+        register_id: int,
+        ts_ns: int,
+        value: Optional[float],
+        rare: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        self._reserve(1)
+        row = self._size
+        self.plc_id[row] = plc_id
+        self.register_id[row] = register_id
+        self.ts_ns[row] = ts_ns
+        self.value[row] = math.nan if value is None else value
+        self.is_alarm[row] = False
+        if rare:
+            for name, field_value in rare.items():
+                if field_value is not None:
+                    self._rare_column(name)[row] = field_value
+        self._size += 1
+        return row
+
+    def extend(self, other: "ReadingBatch") -> None:
+        count = len(other)
+        if not count:
+            return
+        self._reserve(count)
+        start, stop = self._size, self._size + count
+        for name in ("plc_id", "register_id", "ts_ns", "value", "is_alarm"):
+            getattr(self, name)[start:stop] = getattr(other, name)[:count]
+        for name, column in other.rare.items():
+            self._rare_column(name)[start:stop] = column[:count]
+        self._size = stop
+
+    # ------------------------------------------------------------------
+    # Leitura das colunas
+    # ------------------------------------------------------------------
+    def values(self) -> List[Optional[float]]:
+        """Valores como ``float`` com ``None`` no lugar de ``NaN``."""
+
+        column = self.value[: self._size]
+        values = column.tolist()
+        missing = np.flatnonzero(np.isnan(column))
+        for row in missing.tolist():
+            values[row] = None
+        return values
+
+    def rare_values(self, name: str) -> List[Any]:
+        column = self.rare.get(name)
+        if column is None:
+            return [None] * self._size
+        return column[: self._size].tolist()
+
+    def datetimes(self, rows: Optional[Sequence[int]] = None) -> List[datetime]:
+        stamps = self.ts_ns[: self._size] if rows is None else self.ts_ns[np.asarray(rows, dtype=np.intp)]
+        micros = (stamps // 1_000).astype("datetime64[us]").tolist()
+        return [stamp.replace(tzinfo=timezone.utc) for stamp in micros]
+
+    def iso_timestamps(self) -> List[str]:
+        stamps = self.ts_ns[: self._size].astype("datetime64[ns]").astype("datetime64[us]")
+        return [text[:-1] + "+00:00" for text in np.datetime_as_string(stamps, timezone="UTC").tolist()]
+
+    def keys(self) -> List[Tuple[int, int]]:
+        """Pares ``(plc_id, register_id)`` distintos presentes no lote."""
+
+        if not self._size:
+            return []
+        pairs = np.unique(
+            np.stack((self.plc_id[: self._size], self.register_id[: self._size]), axis=1), axis=0
+        )
+        return [(int(plc_id), int(register_id)) for plc_id, register_id in pairs.tolist()]
+
+    def mask_for_keys(self, keys: Iterable[Tuple[int, int]]) -> np.ndarray:
+        """Máscara das linhas cujo ``(plc_id, register_id)`` está em ``keys``."""
+
+        keys = list(keys)
+        if not keys or not self._size:
+            return np.zeros(self._size, dtype=bool)
+        wanted = np.asarray(keys, dtype=np.int64)
+        # Combina os dois ids num único inteiro para usar ``np.isin``.
+        combined = (self.plc_id[: self._size] << 32) | self.register_id[: self._size]
+        return np.isin(combined, (wanted[:, 0] << 32) | wanted[:, 1])
+
+    def rows_with_values(self, keys: Iterable[Tuple[int, int]]) -> List[int]:
+        """Índices das linhas com valor numérico e par presente em ``keys``."""
+
+        mask = self.mask_for_keys(keys) & ~np.isnan(self.value[: self._size])
+        return np.flatnonzero(mask).tolist()
+
+    # ------------------------------------------------------------------
+    # Consumidores
+    # ------------------------------------------------------------------
+    def measurements(self) -> List[Dict[str, Any]]:
+        """Medições no formato aceito por ``publish_measurements``."""
+
+        columns = zip(
+            self.plc_id[: self._size].tolist(),
+            self.register_id[: self._size].tolist(),
+            self.values(),
+            self.rare_values("value_int"),
+            self.rare_values("raw_value"),
+            self.iso_timestamps(),
+            self.rare_values("quality"),
+            self.rare_values("unit"),
+            self.rare_values("tags"),
+            self.is_alarm[: self._size].tolist(),
+        )
+        return [
+            {
+                "plc_id": plc_id,
+                "register_id": register_id,
+                "value_float": value,
+                "value_int": value_int,
+                "raw_value": raw_value,
+                "timestamp": timestamp,
+                "quality": quality,
+                "unit": unit,
+                "tags": tags,
+                "is_alarm": is_alarm or None,
+            }
+            for plc_id, register_id, value, value_int, raw_value, timestamp, quality, unit, tags, is_alarm in columns
+        ]
+
+    def rows(self) -> Iterable[Tuple[Any, ...]]:
+        """Tuplas na ordem de :data:`DB_COLUMNS` (``tags`` serializado em JSON)."""
+
+        tags = [json.dumps(value) if value is not None else None for value in self.rare_values("tags")]
+        return zip(
+            self.plc_id[: self._size].tolist(),
+            self.register_id[: self._size].tolist(),
+            self.iso_timestamps(),
+            self.values(),
+            self.is_alarm[: self._size].tolist(),
+            self.rare_values("raw_value"),
+            self.rare_values("value_int"),
+            self.rare_values("quality"),
+            self.rare_values("unit"),
+            tags,
+        )
+
+    def register_states(self) -> List[Dict[str, Any]]:
+        """Estado final de cada registrador no lote, pela ordem de chegada.
+
+        ``last_value``/``last_read``/``last_error`` vêm da última leitura;
+        ``failures`` conta as falhas depois da última leitura boa e
+        ``recovered`` indica se houve alguma (o contador recomeça do zero).
+        """
+
+        states: Dict[int, Dict[str, Any]] = {}
+        columns = zip(
+            self.register_id[: self._size].tolist(),
+            self.datetimes(),
+            self.values(),
+            self.rare_values("raw_value"),
+            self.rare_values(ERROR_FIELD),
+        )
+        for register_id, stamp, value, raw_value, error in columns:
+            state = states.setdefault(register_id, {"id": register_id, "failures": 0, "recovered": False})
+            raw_value = raw_value if raw_value is not None else value
+            state["last_value"] = None if raw_value is None else str(raw_value)
+            state["last_read"] = stamp
+            state["last_error"] = error
+            if error is None:
+                state["failures"], state["recovered"] = 0, True
+            else:
+                state["failures"] += 1
+        return list(states.values())
+
+    def mappings(self) -> List[Dict[str, Any]]:
+        """Dicionários para ``bulk_insert_mappings`` (caminho genérico)."""
+
+        columns = zip(
+            self.plc_id[: self._size].tolist(),
+            self.register_id[: self._size].tolist(),
+            self.datetimes(),
+            self.values(),
+            self.is_alarm[: self._size].tolist(),
+            *(self.rare_values(name) for name in RARE_FIELDS),
+        )
+        return [dict(zip(DB_COLUMNS, row)) for row in columns]
+
+
+__all__ = ["DB_COLUMNS", "ERROR_FIELD", "RARE_FIELDS", "ReadingBatch", "timestamp_ns"]
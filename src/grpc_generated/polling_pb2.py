@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rpolling.proto\x12\x07polling\"$\n\rConfigPayload\x12\x13\n\x0bjson_config\x18\x01 \x01(\t\" \n\x0b\x44\x61taPayload\x12\x11\n\tjson_data\x18\x01 \x01(\t\"2\n\x0eStatusResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x07\n\x05\x45mpty2\x87\x01\n\x0ePollingService\x12?\n\x0cUpdateConfig\x12\x16.polling.ConfigPayload\x1a\x17.polling.StatusResponse\x12\x34\n\nStreamData\x12\x0e.polling.Empty\x1a\x14.polling.DataPayload0\x01\x42\x0bZ\t./pollingb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rpolling.proto\x12\x07polling\"$\n\rConfigPayload\x12\x13\n\x0bjson_config\x18\x01 \x01(\t\"@\n\x0b\x44\x61taPayload\x12\x11\n\tjson_data\x18\x01 \x01(\t\x12\x0b\n\x03seq\x18\x02 \x01(\x03\x12\x11\n\tstream_id\x18\x03 \x01(\t\"2\n\x0eStatusResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x07\n\x05\x45mpty\"4\n\rStreamRequest\x12\x10\n\x08\x66rom_seq\x18\x01 \x01(\x03\x12\x11\n\tstream_id\x18\x02 \x01(\t2\xd4\x01\n\x0ePollingService\x12?\n\x0cUpdateConfig\x12\x16.polling.ConfigPayload\x1a\x17.polling.StatusResponse\x12\x43\n\x10\x41pplyConfigDelta\x12\x16.polling.ConfigPayload\x1a\x17.polling.StatusResponse\x12<\n\nStreamData\x12\x16.polling.StreamRequest\x1a\x14.polling.DataPayload0\x01\x42\x0bZ\t./pollingb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,11 +35,13 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_CONFIGPAYLOAD']._serialized_start=26
   _globals['_CONFIGPAYLOAD']._serialized_end=62
   _globals['_DATAPAYLOAD']._serialized_start=64
-  _globals['_DATAPAYLOAD']._serialized_end=96
-  _globals['_STATUSRESPONSE']._serialized_start=98
-  _globals['_STATUSRESPONSE']._serialized_end=148
-  _globals['_EMPTY']._serialized_start=150
-  _globals['_EMPTY']._serialized_end=157
-  _globals['_POLLINGSERVICE']._serialized_start=160
-  _globals['_POLLINGSERVICE']._serialized_end=295
+  _globals['_DATAPAYLOAD']._serialized_end=128
+  _globals['_STATUSRESPONSE']._serialized_start=130
+  _globals['_STATUSRESPONSE']._serialized_end=180
+  _globals['_EMPTY']._serialized_start=182
+  _globals['_EMPTY']._serialized_end=189
+  _globals['_STREAMREQUEST']._serialized_start=191
+  _globals['_STREAMREQUEST']._serialized_end=243
+  _globals['_POLLINGSERVICE']._serialized_start=246
+  _globals['_POLLINGSERVICE']._serialized_end=458
 # @@protoc_insertion_point(module_scope)
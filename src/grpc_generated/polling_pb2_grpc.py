@@ -39,9 +39,14 @@ class PollingServiceStub(object):
                 request_serializer=polling__pb2.ConfigPayload.SerializeToString,
                 response_deserializer=polling__pb2.StatusResponse.FromString,
                 _registered_method=True)
+        self.ApplyConfigDelta = channel.unary_unary(
+                '/polling.PollingService/ApplyConfigDelta',
+                request_serializer=polling__pb2.ConfigPayload.SerializeToString,
+                response_deserializer=polling__pb2.StatusResponse.FromString,
+                _registered_method=True)
         self.StreamData = channel.unary_stream(
                 '/polling.PollingService/StreamData',
-                request_serializer=polling__pb2.Empty.SerializeToString,
+                request_serializer=polling__pb2.StreamRequest.SerializeToString,
                 response_deserializer=polling__pb2.DataPayload.FromString,
                 _registered_method=True)
 
@@ -55,8 +60,17 @@ class PollingServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ApplyConfigDelta(self, request, context):
+        """Aplica apenas as diferenças (JSON com base_version/version) à configuração atual.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def StreamData(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+        """Retoma a partir de from_seq (inclusive) enquanto a mensagem estiver no
+        buffer de repetição do poller; from_seq = 0 começa no mais antigo.
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
@@ -69,9 +83,14 @@ def add_PollingServiceServicer_to_server(servicer, server):
                     request_deserializer=polling__pb2.ConfigPayload.FromString,
                     response_serializer=polling__pb2.StatusResponse.SerializeToString,
             ),
+            'ApplyConfigDelta': grpc.unary_unary_rpc_method_handler(
+                    servicer.ApplyConfigDelta,
+                    request_deserializer=polling__pb2.ConfigPayload.FromString,
+                    response_serializer=polling__pb2.StatusResponse.SerializeToString,
+            ),
             'StreamData': grpc.unary_stream_rpc_method_handler(
                     servicer.StreamData,
-                    request_deserializer=polling__pb2.Empty.FromString,
+                    request_deserializer=polling__pb2.StreamRequest.FromString,
                     response_serializer=polling__pb2.DataPayload.SerializeToString,
             ),
     }
@@ -112,6 +131,33 @@ class PollingService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ApplyConfigDelta(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/polling.PollingService/ApplyConfigDelta',
+            polling__pb2.ConfigPayload.SerializeToString,
+            polling__pb2.StatusResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def StreamData(request,
             target,
@@ -127,7 +173,7 @@ class PollingService(object):
             request,
             target,
             '/polling.PollingService/StreamData',
-            polling__pb2.Empty.SerializeToString,
+            polling__pb2.StreamRequest.SerializeToString,
             polling__pb2.DataPayload.FromString,
             options,
             channel_credentials,
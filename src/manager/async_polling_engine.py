@@ -0,0 +1,444 @@
+"""Motor de polling em Python (``asyncio``), alternativa ao poller Go.
+
+O :class:`AsyncPollingEngine` tem a mesma interface do
+:class:`~src.manager.go_polling_manager.GoPollingManager` e do
+:class:`~src.manager.poller_pool.PollerPool` (``start``/``stop``/
+``update_config``/``apply_config``/``config_state``/``is_running``) e por isso
+serve de ``manager`` do :class:`~src.services.polling_runtime.PollingRuntime`.
+
+Corre num *event loop* próprio, numa *thread* dedicada:
+
+* uma tarefa por CLP, com uma ligação persistente
+  (:mod:`src.manager.protocol_clients`) que só é refeita após falha, com
+  *backoff* exponencial;
+* cada bloco do ``read_plan`` e cada registrador fora do plano tem o seu
+  próximo instante de leitura, calculado a partir do ``effective_interval``
+  da :class:`~src.services.poll_scheduler.SchedulePolicy`;
+* um semáforo por família de protocolo limita as leituras simultâneas
+  (``ASYNC_POLLER_CONCURRENCY_<FAMÍLIA>``);
+* as leituras de cada ciclo seguem para ``sink`` no formato
+  ``{"values": [...]}`` aceite pelo
+  :class:`~src.consumers.data_processor.PLCDataProcessor`, sem passar pelo
+  gRPC;
+* tal como no poller Go, uma falha de ligação ou de leitura produz leituras
+  com ``status="offline"`` (sem valor) para os registradores afectados, que
+  alimentam o estado de conectividade do CLP.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.manager.protocol_clients import PLCClient, ProtocolClientError, create_client, protocol_family
+from src.services.poller_config_service import PollerConfigState
+from src.utils.env import env_float, env_int
+from src.utils.logs import logger
+
+
+@dataclass(frozen=True)
+class AsyncEngineSettings:
+    modbus_concurrency: int = 32
+    s7_concurrency: int = 4
+    opcua_concurrency: int = 16
+    ethernetip_concurrency: int = 8
+    beckhoff_concurrency: int = 8
+    default_concurrency: int = 8
+    reconnect_min: float = 1.0
+    reconnect_max: float = 30.0
+    min_interval_ms: int = 50
+
+    def concurrency_for(self, family: Optional[str]) -> int:
+        return getattr(self, f"{family}_concurrency", self.default_concurrency)
+
+
+def load_async_engine_settings() -> AsyncEngineSettings:
+    """Lê as variáveis de ambiente ``ASYNC_POLLER_*``."""
+
+    defaults = AsyncEngineSettings()
+
+    def concurrency(family: str) -> int:
+        name = f"ASYNC_POLLER_CONCURRENCY_{family.upper()}"
+        return max(env_int(name, getattr(defaults, f"{family}_concurrency")), 1)
+
+    reconnect_min = max(env_float("ASYNC_POLLER_RECONNECT_MIN", defaults.reconnect_min), 0.0)
+    return AsyncEngineSettings(
+        modbus_concurrency=concurrency("modbus"),
+        s7_concurrency=concurrency("s7"),
+        opcua_concurrency=concurrency("opcua"),
+        ethernetip_concurrency=concurrency("ethernetip"),
+        beckhoff_concurrency=concurrency("beckhoff"),
+        default_concurrency=concurrency("default"),
+        reconnect_min=reconnect_min,
+        reconnect_max=max(env_float("ASYNC_POLLER_RECONNECT_MAX", defaults.reconnect_max), reconnect_min),
+        min_interval_ms=max(env_int("ASYNC_POLLER_MIN_INTERVAL_MS", defaults.min_interval_ms), 1),
+    )
+
+
+Sink = Callable[[Dict[str, Any]], Awaitable[None]]
+ClientFactory = Callable[[Dict[str, Any]], PLCClient]
+
+# Campos que obrigam a refazer a ligação quando mudam.
+CONNECTION_FIELDS = ("protocol", "ip_address", "port", "unit_id", "rack_slot", "timeout")
+
+
+def _interval_seconds(value: Any, fallback: Any, minimum_ms: int) -> float:
+    interval = value or fallback or 1000
+    return max(int(interval), minimum_ms) / 1000.0
+
+
+@dataclass
+class _PollItem:
+    """Bloco do plano ou registrador isolado, com a sua agenda."""
+
+    interval: float
+    registers: List[Dict[str, Any]]
+    block: Optional[Dict[str, Any]] = None
+    due: float = 0.0
+
+
+class PLCWorker:
+    """Tarefa de polling de um CLP com ligação persistente."""
+
+    def __init__(
+        self,
+        plc: Dict[str, Any],
+        *,
+        sink: Sink,
+        semaphore: asyncio.Semaphore,
+        client_factory: ClientFactory,
+        settings: AsyncEngineSettings,
+    ) -> None:
+        self.plc_id = plc["id"]
+        self.sink = sink
+        self.semaphore = semaphore
+        self.settings = settings
+        self._client_factory = client_factory
+        self.client: Optional[PLCClient] = None
+        self.connects = 0
+        self._wake = asyncio.Event()
+        self._items: List[_PollItem] = []
+        self._registers: Dict[int, Dict[str, Any]] = {}
+        self.plc: Dict[str, Any] = {}
+        self.update(plc)
+
+    def update(self, plc: Dict[str, Any]) -> None:
+        """Troca registradores e plano sem largar a ligação."""
+
+        previous = {self._item_key(item): item.due for item in self._items}
+        self.plc = plc
+        self._registers = {register["id"]: register for register in plc.get("registers", [])}
+        minimum = self.settings.min_interval_ms
+        items: List[_PollItem] = []
+        planned = set()
+        for block in plc.get("read_plan") or []:
+            registers = [self._registers[entry["id"]] for entry in block["registers"] if entry["id"] in self._registers]
+            planned.update(entry["id"] for entry in block["registers"])
+            interval = _interval_seconds(block.get("poll_rate"), plc.get("effective_interval"), minimum)
+            items.append(_PollItem(interval, registers, block))
+        for register in self._registers.values():
+            if register["id"] in planned:
+                continue
+            interval = register.get("effective_interval") or register.get("poll_rate")
+            items.append(_PollItem(_interval_seconds(interval, plc.get("effective_interval"), minimum), [register]))
+        for item in items:
+            item.due = previous.get(self._item_key(item), 0.0)
+        self._items = items
+        self._wake.set()
+
+    @staticmethod
+    def _item_key(item: _PollItem) -> Tuple[Any, ...]:
+        if item.block is not None:
+            block = item.block
+            return ("block", block.get("function", block.get("db")), block["start"], block["count"])
+        return ("register", item.registers[0]["id"])
+
+    async def run(self) -> None:
+        delay = self.settings.reconnect_min
+        try:
+            while True:
+                if self.client is None or not self.client.connected:
+                    if not await self._connect():
+                        await self._emit_offline(self._registers.values(), "falha de ligação")
+                        await self._sleep(delay)
+                        delay = min(max(delay * 2, self.settings.reconnect_min), self.settings.reconnect_max)
+                        continue
+                    delay = self.settings.reconnect_min
+                await self._poll_due()
+                await self._sleep(self._next_due() - time.monotonic())
+        finally:
+            await self._disconnect()
+
+    async def _connect(self) -> bool:
+        await self._disconnect()
+        try:
+            self.client = self._client_factory(self.plc)
+            async with self.semaphore:
+                await self.client.connect()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Falha ao ligar ao CLP %s (%s): %s", self.plc_id, self.plc.get("ip_address"), exc)
+            await self._disconnect()
+            return False
+        self.connects += 1
+        return True
+
+    async def _disconnect(self) -> None:
+        client, self.client = self.client, None
+        if client is None:
+            return
+        try:
+            await client.close()
+        except Exception:
+            logger.debug("Erro ao fechar ligação do CLP %s", self.plc_id, exc_info=True)
+
+    async def _sleep(self, seconds: float) -> None:
+        if seconds > 0 and not self._wake.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), seconds)
+            except asyncio.TimeoutError:
+                pass
+        self._wake.clear()
+
+    def _next_due(self) -> float:
+        if not self._items:
+            return time.monotonic() + 3600.0
+        return min(item.due for item in self._items)
+
+    async def _poll_due(self) -> None:
+        now = time.monotonic()
+        due = [item for item in self._items if item.due <= now]
+        if not due:
+            return
+        readings: List[Dict[str, Any]] = []
+        for item in due:
+            # Sem recuperar ciclos perdidos: a próxima leitura é um intervalo
+            # depois de agora se o CLP respondeu com atraso.
+            item.due = max(item.due + item.interval, now)
+            try:
+                async with self.semaphore:
+                    values = await self._read(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Falha de leitura no CLP %s: %s", self.plc_id, exc)
+                await self._disconnect()
+                readings.extend(self._offline_readings(item.registers, str(exc)))
+                break
+            stamp = time.time()
+            for register in item.registers:
+                if register["id"] in values:
+                    readings.append(self._reading(register, values[register["id"]], stamp))
+        if readings:
+            await self.sink({"values": readings})
+
+    async def _emit_offline(self, registers: Iterable[Dict[str, Any]], error: str) -> None:
+        readings = self._offline_readings(registers, error)
+        if readings:
+            await self.sink({"values": readings})
+
+    def _offline_readings(self, registers: Iterable[Dict[str, Any]], error: str) -> List[Dict[str, Any]]:
+        stamp = time.time()
+        return [
+            {
+                "plc_id": self.plc_id,
+                "register_id": register["id"],
+                "timestamp": stamp,
+                "status": "offline",
+                "error": error,
+            }
+            for register in registers
+        ]
+
+    async def _read(self, item: _PollItem) -> Dict[int, Any]:
+        assert self.client is not None
+        if item.block is not None:
+            try:
+                return await self.client.read_block(item.block, self._registers)
+            except ProtocolClientError:
+                if not self.client.connected:
+                    raise
+                # Protocolo sem leitura em bloco: recorre aos registradores.
+        return await self.client.read_registers(item.registers)
+
+    def _reading(self, register: Dict[str, Any], value: Any, stamp: float) -> Dict[str, Any]:
+        reading: Dict[str, Any] = {
+            "plc_id": self.plc_id,
+            "register_id": register["id"],
+            "timestamp": stamp,
+            "raw_value": None if value is None else str(value),
+            "quality": "good" if value is not None else "bad",
+        }
+        if register.get("unit"):
+            reading["unit"] = register["unit"]
+        if isinstance(value, (bool, int, float)):
+            reading["value_float"] = float(value)
+            if isinstance(value, (bool, int)):
+                reading["value_int"] = int(value)
+        return reading
+
+
+class AsyncPollingEngine:
+    """Motor de polling ``asyncio`` com a interface dos gestores Go."""
+
+    def __init__(
+        self,
+        sink: Sink,
+        *,
+        settings: Optional[AsyncEngineSettings] = None,
+        client_factory: Optional[ClientFactory] = None,
+        companions: Sequence[Callable[[], Awaitable[None]]] = (),
+        name: str = "async-poller",
+    ) -> None:
+        self.sink = sink
+        self.settings = settings or load_async_engine_settings()
+        self.name = name
+        self.config_state = PollerConfigState()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.workers: Dict[int, PLCWorker] = {}
+        self._client_factory = client_factory or create_client
+        self._companions = companions
+        self._companion_tasks: List[asyncio.Task] = []
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._config_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def start(self, initial_config: Dict[str, Any]) -> None:
+        if self._thread is not None:
+            raise RuntimeError("Async polling engine already started.")
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(self.loop)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._call(self._start_companions())
+        self.update_config(initial_config)
+        logger.info("Motor de polling Python iniciado com %d CLP(s).", len(self.workers))
+
+    def stop(self) -> None:
+        if self._thread is None or self.loop is None:
+            return
+        try:
+            self._call(self._shutdown(), timeout=10.0)
+        except Exception:
+            logger.exception("Falha ao parar o motor de polling Python.")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop.close()
+        self._thread = None
+        self.loop = None
+        self.config_state.reset()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _call(self, coro, timeout: float = 30.0):
+        assert self.loop is not None
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def _start_companions(self) -> None:
+        self._companion_tasks = [asyncio.create_task(companion()) for companion in self._companions]
+
+    async def _shutdown(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self.workers.clear()
+        # Os acompanhantes (ex.: o processador) param depois dos CLPs para
+        # gravarem as últimas leituras.
+        for task in self._companion_tasks:
+            task.cancel()
+        await asyncio.gather(*self._companion_tasks, return_exceptions=True)
+        self._companion_tasks = []
+
+    # ------------------------------------------------------------------
+    # Configuração
+    # ------------------------------------------------------------------
+    def update_config(self, new_config_data: Dict[str, Any]) -> None:
+        """Aplica a configuração completa."""
+
+        if self.loop is None:
+            raise RuntimeError("Async polling engine not started.")
+        with self._config_lock:
+            self._call(self._reconcile(new_config_data.get("plcs", [])))
+            self.config_state.commit(new_config_data, self.config_state.version + 1)
+
+    def apply_config(self, new_config_data: Dict[str, Any]) -> Optional[str]:
+        """Reconcilia as tarefas com ``new_config_data``.
+
+        Devolve ``"full"`` na primeira configuração, ``"delta"`` se algo mudou
+        e ``None`` caso contrário; só os CLPs alterados são tocados.
+        """
+
+        if self.config_state.needs_full():
+            self.update_config(new_config_data)
+            return "full"
+        if self.config_state.diff(new_config_data) is None:
+            return None
+        self.update_config(new_config_data)
+        return "delta"
+
+    def _semaphore(self, family: Optional[str]) -> asyncio.Semaphore:
+        key = family or "default"
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.settings.concurrency_for(key))
+        return semaphore
+
+    async def _reconcile(self, plcs: Iterable[Dict[str, Any]]) -> None:
+        wanted = {plc["id"]: plc for plc in plcs}
+        stopped = []
+        for plc_id in list(self.workers):
+            plc = wanted.get(plc_id)
+            worker = self.workers[plc_id]
+            if plc is not None and all(plc.get(key) == worker.plc.get(key) for key in CONNECTION_FIELDS):
+                worker.update(plc)
+                continue
+            stopped.append(self._tasks.pop(plc_id))
+            del self.workers[plc_id]
+        for task in stopped:
+            task.cancel()
+        await asyncio.gather(*stopped, return_exceptions=True)
+
+        for plc_id, plc in wanted.items():
+            if plc_id in self.workers:
+                continue
+            worker = PLCWorker(
+                plc,
+                sink=self.sink,
+                semaphore=self._semaphore(protocol_family(plc.get("protocol"))),
+                client_factory=self._client_factory,
+                settings=self.settings,
+            )
+            self.workers[plc_id] = worker
+            self._tasks[plc_id] = asyncio.create_task(worker.run(), name=f"poll-plc-{plc_id}")
+
+
+__all__ = [
+    "AsyncEngineSettings",
+    "AsyncPollingEngine",
+    "PLCWorker",
+    "load_async_engine_settings",
+]
@@ -12,9 +12,13 @@ from typing import Any, Dict, Optional
 import grpc
 
 from src.grpc_generated import polling_pb2, polling_pb2_grpc
+from src.services.poller_config_service import PollerConfigState
 from src.utils.logs import logger
 
 
+READY_PREFIX = "POLLER_READY"
+
+
 def is_go_available() -> bool:
     """Returns True if a Go toolchain is available on PATH."""
 
@@ -31,8 +35,22 @@ class GoPollingManager:
         binary_path: Optional[Path] = None,
         build_binary: bool = True,
         go_command: Optional[list[str]] = None,
+        address: str = "localhost:50051",
+        listen_address: Optional[str] = None,
+        name: str = "go-polling",
+        ready_timeout: float = 5.0,
+        connect_timeout: float = 5.0,
     ) -> None:
         self.data_queue = data_queue
+        self.address = address
+        self._configured_address = address
+        self.listen_address = listen_address or self._listen_address_for(address)
+        self.name = name
+        self.ready_timeout = ready_timeout
+        self.connect_timeout = connect_timeout
+        self._ready = threading.Event()
+        self._ready_address: Optional[str] = None
+        self._stdout_thread: Optional[threading.Thread] = None
         self._go_command = go_command
         self._build_binary = build_binary
         self._binary_path = self._resolve_binary_path(binary_path)
@@ -42,6 +60,27 @@ class GoPollingManager:
         self._stop_event = threading.Event()
         self.channel: Optional[grpc.Channel] = None
         self.stub: Optional[polling_pb2_grpc.PollingServiceStub] = None
+        self.config_state = PollerConfigState()
+        self._config_lock = threading.Lock()
+        # Retoma do stream: instância do poller e última sequência entregue.
+        self._stream_id = ""
+        self._high_water = 0
+        self.duplicates_dropped = 0
+        self.lost_messages = 0
+
+    @staticmethod
+    def _listen_address_for(address: str) -> str:
+        """Endereço de escuta do poller para um alvo gRPC (``unix:`` ou TCP)."""
+
+        if address.startswith("unix:"):
+            return address
+        return ":" + address.rsplit(":", 1)[-1]
+
+    def _resolve_ready_address(self, network: str, address: str) -> str:
+        if network == "unix":
+            return f"unix:{address}"
+        host = self._configured_address.rsplit(":", 1)[0]
+        return f"{host}:{address.rsplit(':', 1)[-1]}"
 
     def _resolve_binary_path(self, explicit: Optional[Path]) -> Path:
         if explicit:
@@ -77,10 +116,14 @@ class GoPollingManager:
             raise RuntimeError("Go polling manager already started.")
 
         command = self._ensure_binary()
+        started = time.monotonic()
+        self._ready.clear()
+        self._ready_address = None
         self._process = subprocess.Popen(
             command,
+            env={**os.environ, "POLLER_LISTEN_ADDR": self.listen_address},
             stdin=None,
-            stdout=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
             bufsize=1,
@@ -89,16 +132,25 @@ class GoPollingManager:
         self._stop_event.clear()
         self._stderr_thread = threading.Thread(target=self._read_stderr, daemon=True)
         self._stderr_thread.start()
+        self._stdout_thread = threading.Thread(target=self._read_stdout, daemon=True)
+        self._stdout_thread.start()
 
-        time.sleep(1.5)
+        self._wait_ready()
+        self.address = self._ready_address or self._configured_address
 
-        self.channel = grpc.insecure_channel("localhost:50051")
+        self.channel = grpc.insecure_channel(self.address)
         try:
-            grpc.channel_ready_future(self.channel).result(timeout=5.0)
+            grpc.channel_ready_future(self.channel).result(timeout=self.connect_timeout)
         except grpc.FutureTimeoutError as exc:
             logger.exception("Canal gRPC não ficou pronto a tempo.")
             self.stop()
             raise RuntimeError("Falha ao conectar ao poller Go via gRPC") from exc
+        logger.info(
+            "Poller %s pronto em %s (%.0f ms).",
+            self.name,
+            self.address,
+            (time.monotonic() - started) * 1000,
+        )
 
         self.stub = polling_pb2_grpc.PollingServiceStub(self.channel)
         try:
@@ -110,58 +162,188 @@ class GoPollingManager:
         self._stream_thread = threading.Thread(target=self._read_stream, daemon=True)
         self._stream_thread.start()
 
+    def _wait_ready(self) -> None:
+        """Espera pela linha ``POLLER_READY`` ou pela morte do processo.
+
+        Binários antigos não escrevem a linha: passado ``ready_timeout`` segue
+        para a espera do canal gRPC, que já tenta de novo com *backoff* curto.
+        """
+
+        assert self._process is not None
+        deadline = time.monotonic() + self.ready_timeout
+        while not self._ready.wait(0.02):
+            code = self._process.poll()
+            if code is not None:
+                self.stop()
+                raise RuntimeError(f"Poller {self.name} terminou durante o arranque (código {code}).")
+            if time.monotonic() >= deadline:
+                logger.warning("Poller %s não anunciou prontidão; a tentar ligar em %s.", self.name, self.address)
+                return
+
+    def _read_stdout(self) -> None:
+        assert self._process is not None and self._process.stdout is not None
+        for line in self._process.stdout:
+            line = line.rstrip()
+            if not self._ready.is_set() and line.startswith(READY_PREFIX):
+                parts = line.split(maxsplit=2)
+                if len(parts) == 3:
+                    self._ready_address = self._resolve_ready_address(parts[1], parts[2])
+                self._ready.set()
+                continue
+            if line:
+                logger.info("[%s] %s", self.name, line)
+
+    def is_running(self) -> bool:
+        """``True`` enquanto o processo do poller estiver vivo."""
+
+        return self._process is not None and self._process.poll() is None
+
     def _read_stream(self) -> None:
-        assert self.stub is not None
+        stub = self.stub
+        assert stub is not None
         while not self._stop_event.is_set():
             try:
-                response_stream = self.stub.StreamData(polling_pb2.Empty())
+                response_stream = stub.StreamData(self._stream_request())
                 for data_payload in response_stream:
-                    self.data_queue.put(data_payload.json_data)
+                    if self._accept(data_payload):
+                        self.data_queue.put(data_payload.json_data)
                 if self._stop_event.is_set():
                     break
             except grpc.RpcError as exc:
+                if self._stop_event.is_set():
+                    break
                 if exc.code() == grpc.StatusCode.UNAVAILABLE:
-                    if not self._stop_event.is_set():
-                        logger.error(
-                            "Conexão gRPC indisponível; aguardando processo Go reiniciar."
-                        )
-                        time.sleep(1.0)
+                    logger.error(
+                        "Conexão gRPC indisponível; aguardando processo Go reiniciar."
+                    )
+                    self._stop_event.wait(1.0)
                     continue
                 logger.exception(
                     "Erro ao consumir stream de dados do poller Go: %s", exc
                 )
-                time.sleep(1.0)
+                self._stop_event.wait(1.0)
             except Exception:
+                if self._stop_event.is_set():
+                    break
                 logger.exception(
                     "Falha inesperada ao consumir stream gRPC do poller Go."
                 )
-                time.sleep(1.0)
+                self._stop_event.wait(1.0)
+
+    def _stream_request(self) -> polling_pb2.StreamRequest:
+        """Pedido que retoma o stream logo após a última sequência entregue."""
+
+        from_seq = self._high_water + 1 if self._high_water else 0
+        return polling_pb2.StreamRequest(from_seq=from_seq, stream_id=self._stream_id)
+
+    def _accept(self, payload: polling_pb2.DataPayload) -> bool:
+        """Atualiza a marca de água e indica se ``payload`` deve seguir.
+
+        Payloads sem sequência (binários antigos) passam sempre.  Uma
+        ``stream_id`` diferente significa que o poller reiniciou e a
+        numeração recomeçou.
+        """
+
+        if not payload.seq:
+            return True
+        if payload.stream_id != self._stream_id:
+            if self._stream_id:
+                logger.warning(
+                    "Poller %s reiniciou (stream %s -> %s); sequência reiniciada.",
+                    self.name,
+                    self._stream_id,
+                    payload.stream_id,
+                )
+            self._stream_id = payload.stream_id
+            self._high_water = 0
+        if payload.seq <= self._high_water:
+            self.duplicates_dropped += 1
+            return False
+        if self._high_water and payload.seq > self._high_water + 1:
+            missing = payload.seq - self._high_water - 1
+            self.lost_messages += missing
+            logger.warning(
+                "Poller %s: %d medições perdidas (sequência %d -> %d).",
+                self.name,
+                missing,
+                self._high_water,
+                payload.seq,
+            )
+        self._high_water = payload.seq
+        return True
 
     def _read_stderr(self) -> None:
         assert self._process is not None and self._process.stderr is not None
         for line in self._process.stderr:
-            logger.error("[go-polling] %s", line.rstrip())
+            logger.error("[%s] %s", self.name, line.rstrip())
             if self._stop_event.is_set():
                 break
 
-    def update_config(self, new_config_data: Dict[str, Any]) -> None:
-        if self.stub is None:
-            raise RuntimeError("gRPC client not initialised.")
+    @staticmethod
+    def _encode(payload: Dict[str, Any]) -> polling_pb2.ConfigPayload:
         try:
-            json_payload = json.dumps(new_config_data)
+            return polling_pb2.ConfigPayload(json_config=json.dumps(payload))
         except (TypeError, ValueError) as exc:
             raise ValueError("Configuração inválida para o poller Go") from exc
 
+    def update_config(self, new_config_data: Dict[str, Any]) -> None:
+        """Envia a configuração completa (``UpdateConfig``) com nova versão."""
+
+        if self.stub is None:
+            raise RuntimeError("gRPC client not initialised.")
+        with self._config_lock:
+            self._push_full(new_config_data)
+
+    def _push_full(self, config: Dict[str, Any]) -> None:
+        assert self.stub is not None
+        payload = self.config_state.full(config)
         try:
-            response = self.stub.UpdateConfig(
-                polling_pb2.ConfigPayload(json_config=json_payload)
-            )
+            response = self.stub.UpdateConfig(self._encode(payload))
         except grpc.RpcError as exc:
             logger.exception("Falha ao enviar configuração ao poller Go: %s", exc)
             raise
 
         if not response.success:
             raise RuntimeError(f"Poller Go rejeitou configuração: {response.message}")
+        self.config_state.commit(config, payload["version"])
+
+    def apply_config(self, new_config_data: Dict[str, Any]) -> Optional[str]:
+        """Sincroniza o poller com ``new_config_data`` enviando só as diferenças.
+
+        Devolve ``"delta"``, ``"full"`` ou ``None`` (nada mudou).  Se o poller
+        recusar o *delta* (versão divergente, método não implementado), cai
+        para o envio completo.
+        """
+
+        if self.stub is None:
+            raise RuntimeError("gRPC client not initialised.")
+        with self._config_lock:
+            if self.config_state.needs_full():
+                self._push_full(new_config_data)
+                return "full"
+
+            delta = self.config_state.diff(new_config_data)
+            if delta is None:
+                return None
+
+            try:
+                response = self.stub.ApplyConfigDelta(self._encode(delta))
+            except grpc.RpcError as exc:
+                logger.warning(
+                    "Delta de configuração não aplicado (%s); a enviar configuração completa.",
+                    exc.code(),
+                )
+            else:
+                if response.success:
+                    self.config_state.commit(new_config_data, delta["version"])
+                    return "delta"
+                logger.warning(
+                    "Poller Go recusou delta de configuração (%s); a enviar configuração completa.",
+                    response.message,
+                )
+
+            self._push_full(new_config_data)
+            return "full"
 
     def stop(self) -> None:
         self._stop_event.set()
@@ -170,6 +352,7 @@ class GoPollingManager:
             self.channel.close()
             self.channel = None
             self.stub = None
+        self.config_state.reset()
 
         if self._process and self._process.poll() is None:
             try:
@@ -182,9 +365,15 @@ class GoPollingManager:
         if self._stderr_thread:
             self._stderr_thread.join(timeout=5)
             self._stderr_thread = None
+        if self._stdout_thread:
+            self._stdout_thread.join(timeout=5)
+            self._stdout_thread = None
         if self._process:
             try:
                 self._process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 self._process.kill()
             self._process = None
+        if self.listen_address.startswith("unix:"):
+            # O Go apaga o socket ao fechar; um processo morto deixa-o para trás.
+            Path(self.listen_address[len("unix:"):]).unlink(missing_ok=True)
@@ -0,0 +1,339 @@
+"""Conjunto de processos poller Go com CLPs repartidos por *hashing* consistente.
+
+Um único poller não acompanha as instalações maiores.  O :class:`PollerPool`
+arranca ``K`` processos (cada um com o seu endereço gRPC), reparte os CLPs por
+um anel de *hashing* consistente — acrescentar um shard só move ~1/K dos
+CLPs — e todos os shards escrevem na mesma ``data_queue``, que continua a ser
+a única entrada do pipeline de ingestão.
+
+Por omissão (POSIX) cada shard escuta num *unix socket* próprio, com o PID
+no nome: menos latência local que TCP e várias instâncias da aplicação podem
+correr lado a lado sem disputar portas.  Com ``POLLER_TRANSPORT=tcp`` os
+shards usam ``POLLER_BASE_PORT + índice`` (``0`` pede portas efémeras, que o
+poller anuncia na linha de prontidão).
+
+Uma *thread* de supervisão reinicia individualmente os shards cujo processo
+morreu; :meth:`PollerPool.apply_config` e :meth:`PollerPool.resize`
+reequilibram a distribuição e enviam a cada shard apenas o seu *delta*.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from queue import Queue
+from typing import Any, Callable, Dict, List, Optional
+
+from src.manager.go_polling_manager import GoPollingManager
+from src.services.poller_config_service import PollerConfigState
+from src.utils.env import env_float, env_int
+from src.utils.logs import logger
+
+
+DEFAULT_TRANSPORT = "unix" if os.name == "posix" else "tcp"
+
+
+@dataclass(frozen=True)
+class PollerPoolSettings:
+    shards: int = 1
+    transport: str = DEFAULT_TRANSPORT
+    socket_dir: str = tempfile.gettempdir()
+    host: str = "localhost"
+    base_port: int = 50051
+    ring_replicas: int = 128
+    monitor_seconds: float = 2.0
+    ready_timeout: float = 5.0
+
+
+def load_poller_pool_settings() -> PollerPoolSettings:
+    """Lê as variáveis de ambiente ``POLLER_*``."""
+
+    transport = os.getenv("POLLER_TRANSPORT", DEFAULT_TRANSPORT).strip().lower()
+    if transport not in {"unix", "tcp"} or (transport == "unix" and os.name != "posix"):
+        transport = "tcp"
+    return PollerPoolSettings(
+        shards=max(env_int("POLLER_SHARDS", 1), 1),
+        transport=transport,
+        socket_dir=os.getenv("POLLER_SOCKET_DIR") or tempfile.gettempdir(),
+        host=os.getenv("POLLER_HOST", "localhost"),
+        base_port=max(env_int("POLLER_BASE_PORT", 50051), 0),
+        ring_replicas=max(env_int("POLLER_RING_REPLICAS", 128), 1),
+        monitor_seconds=max(env_float("POLLER_MONITOR_SECONDS", 2.0), 0.0),
+        ready_timeout=max(env_float("POLLER_READY_TIMEOUT", 5.0), 0.0),
+    )
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """Anel de *hashing* consistente com nós virtuais."""
+
+    def __init__(self, nodes: List[str], *, replicas: int = 128) -> None:
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            if point in self._owners:
+                continue
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str) -> None:
+        points = [point for point, owner in self._owners.items() if owner == node]
+        for point in points:
+            del self._owners[point]
+        removed = set(points)
+        self._points = [point for point in self._points if point not in removed]
+
+    def node_for(self, key: Any) -> str:
+        if not self._points:
+            raise LookupError("Anel de hashing sem nós")
+        index = bisect.bisect(self._points, _hash(str(key))) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+ManagerFactory = Callable[[str, int], GoPollingManager]
+
+
+class PollerPool:
+    """Gere ``K`` shards :class:`GoPollingManager` com a mesma interface."""
+
+    def __init__(
+        self,
+        data_queue: Queue,
+        *,
+        settings: Optional[PollerPoolSettings] = None,
+        manager_factory: Optional[ManagerFactory] = None,
+    ) -> None:
+        self.data_queue = data_queue
+        self.settings = settings or load_poller_pool_settings()
+        self._factory = manager_factory or self._default_factory
+        self.shards: Dict[str, GoPollingManager] = {}
+        self._assigned: Dict[str, Dict[str, Any]] = {}
+        self._ring = ConsistentHashRing([], replicas=self.settings.ring_replicas)
+        self.config_state = PollerConfigState()
+        self._config: Dict[str, Any] = {"plcs": []}
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._monitor_thread: Optional[threading.Thread] = None
+        self.restarts: Dict[str, int] = {}
+        # Shards a reiniciar fora do lock por ``check_shards``.
+        self._restarting: set = set()
+
+    def shard_address(self, index: int) -> str:
+        """Alvo gRPC do shard ``index``."""
+
+        if self.settings.transport == "unix":
+            path = os.path.join(self.settings.socket_dir, f"clp-poller-{os.getpid()}-{index}.sock")
+            return f"unix:{path}"
+        port = self.settings.base_port + index if self.settings.base_port else 0
+        return f"{self.settings.host}:{port}"
+
+    def _default_factory(self, name: str, index: int) -> GoPollingManager:
+        return GoPollingManager(
+            self.data_queue,
+            address=self.shard_address(index),
+            name=name,
+            ready_timeout=self.settings.ready_timeout,
+        )
+
+    @staticmethod
+    def _shard_name(index: int) -> str:
+        return f"poller-{index}"
+
+    # ------------------------------------------------------------------
+    # Repartição
+    # ------------------------------------------------------------------
+    def split(self, config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Configuração de cada shard (``{"plcs": [...]}``)."""
+
+        with self._lock:
+            parts: Dict[str, Dict[str, Any]] = {name: {"plcs": []} for name in self.shards}
+            for plc in config.get("plcs", []):
+                parts[self._ring.node_for(plc["id"])]["plcs"].append(plc)
+            return parts
+
+    def shard_for(self, plc_id: int) -> str:
+        with self._lock:
+            return self._ring.node_for(plc_id)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def start(self, initial_config: Dict[str, Any]) -> None:
+        with self._lock:
+            if self.shards:
+                raise RuntimeError("Poller pool already started.")
+            self._stop_event.clear()
+            self._config = initial_config
+            for index in range(self.settings.shards):
+                self._add_shard(index)
+            try:
+                for name, part in self.split(initial_config).items():
+                    self.shards[name].start(part)
+                    self._assigned[name] = part
+            except Exception:
+                self.stop()
+                raise
+            self.config_state.commit(initial_config, self.config_state.version + 1)
+
+        if self.settings.monitor_seconds > 0:
+            self._monitor_thread = threading.Thread(target=self._monitor, name="poller-pool-monitor", daemon=True)
+            self._monitor_thread.start()
+
+    def _add_shard(self, index: int) -> str:
+        name = self._shard_name(index)
+        self.shards[name] = self._factory(name, index)
+        self._ring.add(name)
+        return name
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._monitor_thread is not None:
+            self._monitor_thread.join(timeout=5)
+            self._monitor_thread = None
+        with self._lock:
+            for shard in self.shards.values():
+                try:
+                    shard.stop()
+                except Exception:
+                    logger.exception("Falha ao parar shard %s do poller.", shard.name)
+            self.shards.clear()
+            self._assigned.clear()
+            self._restarting.clear()
+            self._ring = ConsistentHashRing([], replicas=self.settings.ring_replicas)
+            self.config_state.reset()
+
+    def _monitor(self) -> None:
+        while not self._stop_event.wait(self.settings.monitor_seconds):
+            self.check_shards()
+
+    def check_shards(self) -> List[str]:
+        """Reinicia os shards cujo processo terminou; devolve os seus nomes.
+
+        O arranque pode demorar até ``ready_timeout`` por shard, por isso
+        corre fora do *lock*: ``apply_config`` continua a servir os outros
+        shards e só actualiza a atribuição dos que estão a reiniciar.  Se a
+        atribuição mudou entretanto, o shard é sincronizado no fim.
+        """
+
+        with self._lock:
+            if self._stop_event.is_set():
+                return []
+            dead = [
+                (name, shard, self._assigned.get(name, {"plcs": []}))
+                for name, shard in self.shards.items()
+                if name not in self._restarting and not shard.is_running()
+            ]
+            self._restarting.update(name for name, _, _ in dead)
+
+        restarted = []
+        for name, shard, assigned in dead:
+            logger.error("Shard %s do poller terminou; a reiniciar.", name)
+            try:
+                shard.stop()
+                shard.start(assigned)
+            except Exception:
+                logger.exception("Falha ao reiniciar shard %s do poller.", name)
+                with self._lock:
+                    self._restarting.discard(name)
+                continue
+            with self._lock:
+                self._restarting.discard(name)
+                self.restarts[name] = self.restarts.get(name, 0) + 1
+                current = self._assigned.get(name)
+                if current is not None and current is not assigned and self.shards.get(name) is shard:
+                    try:
+                        shard.apply_config(current)
+                    except Exception:
+                        logger.exception("Falha ao sincronizar shard %s do poller reiniciado.", name)
+            restarted.append(name)
+        return restarted
+
+    # ------------------------------------------------------------------
+    # Configuração
+    # ------------------------------------------------------------------
+    def update_config(self, new_config_data: Dict[str, Any]) -> None:
+        """Envia a configuração completa a todos os shards."""
+
+        with self._lock:
+            for name, part in self.split(new_config_data).items():
+                self.shards[name].update_config(part)
+                self._assigned[name] = part
+            self._config = new_config_data
+            self.config_state.commit(new_config_data, self.config_state.version + 1)
+
+    def apply_config(self, new_config_data: Dict[str, Any]) -> Optional[str]:
+        """Reparte ``new_config_data`` e envia a cada shard só o que mudou.
+
+        Um CLP que muda de shard aparece como removido num e adicionado no
+        outro.  Devolve ``"full"`` se algum shard recebeu a configuração
+        completa, ``"delta"`` se só houve *deltas* e ``None`` se nada mudou.
+
+        A atribuição de cada shard é registada mesmo que o envio falhe: um
+        shard em baixo é reiniciado por :meth:`check_shards` já com a parte
+        nova, e um que falhou vivo volta a receber o *delta* na próxima
+        chamada.
+        """
+
+        with self._lock:
+            results = []
+            pending = False
+            for name, part in self.split(new_config_data).items():
+                self._assigned[name] = part
+                if name in self._restarting:
+                    pending = True
+                    continue
+                try:
+                    results.append(self.shards[name].apply_config(part))
+                except Exception:
+                    logger.exception("Falha ao aplicar configuração no shard %s do poller.", name)
+                    pending = True
+            self._config = new_config_data
+            if any(results) or pending:
+                self.config_state.commit(new_config_data, self.config_state.version + 1)
+        if "full" in results:
+            return "full"
+        return "delta" if "delta" in results else None
+
+    def resize(self, shards: int) -> None:
+        """Altera o número de shards e reequilibra os CLPs."""
+
+        shards = max(shards, 1)
+        with self._lock:
+            current = len(self.shards)
+            removed = []
+            for index in range(current, shards):
+                name = self._add_shard(index)
+                self.shards[name].start({"plcs": []})
+                self._assigned[name] = {"plcs": []}
+            for index in range(shards, current):
+                name = self._shard_name(index)
+                self._ring.remove(name)
+                removed.append(self.shards.pop(name))
+                self._assigned.pop(name, None)
+            # Primeiro os shards que ficam recebem os CLPs; só depois os
+            # removidos param, para não haver intervalo sem polling.
+            self.apply_config(self._config)
+        for shard in removed:
+            shard.stop()
+        logger.info("Poller pool redimensionado de %d para %d shards.", current, shards)
+
+
+__all__ = [
+    "ConsistentHashRing",
+    "PollerPool",
+    "PollerPoolSettings",
+    "load_poller_pool_settings",
+]
@@ -0,0 +1,434 @@
+"""Clientes de protocolo usados pelo :mod:`src.manager.async_polling_engine`.
+
+Cada cliente mantém uma ligação persistente a um CLP e expõe a mesma
+interface assíncrona: :meth:`PLCClient.connect`, :meth:`PLCClient.close`,
+:meth:`PLCClient.read_block` (blocos do
+:func:`~src.services.read_planner.plan_reads`) e
+:meth:`PLCClient.read_registers` (registradores fora do plano).
+
+Modbus (``pymodbus``) e OPC UA (``asyncua``) são nativamente assíncronos;
+S7 (``python-snap7``), Ethernet/IP (``pycomm3``) e ADS (``pyads``) são
+bibliotecas bloqueantes e correm no *executor* do *event loop*, uma chamada
+de cada vez por ligação.
+As bibliotecas só são importadas ao ligar, para que a ausência de uma delas
+afete apenas os CLPs desse protocolo.
+
+Protocolos ``*-sim`` usam o
+:data:`~src.simulations.runtime.simulation_registry`, o que permite exercitar
+o motor de polling sem controladores físicos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.services.address_mapping import AddressMappingEngine
+from src.simulations.runtime import simulation_registry
+
+PROTOCOL_FAMILIES = {
+    "modbus": {"modbus", "modbus-tcp", "modbus-rtu"},
+    "s7": {"s7", "siemens"},
+    "opcua": {"opcua", "opc-ua"},
+    "ethernetip": {"ethernetip", "ethernet/ip", "ethernet_ip", "cip"},
+    "beckhoff": {"beckhoff", "beckhoff-ads", "ads"},
+    "profinet": {"profinet"},
+    "dnp3": {"dnp3"},
+    "iec104": {"iec104", "iec-104", "iec_104"},
+}
+
+SIMULATION_SUFFIX = "-sim"
+
+# Porta AMS do runtime PLC do TwinCAT 3.
+ADS_PLC_PORT = 851
+
+_engine = AddressMappingEngine()
+
+
+class ProtocolClientError(Exception):
+    """Falha de ligação ou leitura num cliente de protocolo."""
+
+
+def protocol_family(protocol: Optional[str]) -> Optional[str]:
+    """Família do protocolo (``modbus``, ``s7``...), ignorando o sufixo ``-sim``."""
+
+    key = (protocol or "").strip().lower()
+    if key.endswith(SIMULATION_SUFFIX):
+        key = key[: -len(SIMULATION_SUFFIX)]
+    for family, aliases in PROTOCOL_FAMILIES.items():
+        if key in aliases:
+            return family
+    return None
+
+
+def is_simulated(protocol: Optional[str]) -> bool:
+    return (protocol or "").strip().lower().endswith(SIMULATION_SUFFIX)
+
+
+# ----------------------------------------------------------------------
+# Descodificação
+# ----------------------------------------------------------------------
+_WORD_FORMATS = {
+    "int16": ">h",
+    "int": ">h",
+    "uint16": ">H",
+    "word": ">H",
+    "float": ">f",
+    "float32": ">f",
+    "real": ">f",
+    "int32": ">i",
+    "dint": ">i",
+    "uint32": ">I",
+    "udint": ">I",
+    "dword": ">I",
+    "double": ">d",
+    "float64": ">d",
+    "lreal": ">d",
+    "int64": ">q",
+    "lint": ">q",
+    "uint64": ">Q",
+}
+
+_BOOL_TYPES = {"bool", "boolean", "bit"}
+
+
+def word_count(data_type: Optional[str]) -> int:
+    """Palavras de 16 bits ocupadas por ``data_type``."""
+
+    fmt = _WORD_FORMATS.get(str(data_type or "").lower(), ">H")
+    return max(struct.calcsize(fmt) // 2, 1)
+
+
+def decode_words(words: List[int], data_type: Optional[str]) -> Any:
+    """Valor de palavras Modbus de 16 bits (ordem *big-endian*)."""
+
+    fmt = _WORD_FORMATS.get(str(data_type or "").lower(), ">H")
+    size = struct.calcsize(fmt)
+    raw = b"".join(int(word & 0xFFFF).to_bytes(2, "big") for word in words)
+    if len(raw) < size:
+        raise ProtocolClientError(f"Palavras insuficientes para {data_type}: {len(words)}")
+    return struct.unpack(fmt, raw[:size])[0]
+
+
+def decode_bytes(data: bytes, data_type: Optional[str], bit: Optional[int] = None) -> Any:
+    """Valor de bytes S7 (*big-endian*); ``bit`` para endereços ``DBX``."""
+
+    if bit is not None or str(data_type or "").lower() in _BOOL_TYPES:
+        return bool(data[0] >> (bit or 0) & 1)
+    fmt = _WORD_FORMATS.get(str(data_type or "").lower())
+    if fmt is None:
+        fmt = {1: ">B", 2: ">h", 4: ">i", 8: ">q"}.get(len(data), ">h")
+    size = struct.calcsize(fmt)
+    if len(data) < size:
+        raise ProtocolClientError(f"Bytes insuficientes para {data_type}: {len(data)}")
+    return struct.unpack(fmt, bytes(data[:size]))[0]
+
+
+# ----------------------------------------------------------------------
+# Clientes
+# ----------------------------------------------------------------------
+class PLCClient:
+    """Ligação persistente a um CLP."""
+
+    def __init__(self, plc: Dict[str, Any]) -> None:
+        self.plc = plc
+        self.timeout = max(float(plc.get("timeout") or 5000) / 1000.0, 0.1)
+
+    @property
+    def connected(self) -> bool:
+        raise NotImplementedError
+
+    async def connect(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+    async def read_block(self, block: Dict[str, Any], registers: Dict[int, Dict[str, Any]]) -> Dict[int, Any]:
+        """Lê um bloco do plano e devolve ``{register_id: valor}``."""
+
+        raise ProtocolClientError(f"Leitura em bloco não suportada para {self.plc.get('protocol')}")
+
+    async def read_registers(self, registers: Iterable[Dict[str, Any]]) -> Dict[int, Any]:
+        """Lê registradores individuais e devolve ``{register_id: valor}``."""
+
+        raise NotImplementedError
+
+
+class SimulatedClient(PLCClient):
+    """Cliente dos protocolos ``*-sim`` alimentado pelo registo de simulação."""
+
+    def __init__(self, plc: Dict[str, Any]) -> None:
+        super().__init__(plc)
+        self.family = protocol_family(plc.get("protocol")) or "sim"
+        self._connected = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> None:
+        self._connected = True
+
+    async def close(self) -> None:
+        self._connected = False
+
+    async def read_registers(self, registers: Iterable[Dict[str, Any]]) -> Dict[int, Any]:
+        values = {}
+        for register in registers:
+            config = SimpleNamespace(id=register["id"], data_type=register.get("data_type") or "float")
+            values[register["id"]] = simulation_registry.next_value(self.family, config)["raw_value"]
+        return values
+
+
+class ModbusClient(PLCClient):
+    """Modbus TCP via ``pymodbus`` (cliente assíncrono).
+
+    Os endereços seguem a convenção Modicon do resto da aplicação (``40001``
+    é o primeiro *holding register*), pelo que o endereço de protocolo é o
+    normalizado menos um.
+    """
+
+    _READERS = {1: "read_coils", 2: "read_discrete_inputs", 3: "read_holding_registers", 4: "read_input_registers"}
+    # Prefixo do endereço -> código de função da leitura.
+    _FUNCTIONS = {0: 1, 1: 2, 3: 4, 4: 3}
+
+    def __init__(self, plc: Dict[str, Any]) -> None:
+        super().__init__(plc)
+        self.unit = int(plc.get("unit_id") or 1)
+        self._client = None
+
+    @property
+    def connected(self) -> bool:
+        return bool(self._client is not None and self._client.connected)
+
+    async def connect(self) -> None:
+        from pymodbus.client import AsyncModbusTcpClient
+
+        self._client = AsyncModbusTcpClient(
+            self.plc["ip_address"], port=int(self.plc.get("port") or 502), timeout=self.timeout, retries=0
+        )
+        if not await self._client.connect():
+            raise ProtocolClientError(f"Ligação Modbus falhou para {self.plc['ip_address']}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def _read(self, function: int, start: int, count: int) -> List[Any]:
+        reader = getattr(self._client, self._READERS[function])
+        response = await reader(max(start - 1, 0), count, slave=self.unit)
+        if response.isError():
+            raise ProtocolClientError(f"Erro Modbus (função {function}): {response}")
+        return list(response.bits if function in (1, 2) else response.registers)
+
+    async def read_block(self, block: Dict[str, Any], registers: Dict[int, Dict[str, Any]]) -> Dict[int, Any]:
+        function = int(block["function"])
+        data = await self._read(function, int(block["start"]), int(block["count"]))
+        values = {}
+        for entry in block["registers"]:
+            offset, count = entry["offset"], entry["count"]
+            if function in (1, 2):
+                values[entry["id"]] = bool(data[offset])
+            else:
+                data_type = registers.get(entry["id"], {}).get("data_type")
+                values[entry["id"]] = decode_words(data[offset : offset + count], data_type)
+        return values
+
+    async def read_registers(self, registers: Iterable[Dict[str, Any]]) -> Dict[int, Any]:
+        values = {}
+        for register in registers:
+            normalized = _engine.normalize("modbus", str(register.get("address") or ""))
+            function = self._FUNCTIONS.get(normalized["function"])
+            if function is None:
+                raise ProtocolClientError(f"Endereço Modbus sem leitura: {register.get('address')}")
+            count = 1 if function in (1, 2) else word_count(register.get("data_type"))
+            block = {
+                "function": function,
+                "start": normalized["address"],
+                "count": count,
+                "registers": [{"id": register["id"], "offset": 0, "count": count}],
+            }
+            values.update(await self.read_block(block, {register["id"]: register}))
+        return values
+
+
+class OpcUaClient(PLCClient):
+    """OPC UA via ``asyncua``; cada registrador é um ``NodeId``."""
+
+    def __init__(self, plc: Dict[str, Any]) -> None:
+        super().__init__(plc)
+        self._client = None
+        self._connected = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> None:
+        from asyncua import Client
+
+        url = f"opc.tcp://{self.plc['ip_address']}:{int(self.plc.get('port') or 4840)}"
+        self._client = Client(url=url, timeout=self.timeout)
+        await self._client.connect()
+        self._connected = True
+
+    async def close(self) -> None:
+        client, self._client, self._connected = self._client, None, False
+        if client is not None:
+            await client.disconnect()
+
+    async def read_registers(self, registers: Iterable[Dict[str, Any]]) -> Dict[int, Any]:
+        registers = list(registers)
+        nodes = [self._client.get_node(register["address"]) for register in registers]
+        results = await self._client.read_values(nodes)
+        return {register["id"]: value for register, value in zip(registers, results)}
+
+
+class BlockingClient(PLCClient):
+    """Base dos clientes de bibliotecas síncronas.
+
+    As chamadas de uma ligação correm no *executor* e são serializadas,
+    porque nenhuma destas bibliotecas é *thread-safe*.
+    """
+
+    def __init__(self, plc: Dict[str, Any]) -> None:
+        super().__init__(plc)
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    async def _call(self, func, *args):
+        async with self._lock:
+            return await asyncio.wait_for(asyncio.to_thread(func, *args), self.timeout)
+
+    async def connect(self) -> None:
+        self._conn = await self._call(self._open)
+
+    async def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await self._call(self._close, conn)
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _close(self, conn) -> None:
+        conn.close()
+
+
+class S7Client(BlockingClient):
+    """Siemens S7 via ``python-snap7`` (``rack_slot`` no formato ``"0,2"``)."""
+
+    def _open(self):
+        import snap7
+
+        rack, _, slot = str(self.plc.get("rack_slot") or "0,1").replace(".", ",").partition(",")
+        client = snap7.client.Client()
+        client.connect(self.plc["ip_address"], int(rack or 0), int(slot or 1), int(self.plc.get("port") or 102))
+        return client
+
+    def _close(self, conn) -> None:
+        conn.disconnect()
+
+    async def read_block(self, block: Dict[str, Any], registers: Dict[int, Dict[str, Any]]) -> Dict[int, Any]:
+        data = await self._call(self._conn.db_read, int(block["db"]), int(block["start"]), int(block["count"]))
+        values = {}
+        for entry in block["registers"]:
+            offset, count = entry["offset"], entry["count"]
+            data_type = registers.get(entry["id"], {}).get("data_type")
+            values[entry["id"]] = decode_bytes(data[offset : offset + count], data_type, entry.get("bit"))
+        return values
+
+    async def read_registers(self, registers: Iterable[Dict[str, Any]]) -> Dict[int, Any]:
+        values = {}
+        for register in registers:
+            normalized = _engine.normalize("s7", str(register.get("address") or ""))
+            size = {"DBX": 1, "DBB": 1, "DBW": 2, "DBD": 4}.get(normalized["area"], 2)
+            block = {
+                "db": normalized["db"],
+                "start": normalized["byte"],
+                "count": size,
+                "registers": [{"id": register["id"], "offset": 0, "count": size, "bit": normalized.get("bit")}],
+            }
+            values.update(await self.read_block(block, {register["id"]: register}))
+        return values
+
+
+class EtherNetIPClient(BlockingClient):
+    """Allen-Bradley Logix via ``pycomm3``; lê todas as *tags* num só pedido."""
+
+    def _open(self):
+        from pycomm3 import LogixDriver
+
+        driver = LogixDriver(self.plc["ip_address"], init_tags=False, init_program_tags=False)
+        driver.open()
+        return driver
+
+    async def read_registers(self, registers: Iterable[Dict[str, Any]]) -> Dict[int, Any]:
+        registers = list(registers)
+        results = await self._call(self._conn.read, *(register["address"] for register in registers))
+        if not isinstance(results, list):
+            results = [results]
+        values = {}
+        for register, tag in zip(registers, results):
+            if tag.error:
+                raise ProtocolClientError(f"Erro ao ler tag {register['address']}: {tag.error}")
+            values[register["id"]] = tag.value
+        return values
+
+
+class AdsClient(BlockingClient):
+    """Beckhoff TwinCAT via ``pyads`` (AMS Net ID ``<ip>.1.1``)."""
+
+    def _open(self):
+        import pyads
+
+        ip = self.plc["ip_address"]
+        connection = pyads.Connection(f"{ip}.1.1", ADS_PLC_PORT, ip)
+        connection.open()
+        return connection
+
+    async def read_registers(self, registers: Iterable[Dict[str, Any]]) -> Dict[int, Any]:
+        values = {}
+        for register in registers:
+            values[register["id"]] = await self._call(self._conn.read_by_name, register["address"])
+        return values
+
+
+CLIENTS = {
+    "modbus": ModbusClient,
+    "s7": S7Client,
+    "opcua": OpcUaClient,
+    "ethernetip": EtherNetIPClient,
+    "beckhoff": AdsClient,
+}
+
+
+def create_client(plc: Dict[str, Any]) -> PLCClient:
+    """Cliente para ``plc``; levanta :class:`ProtocolClientError` se não houver."""
+
+    if is_simulated(plc.get("protocol")):
+        return SimulatedClient(plc)
+    client_class = CLIENTS.get(protocol_family(plc.get("protocol")))
+    if client_class is None:
+        raise ProtocolClientError(f"Protocolo sem cliente Python: {plc.get('protocol')}")
+    return client_class(plc)
+
+
+__all__ = [
+    "PLCClient",
+    "ProtocolClientError",
+    "create_client",
+    "decode_bytes",
+    "decode_words",
+    "is_simulated",
+    "protocol_family",
+    "word_count",
+]
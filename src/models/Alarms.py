@@ -1,7 +1,5 @@
 from datetime import datetime, timezone
 
-from datetime import datetime, timezone
-
 from src.app import db
 from src.models.Users import UserRole
 
@@ -21,6 +19,11 @@ class AlarmDefinition(db.Model):
     threshold_low = db.Column(db.Float, nullable=True)
     threshold_high = db.Column(db.Float, nullable=True)
     deadband = db.Column(db.Float, default=0.0)
+    # Condições de janela (taxa de variação, média móvel, máx./mín.) e
+    # temporizações aplicadas a qualquer condição.
+    window_size = db.Column(db.Integer, nullable=True)
+    on_delay_seconds = db.Column(db.Float, default=0.0)
+    off_delay_seconds = db.Column(db.Float, default=0.0)
 
     priority = db.Column(db.String(20), default="MEDIUM")
     is_active = db.Column(db.Boolean, default=True)
@@ -31,6 +34,12 @@ class AlarmDefinition(db.Model):
     )
     severity = db.Column(db.Integer, default=3)
 
+    # Shelving: enquanto ``shelved_until`` estiver no futuro a definição não é
+    # avaliada (nenhuma escrita em ``alarm`` nem notificações).
+    shelved_until = db.Column(db.DateTime, nullable=True)
+    shelved_by = db.Column(db.String(100), nullable=True)
+    shelve_reason = db.Column(db.String(255), nullable=True)
+
     created_at = db.Column(
         db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
     )
@@ -86,7 +95,91 @@ class Alarm(db.Model):
 
     last_updated_at = db.Column(db.DateTime, nullable=True)
 
+    storm_id = db.Column(
+        db.Integer, db.ForeignKey("alarm_storm.id"), nullable=True, index=True
+    )
+
     register = db.relationship("Register", back_populates="alarms")
 
     def __repr__(self) -> str:  # pragma: no cover - debug helper
         return f"<Alarm id={self.id} state={self.state} plc_id={self.plc_id}>"
+
+
+class AlarmStorm(db.Model):
+    """Agrupa uma avalanche de alarmes de um mesmo CLP/VLAN num único registo."""
+
+    __tablename__ = "alarm_storm"
+
+    id = db.Column(db.Integer, primary_key=True)
+    rule_name = db.Column(db.String(100), nullable=False)
+    scope = db.Column(db.String(20), nullable=False)  # plc | vlan
+    scope_key = db.Column(db.String(50), nullable=False, index=True)
+    plc_id = db.Column(db.Integer, db.ForeignKey("plc.id"), nullable=True, index=True)
+    vlan_id = db.Column(db.Integer, nullable=True)
+
+    state = db.Column(db.String(20), nullable=False, default="ACTIVE")
+    priority = db.Column(db.String(20), nullable=False, default="HIGH")
+    message = db.Column(db.Text, nullable=False)
+    alarm_count = db.Column(db.Integer, nullable=False, default=0)
+
+    started_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    last_alarm_at = db.Column(db.DateTime, nullable=True)
+    ended_at = db.Column(db.DateTime, nullable=True)
+
+    alarms = db.relationship("Alarm", backref="storm")
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return (
+            f"<AlarmStorm id={self.id} scope={self.scope}:{self.scope_key} "
+            f"state={self.state} count={self.alarm_count}>"
+        )
+
+
+class AlarmKpiCounter(db.Model):
+    """Contadores de alarmes mantidos incrementalmente por escopo.
+
+    ``scope`` é ``global``, ``plc``, ``register`` ou ``priority`` e
+    ``scope_key`` identifica o CLP/registrador/prioridade (``all`` no global).
+    """
+
+    __tablename__ = "alarm_kpi_counter"
+
+    scope = db.Column(db.String(20), primary_key=True)
+    scope_key = db.Column(db.String(50), primary_key=True)
+
+    active_count = db.Column(db.Integer, nullable=False, default=0)
+    unacknowledged_count = db.Column(db.Integer, nullable=False, default=0)
+    trigger_count = db.Column(db.Integer, nullable=False, default=0)
+    clear_count = db.Column(db.Integer, nullable=False, default=0)
+    ack_count = db.Column(db.Integer, nullable=False, default=0)
+    time_in_alarm_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+    first_trigger_at = db.Column(db.DateTime, nullable=True)
+    last_trigger_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return (
+            f"<AlarmKpiCounter {self.scope}:{self.scope_key} "
+            f"active={self.active_count} triggers={self.trigger_count}>"
+        )
+
+
+class AlarmKpiDaily(db.Model):
+    """Número de disparos por dia, CLP e prioridade."""
+
+    __tablename__ = "alarm_kpi_daily"
+
+    day = db.Column(db.Date, primary_key=True)
+    plc_id = db.Column(db.Integer, primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    trigger_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return f"<AlarmKpiDaily {self.day} plc={self.plc_id} {self.priority}={self.trigger_count}>"
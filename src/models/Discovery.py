@@ -0,0 +1,66 @@
+"""Modelos com o inventário produzido pela descoberta de rede."""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Index, UniqueConstraint
+
+from src.app import db
+
+
+class DiscoveredDevice(db.Model):
+    """Dispositivo encontrado na última varredura (um registo por IP)."""
+
+    __tablename__ = "discovered_device"
+
+    id = db.Column(db.Integer, primary_key=True)
+    ip = db.Column(db.String(45), nullable=False, unique=True)
+    mac = db.Column(db.String(17), index=True)
+    interface = db.Column(db.String(50))
+    network = db.Column(db.String(50))
+    responds_to_ping = db.Column(db.Boolean, nullable=False, default=False)
+
+    is_industrial = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    device_type = db.Column(db.String(50))
+    manufacturer = db.Column(db.String(50))
+    model = db.Column(db.String(100))
+    protocols = db.Column(db.JSON, default=list)
+    confidence = db.Column(db.Integer, nullable=False, default=0)
+
+    plc_id = db.Column(db.Integer, db.ForeignKey("plc.id", ondelete="SET NULL"), nullable=True)
+    first_seen = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    last_seen = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    ports = db.relationship(
+        "DiscoveredPort",
+        backref="device",
+        cascade="all, delete-orphan",
+        order_by="DiscoveredPort.port",
+    )
+
+    __table_args__ = (Index("ix_discovered_device_industrial_ip", "is_industrial", "ip"),)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return f"<DiscoveredDevice id={self.id} ip={self.ip} industrial={self.is_industrial}>"
+
+
+class DiscoveredPort(db.Model):
+    """Porta aberta de um :class:`DiscoveredDevice` e o serviço identificado."""
+
+    __tablename__ = "discovered_port"
+
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(
+        db.Integer,
+        db.ForeignKey("discovered_device.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    port = db.Column(db.Integer, nullable=False, index=True)
+    service = db.Column(db.String(50))
+    service_type = db.Column(db.String(20))
+    banner = db.Column(db.String(255))
+    fingerprint = db.Column(db.JSON)
+
+    __table_args__ = (UniqueConstraint("device_id", "port", name="uq_discovered_port_device_port"),)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return f"<DiscoveredPort device={self.device_id} port={self.port} service={self.service}>"
@@ -1,7 +1,14 @@
 # src/models/__init__.py
-from src.models.Alarms import AlarmDefinition, Alarm
+from src.models.Alarms import (
+    Alarm,
+    AlarmDefinition,
+    AlarmKpiCounter,
+    AlarmKpiDaily,
+    AlarmStorm,
+)
 from src.models.Audit import AuditLog
 from src.models.Data import DataLog
+from src.models.Discovery import DiscoveredDevice, DiscoveredPort
 from src.models.Registers import Register
 from src.models.Scripts import Script
 from src.models.PLCs import Organization, PLC
@@ -14,8 +21,13 @@ from src.models.Settings import SystemSetting
 __all__ = [
     "AlarmDefinition",
     "Alarm",
+    "AlarmKpiCounter",
+    "AlarmKpiDaily",
+    "AlarmStorm",
     "AuditLog",
     "DataLog",
+    "DiscoveredDevice",
+    "DiscoveredPort",
     "Register",
     "Organization",
     "PLC",
@@ -1,4 +1,4 @@
-from src.models.Alarms import AlarmDefinition, Alarm
+from src.models.Alarms import AlarmDefinition, Alarm, AlarmStorm
 from src.repository.Base_repository import BaseRepo
 from src.utils.logs import logger
 from sqlalchemy.exc import SQLAlchemyError
@@ -40,4 +40,21 @@ class AlarmRepo(BaseRepo):
             return q.all()
         except SQLAlchemyError:
             logger.exception("Erro list_active alarms")
-            return []
\ No newline at end of file
+            return []
+
+
+class AlarmStormRepo(BaseRepo):
+    def __init__(self, session: Optional[Session] = None):
+        super().__init__(AlarmStorm, session=session)
+
+    def list_active(self) -> List[AlarmStorm]:
+        try:
+            return (
+                self.session.query(self.model)
+                .filter(self.model.state == "ACTIVE")
+                .order_by(self.model.started_at.desc())
+                .all()
+            )
+        except SQLAlchemyError:
+            logger.exception("Erro list_active alarm storms")
+            return []
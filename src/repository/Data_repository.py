@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+import csv
+import io
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
 
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
@@ -12,6 +14,9 @@ from src.models.Data import DataLog
 from src.repository.Base_repository import BaseRepo
 from src.utils.logs import logger
 
+if TYPE_CHECKING:  # pragma: no cover - apenas para type hints
+    from src.consumers.reading_batch import ReadingBatch
+
 
 class DataLogRepo(BaseRepo):
     def __init__(self, session: Optional[Session] = None) -> None:
@@ -71,12 +76,61 @@ class DataLogRepo(BaseRepo):
             logger.exception("Erro bulk_insert DataLog")
             raise
 
+    def bulk_insert_columns(self, batch: "ReadingBatch", *, commit: bool = True) -> int:
+        """Grava um :class:`ReadingBatch` lendo directamente as suas colunas.
+
+        No PostgreSQL usa ``COPY ... FROM STDIN``; nos demais bancos recorre a
+        ``bulk_insert_mappings``.
+        """
+
+        if not len(batch):
+            return 0
+        try:
+            if self.session.get_bind().dialect.name == "postgresql":
+                self._copy_rows(batch)
+            else:
+                self.session.bulk_insert_mappings(self.model, batch.mappings())
+
+            try:
+                self._cleanup_keys(tuple(batch.keys()))
+            except Exception:
+                logger.exception("Falha ao executar limpeza otimizada de data_log")
+
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
+            return len(batch)
+        except Exception:
+            # Inclui erros do driver vindos do COPY, fora do SQLAlchemy.
+            self.session.rollback()
+            logger.exception("Erro bulk_insert_columns DataLog")
+            raise
+
+    def _copy_rows(self, batch: "ReadingBatch") -> None:
+        from src.consumers.reading_batch import DB_COLUMNS
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch.rows())
+        buffer.seek(0)
+        cursor = self.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {self.model.__tablename__} ({', '.join(DB_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        finally:
+            cursor.close()
+
     def _cleanup_old_records(self, records: Iterable[Dict[str, Any]]) -> None:
         """Mantém apenas os 30 registros mais recentes por CLP/registrador."""
 
         keys: Tuple[Tuple[int, int], ...] = tuple(
             { (rec["plc_id"], rec["register_id"]) for rec in records }
         )
+        self._cleanup_keys(keys)
+
+    def _cleanup_keys(self, keys: Tuple[Tuple[int, int], ...]) -> None:
         if not keys:
             return
 
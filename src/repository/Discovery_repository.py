@@ -0,0 +1,252 @@
+"""Repositório do inventário da descoberta de rede."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, selectinload
+
+from src.models.Discovery import DiscoveredDevice, DiscoveredPort
+from src.repository.Base_repository import BaseRepo
+from src.utils.logs import logger
+
+# Tamanho dos lotes de ``IN (...)`` para não exceder o limite de parâmetros.
+_CHUNK = 500
+
+# Confiança mínima para classificar um dispositivo como industrial.
+INDUSTRIAL_CONFIDENCE = 50
+
+
+def _chunks(values: Sequence[Any]) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(values), _CHUNK):
+        yield values[start : start + _CHUNK]
+
+
+def _truncate(value: Any, size: int) -> Optional[str]:
+    return str(value)[:size] if value else None
+
+
+def _device_row(device: Dict[str, Any], scanned_at: datetime) -> Dict[str, Any]:
+    industrial = device.get("industrial_device") or {}
+    confidence = int(industrial.get("confidence", 0) or 0)
+    return {
+        "ip": device["ip"],
+        "mac": device.get("mac"),
+        "interface": device.get("interface"),
+        "network": device.get("network"),
+        "responds_to_ping": bool(device.get("responds_to_ping", False)),
+        "is_industrial": confidence > INDUSTRIAL_CONFIDENCE,
+        "device_type": _truncate(industrial.get("type") or "unknown", 50),
+        "manufacturer": _truncate(industrial.get("manufacturer") or "unknown", 50),
+        "model": _truncate(industrial.get("model"), 100),
+        "protocols": list(industrial.get("protocol") or []),
+        "confidence": confidence,
+        "last_seen": scanned_at,
+    }
+
+
+def _port_rows(device: Dict[str, Any], device_id: int) -> List[Dict[str, Any]]:
+    services = device.get("services") or {}
+    rows = []
+    for port in device.get("open_ports") or {}:
+        service = services.get(port) or {}
+        rows.append(
+            {
+                "device_id": device_id,
+                "port": int(port),
+                "service": service.get("name"),
+                "service_type": service.get("type"),
+                "banner": _truncate(service.get("banner"), 255),
+                "fingerprint": service.get("fingerprint"),
+            }
+        )
+    return rows
+
+
+class DiscoveredDeviceRepo(BaseRepo):
+    def __init__(self, session: Optional[Session] = None) -> None:
+        super().__init__(DiscoveredDevice, session=session)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def sync_scan(
+        self,
+        devices: Iterable[Dict[str, Any]],
+        *,
+        interfaces: Optional[Iterable[str]] = None,
+        scanned_at: Optional[datetime] = None,
+        commit: bool = True,
+    ) -> Dict[str, int]:
+        """Substitui o inventário pelo resultado de uma varredura, em lote.
+
+        Dispositivos já conhecidos mantêm ``id``, ``first_seen`` e ``plc_id``;
+        os que deixaram de aparecer são removidos (só das ``interfaces``
+        varridas, quando indicadas).  Registos sem ``interface`` não podem ser
+        atribuídos a nenhuma interface e contam como varridos em qualquer
+        varredura.  As portas são regravadas por completo.
+        """
+
+        scanned_at = scanned_at or datetime.now(timezone.utc)
+        by_ip = {device["ip"]: device for device in devices}
+        try:
+            existing: Dict[str, Tuple[int, Optional[str]]] = {
+                ip: (device_id, interface)
+                for device_id, ip, interface in self.session.query(
+                    self.model.id, self.model.ip, self.model.interface
+                )
+            }
+
+            scanned_interfaces = set(interfaces) if interfaces is not None else None
+            stale_ids = [
+                device_id
+                for ip, (device_id, interface) in existing.items()
+                if ip not in by_ip
+                and (scanned_interfaces is None or interface is None or interface in scanned_interfaces)
+            ]
+            kept_ids = [existing[ip][0] for ip in by_ip if ip in existing]
+
+            for chunk in _chunks(stale_ids + kept_ids):
+                self.session.query(DiscoveredPort).filter(DiscoveredPort.device_id.in_(chunk)).delete(
+                    synchronize_session=False
+                )
+            for chunk in _chunks(stale_ids):
+                self.session.query(self.model).filter(self.model.id.in_(chunk)).delete(
+                    synchronize_session=False
+                )
+
+            updates = [
+                {**_device_row(device, scanned_at), "id": existing[ip][0]}
+                for ip, device in by_ip.items()
+                if ip in existing
+            ]
+            inserts = [
+                {**_device_row(device, scanned_at), "first_seen": scanned_at}
+                for ip, device in by_ip.items()
+                if ip not in existing
+            ]
+            if updates:
+                self.session.bulk_update_mappings(self.model, updates)
+            if inserts:
+                self.session.bulk_insert_mappings(self.model, inserts)
+                self.session.flush()
+
+            ids = {ip: existing[ip][0] for ip in by_ip if ip in existing}
+            new_ips = [ip for ip in by_ip if ip not in existing]
+            for chunk in _chunks(new_ips):
+                ids.update(
+                    self.session.query(self.model.ip, self.model.id).filter(self.model.ip.in_(chunk)).all()
+                )
+
+            ports = [row for ip, device in by_ip.items() for row in _port_rows(device, ids[ip])]
+            if ports:
+                self.session.bulk_insert_mappings(DiscoveredPort, ports)
+
+            self._commit(commit)
+            return {
+                "inserted": len(inserts),
+                "updated": len(updates),
+                "removed": len(stale_ids),
+                "ports": len(ports),
+            }
+        except SQLAlchemyError:
+            self.session.rollback()
+            logger.exception("Erro ao gravar inventário da descoberta")
+            raise
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _filtered(
+        self,
+        *,
+        industrial: Optional[bool] = None,
+        search: Optional[str] = None,
+        manufacturer: Optional[str] = None,
+        port: Optional[int] = None,
+        promoted: Optional[bool] = None,
+    ):
+        query = self.session.query(self.model)
+        if industrial is not None:
+            query = query.filter(self.model.is_industrial.is_(industrial))
+        if search:
+            # Prefixo, para aproveitar os índices de ``ip`` e ``mac``.
+            pattern = f"{search.strip()}%"
+            query = query.filter(self.model.ip.like(pattern) | self.model.mac.ilike(pattern))
+        if manufacturer:
+            query = query.filter(self.model.manufacturer == manufacturer)
+        if port is not None:
+            query = query.filter(self.model.ports.any(DiscoveredPort.port == port))
+        if promoted is not None:
+            query = query.filter(self.model.plc_id.isnot(None) if promoted else self.model.plc_id.is_(None))
+        return query
+
+    def paginate(
+        self,
+        page: int = 1,
+        per_page: int = 50,
+        **filters: Any,
+    ) -> Tuple[List[DiscoveredDevice], int]:
+        """Devolve uma página de dispositivos (com as portas) e o total filtrado."""
+
+        query = self._filtered(**filters)
+        try:
+            total = query.order_by(None).count()
+            items = (
+                query.options(selectinload(self.model.ports))
+                .order_by(self.model.is_industrial.desc(), self.model.ip)
+                .offset((max(page, 1) - 1) * per_page)
+                .limit(per_page)
+                .all()
+            )
+            return items, total
+        except SQLAlchemyError:
+            logger.exception("Erro ao paginar inventário da descoberta filtros=%s", filters)
+            return [], 0
+
+    def counts(self) -> Dict[str, int]:
+        """Total, industriais e já promovidos a CLP, numa única consulta."""
+
+        try:
+            total, industrial, promoted = self.session.query(
+                func.count(self.model.id),
+                func.sum(case((self.model.is_industrial.is_(True), 1), else_=0)),
+                func.count(self.model.plc_id),
+            ).one()
+        except SQLAlchemyError:
+            logger.exception("Erro ao contar inventário da descoberta")
+            return {"total": 0, "industrial": 0, "promoted": 0}
+        return {"total": total or 0, "industrial": int(industrial or 0), "promoted": promoted or 0}
+
+    def manufacturers(self) -> List[str]:
+        try:
+            rows = (
+                self.session.query(self.model.manufacturer)
+                .filter(self.model.manufacturer.isnot(None), self.model.manufacturer != "unknown")
+                .distinct()
+                .order_by(self.model.manufacturer)
+                .all()
+            )
+        except SQLAlchemyError:
+            logger.exception("Erro ao listar fabricantes descobertos")
+            return []
+        return [manufacturer for (manufacturer,) in rows]
+
+    def list_by_ids(self, ids: Iterable[int]) -> List[DiscoveredDevice]:
+        id_list = list(ids)
+        if not id_list:
+            return []
+        try:
+            return (
+                self.session.query(self.model)
+                .options(selectinload(self.model.ports))
+                .filter(self.model.id.in_(id_list))
+                .order_by(self.model.ip)
+                .all()
+            )
+        except SQLAlchemyError:
+            logger.exception("Erro ao carregar dispositivos descobertos ids=%s", id_list)
+            return []
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
@@ -58,6 +59,47 @@ class RegisterRepo(BaseRepo):
             logger.warning("Nenhum registrador activo encontrado para PLC %s", plc_id)
         return registers
 
+    def record_reads(self, states: Iterable[Dict[str, Any]], *, commit: bool = True) -> int:
+        """Actualiza ``last_value``/``last_read``/``error_count``/``last_error`` em lote.
+
+        ``states`` segue :meth:`ReadingBatch.register_states`: registradores
+        com ``recovered`` recebem ``error_count = failures``; os restantes
+        somam ``failures`` ao valor gravado.
+        """
+
+        states = list(states)
+        if not states:
+            return 0
+        try:
+            self.session.bulk_update_mappings(
+                self.model,
+                [
+                    {
+                        "id": state["id"],
+                        "last_value": state["last_value"],
+                        "last_read": state["last_read"],
+                        "last_error": state["last_error"],
+                        **({"error_count": state["failures"]} if state["recovered"] else {}),
+                    }
+                    for state in states
+                ],
+            )
+            increments: Dict[int, List[int]] = {}
+            for state in states:
+                if not state["recovered"]:
+                    increments.setdefault(state["failures"], []).append(state["id"])
+            for failures, ids in increments.items():
+                self.session.query(self.model).filter(self.model.id.in_(ids)).update(
+                    {self.model.error_count: func.coalesce(self.model.error_count, 0) + failures},
+                    synchronize_session=False,
+                )
+            self._commit(commit)
+            return len(states)
+        except SQLAlchemyError:
+            self.session.rollback()
+            logger.exception("Erro ao actualizar estado de leitura de %d registradores", len(states))
+            raise
+
 
 class OrganizationRepo(BaseRepo):
     def __init__(self, session: Optional[Session] = None) -> None:
@@ -2,21 +2,70 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import threading
+from datetime import datetime, timedelta, timezone
 from html import escape
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
 
 from src.app import db
-from src.models.Alarms import Alarm, AlarmDefinition
+from src.models.Alarms import Alarm, AlarmDefinition, AlarmStorm
+from src.models.PLCs import PLC
 from src.models.Users import User, UserRole
-from src.repository.Alarms_repository import AlarmDefinitionRepo, AlarmRepo
+from src.repository.Alarms_repository import AlarmDefinitionRepo, AlarmRepo, AlarmStormRepo
+from src.services.alarm_conditions import (
+    METRIC_LABELS,
+    WINDOWED_CONDITIONS,
+    AlarmConditionEngine,
+    RollingWindow,
+    get_alarm_condition_engine,
+    window_size_for,
+)
+from src.services.alarm_flood_service import (
+    AlarmFloodManager,
+    FloodRule,
+    StormState,
+    get_alarm_flood_manager,
+)
+from src.services.alarm_kpi_service import AlarmKpiService
 from src.services.email_service import send_email
 from src.services.mqtt_service import get_mqtt_publisher
 from src.utils.logs import logger
 
+if TYPE_CHECKING:  # pragma: no cover - apenas para type hints
+    from src.consumers.reading_batch import ReadingBatch
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def is_shelved(defn: AlarmDefinition, now: Optional[datetime] = None) -> bool:
+    """Indica se a definição está em *shelving* no instante ``now``."""
+
+    until = _as_utc(getattr(defn, "shelved_until", None))
+    if until is None:
+        return False
+    return until > (now or datetime.now(timezone.utc))
 
-def evaluate_alarm(defn: AlarmDefinition, value: float, existing_alarm: Optional[Alarm]) -> Tuple[str, Dict[str, object]]:
-    """Determine the action that should be taken for the given reading."""
+
+def evaluate_alarm(
+    defn: AlarmDefinition,
+    value: float,
+    existing_alarm: Optional[Alarm],
+    window: Optional[RollingWindow] = None,
+) -> Tuple[str, Dict[str, object]]:
+    """Determine the action that should be taken for the given reading.
+
+    Windowed conditions (see :data:`WINDOWED_CONDITIONS`) compare a statistic
+    of ``window`` instead of the instantaneous value and return ``"none"``
+    until the window holds enough samples.
+    """
 
     now = datetime.now(timezone.utc)
     if value is None:
@@ -28,17 +77,27 @@ def evaluate_alarm(defn: AlarmDefinition, value: float, existing_alarm: Optional
     sp = defn.setpoint
     dband = defn.deadband or 0.0
 
+    observed = value
+    label = "Value"
+    windowed = WINDOWED_CONDITIONS.get(cond)
+    if windowed is not None:
+        metric, cond = windowed
+        observed = window.metric(metric) if window is not None else None
+        if observed is None:
+            return "none", {}
+        label = METRIC_LABELS[metric]
+
     in_cond = False
     if cond == "above":
         if sp is None:
             return "none", {}
-        in_cond = value > sp
-        msg = f"Value {value} > setpoint {sp}"
+        in_cond = observed > sp
+        msg = f"{label} {observed:g} > setpoint {sp}" if windowed else f"Value {value} > setpoint {sp}"
     elif cond == "below":
         if sp is None:
             return "none", {}
-        in_cond = value < sp
-        msg = f"Value {value} < setpoint {sp}"
+        in_cond = observed < sp
+        msg = f"{label} {observed:g} < setpoint {sp}" if windowed else f"Value {value} < setpoint {sp}"
     elif cond == "outside_range":
         if low is None or high is None:
             return "none", {}
@@ -63,11 +122,11 @@ def evaluate_alarm(defn: AlarmDefinition, value: float, existing_alarm: Optional
 
     if existing_alarm.state == "ACTIVE":
         if cond == "above":
-            safe = value <= (sp - dband)
+            safe = observed <= (sp - dband)
             if safe:
                 return "clear", {"cleared_at": now, "current_value": value}
         elif cond == "below":
-            safe = value >= (sp + dband)
+            safe = observed >= (sp + dband)
             if safe:
                 return "clear", {"cleared_at": now, "current_value": value}
         elif cond == "outside_range":
@@ -83,12 +142,37 @@ def evaluate_alarm(defn: AlarmDefinition, value: float, existing_alarm: Optional
 
 
 class AlarmService:
-    def __init__(self, session=None):
+    def __init__(
+        self,
+        session=None,
+        flood_manager: Optional[AlarmFloodManager] = None,
+        condition_engine: Optional[AlarmConditionEngine] = None,
+    ):
         self.def_repo = AlarmDefinitionRepo(session=session)
         self.alarm_repo = AlarmRepo(session=session)
+        self.storm_repo = AlarmStormRepo(session=session)
         self.mqtt_publisher = get_mqtt_publisher()
+        self.flood = flood_manager or get_alarm_flood_manager()
+        self.conditions = condition_engine or get_alarm_condition_engine()
+        self.kpi = AlarmKpiService(session=self.alarm_repo.session)
+
+    def _commit_with_kpis(self) -> None:
+        """Aplica os contadores de KPI (num SAVEPOINT) e faz *commit* com o alarme."""
+
+        session = self.alarm_repo.session
+        try:
+            self.kpi.apply()
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            self.kpi.discard()
+            logger.exception("Erro ao gravar alarme e contadores de KPI")
+            raise
 
     def _find_active_alarm_for_definition(self, defn: AlarmDefinition) -> Optional[Alarm]:
+        pending = self.flood.get_pending(defn.id)
+        if pending is not None:
+            return pending
         return self.alarm_repo.first_by(alarm_definition_id=defn.id, state="ACTIVE")
 
     def _create_alarm(
@@ -112,7 +196,9 @@ class AlarmService:
             trigger_value=trigger_value,
             current_value=current_value,
         )
-        self.alarm_repo.add(alarm)
+        self.alarm_repo.add(alarm, commit=False)
+        self.kpi.record_trigger(alarm)
+        self._commit_with_kpis()
         logger.info("Alarm triggered: %s (def=%s plc=%s reg=%s)", message, defn.id, plc_id, register_id)
         self._notify_trigger(defn, alarm)
         try:
@@ -121,40 +207,120 @@ class AlarmService:
             logger.exception("Erro ao publicar alarme %s no MQTT", getattr(defn, "id", None))
         return alarm
 
+    def _raise_alarm(
+        self,
+        defn: AlarmDefinition,
+        plc_id: int,
+        register_id: int,
+        trigger_value: float,
+        current_value: float,
+        message: str,
+    ) -> Alarm:
+        """Cria o alarme individualmente ou agrega-o a uma tempestade."""
+
+        storm: Optional[StormState] = None
+        if self.flood.enabled:
+            vlan_id = self._vlan_for(plc_id)
+            storm = self.flood.active_storm(plc_id, vlan_id)
+            if storm is None:
+                violated = self.flood.register_trigger(plc_id, vlan_id)
+                if violated is not None:
+                    storm = self._open_storm(defn, plc_id, vlan_id, *violated)
+
+        if storm is None:
+            alarm = self._create_alarm(defn, plc_id, register_id, trigger_value, current_value, message)
+        else:
+            alarm = Alarm(
+                alarm_definition_id=defn.id,
+                plc_id=plc_id,
+                register_id=register_id,
+                storm_id=storm.storm_id,
+                state="ACTIVE",
+                priority=defn.priority or "MEDIUM",
+                message=message,
+                triggered_at=datetime.now(timezone.utc),
+                trigger_value=trigger_value,
+                current_value=current_value,
+            )
+            self.flood.add_pending(defn.id, alarm)
+            self.flood.note_storm_alarm(storm)
+            logger.debug(
+                "Alarme def=%s agregado à tempestade %s (%d alarmes)",
+                defn.id,
+                storm.storm_id,
+                storm.alarm_count,
+            )
+
+        if self.flood.register_definition_trigger(defn.id):
+            self._auto_shelve(defn)
+        return alarm
+
     def _clear_alarm(self, defn: AlarmDefinition, alarm: Alarm, current_value: float) -> None:
         now = datetime.now(timezone.utc)
         alarm.state = "CLEARED"
         alarm.cleared_at = now
         alarm.current_value = current_value
-        self.alarm_repo.update(alarm)
+        if self.flood.is_pending(alarm):
+            # Ainda não foi gravado: segue no próximo lote já normalizado.
+            self.flood.release_pending(defn.id)
+        else:
+            alarm = self.alarm_repo.update(alarm, commit=False)
+            self.kpi.record_clear(alarm)
+            self._commit_with_kpis()
         logger.info("Alarm cleared: id=%s def=%s", alarm.id, alarm.alarm_definition_id)
+        if alarm.storm_id is not None:
+            return
         self._notify_clear(defn, alarm)
         try:
             self.mqtt_publisher.publish_alarm_event(defn, alarm, state="CLEARED")
         except Exception:
             logger.exception("Erro ao publicar normalização do alarme %s no MQTT", getattr(defn, "id", None))
 
-    def check_and_handle(self, plc_id: int, register_id: int, value: Optional[float]) -> bool:
+    def check_and_handle(
+        self,
+        plc_id: int,
+        register_id: int,
+        value: Optional[float],
+        *,
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
         if value is None:
             return False
 
+        self.close_quiet_storms()
+
         triggered_any = False
         defs: List[AlarmDefinition] = self.def_repo.find_by(plc_id=plc_id, register_id=register_id, is_active=True)
+        now = datetime.now(timezone.utc)
+        reading_ts = (_as_utc(timestamp) or now).timestamp()
+
+        # A leitura entra uma única vez em cada janela exigida pelas definições
+        # do registrador, mesmo que a definição esteja em shelving.
+        sizes = {size for size in map(window_size_for, defs) if size}
+        windows = self.conditions.observe(register_id, sizes, reading_ts, value) if sizes else {}
 
         for defn in defs:
+            if is_shelved(defn, now):
+                continue
             try:
                 existing_alarm = self._find_active_alarm_for_definition(defn)
-                action, info = evaluate_alarm(defn, value, existing_alarm)
+                window = windows.get(window_size_for(defn))
+                action, info = evaluate_alarm(defn, value, existing_alarm, window)
+                action = self.conditions.gate(defn, action, reading_ts)
 
                 if action == "trigger":
                     if existing_alarm is None or existing_alarm.state != "ACTIVE":
                         message = info.get("message") or f"Alarm {defn.name} triggered"
                         trigger_val = info.get("trigger_value", value)
-                        self._create_alarm(defn, plc_id, register_id, trigger_val, value, message)
+                        self._raise_alarm(defn, plc_id, register_id, trigger_val, value, message)
                         triggered_any = True
                     else:
                         existing_alarm.current_value = value
+                        if self.flood.is_pending(existing_alarm):
+                            continue
                         self.alarm_repo.update(existing_alarm)
+                        if existing_alarm.storm_id is not None:
+                            continue
                         try:
                             self.mqtt_publisher.publish_alarm_event(defn, existing_alarm, state="ACTIVE")
                         except Exception:
@@ -170,8 +336,218 @@ class AlarmService:
                 logger.exception("Erro avaliando alarme def=%s: %s", getattr(defn, "id", None), exc)
                 continue
 
+        if self.flood.should_flush():
+            self.flush_pending_alarms()
+
         return triggered_any
 
+    def _watched_keys(self, keys: Sequence[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        register_ids = {register_id for _, register_id in keys}
+        rows = (
+            self.def_repo.session.query(AlarmDefinition.plc_id, AlarmDefinition.register_id)
+            .filter(AlarmDefinition.is_active.is_(True), AlarmDefinition.register_id.in_(register_ids))
+            .distinct()
+            .all()
+        )
+        return {(plc_id, register_id) for plc_id, register_id in rows}
+
+    def check_batch(self, batch: "ReadingBatch") -> int:
+        """Avalia um lote colunar e marca ``batch.is_alarm`` nas linhas disparadas.
+
+        Uma única consulta identifica os registradores com definições ativas;
+        só essas leituras passam por :meth:`check_and_handle`, na ordem do lote.
+        """
+
+        keys = batch.keys()
+        if not keys:
+            return 0
+        rows = batch.rows_with_values(self._watched_keys(keys))
+        if not rows:
+            return 0
+
+        triggered = 0
+        readings = zip(
+            rows,
+            batch.plc_id[rows].tolist(),
+            batch.register_id[rows].tolist(),
+            batch.value[rows].tolist(),
+            batch.datetimes(rows),
+        )
+        for row, plc_id, register_id, value, timestamp in readings:
+            try:
+                if self.check_and_handle(plc_id, register_id, value, timestamp=timestamp):
+                    batch.is_alarm[row] = True
+                    triggered += 1
+            except Exception:
+                logger.exception(
+                    "Erro ao processar AlarmService para plc=%s register=%s", plc_id, register_id
+                )
+        return triggered
+
+    def acknowledge_alarm(self, alarm: Alarm, *, actor: Optional[str] = None) -> Alarm:
+        """Regista o reconhecimento do alarme (idempotente)."""
+
+        if alarm.acknowledged_at is not None:
+            return alarm
+        alarm.acknowledged_at = datetime.now(timezone.utc)
+        alarm.acknowledged_by = actor
+        alarm = self.alarm_repo.update(alarm, commit=False)
+        self.kpi.record_ack(alarm)
+        self._commit_with_kpis()
+        logger.info("Alarm acknowledged: id=%s by=%s", alarm.id, actor)
+        return alarm
+
+    # ------------------------------------------------------------------
+    # Avalanches de alarmes
+    # ------------------------------------------------------------------
+    def _vlan_for(self, plc_id: int) -> Optional[int]:
+        known, vlan_id = self.flood.cached_vlan(plc_id)
+        if known:
+            return vlan_id
+        plc = self.alarm_repo.session.get(PLC, plc_id)
+        vlan_id = getattr(plc, "vlan_id", None)
+        self.flood.remember_vlan(plc_id, vlan_id)
+        return vlan_id
+
+    def _open_storm(
+        self,
+        defn: AlarmDefinition,
+        plc_id: int,
+        vlan_id: Optional[int],
+        rule: FloodRule,
+        scope_key: str,
+    ) -> StormState:
+        now = datetime.now(timezone.utc)
+        storm = AlarmStorm(
+            rule_name=rule.name,
+            scope=rule.scope,
+            scope_key=scope_key,
+            plc_id=plc_id if rule.scope == "plc" else None,
+            vlan_id=vlan_id,
+            state="ACTIVE",
+            priority=defn.priority or "HIGH",
+            message=(
+                f"Avalanche de alarmes em {scope_key}: mais de {rule.max_alarms} "
+                f"alarmes em {rule.window_seconds:g}s"
+            ),
+            alarm_count=0,
+            started_at=now,
+            last_alarm_at=now,
+        )
+        self.storm_repo.add(storm)
+        state = self.flood.open_storm(rule, scope_key, storm.id)
+        logger.warning("Tempestade de alarmes iniciada: %s (storm=%s)", storm.message, storm.id)
+        self._notify_storm(defn, storm)
+        try:
+            self.mqtt_publisher.publish_storm_event(storm, state="ACTIVE")
+        except Exception:
+            logger.exception("Erro ao publicar tempestade de alarmes %s no MQTT", storm.id)
+        return state
+
+    def close_quiet_storms(self) -> int:
+        """Encerra as tempestades sem novos disparos dentro de ``quiet_seconds``."""
+
+        ended = self.flood.expire_storms()
+        if not ended:
+            return 0
+
+        self.flush_pending_alarms()
+        now = datetime.now(timezone.utc)
+        for state in ended:
+            storm = self.storm_repo.get(state.storm_id)
+            if storm is None:
+                continue
+            storm.state = "ENDED"
+            storm.ended_at = now
+            storm.alarm_count = state.alarm_count
+            try:
+                self.storm_repo.update(storm)
+            except SQLAlchemyError:
+                continue
+            logger.info(
+                "Tempestade de alarmes %s encerrada com %d alarmes agregados",
+                storm.id,
+                state.alarm_count,
+            )
+            try:
+                self.mqtt_publisher.publish_storm_event(storm, state="ENDED")
+            except Exception:
+                logger.exception("Erro ao publicar fim da tempestade %s no MQTT", storm.id)
+        return len(ended)
+
+    def flush_pending_alarms(self) -> int:
+        """Grava em lote os alarmes agregados a tempestades."""
+
+        alarms = self.flood.drain_pending()
+        if not alarms:
+            return 0
+        try:
+            self.alarm_repo.add_all(alarms, commit=False)
+            for alarm in alarms:
+                self.kpi.record_trigger(alarm)
+                if alarm.state != "ACTIVE":
+                    self.kpi.record_clear(alarm)
+            self.kpi.apply()
+            for state in self.flood.active_storms():
+                storm = self.storm_repo.get(state.storm_id)
+                if storm is not None:
+                    storm.alarm_count = state.alarm_count
+            self.alarm_repo.session.commit()
+        except SQLAlchemyError:
+            self.alarm_repo.session.rollback()
+            self.kpi.discard()
+            logger.exception("Erro ao gravar lote de %d alarmes agregados", len(alarms))
+            self.flood.restore_pending(alarms)
+            return 0
+        return len(alarms)
+
+    # ------------------------------------------------------------------
+    # Shelving
+    # ------------------------------------------------------------------
+    def shelve_definition(
+        self,
+        defn: AlarmDefinition,
+        *,
+        duration_seconds: float,
+        actor: Optional[str] = None,
+        reason: Optional[str] = None,
+        commit: bool = True,
+    ) -> AlarmDefinition:
+        defn.shelved_until = datetime.now(timezone.utc) + timedelta(seconds=duration_seconds)
+        defn.shelved_by = actor
+        defn.shelve_reason = reason[:255] if reason else None
+        logger.info(
+            "Definição de alarme %s em shelving até %s (%s)",
+            defn.id,
+            defn.shelved_until.isoformat(),
+            reason or "manual",
+        )
+        return self.def_repo.update(defn, commit=commit)
+
+    def unshelve_definition(self, defn: AlarmDefinition, *, commit: bool = True) -> AlarmDefinition:
+        defn.shelved_until = None
+        defn.shelved_by = None
+        defn.shelve_reason = None
+        return self.def_repo.update(defn, commit=commit)
+
+    def _auto_shelve(self, defn: AlarmDefinition) -> None:
+        duration = self.flood.settings.chatter_shelve_seconds
+        if duration <= 0:
+            return
+        priority = (defn.priority or "MEDIUM").upper()
+        if priority in self.flood.settings.chatter_exempt_priorities:
+            logger.debug("Definição %s oscila mas a prioridade %s não permite shelving automático", defn.id, priority)
+            return
+        try:
+            self.shelve_definition(
+                defn,
+                duration_seconds=duration,
+                actor="sistema",
+                reason="Alarme oscilante (chattering)",
+            )
+        except SQLAlchemyError:
+            logger.exception("Falha ao colocar a definição %s em shelving", defn.id)
+
     # ------------------------------------------------------------------
     # Email helpers
     # ------------------------------------------------------------------
@@ -204,6 +580,39 @@ class AlarmService:
         except TypeError:
             send_email(subject, text_body, recipients)
 
+    def _notify_storm(self, defn: AlarmDefinition, storm: AlarmStorm) -> None:
+        if not getattr(defn, "email_enabled", False):
+            return
+        recipients = self._resolve_recipients(defn)
+        if not recipients:
+            return
+
+        subject = f"[TEMPESTADE DE ALARMES {storm.priority}] {storm.scope_key}"
+        started_at = storm.started_at.strftime("%Y-%m-%d %H:%M:%S %Z") if storm.started_at else "N/D"
+        text_body = "\n".join(
+            [
+                storm.message,
+                f"Regra: {storm.rule_name}",
+                f"Iniciada em: {started_at}",
+                "",
+                "Os alarmes seguintes deste escopo serão agregados sem notificações individuais.",
+            ]
+        )
+        html_body = self._build_email_html(
+            title="Tempestade de Alarmes",
+            subtitle=f"{escape(storm.scope_key)} · Prioridade {escape(storm.priority or 'HIGH')}",
+            rows=[
+                ("Regra", storm.rule_name),
+                ("Mensagem", storm.message),
+                ("Iniciada em", started_at),
+            ],
+            description="Os alarmes seguintes deste escopo serão agregados sem notificações individuais.",
+        )
+        try:
+            send_email(subject, text_body, recipients, html_body=html_body)
+        except TypeError:
+            send_email(subject, text_body, recipients)
+
     def _resolve_recipients(self, defn: AlarmDefinition) -> List[str]:
         min_role = getattr(defn, "email_min_role", UserRole.ALARM_DEFINITION)
         if isinstance(min_role, str):
@@ -414,5 +823,43 @@ class AlarmService:
 </html>"""
 
 
-__all__ = ["AlarmService", "evaluate_alarm"]
+def start_pending_alarm_flusher(
+    app,
+    *,
+    interval: Optional[float] = None,
+    flood_manager: Optional[AlarmFloodManager] = None,
+) -> Tuple[threading.Thread, threading.Event]:
+    """Grava os alarmes retidos pelas tempestades mesmo sem novas leituras.
+
+    O *buffer* de :class:`AlarmFloodManager` só era gravado por um disparo
+    seguinte; esta *thread* encerra as tempestades calmas e grava o lote a
+    cada ``bulk_flush_interval``, e uma última vez ao parar.
+    """
+
+    flood = flood_manager or get_alarm_flood_manager()
+    interval = max(interval or flood.settings.bulk_flush_interval, 0.1)
+    stop_event = threading.Event()
+
+    def _flush() -> None:
+        if not flood.pending_count() and not flood.active_storms():
+            return
+        try:
+            with app.app_context():
+                service = AlarmService(flood_manager=flood)
+                service.close_quiet_storms()
+                service.flush_pending_alarms()
+        except Exception:
+            logger.exception("Erro ao gravar alarmes retidos por tempestades")
+
+    def _run() -> None:
+        while not stop_event.wait(interval):
+            _flush()
+        _flush()
+
+    thread = threading.Thread(target=_run, name="alarm-flood-flush", daemon=True)
+    thread.start()
+    return thread, stop_event
+
+
+__all__ = ["AlarmService", "evaluate_alarm", "is_shelved", "start_pending_alarm_flusher"]
 
@@ -6,9 +6,12 @@ from typing import Any, Dict, Optional
 from sqlalchemy.orm import Session
 
 from src.app import db
-from src.models.Alarms import AlarmDefinition
+from src.models.Alarms import Alarm, AlarmDefinition
 from src.models.Users import UserRole
 from src.repository.Alarms_repository import AlarmDefinitionRepo
+from src.services.Alarms_service import AlarmService
+from src.services.alarm_conditions import get_alarm_condition_engine
+from src.services.alarm_kpi_service import AlarmKpiService
 
 
 def _get_repo(session: Optional[Session]) -> AlarmDefinitionRepo:
@@ -34,6 +37,9 @@ def create_alarm_definition(
         "threshold_low": data.get("threshold_low"),
         "threshold_high": data.get("threshold_high"),
         "deadband": data.get("deadband") if data.get("deadband") is not None else 0.0,
+        "window_size": data.get("window_size") or None,
+        "on_delay_seconds": data.get("on_delay_seconds") or 0.0,
+        "off_delay_seconds": data.get("off_delay_seconds") or 0.0,
         "priority": data.get("priority"),
         "severity": data.get("severity") if data.get("severity") is not None else 3,
         "is_active": data.get("is_active"),
@@ -52,5 +58,46 @@ def delete_alarm_definition(
     session: Optional[Session] = None,
 ) -> None:
     repo = _get_repo(session)
+    definition_id = definition.id
     repo.session.delete(repo.session.merge(definition))
     repo.session.commit()
+    get_alarm_condition_engine().forget_definition(definition_id)
+    # Os alarmes da definição são apagados em cascata: recalcula os KPIs.
+    AlarmKpiService(session=repo.session).rebuild()
+
+
+def shelve_alarm_definition(
+    definition: AlarmDefinition,
+    *,
+    minutes: float,
+    actor: Optional[str] = None,
+    reason: Optional[str] = None,
+    session: Optional[Session] = None,
+) -> AlarmDefinition:
+    """Suspende a avaliação da definição durante ``minutes`` minutos."""
+
+    if minutes <= 0:
+        raise ValueError("A duração do shelving deve ser positiva")
+    service = AlarmService(session=session or db.session)
+    return service.shelve_definition(
+        definition, duration_seconds=minutes * 60.0, actor=actor, reason=reason
+    )
+
+
+def unshelve_alarm_definition(
+    definition: AlarmDefinition,
+    *,
+    session: Optional[Session] = None,
+) -> AlarmDefinition:
+    service = AlarmService(session=session or db.session)
+    return service.unshelve_definition(definition)
+
+
+def acknowledge_alarm(
+    alarm: Alarm,
+    *,
+    actor: Optional[str] = None,
+    session: Optional[Session] = None,
+) -> Alarm:
+    service = AlarmService(session=session or db.session)
+    return service.acknowledge_alarm(alarm, actor=actor)
@@ -0,0 +1,246 @@
+"""Condições de alarme baseadas em janelas de amostras e temporizações.
+
+As condições instantâneas (``above``/``below``/...) só precisam do valor
+actual.  As condições deste módulo — taxa de variação, média móvel, máximo e
+mínimo da janela — usam um *ring buffer* de tamanho fixo por registrador com
+estatísticas incrementais O(1): soma corrente para a média e *deques*
+monotónicas para o mínimo/máximo.  Nada é lido de ``data_log``.
+
+O :class:`AlarmConditionEngine` também guarda o estado dos temporizadores
+*on-delay*/*off-delay* de cada definição.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_WINDOW_SIZE = 10
+
+# condição -> (métrica da janela, sentido da comparação)
+WINDOWED_CONDITIONS: Dict[str, Tuple[str, str]] = {
+    "change": ("abs_rate", "above"),
+    "rate_above": ("rate", "above"),
+    "rate_below": ("rate", "below"),
+    "average_above": ("mean", "above"),
+    "average_below": ("mean", "below"),
+    "window_max_above": ("maximum", "above"),
+    "window_min_below": ("minimum", "below"),
+}
+
+METRIC_LABELS = {
+    "abs_rate": "Variação",
+    "rate": "Taxa de variação",
+    "mean": "Média móvel",
+    "maximum": "Máximo da janela",
+    "minimum": "Mínimo da janela",
+}
+
+
+def window_size_for(defn) -> Optional[int]:
+    """Tamanho de janela exigido pela definição (``None`` se instantânea)."""
+
+    if getattr(defn, "condition_type", None) not in WINDOWED_CONDITIONS:
+        return None
+    size = getattr(defn, "window_size", None) or DEFAULT_WINDOW_SIZE
+    return max(int(size), 2)
+
+
+class RollingWindow:
+    """*Ring buffer* de tamanho fixo com média, mínimo, máximo e taxa em O(1)."""
+
+    __slots__ = ("size", "_values", "_times", "_count", "_head", "_seq", "_sum", "_max", "_min")
+
+    def __init__(self, size: int) -> None:
+        if size < 1:
+            raise ValueError("O tamanho da janela deve ser positivo")
+        self.size = size
+        self._values: List[float] = [0.0] * size
+        self._times: List[float] = [0.0] * size
+        self._count = 0
+        self._head = 0
+        self._seq = 0
+        self._sum = 0.0
+        self._max: Deque[Tuple[int, float]] = deque()
+        self._min: Deque[Tuple[int, float]] = deque()
+
+    def push(self, timestamp: float, value: float) -> None:
+        head = self._head
+        if self._count == self.size:
+            self._sum -= self._values[head]
+        else:
+            self._count += 1
+        self._values[head] = value
+        self._times[head] = timestamp
+        self._sum += value
+        self._head = (head + 1) % self.size
+        if self._head == 0:
+            # Recalcula a soma a cada volta para não acumular erro de vírgula
+            # flutuante; custo amortizado O(1).
+            self._sum = sum(self._values[: self._count])
+
+        seq = self._seq
+        self._seq += 1
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+
+        expired = seq - self.size
+        while self._max[0][0] <= expired:
+            self._max.popleft()
+        while self._min[0][0] <= expired:
+            self._min.popleft()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def is_full(self) -> bool:
+        return self._count == self.size
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._sum / self._count if self._count else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    def _oldest_index(self) -> int:
+        return self._head if self._count == self.size else 0
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Variação por segundo entre a amostra mais antiga e a mais recente."""
+
+        if self._count < 2:
+            return None
+        oldest = self._oldest_index()
+        newest = (self._head - 1) % self.size
+        elapsed = self._times[newest] - self._times[oldest]
+        if elapsed <= 0:
+            return None
+        return (self._values[newest] - self._values[oldest]) / elapsed
+
+    @property
+    def abs_rate(self) -> Optional[float]:
+        rate = self.rate
+        return abs(rate) if rate is not None else None
+
+    def metric(self, name: str) -> Optional[float]:
+        if name in {"mean", "maximum", "minimum"} and not self.is_full:
+            return None
+        return getattr(self, name)
+
+
+class AlarmConditionEngine:
+    """Estado partilhado das janelas por registrador e dos temporizadores."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._windows: Dict[Tuple[int, int], RollingWindow] = {}
+        # def_id -> [instante em condição, instante em zona segura]
+        self._delays: Dict[int, List[Optional[float]]] = {}
+
+    def observe(
+        self, register_id: int, sizes: Iterable[int], timestamp: float, value: float
+    ) -> Dict[int, RollingWindow]:
+        """Insere a leitura uma única vez em cada janela exigida do registrador."""
+
+        windows: Dict[int, RollingWindow] = {}
+        with self._lock:
+            for size in set(sizes):
+                key = (register_id, size)
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = RollingWindow(size)
+                window.push(timestamp, value)
+                windows[size] = window
+        return windows
+
+    def gate(self, defn, action: str, timestamp: float) -> str:
+        """Aplica *on-delay*/*off-delay* à acção calculada por ``evaluate_alarm``.
+
+        O estado da definição só existe enquanto um temporizador está a
+        contar; quando nenhum está, a entrada é descartada.
+        """
+
+        on_delay = float(getattr(defn, "on_delay_seconds", None) or 0.0)
+        off_delay = float(getattr(defn, "off_delay_seconds", None) or 0.0)
+        if on_delay <= 0 and off_delay <= 0:
+            if self._delays:
+                self.forget_definition(defn.id)
+            return action
+
+        with self._lock:
+            state = self._delays.setdefault(defn.id, [None, None])
+            if action == "trigger":
+                state[1] = None
+                action = self._elapsed(state, 0, on_delay, timestamp, action)
+            elif action == "clear":
+                state[0] = None
+                action = self._elapsed(state, 1, off_delay, timestamp, action)
+            else:
+                state[0] = state[1] = None
+            if state[0] is None and state[1] is None:
+                del self._delays[defn.id]
+            return action
+
+    @staticmethod
+    def _elapsed(
+        state: List[Optional[float]], slot: int, delay: float, timestamp: float, action: str
+    ) -> str:
+        if delay <= 0:
+            state[slot] = None
+            return action
+        if state[slot] is None:
+            state[slot] = timestamp
+        if timestamp - state[slot] >= delay:
+            state[slot] = None
+            return action
+        return "none"
+
+    def forget_register(self, register_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._windows if key[0] == register_id]:
+                del self._windows[key]
+
+    def forget_definition(self, definition_id: int) -> None:
+        with self._lock:
+            self._delays.pop(definition_id, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._windows.clear()
+            self._delays.clear()
+
+
+_singleton: Optional[AlarmConditionEngine] = None
+_singleton_lock = threading.Lock()
+
+
+def get_alarm_condition_engine() -> AlarmConditionEngine:
+    global _singleton
+    if _singleton is None:
+        with _singleton_lock:
+            if _singleton is None:
+                _singleton = AlarmConditionEngine()
+    return _singleton
+
+
+__all__ = [
+    "AlarmConditionEngine",
+    "DEFAULT_WINDOW_SIZE",
+    "RollingWindow",
+    "WINDOWED_CONDITIONS",
+    "get_alarm_condition_engine",
+    "window_size_for",
+]
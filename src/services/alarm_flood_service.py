@@ -0,0 +1,374 @@
+"""Gestão de avalanches de alarmes (*alarm flood*) e *shelving*.
+
+Quando um CLP perde comunicação ou uma linha desarma, dezenas de definições
+disparam no mesmo segundo.  Este módulo mantém janelas deslizantes de disparos
+por CLP e por VLAN; ao ultrapassar o limite de uma regra abre-se uma
+"tempestade" (:class:`~src.models.Alarms.AlarmStorm`) que concentra os alarmes
+seguintes numa única notificação, enquanto as linhas individuais ficam em
+memória e são gravadas em lote.
+
+Também deteta definições que oscilam (*chattering*) para que o
+:class:`~src.services.Alarms_service.AlarmService` as coloque em *shelving*
+temporário, evitando escritas repetidas na base de dados.  As prioridades
+``ALARM_CHATTER_EXEMPT_PRIORITIES`` (``CRITICAL`` e ``HIGH`` por omissão)
+nunca são colocadas em *shelving* automático.
+
+Tudo isto fica desligado até ``ALARM_FLOOD_ENABLED=true``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.utils.env import env_bool, env_float
+from src.utils.logs import logger
+
+FLOOD_SCOPES = ("plc", "vlan")
+
+
+@dataclass(frozen=True)
+class FloodRule:
+    """Regra "mais de ``max_alarms`` disparos em ``window_seconds``"."""
+
+    name: str
+    scope: str
+    max_alarms: int
+    window_seconds: float
+    quiet_seconds: float = 30.0
+
+    def scope_key(self, plc_id: int, vlan_id: Optional[int]) -> Optional[str]:
+        if self.scope == "plc":
+            return f"plc:{plc_id}"
+        if self.scope == "vlan" and vlan_id is not None:
+            return f"vlan:{vlan_id}"
+        return None
+
+
+DEFAULT_FLOOD_RULES: Tuple[FloodRule, ...] = (
+    FloodRule(name="plc_flood", scope="plc", max_alarms=10, window_seconds=5.0),
+    FloodRule(name="vlan_flood", scope="vlan", max_alarms=25, window_seconds=10.0),
+)
+
+
+@dataclass(frozen=True)
+class FloodSettings:
+    enabled: bool
+    rules: Tuple[FloodRule, ...]
+    bulk_flush_size: int
+    bulk_flush_interval: float
+    chatter_max_triggers: int
+    chatter_window_seconds: float
+    chatter_shelve_seconds: float
+    chatter_exempt_priorities: Tuple[str, ...] = ("CRITICAL", "HIGH")
+
+
+def _parse_rules(raw: Optional[str]) -> Tuple[FloodRule, ...]:
+    if not raw:
+        return DEFAULT_FLOOD_RULES
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError:
+        logger.error("ALARM_FLOOD_RULES inválido; usando regras padrão")
+        return DEFAULT_FLOOD_RULES
+
+    rules: List[FloodRule] = []
+    for entry in entries if isinstance(entries, list) else []:
+        try:
+            scope = str(entry.get("scope", "plc")).lower()
+            if scope not in FLOOD_SCOPES:
+                raise ValueError(f"escopo desconhecido: {scope}")
+            rules.append(
+                FloodRule(
+                    name=str(entry.get("name") or f"{scope}_flood"),
+                    scope=scope,
+                    max_alarms=int(entry["max_alarms"]),
+                    window_seconds=float(entry["window_seconds"]),
+                    quiet_seconds=float(entry.get("quiet_seconds", 30.0)),
+                )
+            )
+        except (AttributeError, KeyError, TypeError, ValueError) as exc:
+            logger.error("Regra de avalanche de alarmes ignorada (%s): %s", exc, entry)
+    return tuple(rules) or DEFAULT_FLOOD_RULES
+
+
+def load_flood_settings() -> FloodSettings:
+    """Lê as variáveis de ambiente ``ALARM_FLOOD_*``.
+
+    ``ALARM_FLOOD_RULES`` aceita uma lista JSON, por exemplo
+    ``[{"scope": "plc", "max_alarms": 10, "window_seconds": 5}]``.
+    """
+
+    return FloodSettings(
+        enabled=env_bool("ALARM_FLOOD_ENABLED", default=False),
+        rules=_parse_rules(os.getenv("ALARM_FLOOD_RULES")),
+        bulk_flush_size=int(env_float("ALARM_FLOOD_BULK_SIZE", 200)),
+        bulk_flush_interval=env_float("ALARM_FLOOD_BULK_INTERVAL", 2.0),
+        chatter_max_triggers=int(env_float("ALARM_CHATTER_MAX_TRIGGERS", 6)),
+        chatter_window_seconds=env_float("ALARM_CHATTER_WINDOW", 60.0),
+        chatter_shelve_seconds=env_float("ALARM_CHATTER_SHELVE", 600.0),
+        chatter_exempt_priorities=tuple(
+            priority.strip().upper()
+            for priority in os.getenv("ALARM_CHATTER_EXEMPT_PRIORITIES", "CRITICAL,HIGH").split(",")
+            if priority.strip()
+        ),
+    )
+
+
+@dataclass
+class StormState:
+    """Estado em memória de uma tempestade activa."""
+
+    storm_id: int
+    rule: FloodRule
+    scope_key: str
+    alarm_count: int
+    last_alarm_at: float
+
+
+class AlarmFloodManager:
+    """Mantém janelas deslizantes, tempestades activas e o *buffer* de alarmes.
+
+    As instâncias de :class:`AlarmService` são efémeras (uma por payload
+    ingerido), por isso todo o estado vive aqui e é partilhado através de
+    :func:`get_alarm_flood_manager`.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[FloodSettings] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.settings = settings or load_flood_settings()
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._windows: Dict[Tuple[str, str], Deque[float]] = {}
+        self._storms: Dict[str, StormState] = {}
+        self._chatter: Dict[int, Deque[float]] = {}
+        self._vlan_cache: Dict[int, Optional[int]] = {}
+        self._pending: List[Any] = []
+        self._pending_ids: set = set()
+        self._pending_active: Dict[int, Any] = {}
+        self._pending_since: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    def now(self) -> float:
+        return self._clock()
+
+    # ------------------------------------------------------------------
+    # Escopos
+    # ------------------------------------------------------------------
+    def cached_vlan(self, plc_id: int) -> Tuple[bool, Optional[int]]:
+        with self._lock:
+            if plc_id in self._vlan_cache:
+                return True, self._vlan_cache[plc_id]
+        return False, None
+
+    def remember_vlan(self, plc_id: int, vlan_id: Optional[int]) -> None:
+        with self._lock:
+            self._vlan_cache[plc_id] = vlan_id
+
+    def _scope_keys(self, plc_id: int, vlan_id: Optional[int]) -> List[Tuple[FloodRule, str]]:
+        keys = []
+        for rule in self.settings.rules:
+            key = rule.scope_key(plc_id, vlan_id)
+            if key is not None:
+                keys.append((rule, key))
+        return keys
+
+    # ------------------------------------------------------------------
+    # Tempestades
+    # ------------------------------------------------------------------
+    def active_storm(self, plc_id: int, vlan_id: Optional[int]) -> Optional[StormState]:
+        """Devolve a tempestade activa que abrange o CLP/VLAN, se existir."""
+
+        with self._lock:
+            for _, key in self._scope_keys(plc_id, vlan_id):
+                storm = self._storms.get(key)
+                if storm is not None:
+                    return storm
+        return None
+
+    def register_trigger(
+        self, plc_id: int, vlan_id: Optional[int]
+    ) -> Optional[Tuple[FloodRule, str]]:
+        """Contabiliza um disparo e devolve a regra violada, caso exista."""
+
+        if not self.enabled:
+            return None
+        now = self.now()
+        violated: Optional[Tuple[FloodRule, str]] = None
+        with self._lock:
+            for rule, key in self._scope_keys(plc_id, vlan_id):
+                window = self._windows.setdefault((rule.name, key), deque())
+                window.append(now)
+                horizon = now - rule.window_seconds
+                while window and window[0] < horizon:
+                    window.popleft()
+                if violated is None and len(window) > rule.max_alarms:
+                    violated = (rule, key)
+        return violated
+
+    def open_storm(self, rule: FloodRule, scope_key: str, storm_id: int) -> StormState:
+        with self._lock:
+            state = StormState(
+                storm_id=storm_id,
+                rule=rule,
+                scope_key=scope_key,
+                alarm_count=0,
+                last_alarm_at=self.now(),
+            )
+            self._storms[scope_key] = state
+            self._windows.pop((rule.name, scope_key), None)
+            return state
+
+    def note_storm_alarm(self, storm: StormState) -> None:
+        with self._lock:
+            storm.alarm_count += 1
+            storm.last_alarm_at = self.now()
+
+    def expire_storms(self) -> List[StormState]:
+        """Remove e devolve as tempestades sem disparos há ``quiet_seconds``."""
+
+        if not self._storms:
+            return []
+        now = self.now()
+        ended: List[StormState] = []
+        with self._lock:
+            for key, storm in list(self._storms.items()):
+                if now - storm.last_alarm_at >= storm.rule.quiet_seconds:
+                    ended.append(self._storms.pop(key))
+        return ended
+
+    def active_storms(self) -> List[StormState]:
+        with self._lock:
+            return list(self._storms.values())
+
+    # ------------------------------------------------------------------
+    # Alarmes pendentes (gravação em lote)
+    # ------------------------------------------------------------------
+    def add_pending(self, definition_id: int, alarm: Any) -> None:
+        with self._lock:
+            if not self._pending:
+                self._pending_since = self.now()
+            self._pending.append(alarm)
+            self._pending_ids.add(id(alarm))
+            self._pending_active[definition_id] = alarm
+
+    def get_pending(self, definition_id: int) -> Optional[Any]:
+        """Alarme activo ainda não gravado para a definição, se existir."""
+
+        with self._lock:
+            return self._pending_active.get(definition_id)
+
+    def release_pending(self, definition_id: int) -> None:
+        """Marca o alarme pendente como normalizado (continua no lote)."""
+
+        with self._lock:
+            self._pending_active.pop(definition_id, None)
+
+    def is_pending(self, alarm: Any) -> bool:
+        with self._lock:
+            return id(alarm) in self._pending_ids
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def should_flush(self) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            if len(self._pending) >= self.settings.bulk_flush_size:
+                return True
+            return (
+                self._pending_since is not None
+                and self.now() - self._pending_since >= self.settings.bulk_flush_interval
+            )
+
+    def drain_pending(self) -> List[Any]:
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            self._pending_ids.clear()
+            self._pending_active.clear()
+            self._pending_since = None
+            return pending
+
+    def restore_pending(self, alarms: List[Any]) -> None:
+        """Devolve alarmes ao *buffer* após uma falha de gravação."""
+
+        with self._lock:
+            for alarm in alarms:
+                if id(alarm) in self._pending_ids:
+                    continue
+                self._pending.append(alarm)
+                self._pending_ids.add(id(alarm))
+                if alarm.state == "ACTIVE":
+                    self._pending_active.setdefault(alarm.alarm_definition_id, alarm)
+            if self._pending and self._pending_since is None:
+                self._pending_since = self.now()
+
+    # ------------------------------------------------------------------
+    # Chattering
+    # ------------------------------------------------------------------
+    def register_definition_trigger(self, definition_id: int) -> bool:
+        """Regista um disparo da definição e indica se ela está a oscilar."""
+
+        limit = self.settings.chatter_max_triggers
+        if not self.enabled or limit <= 0:
+            return False
+        now = self.now()
+        with self._lock:
+            window = self._chatter.setdefault(definition_id, deque())
+            window.append(now)
+            horizon = now - self.settings.chatter_window_seconds
+            while window and window[0] < horizon:
+                window.popleft()
+            if len(window) >= limit:
+                window.clear()
+                return True
+        return False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._windows.clear()
+            self._storms.clear()
+            self._chatter.clear()
+            self._vlan_cache.clear()
+            self._pending = []
+            self._pending_ids.clear()
+            self._pending_active.clear()
+            self._pending_since = None
+
+
+_singleton: Optional[AlarmFloodManager] = None
+_singleton_lock = threading.Lock()
+
+
+def get_alarm_flood_manager() -> AlarmFloodManager:
+    global _singleton
+    if _singleton is None:
+        with _singleton_lock:
+            if _singleton is None:
+                _singleton = AlarmFloodManager()
+    return _singleton
+
+
+__all__ = [
+    "AlarmFloodManager",
+    "FloodRule",
+    "FloodSettings",
+    "StormState",
+    "get_alarm_flood_manager",
+    "load_flood_settings",
+]
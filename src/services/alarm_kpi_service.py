@@ -0,0 +1,367 @@
+"""KPIs de alarmes mantidos incrementalmente.
+
+Os widgets do dashboard, da HMI e das páginas de gestão precisavam de
+``GROUP BY`` sobre a tabela ``alarm`` a cada pedido.  Este serviço actualiza
+contadores (:class:`~src.models.Alarms.AlarmKpiCounter` e
+:class:`~src.models.Alarms.AlarmKpiDaily`) em cada transição
+*trigger*/*clear*/*ack*, dentro da mesma transacção do alarme, e serve as
+leituras a partir de uma *cache* em memória invalidada a cada escrita local.
+
+Se a tabela de contadores estiver vazia (instalação nova, alarmes inseridos
+por fora do :class:`~src.services.Alarms_service.AlarmService`), os contadores
+são reconstruídos uma única vez a partir de ``alarm`` -- na primeira leitura
+ou na primeira transição, o que acontecer antes.  Remoções em cascata (CLP,
+registrador, definição) reconstroem-nos por completo.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.app import db
+from src.models.Alarms import Alarm, AlarmKpiCounter, AlarmKpiDaily
+from src.utils.logs import logger
+
+GLOBAL_KEY = ("global", "all")
+DEFAULT_PRIORITY = "MEDIUM"
+COUNTER_FIELDS = (
+    "active_count",
+    "unacknowledged_count",
+    "trigger_count",
+    "clear_count",
+    "ack_count",
+    "time_in_alarm_seconds",
+)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    value = _as_utc(value)
+    return value.replace(tzinfo=None) if value is not None else None
+
+
+@dataclass
+class _Delta:
+    active_count: int = 0
+    unacknowledged_count: int = 0
+    trigger_count: int = 0
+    clear_count: int = 0
+    ack_count: int = 0
+    time_in_alarm_seconds: float = 0.0
+    first_trigger_at: Optional[datetime] = None
+    last_trigger_at: Optional[datetime] = None
+
+    def note_trigger(self, moment: Optional[datetime]) -> None:
+        self.active_count += 1
+        self.unacknowledged_count += 1
+        self.trigger_count += 1
+        if moment is not None:
+            if self.first_trigger_at is None or moment < self.first_trigger_at:
+                self.first_trigger_at = moment
+            if self.last_trigger_at is None or moment > self.last_trigger_at:
+                self.last_trigger_at = moment
+
+
+class _KpiReadCache:
+    """*Cache* de leitura partilhada pelo processo.
+
+    Escritas locais invalidam-na imediatamente; o TTL cobre actualizações
+    feitas por outros processos (ex.: ``PLCDataProcessor``).
+    """
+
+    def __init__(self, ttl: float = 2.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+kpi_cache = _KpiReadCache()
+
+
+class AlarmKpiService:
+    """Regista transições de alarmes e expõe os contadores agregados."""
+
+    def __init__(self, session: Optional[Session] = None) -> None:
+        self.session = session or db.session
+        self._deltas: Dict[Tuple[str, str], _Delta] = {}
+        self._daily: Dict[Tuple[date, int, str], int] = {}
+
+    # ------------------------------------------------------------------
+    # Transições
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _scopes(alarm: Any) -> List[Tuple[str, str]]:
+        scopes = [GLOBAL_KEY, ("plc", str(alarm.plc_id))]
+        if alarm.register_id is not None:
+            scopes.append(("register", str(alarm.register_id)))
+        scopes.append(("priority", alarm.priority or DEFAULT_PRIORITY))
+        return scopes
+
+    def _delta(self, scope: Tuple[str, str]) -> _Delta:
+        delta = self._deltas.get(scope)
+        if delta is None:
+            delta = self._deltas[scope] = _Delta()
+        return delta
+
+    def record_trigger(self, alarm: Alarm) -> None:
+        moment = _naive(alarm.triggered_at) or _naive(datetime.now(timezone.utc))
+        for scope in self._scopes(alarm):
+            self._delta(scope).note_trigger(moment)
+        day_key = (moment.date(), alarm.plc_id, alarm.priority or DEFAULT_PRIORITY)
+        self._daily[day_key] = self._daily.get(day_key, 0) + 1
+
+    def record_clear(self, alarm: Alarm) -> None:
+        duration = 0.0
+        triggered_at, cleared_at = _as_utc(alarm.triggered_at), _as_utc(alarm.cleared_at)
+        if triggered_at is not None and cleared_at is not None:
+            duration = max((cleared_at - triggered_at).total_seconds(), 0.0)
+        for scope in self._scopes(alarm):
+            delta = self._delta(scope)
+            delta.active_count -= 1
+            delta.clear_count += 1
+            delta.time_in_alarm_seconds += duration
+
+    def record_ack(self, alarm: Alarm) -> None:
+        for scope in self._scopes(alarm):
+            delta = self._delta(scope)
+            delta.unacknowledged_count -= 1
+            delta.ack_count += 1
+
+    def discard(self) -> None:
+        self._deltas.clear()
+        self._daily.clear()
+
+    def apply(self) -> None:
+        """Aplica as variações acumuladas na sessão (sem *commit*).
+
+        Os incrementos são expressões SQL (``coluna = coluna + n``) para que
+        processos concorrentes não percam actualizações.  A escrita corre num
+        SAVEPOINT: se outro processo criar a mesma linha de contador ao mesmo
+        tempo (``IntegrityError``), só o SAVEPOINT é desfeito e a variação é
+        reaplicada sobre a linha já existente -- o alarme da transacção
+        exterior nunca se perde por causa dos contadores.
+        """
+
+        if not self._deltas and not self._daily:
+            return
+        deltas, daily = self._deltas, self._daily
+        for attempt in range(2):
+            self._deltas, self._daily = dict(deltas), dict(daily)
+            try:
+                with self.session.begin_nested():
+                    self._apply_or_seed()
+                return
+            except IntegrityError:
+                if attempt:
+                    logger.exception("Conflito persistente ao gravar contadores de KPI; variação descartada")
+                    self.discard()
+
+    def _apply_or_seed(self) -> None:
+        if self.session.get(AlarmKpiCounter, GLOBAL_KEY) is None:
+            # Contadores ainda não semeados (actualização a partir de uma versão
+            # sem KPIs): aplicar só a variação ignoraria os alarmes já activos.
+            # A reconstrução lê ``alarm`` já com as alterações pendentes.
+            self.rebuild(commit=False)
+            return
+        self._apply_deltas()
+
+    def _apply_deltas(self) -> None:
+        deltas, daily = self._deltas, self._daily
+        self._deltas, self._daily = {}, {}
+
+        for (scope, key), delta in deltas.items():
+            row = self.session.get(AlarmKpiCounter, (scope, key))
+            if row is None:
+                row = AlarmKpiCounter(scope=scope, scope_key=key)
+                for name in COUNTER_FIELDS:
+                    setattr(row, name, getattr(delta, name))
+                row.first_trigger_at = delta.first_trigger_at
+                row.last_trigger_at = delta.last_trigger_at
+                self.session.add(row)
+                continue
+            for name in COUNTER_FIELDS:
+                change = getattr(delta, name)
+                if change:
+                    setattr(row, name, getattr(AlarmKpiCounter, name) + change)
+            if delta.first_trigger_at is not None and (
+                row.first_trigger_at is None or delta.first_trigger_at < row.first_trigger_at
+            ):
+                row.first_trigger_at = delta.first_trigger_at
+            if delta.last_trigger_at is not None:
+                row.last_trigger_at = delta.last_trigger_at
+
+        for (day, plc_id, priority), count in daily.items():
+            row = self.session.get(AlarmKpiDaily, (day, plc_id, priority))
+            if row is None:
+                self.session.add(
+                    AlarmKpiDaily(day=day, plc_id=plc_id, priority=priority, trigger_count=count)
+                )
+            else:
+                row.trigger_count = AlarmKpiDaily.trigger_count + count
+
+        self.session.flush()
+        kpi_cache.clear()
+
+    # ------------------------------------------------------------------
+    # Reconstrução
+    # ------------------------------------------------------------------
+    def rebuild(self, *, commit: bool = True) -> None:
+        """Recalcula todos os contadores a partir da tabela ``alarm``."""
+
+        self.discard()
+        rows = self.session.query(
+            Alarm.plc_id,
+            Alarm.register_id,
+            Alarm.priority,
+            Alarm.state,
+            Alarm.triggered_at,
+            Alarm.cleared_at,
+            Alarm.acknowledged_at,
+        ).yield_per(5000)
+        for plc_id, register_id, priority, state, triggered_at, cleared_at, acked_at in rows:
+            alarm = SimpleNamespace(
+                plc_id=plc_id,
+                register_id=register_id,
+                priority=priority,
+                state=state,
+                triggered_at=triggered_at,
+                cleared_at=cleared_at,
+            )
+            self.record_trigger(alarm)
+            if state != "ACTIVE":
+                self.record_clear(alarm)
+            if acked_at is not None:
+                self.record_ack(alarm)
+
+        self.session.query(AlarmKpiCounter).delete()
+        self.session.query(AlarmKpiDaily).delete()
+        self.session.flush()
+        self._delta(GLOBAL_KEY)
+        self._apply_deltas()
+        if commit:
+            self.session.commit()
+        logger.info("Contadores de KPI de alarmes reconstruídos")
+
+    def ensure_initialised(self) -> None:
+        if self.session.get(AlarmKpiCounter, GLOBAL_KEY) is not None:
+            return
+        try:
+            self.rebuild()
+        except SQLAlchemyError:
+            self.session.rollback()
+            logger.exception("Falha ao reconstruir contadores de KPI de alarmes")
+
+    # ------------------------------------------------------------------
+    # Leituras
+    # ------------------------------------------------------------------
+    def _counters(self, scope: str) -> Dict[str, Dict[str, Any]]:
+        cached = kpi_cache.get(scope)
+        if cached is not None:
+            return cached
+        self.ensure_initialised()
+        try:
+            rows = self.session.query(AlarmKpiCounter).filter(AlarmKpiCounter.scope == scope).all()
+        except SQLAlchemyError:
+            logger.exception("Erro ao ler contadores de KPI (%s)", scope)
+            return {}
+        result = {
+            row.scope_key: {
+                **{name: getattr(row, name) for name in COUNTER_FIELDS},
+                "first_trigger_at": row.first_trigger_at,
+                "last_trigger_at": row.last_trigger_at,
+            }
+            for row in rows
+        }
+        kpi_cache.put(scope, result)
+        return result
+
+    def _active_map(self, scope: str, key_type=int) -> Dict[Any, int]:
+        cache_key = f"{scope}:active"
+        cached = kpi_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        result = {
+            key_type(key): values["active_count"]
+            for key, values in self._counters(scope).items()
+            if values["active_count"] > 0
+        }
+        kpi_cache.put(cache_key, result)
+        return result
+
+    def active_by_plc(self) -> Dict[int, int]:
+        return self._active_map("plc")
+
+    def active_by_register(self) -> Dict[int, int]:
+        return self._active_map("register")
+
+    def active_by_priority(self) -> Dict[str, int]:
+        return self._active_map("priority", key_type=str)
+
+    def active_total(self) -> int:
+        values = self._counters("global").get(GLOBAL_KEY[1])
+        return int(values["active_count"]) if values else 0
+
+    def counters_for(self, scope: str, key: Any) -> Dict[str, Any]:
+        """KPIs de um escopo, incluindo o tempo médio entre alarmes (MTBA)."""
+
+        values = dict(self._counters(scope).get(str(key)) or {})
+        if not values:
+            values = {name: 0 for name in COUNTER_FIELDS}
+            values.update(first_trigger_at=None, last_trigger_at=None)
+        first, last = values.get("first_trigger_at"), values.get("last_trigger_at")
+        triggers = values.get("trigger_count") or 0
+        values["mtba_seconds"] = (
+            (last - first).total_seconds() / (triggers - 1)
+            if first is not None and last is not None and triggers > 1
+            else None
+        )
+        return values
+
+    def daily_triggers(self, days: int = 14, *, plc_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        cache_key = f"daily:{days}:{plc_id}"
+        cached = kpi_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        horizon = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        query = self.session.query(AlarmKpiDaily).filter(AlarmKpiDaily.day >= horizon)
+        if plc_id is not None:
+            query = query.filter(AlarmKpiDaily.plc_id == plc_id)
+        totals: Dict[date, int] = {}
+        for row in query:
+            totals[row.day] = totals.get(row.day, 0) + row.trigger_count
+        result = [{"date": day.isoformat(), "count": totals[day]} for day in sorted(totals)]
+        kpi_cache.put(cache_key, result)
+        return result
+
+
+__all__ = ["AlarmKpiService", "kpi_cache"]
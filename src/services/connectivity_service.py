@@ -0,0 +1,349 @@
+"""Estado de conectividade por CLP com histerese.
+
+O poller envia uma leitura por registrador, cada uma com o seu ``status``.
+Usar cada leitura para ligar/desligar ``PLC.is_online`` faz um CLP oscilar
+sempre que um único registrador falha.  O :class:`ConnectivityTracker`
+agrupa as leituras de cada CLP em ciclos de *polling* (janela igual ao
+``polling_interval`` do CLP) e considera o ciclo saudável quando a fração de
+registradores OK atinge ``min_ok_ratio``.  O CLP só muda de estado depois de
+``offline_after_cycles`` ciclos ruins ou ``online_after_cycles`` ciclos bons
+consecutivos, e CLPs sem leituras há ``stale_seconds`` passam a *offline*.
+
+Só as transições chegam ao MQTT
+(:meth:`~src.services.mqtt_service.MqttPublisherService.publish_connectivity_event`).
+Na base de dados, além das transições, ``PLC.last_seen`` acompanha as
+leituras boas no máximo uma vez a cada ``last_seen_seconds`` por CLP, e não
+é apagado quando o CLP fica *offline*.
+
+O *poller* Go grava cada leitura com
+:func:`~src.services.poller_ingest_service.process_poller_payload`; os
+restantes caminhos (motor ``asyncio``, Redis, Streams e MQTT) passam pelo
+:class:`~src.consumers.data_processor.PLCDataProcessor`, que usa
+:func:`record_readings` e corre :func:`sweep_stale_plcs` periodicamente.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.env import env_float, env_int
+from src.utils.logs import logger
+
+
+@dataclass(frozen=True)
+class ConnectivitySettings:
+    offline_after_cycles: int = 3
+    online_after_cycles: int = 2
+    min_ok_ratio: float = 0.5
+    cycle_seconds: float = 1.0
+    min_cycle_seconds: float = 0.2
+    stale_seconds: float = 30.0
+    last_seen_seconds: float = 10.0
+
+
+def load_connectivity_settings() -> ConnectivitySettings:
+    """Lê as variáveis de ambiente ``CONNECTIVITY_*``."""
+
+    return ConnectivitySettings(
+        offline_after_cycles=max(env_int("CONNECTIVITY_OFFLINE_AFTER_CYCLES", 3), 1),
+        online_after_cycles=max(env_int("CONNECTIVITY_ONLINE_AFTER_CYCLES", 2), 1),
+        min_ok_ratio=min(max(env_float("CONNECTIVITY_MIN_OK_RATIO", 0.5), 0.0), 1.0),
+        cycle_seconds=max(env_float("CONNECTIVITY_CYCLE_SECONDS", 1.0), 0.01),
+        min_cycle_seconds=max(env_float("CONNECTIVITY_MIN_CYCLE_SECONDS", 0.2), 0.0),
+        stale_seconds=max(env_float("CONNECTIVITY_STALE_SECONDS", 30.0), 0.0),
+        last_seen_seconds=max(env_float("CONNECTIVITY_LAST_SEEN_SECONDS", 10.0), 0.0),
+    )
+
+
+@dataclass(frozen=True)
+class ConnectivityTransition:
+    plc_id: int
+    online: bool
+    at: datetime
+
+    @property
+    def state(self) -> str:
+        return "online" if self.online else "offline"
+
+
+@dataclass
+class _PlcState:
+    online: Optional[bool]
+    cycle_start: float
+    last_received: float
+    interval: Optional[float] = None
+    ok: int = 0
+    failed: int = 0
+    healthy_streak: int = 0
+    failed_streak: int = 0
+
+
+class ConnectivityTracker:
+    """Agrega o ``status`` das leituras em ciclos e emite transições únicas."""
+
+    def __init__(self, settings: Optional[ConnectivitySettings] = None) -> None:
+        self.settings = settings or load_connectivity_settings()
+        self._states: Dict[int, _PlcState] = {}
+        self._last_seen: Dict[int, float] = {}
+        self._lock = threading.RLock()
+
+    def observe(
+        self,
+        plc_id: int,
+        ok: bool,
+        timestamp: datetime,
+        *,
+        interval: Optional[float] = None,
+        current: Optional[bool] = None,
+    ) -> Optional[ConnectivityTransition]:
+        """Regista uma leitura; devolve a transição se o ciclo anterior a causou.
+
+        ``interval`` é a duração do ciclo em segundos (``polling_interval`` do
+        CLP), guardada para as chamadas seguintes que não a indiquem;
+        ``current`` é o estado gravado, usado quando o CLP ainda não está a
+        ser acompanhado.
+        """
+
+        stamp = timestamp.timestamp()
+        with self._lock:
+            state = self._states.get(plc_id)
+            if state is None:
+                state = self._states[plc_id] = _PlcState(
+                    online=current, cycle_start=stamp, last_received=time.time()
+                )
+            if interval:
+                state.interval = interval
+            window = max(state.interval or self.settings.cycle_seconds, self.settings.min_cycle_seconds)
+
+            transition = None
+            if stamp - state.cycle_start >= window and (state.ok or state.failed):
+                transition = self._close_cycle(plc_id, state, timestamp)
+                state.cycle_start = stamp
+
+            if ok:
+                state.ok += 1
+            else:
+                state.failed += 1
+            state.last_received = time.time()
+            return transition
+
+    def _close_cycle(
+        self, plc_id: int, state: _PlcState, at: datetime
+    ) -> Optional[ConnectivityTransition]:
+        healthy = state.ok / (state.ok + state.failed) >= self.settings.min_ok_ratio
+        state.ok = state.failed = 0
+        if healthy:
+            state.healthy_streak += 1
+            state.failed_streak = 0
+            if state.online is not True and state.healthy_streak >= self.settings.online_after_cycles:
+                state.online = True
+                return ConnectivityTransition(plc_id, True, at)
+        else:
+            state.failed_streak += 1
+            state.healthy_streak = 0
+            if state.online is not False and state.failed_streak >= self.settings.offline_after_cycles:
+                state.online = False
+                return ConnectivityTransition(plc_id, False, at)
+        return None
+
+    def sweep(self, now: Optional[float] = None) -> List[ConnectivityTransition]:
+        """Marca *offline* os CLPs *online* sem leituras há ``stale_seconds``."""
+
+        now = time.time() if now is None else now
+        moment = datetime.fromtimestamp(now, tz=timezone.utc)
+        transitions: List[ConnectivityTransition] = []
+        with self._lock:
+            for plc_id, state in self._states.items():
+                if state.online and now - state.last_received >= self.settings.stale_seconds:
+                    state.online = False
+                    state.ok = state.failed = state.healthy_streak = 0
+                    state.failed_streak = self.settings.offline_after_cycles
+                    transitions.append(ConnectivityTransition(plc_id, False, moment))
+        return transitions
+
+    def last_seen_due(self, plc_id: int, timestamp: datetime) -> bool:
+        """Indica se ``PLC.last_seen`` deve ser gravado para esta leitura boa."""
+
+        stamp = timestamp.timestamp()
+        with self._lock:
+            written = self._last_seen.get(plc_id)
+            if written is not None and stamp - written < self.settings.last_seen_seconds:
+                return False
+            self._last_seen[plc_id] = stamp
+            return True
+
+    def tracks(self, plc_id: int) -> bool:
+        with self._lock:
+            return plc_id in self._states
+
+    def discard(self, transition: ConnectivityTransition) -> None:
+        """Desfaz uma transição que não chegou a ser gravada."""
+
+        with self._lock:
+            state = self._states.get(transition.plc_id)
+            if state is not None and state.online == transition.online:
+                state.online = not transition.online
+
+    def state(self, plc_id: int) -> Optional[bool]:
+        with self._lock:
+            state = self._states.get(plc_id)
+            return None if state is None else state.online
+
+    def forget(self, plc_id: int) -> None:
+        with self._lock:
+            self._states.pop(plc_id, None)
+            self._last_seen.pop(plc_id, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._states.clear()
+            self._last_seen.clear()
+
+
+def apply_transition(plc, transition: ConnectivityTransition) -> None:
+    """Reflete a transição nas colunas de estado do CLP (sem *commit*).
+
+    ``last_seen`` só avança: um CLP *offline* mantém a última leitura boa.
+    """
+
+    plc.is_online = transition.online
+    plc.status_changed_at = transition.at
+    if transition.online:
+        plc.last_seen = transition.at
+
+
+def publish_transition(plc, transition: ConnectivityTransition) -> None:
+    from src.services.mqtt_service import get_mqtt_publisher
+
+    logger.info("CLP %s passou a %s", getattr(plc, "id", transition.plc_id), transition.state)
+    try:
+        get_mqtt_publisher().publish_connectivity_event(plc, transition.state)
+    except Exception:
+        logger.exception("Erro ao publicar conectividade do CLP %s no MQTT", transition.plc_id)
+
+
+def record_readings(
+    readings: Iterable[Tuple[int, bool, datetime]],
+    *,
+    session=None,
+    tracker: Optional[ConnectivityTracker] = None,
+) -> int:
+    """Alimenta o *tracker* com ``(plc_id, ok, timestamp)`` e grava o estado.
+
+    O CLP só é lido da base de dados quando ainda não é acompanhado, quando
+    há transição ou quando ``last_seen`` deve avançar; sem alterações não há
+    *commit*.  Devolve o número de transições gravadas.
+    """
+
+    from src.app.extensions import db
+    from src.models.PLCs import PLC
+
+    tracker = tracker or get_connectivity_tracker()
+    session = session or db.session
+    plcs: Dict[int, Optional[PLC]] = {}
+
+    def _plc(plc_id: int) -> Optional[PLC]:
+        if plc_id not in plcs:
+            plcs[plc_id] = session.get(PLC, plc_id)
+        return plcs[plc_id]
+
+    transitions: List[Tuple[PLC, ConnectivityTransition]] = []
+    changed = False
+    try:
+        for plc_id, ok, timestamp in readings:
+            plc, interval, current = None, None, None
+            seen = ok and tracker.last_seen_due(plc_id, timestamp)
+            if seen or not tracker.tracks(plc_id):
+                plc = _plc(plc_id)
+                if plc is None:
+                    continue
+                if seen:
+                    plc.last_seen = timestamp
+                    changed = True
+                interval = (plc.polling_interval or 0) / 1000.0 or None
+                current = plc.is_online
+            transition = tracker.observe(plc_id, ok, timestamp, interval=interval, current=current)
+            if transition is None:
+                continue
+            plc = plc or _plc(plc_id)
+            if plc is None:
+                tracker.forget(plc_id)
+                continue
+            apply_transition(plc, transition)
+            transitions.append((plc, transition))
+        if changed or transitions:
+            session.commit()
+    except Exception:
+        session.rollback()
+        for _, transition in transitions:
+            tracker.discard(transition)
+        logger.exception("Erro ao gravar conectividade dos CLPs")
+        return 0
+
+    for plc, transition in transitions:
+        publish_transition(plc, transition)
+    return len(transitions)
+
+
+def sweep_stale_plcs(*, session=None, tracker: Optional[ConnectivityTracker] = None) -> int:
+    """Grava e publica as transições para *offline* por falta de leituras."""
+
+    from src.app.extensions import db
+    from src.models.PLCs import PLC
+
+    tracker = tracker or get_connectivity_tracker()
+    transitions = tracker.sweep()
+    if not transitions:
+        return 0
+
+    session = session or db.session
+    applied = []
+    try:
+        for transition in transitions:
+            plc = session.get(PLC, transition.plc_id)
+            if plc is None:
+                tracker.forget(transition.plc_id)
+                continue
+            apply_transition(plc, transition)
+            applied.append((plc, transition))
+        session.commit()
+    except Exception:
+        session.rollback()
+        for transition in transitions:
+            tracker.discard(transition)
+        logger.exception("Erro ao gravar CLPs sem leituras como offline")
+        return 0
+
+    for plc, transition in applied:
+        publish_transition(plc, transition)
+    return len(applied)
+
+
+_singleton: Optional[ConnectivityTracker] = None
+_singleton_lock = threading.Lock()
+
+
+def get_connectivity_tracker() -> ConnectivityTracker:
+    global _singleton
+    if _singleton is None:
+        with _singleton_lock:
+            if _singleton is None:
+                _singleton = ConnectivityTracker()
+    return _singleton
+
+
+__all__ = [
+    "ConnectivitySettings",
+    "ConnectivityTracker",
+    "ConnectivityTransition",
+    "apply_transition",
+    "get_connectivity_tracker",
+    "load_connectivity_settings",
+    "publish_transition",
+    "record_readings",
+    "sweep_stale_plcs",
+]
@@ -3,21 +3,34 @@
 from __future__ import annotations
 
 import json
+import math
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from src.app import db
+from src.models.Discovery import DiscoveredDevice
+from src.models.PLCs import PLC
+from src.repository.Discovery_repository import DiscoveredDeviceRepo
 from src.repository.Settings_repository import SettingsRepoInstance
 from src.utils.logs import logger
 from src.utils.network import (
     DISCOVERY_FILE,
     DISCOVERY_SUMMARY_FILE,
     has_network_privileges,
-    run_enhanced_discovery,
+    run_incremental_discovery,
 )
 
 DISCOVERY_ENABLED_KEY = "network_discovery_enabled"
 DISCOVERY_LAST_RUN_KEY = "network_discovery_last_run"
 
+# Serviço identificado -> protocolo do CLP, por ordem de prioridade.
+PROMOTABLE_SERVICES = (
+    ("modbus", "modbus"),
+    ("s7comm", "s7"),
+    ("ethernet_ip", "ethernet_ip"),
+    ("opcua", "opcua"),
+)
+
 
 def is_discovery_enabled(default: bool = False) -> bool:
     """Retorna o estado persistido para a descoberta de rede."""
@@ -39,10 +52,17 @@ def set_discovery_enabled(enabled: bool, *, actor: Optional[str] = None) -> None
     )
 
 
-def execute_discovery(*, actor: Optional[str] = None, **kwargs: Any) -> List[Dict[str, Any]]:
-    """Executa a descoberta completa e regista o instante da operação."""
+def execute_discovery(*, actor: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+    """Executa a descoberta, grava o inventário e regista o instante da operação.
 
-    results = run_enhanced_discovery(**kwargs)
+    Devolve o resultado de
+    :func:`~src.utils.network.enhanced_discovery.run_incremental_discovery`
+    (``devices``, ``diff``, ``probed`` e ``reused``) com ``stats``, as
+    contagens da gravação no inventário.
+    """
+
+    result = run_incremental_discovery(**kwargs)
+    result["stats"] = store_discovery_results(result["devices"], interfaces=kwargs.get("target_interfaces"))
     timestamp = datetime.now(timezone.utc).isoformat()
     description = "Última execução da descoberta de rede"
     if actor:
@@ -52,7 +72,7 @@ def execute_discovery(*, actor: Optional[str] = None, **kwargs: Any) -> List[Dic
         timestamp,
         description=description,
     )
-    return results
+    return result
 
 
 def get_last_run_time() -> Optional[datetime]:
@@ -98,6 +118,144 @@ def load_discovery_summary(limit: Optional[int] = None) -> List[Dict[str, Any]]:
     return data
 
 
+def store_discovery_results(
+    devices: List[Dict[str, Any]],
+    *,
+    interfaces: Optional[Iterable[str]] = None,
+) -> Dict[str, int]:
+    """Grava o resultado de uma varredura no inventário da base de dados."""
+
+    stats = DiscoveredDeviceRepo().sync_scan(devices, interfaces=interfaces)
+    logger.info(
+        "Inventário da descoberta: %d novos, %d actualizados, %d removidos",
+        stats["inserted"],
+        stats["updated"],
+        stats["removed"],
+    )
+    return stats
+
+
+def _device_view(device: DiscoveredDevice) -> Dict[str, Any]:
+    return {
+        "id": device.id,
+        "ip": device.ip,
+        "mac": device.mac,
+        "responds_to_ping": device.responds_to_ping,
+        "open_ports": [port.port for port in device.ports],
+        "is_industrial": device.is_industrial,
+        "device_type": device.device_type,
+        "manufacturer": device.manufacturer,
+        "model": device.model,
+        "plc_id": device.plc_id,
+        "last_seen": device.last_seen,
+    }
+
+
+def list_discovered_devices(page: int = 1, per_page: int = 50, **filters: Any) -> Dict[str, Any]:
+    """Página do inventário com os dados de paginação usados pelos templates.
+
+    ``filters`` aceita ``industrial``, ``search`` (prefixo de IP ou MAC),
+    ``manufacturer``, ``port`` e ``promoted``.
+    """
+
+    repo = DiscoveredDeviceRepo()
+    page = max(page, 1)
+    items, total = repo.paginate(page, per_page, **filters)
+    total_pages = max(1, math.ceil(total / per_page))
+    return {
+        "items": [_device_view(device) for device in items],
+        "pagination": {
+            "page": page,
+            "per_page": per_page,
+            "total_items": total,
+            "total_pages": total_pages,
+            "has_prev": page > 1,
+            "has_next": page < total_pages,
+            "prev_page": page - 1,
+            "next_page": page + 1,
+        },
+    }
+
+
+def discovery_counts() -> Dict[str, int]:
+    """Totais do inventário (``total``, ``industrial``, ``promoted``)."""
+
+    return DiscoveredDeviceRepo().counts()
+
+
+def list_discovered_manufacturers() -> List[str]:
+    return DiscoveredDeviceRepo().manufacturers()
+
+
+def _plc_endpoint(device: DiscoveredDevice) -> Optional[Tuple[str, int]]:
+    by_service = {port.service: port.port for port in device.ports}
+    for service, protocol in PROMOTABLE_SERVICES:
+        if service in by_service:
+            return protocol, by_service[service]
+    return None
+
+
+def promote_to_plcs(device_ids: Iterable[int], *, actor: Optional[str] = None) -> List[PLC]:
+    """Cria, de uma vez, um CLP por dispositivo descoberto seleccionado.
+
+    O protocolo e a porta vêm do primeiro serviço industrial identificado
+    (Modbus, S7, EtherNet/IP, OPC UA).  Dispositivos sem serviço industrial
+    ou já promovidos são ignorados; se já existir um CLP com o mesmo IP, o
+    dispositivo fica apenas ligado a ele.
+    """
+
+    devices = DiscoveredDeviceRepo().list_by_ids(device_ids)
+    candidates = [device for device in devices if device.plc_id is None]
+    if not candidates:
+        return []
+
+    existing = dict(
+        db.session.query(PLC.ip_address, PLC.id)
+        .filter(PLC.ip_address.in_([device.ip for device in candidates]))
+        .all()
+    )
+
+    created: List[Tuple[DiscoveredDevice, PLC]] = []
+    for device in candidates:
+        if device.ip in existing:
+            device.plc_id = existing[device.ip]
+            continue
+        endpoint = _plc_endpoint(device)
+        if endpoint is None:
+            continue
+        protocol, port = endpoint
+        label = device.model or (device.manufacturer if device.manufacturer != "unknown" else None) or "CLP"
+        plc = PLC(
+            name=f"{label} {device.ip}"[:100],
+            description="Criado a partir da descoberta de rede",
+            ip_address=device.ip,
+            mac_address=device.mac,
+            protocol=protocol,
+            port=port,
+            unit_id=1 if protocol == "modbus" else None,
+            manufacturer=device.manufacturer if device.manufacturer != "unknown" else None,
+            model=device.model[:50] if device.model else None,
+            is_active=True,
+        )
+        plc.set_tags([protocol, "descoberta"])
+        plc.mark_active(actor=actor, source="discovery")
+        created.append((device, plc))
+
+    try:
+        db.session.add_all([plc for _, plc in created])
+        db.session.flush()
+        for device, plc in created:
+            device.plc_id = plc.id
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Erro ao promover dispositivos descobertos a CLP")
+        raise
+
+    logger.info("%d dispositivos descobertos promovidos a CLP por %s", len(created), actor or "sistema")
+    return [plc for _, plc in created]
+
+
 def count_industrial_devices(summary: Optional[List[Dict[str, Any]]] = None) -> int:
     """Conta quantos dispositivos do resumo foram classificados como industriais."""
 
@@ -108,12 +266,18 @@ def count_industrial_devices(summary: Optional[List[Dict[str, Any]]] = None) ->
 __all__ = [
     "DISCOVERY_ENABLED_KEY",
     "DISCOVERY_LAST_RUN_KEY",
+    "PROMOTABLE_SERVICES",
     "count_industrial_devices",
+    "discovery_counts",
     "execute_discovery",
     "get_last_run_time",
     "has_network_privileges",
     "is_discovery_enabled",
+    "list_discovered_devices",
+    "list_discovered_manufacturers",
     "load_discovery_results",
     "load_discovery_summary",
+    "promote_to_plcs",
     "set_discovery_enabled",
+    "store_discovery_results",
 ]
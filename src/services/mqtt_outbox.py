@@ -0,0 +1,301 @@
+"""*Outbox* persistente em disco para o publicador MQTT.
+
+Quando o *broker* está indisponível, ou a fila em memória passa do limite, as
+mensagens são anexadas a ficheiros de segmento (``segment-<n>.log``) em vez de
+serem descartadas.  Um cursor (``cursor``) guarda a posição da próxima
+mensagem a enviar; após a reconexão o publicador drena o *outbox* pela ordem
+de escrita.  Segmentos totalmente consumidos são apagados e, se o tamanho
+total ultrapassar o orçamento, os segmentos mais antigos são descartados.
+
+Formato de cada registo::
+
+    <u32 tamanho do corpo><f64 epoch de escrita><u16 flags|tamanho do tópico><tópico><payload>
+
+O bit mais alto do campo do tópico (``_RETAIN_FLAG``) indica que a mensagem
+deve ser publicada com ``retain``; registos gravados antes desta flag têm-no a
+zero e continuam legíveis.
+
+A entrega é *at-least-once*: o cursor só avança depois da publicação.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.logs import logger
+
+_HEADER = struct.Struct("<IdH")
+_RETAIN_FLAG = 0x8000
+_TOPIC_LEN_MASK = 0x7FFF
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".log"
+
+# (tópico, payload, retain, segmento, posição seguinte)
+OutboxRecord = Tuple[str, bytes, bool, int, int]
+
+
+class DiskOutbox:
+    """Fila FIFO persistente baseada em segmentos *append-only*."""
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = max(int(segment_bytes), 1024)
+        self.max_bytes = max(int(max_bytes), self.segment_bytes)
+        self._lock = threading.Lock()
+        self._cursor_path = self.directory / "cursor"
+        self._segments: List[int] = sorted(self._scan_segments())
+        self._sizes: Dict[int, int] = {
+            segment: self._segment_path(segment).stat().st_size for segment in self._segments
+        }
+        self._read_segment, self._read_offset = self._load_cursor()
+        self._writer = None
+        self._records = self._count_pending()
+        self.dropped_records = 0
+
+    # ------------------------------------------------------------------
+    # Ficheiros
+    # ------------------------------------------------------------------
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"{_SEGMENT_PREFIX}{segment:012d}{_SEGMENT_SUFFIX}"
+
+    def _scan_segments(self) -> List[int]:
+        segments = []
+        for path in self.directory.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"):
+            try:
+                segments.append(int(path.name[len(_SEGMENT_PREFIX) : -len(_SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+        return segments
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        first = self._segments[0] if self._segments else 0
+        try:
+            raw = json.loads(self._cursor_path.read_text())
+            segment, offset = int(raw["segment"]), int(raw["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return first, 0
+        if segment < first:
+            return first, 0
+        return segment, offset
+
+    def _save_cursor(self) -> None:
+        tmp = self._cursor_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"segment": self._read_segment, "offset": self._read_offset}))
+        os.replace(tmp, self._cursor_path)
+
+    def _count_pending(self) -> int:
+        return sum(
+            self._records_in(segment, self._read_offset if segment == self._read_segment else 0)
+            for segment in self._segments
+            if segment >= self._read_segment
+        )
+
+    def _open_writer(self):
+        if self._segments and self._sizes[self._segments[-1]] < self.segment_bytes:
+            if self._writer is None:
+                self._writer = open(self._segment_path(self._segments[-1]), "ab")
+            return self._writer
+
+        if self._writer is not None:
+            self._writer.close()
+        if self._segments:
+            segment = self._segments[-1] + 1
+        else:
+            segment, self._read_offset = self._read_segment, 0
+        self._segments.append(segment)
+        self._sizes[segment] = 0
+        self._writer = open(self._segment_path(segment), "ab")
+        return self._writer
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def append(self, topic: str, payload: Any, *, retain: bool = False) -> None:
+        if isinstance(payload, str):
+            data = payload.encode("utf-8")
+        elif isinstance(payload, bytes):
+            data = payload
+        else:
+            data = json.dumps(payload, default=str).encode("utf-8")
+        topic_bytes = topic.encode("utf-8")
+        if len(topic_bytes) > _TOPIC_LEN_MASK:
+            raise ValueError(f"Tópico MQTT demasiado longo para o outbox ({len(topic_bytes)} bytes)")
+        topic_field = len(topic_bytes) | (_RETAIN_FLAG if retain else 0)
+        record = _HEADER.pack(len(topic_bytes) + len(data), time.time(), topic_field)
+        record += topic_bytes + data
+
+        with self._lock:
+            writer = self._open_writer()
+            writer.write(record)
+            writer.flush()
+            self._sizes[self._segments[-1]] += len(record)
+            self._records += 1
+            self._enforce_budget()
+
+    def _enforce_budget(self) -> None:
+        while sum(self._sizes.values()) > self.max_bytes and len(self._segments) > 1:
+            oldest = self._segments[0]
+            dropped = self._records_in(oldest, self._read_offset if oldest == self._read_segment else 0)
+            self._remove_segment(oldest)
+            self._records -= dropped
+            self.dropped_records += dropped
+            self._read_segment, self._read_offset = self._segments[0], 0
+            self._save_cursor()
+            logger.warning(
+                "Outbox MQTT excedeu %d bytes; %d mensagens antigas descartadas",
+                self.max_bytes,
+                dropped,
+            )
+
+    def _records_in(self, segment: int, offset: int, end: Optional[int] = None) -> int:
+        count = 0
+        with open(self._segment_path(segment), "rb") as handle:
+            handle.seek(offset)
+            while end is None or handle.tell() < end:
+                header = handle.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return count
+                length, _, _ = _HEADER.unpack(header)
+                handle.seek(length, os.SEEK_CUR)
+                count += 1
+        return count
+
+    def _remove_segment(self, segment: int) -> None:
+        if self._writer is not None and segment == self._segments[-1]:
+            self._writer.close()
+            self._writer = None
+        try:
+            self._segment_path(segment).unlink()
+        except OSError:
+            logger.exception("Erro ao remover segmento %s do outbox MQTT", segment)
+        self._segments.remove(segment)
+        self._sizes.pop(segment, None)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def read(self, limit: int) -> List[OutboxRecord]:
+        """Lê até ``limit`` mensagens a partir do cursor, sem o avançar."""
+
+        records: List[OutboxRecord] = []
+        with self._lock:
+            if not self._records:
+                return records
+            segment, offset = self._read_segment, self._read_offset
+            for current in [s for s in self._segments if s >= segment]:
+                start = offset if current == segment else 0
+                with open(self._segment_path(current), "rb") as handle:
+                    handle.seek(start)
+                    while len(records) < limit:
+                        header = handle.read(_HEADER.size)
+                        if len(header) < _HEADER.size:
+                            break
+                        length, _, topic_field = _HEADER.unpack(header)
+                        body = handle.read(length)
+                        if len(body) < length:
+                            break
+                        topic_len = topic_field & _TOPIC_LEN_MASK
+                        topic = body[:topic_len].decode("utf-8")
+                        retain = bool(topic_field & _RETAIN_FLAG)
+                        records.append((topic, body[topic_len:], retain, current, handle.tell()))
+                if len(records) >= limit:
+                    break
+        return records
+
+    def commit(self, segment: int, position: int, count: int) -> None:
+        """Avança o cursor até ``(segment, position)`` após ``count`` envios.
+
+        Entre ``read`` e ``commit`` o orçamento pode ter descartado segmentos
+        (e já descontado os seus registos).  Por isso só se descontam os
+        registos que existem entre o cursor actual e a nova posição, e uma
+        posição num segmento já removido é ignorada.
+        """
+
+        with self._lock:
+            if segment not in self._sizes or (segment, position) <= (self._read_segment, self._read_offset):
+                return
+            confirmed = sum(
+                self._records_in(
+                    current,
+                    self._read_offset if current == self._read_segment else 0,
+                    position if current == segment else None,
+                )
+                for current in self._segments
+                if self._read_segment <= current <= segment
+            )
+            if confirmed < count:
+                logger.debug(
+                    "Outbox MQTT: %d de %d mensagens enviadas já tinham sido descartadas pelo orçamento",
+                    count - confirmed,
+                    count,
+                )
+            self._read_segment, self._read_offset = segment, position
+            self._records = max(self._records - confirmed, 0)
+            for old in [s for s in self._segments if s < segment]:
+                self._remove_segment(old)
+            if segment == self._segments[-1] and position >= self._sizes[segment]:
+                self._records = 0
+                # Tudo enviado: recomeça num segmento novo para libertar espaço.
+                for old in list(self._segments):
+                    self._remove_segment(old)
+                self._read_segment, self._read_offset = self._read_segment + 1, 0
+            self._save_cursor()
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._records
+
+    def backlog_bytes(self) -> int:
+        with self._lock:
+            total = sum(self._sizes.values())
+            if self._read_segment in self._sizes:
+                total -= self._read_offset
+            return max(total, 0)
+
+    def oldest_age_seconds(self) -> Optional[float]:
+        with self._lock:
+            if not self._records:
+                return None
+            path = self._segment_path(self._read_segment)
+            try:
+                with open(path, "rb") as handle:
+                    handle.seek(self._read_offset)
+                    header = handle.read(_HEADER.size)
+            except OSError:
+                return None
+        if len(header) < _HEADER.size:
+            return None
+        _, written_at, _ = _HEADER.unpack(header)
+        return max(time.time() - written_at, 0.0)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "records": len(self),
+            "bytes": self.backlog_bytes(),
+            "oldest_age_seconds": self.oldest_age_seconds(),
+            "dropped_records": self.dropped_records,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+__all__ = ["DiskOutbox"]
@@ -0,0 +1,140 @@
+"""Serializadores de *payload* para a publicação MQTT.
+
+* ``json`` — usa ``orjson`` quando instalado e recorre ao ``json`` da
+  biblioteca padrão caso contrário;
+* ``stdlib`` — força o ``json`` da biblioteca padrão;
+* ``msgpack`` — binário compacto (requer o pacote ``msgpack``).  Como o
+  MQTT 3.1.1 não tem ``content-type``, o formato vai no tópico: as mensagens
+  saem em ``<tópico>/msgpack`` (antes do eventual ``/zlib``), e os tópicos
+  sem sufixo continuam a transportar só JSON.
+
+Além de ``dumps``, cada serializador sabe codificar os itens de uma lista sem
+o envelope (:meth:`Serializer.items`) e montar um objeto a partir desses
+fragmentos (:meth:`Serializer.envelope`).  É isso que permite ao publicador
+juntar vários lotes de medições serializando cada lote uma única vez.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import json
+import struct
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List
+
+from src.utils.logs import logger
+
+_orjson = importlib.import_module("orjson") if importlib.util.find_spec("orjson") else None
+_msgpack = importlib.import_module("msgpack") if importlib.util.find_spec("msgpack") else None
+
+
+def _iso(value: Any) -> str:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Valor {value!r} não serializável")
+
+
+class Serializer:
+    name = "stdlib"
+    # Sufixo acrescentado ao tópico para identificar o formato ("" para JSON).
+    topic_suffix = ""
+    # ``True`` quando ``datetime`` é serializado sem conversão prévia para ISO.
+    native_datetime = False
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=_iso).encode("utf-8")
+
+    def items(self, values: List[Any]) -> bytes:
+        return self.dumps(values)[1:-1]
+
+    def envelope(self, fields: Dict[str, Any], key: str, fragments: List[bytes], count: int) -> bytes:
+        head = self.dumps(fields)[:-1]
+        separator = b", " if fields else b""
+        return head + separator + self.dumps(key) + b": [" + b", ".join(fragments) + b"]}"
+
+    def fragment_overhead(self) -> int:
+        return 2
+
+
+class OrjsonSerializer(Serializer):
+    name = "orjson"
+    native_datetime = True
+
+    def __init__(self) -> None:
+        self._options = _orjson.OPT_NAIVE_UTC | _orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> bytes:
+        return _orjson.dumps(obj, default=_iso, option=self._options)
+
+    def envelope(self, fields: Dict[str, Any], key: str, fragments: List[bytes], count: int) -> bytes:
+        head = self.dumps(fields)[:-1]
+        separator = b"," if fields else b""
+        return head + separator + self.dumps(key) + b":[" + b",".join(fragments) + b"]}"
+
+    def fragment_overhead(self) -> int:
+        return 1
+
+
+def _msgpack_header(count: int, fix: int, small: int, large: int) -> bytes:
+    if count < 16:
+        return bytes([fix | count])
+    if count < 0x10000:
+        return struct.pack(">BH", small, count)
+    return struct.pack(">BI", large, count)
+
+
+class MsgpackSerializer(Serializer):
+    name = "msgpack"
+    topic_suffix = "msgpack"
+
+    def dumps(self, obj: Any) -> bytes:
+        return _msgpack.packb(obj, default=_iso, use_bin_type=True)
+
+    def items(self, values: List[Any]) -> bytes:
+        return b"".join(self.dumps(value) for value in values)
+
+    def envelope(self, fields: Dict[str, Any], key: str, fragments: List[bytes], count: int) -> bytes:
+        body = b"".join(self.dumps(name) + self.dumps(value) for name, value in fields.items())
+        return (
+            _msgpack_header(len(fields) + 1, 0x80, 0xDE, 0xDF)
+            + body
+            + self.dumps(key)
+            + _msgpack_header(count, 0x90, 0xDC, 0xDD)
+            + b"".join(fragments)
+        )
+
+    def fragment_overhead(self) -> int:
+        return 0
+
+
+def get_serializer(name: str = "json") -> Serializer:
+    """Devolve o serializador pedido, com recurso ao ``json`` padrão."""
+
+    name = (name or "json").strip().lower()
+    if name == "msgpack":
+        if _msgpack is not None:
+            return MsgpackSerializer()
+        logger.warning("MQTT_SERIALIZER=msgpack mas o pacote msgpack não está instalado; usando JSON")
+        name = "json"
+    if name in {"json", "orjson"} and _orjson is not None:
+        return OrjsonSerializer()
+    if name not in {"json", "orjson", "stdlib"}:
+        logger.warning("Serializador MQTT desconhecido (%s); usando JSON", name)
+    return Serializer()
+
+
+def available_serializers() -> List[Serializer]:
+    serializers: List[Serializer] = [Serializer()]
+    if _orjson is not None:
+        serializers.append(OrjsonSerializer())
+    if _msgpack is not None:
+        serializers.append(MsgpackSerializer())
+    return serializers
+
+
+__all__ = ["Serializer", "available_serializers", "get_serializer"]
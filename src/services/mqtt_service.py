@@ -12,14 +12,14 @@ from __future__ import annotations
 
 import importlib
 import importlib.util
-import json
 import os
 import queue
 import threading
 import time
+import zlib
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 _PAHO_SPEC = importlib.util.find_spec("paho")
 _MQTT_SPEC = importlib.util.find_spec("paho.mqtt.client") if _PAHO_SPEC else None
@@ -30,31 +30,20 @@ else:  # pragma: no cover - fallback para tempo de execução
 
 mqtt = importlib.import_module("paho.mqtt.client") if _MQTT_SPEC else None
 MQTT_ERR_SUCCESS = getattr(mqtt, "MQTT_ERR_SUCCESS", 0)
+COMPRESSED_TOPIC_SUFFIX = "zlib"
 
+from src.services.mqtt_outbox import DiskOutbox
+from src.services.mqtt_serializers import get_serializer
+from src.services.sparkplug_encoding import NAMESPACE as SPARKPLUG_NAMESPACE
+from src.services.sparkplug_encoding import SparkplugEncoder
+from src.utils.env import env_bool, env_int
 from src.utils.logs import logger
 
 if TYPE_CHECKING:  # pragma: no cover - apenas para *type checkers*
-    from src.models.Alarms import Alarm, AlarmDefinition
+    from src.models.Alarms import Alarm, AlarmDefinition, AlarmStorm
     from src.models.PLCs import PLC
 
 
-def _env_bool(name: str, default: bool = False) -> bool:
-    raw = os.getenv(name)
-    if raw is None:
-        return default
-    return raw.strip().lower() in {"1", "true", "yes", "on"}
-
-
-def _env_int(name: str, default: int) -> int:
-    raw = os.getenv(name)
-    if raw is None:
-        return default
-    try:
-        return int(raw)
-    except ValueError:
-        return default
-
-
 @dataclass(frozen=True)
 class MqttSettings:
     enabled: bool
@@ -71,6 +60,28 @@ class MqttSettings:
     keepalive: int
     qos: int
     retain: bool
+    # Agregação de lotes de medições no *worker* (ver ``_collect_messages``).
+    batch_max_messages: int = 50
+    batch_max_wait_ms: int = 50
+    batch_max_bytes: int = 256 * 1024
+    # ``json`` (padrão) ou ``sparkplug`` (protobuf compacto com aliases).
+    encoding: str = "json"
+    # *Outbox* em disco (desativado quando ``outbox_dir`` é ``None``).
+    outbox_dir: Optional[str] = None
+    outbox_threshold: int = 5000
+    outbox_max_bytes: int = 512 * 1024 * 1024
+    outbox_segment_bytes: int = 16 * 1024 * 1024
+    # Mensagens/s na drenagem; deve superar o ritmo de publicação em regime.
+    outbox_drain_rate: float = 1000.0
+    # Publica também ``<base>/<plc_id>/<register_id>`` com ``retain=True``.
+    last_value_topics: bool = False
+    # ``json`` (orjson quando instalado), ``stdlib`` ou ``msgpack`` (publicado
+    # em ``<tópico>/msgpack``).
+    serializer: str = "json"
+    # Payloads a partir deste tamanho (bytes) seguem comprimidos com zlib em
+    # ``<tópico>/zlib``; 0 desativa.
+    compress_threshold: int = 0
+    compress_level: int = 6
 
 
 def load_mqtt_settings() -> MqttSettings:
@@ -78,38 +89,120 @@ def load_mqtt_settings() -> MqttSettings:
 
     client_id = os.getenv("MQTT_CLIENT_ID") or f"clp-tcc3-{os.getpid()}"
     return MqttSettings(
-        enabled=_env_bool("MQTT_ENABLED", default=False),
+        enabled=env_bool("MQTT_ENABLED", default=False),
         host=os.getenv("MQTT_HOST", "localhost"),
-        port=_env_int("MQTT_PORT", 1883),
+        port=env_int("MQTT_PORT", 1883),
         username=os.getenv("MQTT_USERNAME"),
         password=os.getenv("MQTT_PASSWORD"),
-        use_tls=_env_bool("MQTT_TLS", default=False),
+        use_tls=env_bool("MQTT_TLS", default=False),
         base_topic=os.getenv("MQTT_BASE_TOPIC", "clp_tcc3"),
         data_topic=os.getenv("MQTT_DATA_TOPIC", "telemetry/process"),
         alarm_topic=os.getenv("MQTT_ALARM_TOPIC", "telemetry/alarms"),
         status_topic=os.getenv("MQTT_STATUS_TOPIC", "telemetry/status"),
         client_id=client_id,
-        keepalive=_env_int("MQTT_KEEPALIVE", 60),
-        qos=_env_int("MQTT_QOS", 1),
-        retain=_env_bool("MQTT_RETAIN", default=False),
+        keepalive=env_int("MQTT_KEEPALIVE", 60),
+        qos=env_int("MQTT_QOS", 1),
+        retain=env_bool("MQTT_RETAIN", default=False),
+        batch_max_messages=max(env_int("MQTT_BATCH_MAX_MESSAGES", 50), 1),
+        batch_max_wait_ms=max(env_int("MQTT_BATCH_MAX_WAIT_MS", 50), 0),
+        batch_max_bytes=max(env_int("MQTT_BATCH_MAX_BYTES", 256 * 1024), 1024),
+        encoding=(os.getenv("MQTT_ENCODING") or "json").strip().lower(),
+        outbox_dir=os.getenv("MQTT_OUTBOX_DIR") or None,
+        outbox_threshold=max(env_int("MQTT_OUTBOX_THRESHOLD", 5000), 0),
+        outbox_max_bytes=max(env_int("MQTT_OUTBOX_MAX_MB", 512), 1) * 1024 * 1024,
+        outbox_segment_bytes=max(env_int("MQTT_OUTBOX_SEGMENT_MB", 16), 1) * 1024 * 1024,
+        outbox_drain_rate=float(max(env_int("MQTT_OUTBOX_DRAIN_RATE", 1000), 0)),
+        last_value_topics=env_bool("MQTT_LAST_VALUE_TOPICS", default=False),
+        serializer=os.getenv("MQTT_SERIALIZER", "json"),
+        compress_threshold=max(env_int("MQTT_COMPRESS_THRESHOLD", 0), 0),
+        compress_level=min(max(env_int("MQTT_COMPRESS_LEVEL", 6), 1), 9),
     )
 
 
+# Metadados de registrador usados no DBIRTH (nomes, unidade, protocolo).
+RegisterMetadata = Dict[str, Any]
+
+
+def _db_register_metadata(register_ids: List[int]) -> Dict[int, RegisterMetadata]:
+    """Nome/tag/endereço/unidade do registrador e nome/protocolo/tags do CLP."""
+
+    from sqlalchemy.orm import joinedload
+
+    from src.app.extensions import db
+    from src.models.Registers import Register
+
+    registers = (
+        db.session.query(Register)
+        .options(joinedload(Register.plc))
+        .filter(Register.id.in_(register_ids))
+        .all()
+    )
+    return {
+        register.id: {
+            "plc_name": getattr(register.plc, "name", None),
+            "protocol": getattr(register.plc, "protocol", None),
+            "plc_tags": MqttPublisherService._plc_tags(register.plc),
+            "register_name": register.name,
+            "register_tag": register.tag,
+            "register_address": register.address,
+            "unit": register.unit,
+        }
+        for register in registers
+    }
+
+
 class MqttPublisherService:
     """Gerencia a publicação assíncrona de mensagens em um broker MQTT."""
 
-    def __init__(self, settings: Optional[MqttSettings] = None):
+    def __init__(
+        self,
+        settings: Optional[MqttSettings] = None,
+        *,
+        client: Optional[MqttClient] = None,
+        metadata_lookup: Optional[Callable[[List[int]], Dict[int, RegisterMetadata]]] = None,
+    ):
+        """``client`` permite injetar um cliente compatível com o Paho (ex.: um
+        *broker* em processo nos testes e *benchmarks*); ``metadata_lookup``
+        substitui a consulta à base de dados dos metadados do DBIRTH."""
+
         self.settings = settings or load_mqtt_settings()
-        self._queue: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue(
-            maxsize=10000
-        )
-        self._client: Optional[MqttClient] = None
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=10000)
+        self._client: Optional[MqttClient] = client
         self._connected = False
         self._stop_event = threading.Event()
         self._worker: Optional[threading.Thread] = None
         self._lock = threading.Lock()
-        self._library_available = mqtt is not None
+        self._library_available = mqtt is not None or client is not None
         self._active = self.settings.enabled and self._library_available
+        self.packets_sent = 0
+        self._outbox: Optional[DiskOutbox] = None
+        self._drain_tokens = 0.0
+        self._drain_at = time.monotonic()
+        if self._active and self.settings.outbox_dir:
+            try:
+                self._outbox = DiskOutbox(
+                    self.settings.outbox_dir,
+                    segment_bytes=self.settings.outbox_segment_bytes,
+                    max_bytes=self.settings.outbox_max_bytes,
+                )
+            except OSError:
+                logger.exception(
+                    "Não foi possível abrir o outbox MQTT em %s", self.settings.outbox_dir
+                )
+        self._serializer = get_serializer(self.settings.serializer)
+        self._topic_cache: Dict[str, str] = {}
+        self._last_value_suffixes: Dict[Tuple[Any, Any], str] = {}
+        self._retained_suffixes: set = set()
+        self._last_values: Dict[Tuple[Any, Any], Tuple[Any, ...]] = {}
+        self._sparkplug: Optional[SparkplugEncoder] = None
+        self._metadata_lookup = metadata_lookup or _db_register_metadata
+        self._register_metadata: Dict[int, RegisterMetadata] = {}
+        if self.settings.encoding == "sparkplug":
+            self._sparkplug = SparkplugEncoder(self.settings.base_topic, self.settings.client_id)
+        elif self.settings.encoding != "json":
+            logger.warning(
+                "MQTT_ENCODING=%s desconhecido; usando JSON", self.settings.encoding
+            )
 
         if self.settings.enabled and not self._library_available:
             logger.warning(
@@ -123,17 +216,18 @@ class MqttPublisherService:
     # Ciclo de vida do cliente MQTT
     # ------------------------------------------------------------------
     def _initialise_client(self) -> None:
-        if mqtt is None:
-            self._active = False
-            return
-
-        self._client = mqtt.Client(client_id=self.settings.client_id, clean_session=True)
-        if self.settings.username:
-            self._client.username_pw_set(
-                username=self.settings.username, password=self.settings.password
-            )
-        if self.settings.use_tls:
-            self._client.tls_set()
+        if self._client is None:
+            if mqtt is None:
+                self._active = False
+                return
+
+            self._client = mqtt.Client(client_id=self.settings.client_id, clean_session=True)
+            if self.settings.username:
+                self._client.username_pw_set(
+                    username=self.settings.username, password=self.settings.password
+                )
+            if self.settings.use_tls:
+                self._client.tls_set()
 
         self._client.on_connect = self._on_connect
         self._client.on_disconnect = self._on_disconnect
@@ -143,6 +237,14 @@ class MqttPublisherService:
         )
         self._worker.start()
 
+    def _arm_sparkplug_will(self) -> None:
+        """Cada ligação usa um ``bdSeq`` novo, partilhado pelo NDEATH e pelo NBIRTH."""
+
+        if self._sparkplug is None or not hasattr(self._client, "will_set"):
+            return
+        death_topic, death_payload = self._sparkplug.begin_connection()
+        self._client.will_set(death_topic, payload=death_payload, qos=1, retain=False)
+
     def _on_connect(self, client: Any, userdata, flags, rc) -> None:  # noqa: D401
         """Callback padrão do Paho MQTT."""
 
@@ -154,6 +256,13 @@ class MqttPublisherService:
                 self.settings.client_id,
             )
             self._connected = True
+            if self._sparkplug is not None:
+                # Cada (re)conexão reinicia a sessão Sparkplug: o NBIRTH sai antes
+                # de qualquer mensagem em fila e os CLPs voltam a emitir DBIRTH.
+                try:
+                    self._publish_now(*self._sparkplug.node_birth())
+                except Exception:
+                    logger.exception("Erro ao publicar NBIRTH Sparkplug")
         else:
             logger.error("Conexão MQTT retornou código %s", rc)
             self._connected = False
@@ -173,6 +282,7 @@ class MqttPublisherService:
         while not self._stop_event.is_set():
             if not self._connected:
                 try:
+                    self._arm_sparkplug_will()
                     self._client.connect(
                         host=self.settings.host,
                         port=self.settings.port,
@@ -190,19 +300,175 @@ class MqttPublisherService:
                     backoff = min(backoff * 2, 60.0)
                     continue
 
+            # Com *outbox* pendente a fila em memória (mais antiga) sai primeiro e
+            # só depois o disco é drenado, preservando a ordem de publicação.
+            backlog = self._outbox is not None and len(self._outbox) > 0
             try:
-                topic_suffix, payload = self._queue.get(timeout=0.5)
+                item = self._queue.get_nowait() if backlog else self._queue.get(timeout=0.5)
             except queue.Empty:
+                if backlog:
+                    try:
+                        self._drain_outbox()
+                    except Exception:
+                        logger.exception("Erro ao drenar outbox MQTT; tentativa será repetida")
+                        self._reset_connection()
+                        time.sleep(backoff)
+                        backoff = min(backoff * 2, 60.0)
                 continue
 
+            messages = self._collect_messages(item)
+            for index, (topic_suffix, payload) in enumerate(messages):
+                try:
+                    self._publish_now(topic_suffix, payload)
+                except Exception:
+                    logger.exception("Erro ao publicar mensagem MQTT; tentativa será repetida")
+                    for pending in messages[index:]:
+                        self._safe_requeue(*pending)
+                    self._reset_connection()
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 60.0)
+                    break
+
+    # ------------------------------------------------------------------
+    # Outbox em disco
+    # ------------------------------------------------------------------
+    def _should_spill(self) -> bool:
+        if self._outbox is None:
+            return False
+        return (
+            not self._connected
+            or len(self._outbox) > 0
+            or self._queue.qsize() >= self.settings.outbox_threshold
+        )
+
+    def _drain_outbox(self, max_records: int = 100) -> int:
+        """Publica mensagens do *outbox* respeitando ``outbox_drain_rate``."""
+
+        if self._outbox is None or not self._connected:
+            return 0
+        rate = self.settings.outbox_drain_rate
+        limit = max_records
+        if rate > 0:
+            now = time.monotonic()
+            self._drain_tokens = min(rate, self._drain_tokens + (now - self._drain_at) * rate)
+            self._drain_at = now
+            if self._drain_tokens < 1:
+                time.sleep((1 - self._drain_tokens) / rate)
+                return 0
+            limit = min(limit, int(self._drain_tokens))
+
+        sent = 0
+        position: Optional[Tuple[int, int]] = None
+        try:
+            for topic, payload, retain, segment, offset in self._outbox.read(limit):
+                self._publish_now(topic, payload, retain=retain)
+                sent += 1
+                position = (segment, offset)
+        finally:
+            if position is not None:
+                self._outbox.commit(*position, sent)
+            if rate > 0:
+                self._drain_tokens -= sent
+        if sent and not len(self._outbox):
+            logger.info("Outbox MQTT drenado; publicação retomou a fila em memória")
+        return sent
+
+    def outbox_metrics(self) -> Dict[str, Any]:
+        """Tamanho, idade da mensagem mais antiga e descartes do *outbox*."""
+
+        if self._outbox is None:
+            return {}
+        return self._outbox.metrics()
+
+    # ------------------------------------------------------------------
+    # Agregação de lotes
+    # ------------------------------------------------------------------
+    def _is_measurement_batch(self, topic_suffix: str, payload: Any) -> bool:
+        return (
+            topic_suffix == self.settings.data_topic
+            and isinstance(payload, dict)
+            and payload.get("type") == "measurement_batch"
+        )
+
+    def _collect_messages(self, item: Tuple[str, Any]) -> List[Tuple[str, Any]]:
+        """Agrega lotes de medições consecutivos da fila numa única mensagem.
+
+        Drena até ``batch_max_messages`` lotes ou espera no máximo
+        ``batch_max_wait_ms``.  Um item de outro tipo encerra a drenagem e é
+        publicado a seguir, preservando a ordem da fila.
+        """
+
+        topic_suffix, payload = item
+        max_messages = self.settings.batch_max_messages
+        if max_messages <= 1 or not self._is_measurement_batch(topic_suffix, payload):
+            return [item]
+
+        batches = [payload]
+        trailing: Optional[Tuple[str, Any]] = None
+        deadline = time.monotonic() + self.settings.batch_max_wait_ms / 1000.0
+        while len(batches) < max_messages:
+            remaining = deadline - time.monotonic()
             try:
-                self._publish_now(topic_suffix, payload)
-            except Exception:
-                logger.exception("Erro ao publicar mensagem MQTT; tentativa será repetida")
-                self._safe_requeue(topic_suffix, payload)
-                self._reset_connection()
-                time.sleep(backoff)
-                backoff = min(backoff * 2, 60.0)
+                if remaining > 0:
+                    following = self._queue.get(timeout=remaining)
+                else:
+                    following = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_measurement_batch(*following):
+                batches.append(following[1])
+            else:
+                trailing = following
+                break
+
+        if len(batches) == 1:
+            messages = [item]
+        else:
+            messages = [
+                (topic_suffix, encoded)
+                for encoded in self._merge_measurement_batches(batches)
+            ]
+        if trailing is not None:
+            messages.append(trailing)
+        return messages
+
+    def _merge_measurement_batches(self, batches: List[Dict[str, Any]]) -> List[bytes]:
+        """Junta os lotes em ``measurement_batch`` limitados a ``batch_max_bytes``.
+
+        Cada lote de origem é serializado uma única vez e os fragmentos são
+        concatenados; um lote maior que o limite segue sozinho.
+        """
+
+        serializer = self._serializer
+        fields = {
+            "type": "measurement_batch",
+            "sent_at": self._now_iso(),
+            "source": self.settings.client_id,
+        }
+        # Margem de 4 bytes para o cabeçalho de lista do msgpack crescer.
+        overhead = len(serializer.envelope(fields, "measurements", [], 0)) + 4
+        budget = self.settings.batch_max_bytes - overhead
+        separator = serializer.fragment_overhead()
+
+        merged: List[bytes] = []
+        fragments: List[bytes] = []
+        size = count = 0
+        for batch in batches:
+            measurements = batch.get("measurements") or []
+            if not measurements:
+                continue
+            fragment = serializer.items(measurements)
+            extra = len(fragment) + (separator if fragments else 0)
+            if fragments and size + extra > budget:
+                merged.append(serializer.envelope(fields, "measurements", fragments, count))
+                fragments, size, count = [], 0, 0
+                extra = len(fragment)
+            fragments.append(fragment)
+            size += extra
+            count += len(measurements)
+        if fragments:
+            merged.append(serializer.envelope(fields, "measurements", fragments, count))
+        return merged
 
     def _reset_connection(self) -> None:
         if not self._client:
@@ -229,6 +495,8 @@ class MqttPublisherService:
                 logger.exception("Erro ao encerrar cliente MQTT")
         if self._worker and self._worker.is_alive():
             self._worker.join(timeout=2.0)
+        if self._outbox is not None:
+            self._outbox.close()
 
     # ------------------------------------------------------------------
     # Publicação de alto nível
@@ -237,12 +505,17 @@ class MqttPublisherService:
         if not self._active:
             return
 
-        prepared: List[Dict[str, Any]] = []
-        for measurement in measurements:
-            if not measurement:
-                continue
-            prepared.append(self._prepare_measurement(measurement))
+        measurements = [measurement for measurement in measurements if measurement]
+        if self.settings.last_value_topics:
+            self._publish_last_values(measurements)
 
+        if self._sparkplug is not None:
+            self._describe_registers(measurements)
+            for topic, payload in self._sparkplug.encode_measurements(measurements):
+                self._enqueue(topic, payload)
+            return
+
+        prepared = [self._prepare_measurement(measurement) for measurement in measurements]
         if not prepared:
             return
 
@@ -291,6 +564,31 @@ class MqttPublisherService:
         }
         self._enqueue(self.settings.alarm_topic, payload)
 
+    def publish_storm_event(self, storm: "AlarmStorm", *, state: str) -> None:
+        if not self._active or storm is None:
+            return
+
+        payload = {
+            "type": "alarm_storm_event",
+            "sent_at": self._now_iso(),
+            "source": self.settings.client_id,
+            "state": state,
+            "storm": {
+                "id": getattr(storm, "id", None),
+                "rule": getattr(storm, "rule_name", None),
+                "scope": getattr(storm, "scope", None),
+                "scope_key": getattr(storm, "scope_key", None),
+                "plc_id": getattr(storm, "plc_id", None),
+                "vlan_id": getattr(storm, "vlan_id", None),
+                "priority": getattr(storm, "priority", None),
+                "message": getattr(storm, "message", None),
+                "alarm_count": getattr(storm, "alarm_count", None),
+                "started_at": self._to_iso(getattr(storm, "started_at", None)),
+                "ended_at": self._to_iso(getattr(storm, "ended_at", None)),
+            },
+        }
+        self._enqueue(self.settings.alarm_topic, payload)
+
     def publish_connectivity_event(self, plc: "PLC", state: str) -> None:
         if not self._active or plc is None:
             return
@@ -325,7 +623,7 @@ class MqttPublisherService:
             "register_tag": measurement.get("register_tag"),
             "register_address": measurement.get("register_address"),
             "poll_rate": measurement.get("poll_rate"),
-            "timestamp": self._to_iso(measurement.get("timestamp")),
+            "timestamp": self._timestamp(measurement.get("timestamp")),
             "raw_value": measurement.get("raw_value"),
             "value_float": measurement.get("value_float"),
             "value_int": measurement.get("value_int"),
@@ -334,10 +632,95 @@ class MqttPublisherService:
             "is_alarm": measurement.get("is_alarm", False),
         }
 
+    def _describe_registers(self, measurements: List[Dict[str, Any]]) -> None:
+        """Completa com nomes e unidades as medições ainda sem DBIRTH descritivo.
+
+        O processador só envia ids; os metadados vêm de ``metadata_lookup``
+        uma vez por registrador e ficam em *cache*.
+        """
+
+        pending = [
+            measurement
+            for measurement in measurements
+            if measurement.get("plc_id") is not None
+            and measurement.get("register_id") is not None
+            and not self._sparkplug.describes(measurement["plc_id"], measurement["register_id"])
+        ]
+        if not pending:
+            return
+
+        missing = sorted(
+            {int(item["register_id"]) for item in pending} - self._register_metadata.keys()
+        )
+        if missing:
+            try:
+                found = self._metadata_lookup(missing)
+            except Exception:
+                logger.exception("Erro ao carregar metadados dos registradores para o DBIRTH")
+                return
+            for register_id in missing:
+                self._register_metadata[register_id] = found.get(register_id) or {}
+
+        for measurement in pending:
+            for key, value in self._register_metadata[int(measurement["register_id"])].items():
+                if measurement.get(key) is None:
+                    measurement[key] = value
+
+    def _publish_last_values(self, measurements: List[Dict[str, Any]]) -> None:
+        """Publica o último valor de cada registrador num tópico retido próprio.
+
+        Só publica quando o valor ou a qualidade mudam; o sufixo do tópico é
+        construído uma única vez por registrador.
+        """
+
+        for measurement in measurements:
+            key = (measurement.get("plc_id"), measurement.get("register_id"))
+            if key[0] is None or key[1] is None:
+                continue
+            signature = (
+                measurement.get("value_float"),
+                measurement.get("value_int"),
+                measurement.get("raw_value"),
+                measurement.get("quality"),
+            )
+            if self._last_values.get(key) == signature:
+                continue
+            self._last_values[key] = signature
+
+            suffix = self._last_value_suffixes.get(key)
+            if suffix is None:
+                suffix = self._last_value_suffixes[key] = f"{key[0]}/{key[1]}"
+                self._retained_suffixes.add(suffix)
+            self._enqueue(
+                suffix,
+                {
+                    "value": signature[0] if signature[0] is not None else signature[1],
+                    "raw_value": signature[2],
+                    "quality": signature[3],
+                    "unit": measurement.get("unit"),
+                    "timestamp": self._to_iso(measurement.get("timestamp")),
+                },
+            )
+
     def _enqueue(self, topic_suffix: str, payload: Dict[str, Any]) -> None:
         if not self._active:
             return
 
+        if self._should_spill():
+            try:
+                if not len(self._outbox):
+                    logger.warning(
+                        "Broker MQTT indisponível ou fila cheia; mensagens desviadas para o outbox em disco"
+                    )
+                self._outbox.append(
+                    topic_suffix,
+                    self._encode(payload),
+                    retain=topic_suffix in self._retained_suffixes,
+                )
+                return
+            except OSError:
+                logger.exception("Erro ao gravar no outbox MQTT; usando a fila em memória")
+
         item = (topic_suffix, payload)
         try:
             self._queue.put_nowait(item)
@@ -351,45 +734,68 @@ class MqttPublisherService:
                 pass
             self._queue.put_nowait(item)
 
-    def _safe_requeue(self, topic_suffix: str, payload: Dict[str, Any]) -> None:
+    def _safe_requeue(self, topic_suffix: str, payload: Any) -> None:
         try:
             self._queue.put_nowait((topic_suffix, payload))
         except queue.Full:
             logger.warning("Fila MQTT cheia; mensagem descartada após falha de publicação")
 
-    def _publish_now(self, topic_suffix: str, payload: Dict[str, Any]) -> None:
-        if not self._active or self._client is None or mqtt is None:
+    def _publish_now(self, topic_suffix: str, payload: Any, *, retain: bool = False) -> None:
+        if not self._active or self._client is None:
             return
         if not self._connected:
             raise RuntimeError("Cliente MQTT não está conectado")
 
-        topic = self._build_topic(topic_suffix)
-        payload_str = json.dumps(payload, default=self._json_default)
+        if self._sparkplug is not None and topic_suffix.startswith(SPARKPLUG_NAMESPACE + "/"):
+            # ``seq`` e DBIRTH decididos agora, na sessão em que a mensagem sai.
+            topic_suffix, payload = self._sparkplug.stamp(topic_suffix, payload)
+        topic, payload_str = self._compress(self._build_topic(topic_suffix), self._encode(payload))
         result = self._client.publish(
             topic,
             payload=payload_str,
             qos=self.settings.qos,
-            retain=self.settings.retain,
+            retain=retain or self.settings.retain or topic_suffix in self._retained_suffixes,
         )
         if result.rc != MQTT_ERR_SUCCESS:
             raise RuntimeError(f"Publicação MQTT falhou com código {result.rc}")
+        self.packets_sent += 1
+
+    def _encode(self, payload: Any) -> Any:
+        if isinstance(payload, (str, bytes)):
+            return payload
+        return self._serializer.dumps(payload)
+
+    def _compress(self, topic: str, data: Any) -> Tuple[str, Any]:
+        """Comprime com zlib acima de ``compress_threshold`` e marca o tópico."""
+
+        threshold = self.settings.compress_threshold
+        if threshold <= 0 or len(data) < threshold or topic.startswith(SPARKPLUG_NAMESPACE + "/"):
+            return topic, data
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return f"{topic}/{COMPRESSED_TOPIC_SUFFIX}", zlib.compress(data, self.settings.compress_level)
 
     def _build_topic(self, suffix: str) -> str:
+        topic = self._topic_cache.get(suffix)
+        if topic is None:
+            topic = self._topic_cache[suffix] = self._join_topic(suffix)
+        return topic
+
+    def _join_topic(self, suffix: str) -> str:
+        if (suffix or "").startswith(SPARKPLUG_NAMESPACE + "/"):
+            return suffix
         base = (self.settings.base_topic or "").strip("/")
         suffix = (suffix or "").strip("/")
-        if base and suffix:
-            return f"{base}/{suffix}"
-        if base:
-            return base
-        return suffix
-
-    @staticmethod
-    def _json_default(value: Any) -> str:
-        if isinstance(value, datetime):
-            if value.tzinfo is None:
-                value = value.replace(tzinfo=timezone.utc)
-            return value.isoformat()
-        raise TypeError(f"Valor {value!r} não serializável em JSON")
+        topic = f"{base}/{suffix}" if base and suffix else base or suffix
+        if self._serializer.topic_suffix:
+            topic = f"{topic}/{self._serializer.topic_suffix}"
+        return topic
+
+    def _timestamp(self, value: Any) -> Any:
+        # orjson formata ``datetime`` em C; só os outros precisam de ISO prévio.
+        if self._serializer.native_datetime and isinstance(value, datetime):
+            return value
+        return self._to_iso(value)
 
     @staticmethod
     def _to_iso(value: Any) -> Optional[str]:
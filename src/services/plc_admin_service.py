@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from src.app import db
 from src.models.PLCs import PLC
 from src.repository.PLC_repository import PLCRepo
+from src.services.alarm_kpi_service import AlarmKpiService
 from src.utils.tags import parse_tags
 
 
@@ -116,3 +117,5 @@ def delete_plc(plc: PLC, *, session: Optional[Session] = None) -> None:
     repo = _get_repo(session)
     repo.session.delete(repo.session.merge(plc))
     repo.session.commit()
+    # Os alarmes associados são apagados em cascata: recalcula os KPIs.
+    AlarmKpiService(session=repo.session).rebuild()
@@ -0,0 +1,153 @@
+"""Política de agendamento do *polling*: intervalo efetivo por CLP e registrador.
+
+O intervalo configurado (``PLC.polling_interval`` / ``Register.poll_rate``) é
+só o ponto de partida:
+
+* CLPs *offline* recuam exponencialmente (com *jitter* estável por CLP para
+  não sincronizar as novas tentativas de vários CLPs mortos).  Depois de
+  ``retry_count`` ciclos sem resposta o intervalo dobra a cada duplicação do
+  tempo *offline*, até ``max_interval_ms``;
+* registradores com erros repetidos (``Register.error_count`` acima de
+  ``PLC.retry_count``) recuam da mesma forma;
+* a classe de prioridade do registrador (maior prioridade entre as suas
+  definições de alarme ativas) encurta o intervalo;
+* registradores com alarme ativo recebem ``alarm_boost``.
+
+O resultado vai para a configuração do poller
+(:func:`~src.services.poller_config_service.build_poller_config`) e para a
+página de controlo do *polling*.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from src.utils.env import env_float
+
+PRIORITY_CLASSES = ("critical", "high", "normal")
+# Posição em PRIORITY_CLASSES para cada prioridade de AlarmDefinition.
+PRIORITY_RANKS = {"CRITICAL": 0, "HIGH": 1}
+NORMAL_RANK = 2
+
+
+@dataclass(frozen=True)
+class SchedulePolicySettings:
+    backoff_base: float = 2.0
+    max_interval_ms: int = 300_000
+    min_interval_ms: int = 100
+    jitter: float = 0.2
+    alarm_boost: float = 0.5
+    critical_factor: float = 0.5
+    high_factor: float = 0.75
+    refresh_seconds: float = 30.0
+
+
+def load_schedule_settings() -> SchedulePolicySettings:
+    """Lê as variáveis de ambiente ``POLL_SCHEDULE_*``."""
+
+    return SchedulePolicySettings(
+        backoff_base=max(env_float("POLL_SCHEDULE_BACKOFF_BASE", 2.0), 1.0),
+        max_interval_ms=int(max(env_float("POLL_SCHEDULE_MAX_INTERVAL_MS", 300_000), 1)),
+        min_interval_ms=int(max(env_float("POLL_SCHEDULE_MIN_INTERVAL_MS", 100), 1)),
+        jitter=min(max(env_float("POLL_SCHEDULE_JITTER", 0.2), 0.0), 0.9),
+        alarm_boost=min(max(env_float("POLL_SCHEDULE_ALARM_BOOST", 0.5), 0.01), 1.0),
+        critical_factor=min(max(env_float("POLL_SCHEDULE_CRITICAL_FACTOR", 0.5), 0.01), 1.0),
+        high_factor=min(max(env_float("POLL_SCHEDULE_HIGH_FACTOR", 0.75), 0.01), 1.0),
+        refresh_seconds=max(env_float("POLL_SCHEDULE_REFRESH_SECONDS", 30.0), 0.0),
+    )
+
+
+def priority_class(rank: Optional[int]) -> str:
+    if rank is None or rank < 0 or rank >= len(PRIORITY_CLASSES):
+        return "normal"
+    return PRIORITY_CLASSES[rank]
+
+
+def _as_utc(moment: datetime) -> datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class SchedulePolicy:
+    """Calcula intervalos efetivos (em ms) a partir do estado gravado."""
+
+    def __init__(self, settings: Optional[SchedulePolicySettings] = None) -> None:
+        self.settings = settings or load_schedule_settings()
+
+    def _clamp(self, interval: float) -> int:
+        return int(min(max(interval, self.settings.min_interval_ms), self.settings.max_interval_ms))
+
+    def _steps(self, ratio: float) -> int:
+        if ratio <= 1.0 or self.settings.backoff_base <= 1.0:
+            return 0
+        return int(math.log(ratio, self.settings.backoff_base))
+
+    def plc_interval(
+        self,
+        plc_id: int,
+        base_ms: int,
+        *,
+        online: Optional[bool],
+        offline_since: Optional[datetime] = None,
+        retry_count: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> Tuple[int, int]:
+        """Devolve ``(intervalo_ms, passo_de_backoff)`` do CLP.
+
+        O passo só muda quando o tempo *offline* duplica, pelo que a
+        configuração enviada ao poller não varia a cada reconstrução.
+        """
+
+        if online is not False or offline_since is None:
+            return self._clamp(base_ms), 0
+
+        now = now or datetime.now(timezone.utc)
+        offline_ms = max((now - _as_utc(offline_since)).total_seconds() * 1000.0, 0.0)
+        grace = base_ms * max(retry_count or 1, 1)
+        steps = self._steps(1.0 + offline_ms / grace)
+        if steps == 0:
+            return self._clamp(base_ms), 0
+
+        interval = base_ms * self.settings.backoff_base ** steps
+        jitter = random.Random(plc_id).uniform(-self.settings.jitter, self.settings.jitter)
+        return self._clamp(interval * (1.0 + jitter)), steps
+
+    def register_interval(
+        self,
+        base_ms: int,
+        *,
+        plc_interval_ms: int,
+        plc_backoff: bool = False,
+        priority: str = "normal",
+        alarmed: bool = False,
+        error_count: Optional[int] = None,
+        retry_count: Optional[int] = None,
+    ) -> int:
+        interval = float(base_ms)
+        if priority == "critical":
+            interval *= self.settings.critical_factor
+        elif priority == "high":
+            interval *= self.settings.high_factor
+        if alarmed:
+            interval *= self.settings.alarm_boost
+
+        retries = max(retry_count or 1, 1)
+        if error_count and error_count > retries:
+            interval *= self.settings.backoff_base ** self._steps(error_count / retries)
+
+        if plc_backoff:
+            interval = max(interval, plc_interval_ms)
+        return self._clamp(interval)
+
+
+__all__ = [
+    "PRIORITY_CLASSES",
+    "PRIORITY_RANKS",
+    "SchedulePolicy",
+    "SchedulePolicySettings",
+    "load_schedule_settings",
+    "priority_class",
+]
@@ -0,0 +1,286 @@
+"""Configuração do poller Go: construção numa só consulta e *deltas* versionados.
+
+:func:`build_poller_config` lê CLPs e registradores ativos com um único
+``SELECT ... LEFT JOIN`` (apenas colunas, sem carregar objetos ORM).
+:class:`PollerConfigState` guarda a última configuração aceite pelo poller e
+a sua versão; :meth:`PollerConfigState.diff` devolve só o que mudou
+(CLPs/registradores adicionados, removidos e alterados), para que uma edição
+no painel não obrigue a reenviar a planta inteira.
+
+O intervalo efetivo de cada CLP/registrador vem da
+:class:`~src.services.poll_scheduler.SchedulePolicy`.  Cada CLP leva também
+o seu ``read_plan`` (leituras em bloco calculadas por
+:func:`~src.services.read_planner.plan_reads`); como é um campo do CLP, uma
+mudança no plano chega ao poller como CLP alterado.
+
+Formato do *delta*::
+
+    {
+        "base_version": 7,
+        "version": 8,
+        "plcs": {"added": [<plc com registers>], "removed": [3], "changed": [<plc sem registers>]},
+        "registers": {
+            "added": [{"plc_id": 1, ...}],
+            "removed": [{"plc_id": 1, "id": 10}],
+            "changed": [{"plc_id": 1, ...}],
+        },
+    }
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, case, exists, func, select
+
+from src.app.extensions import db
+from src.models.Alarms import Alarm, AlarmDefinition
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.poll_scheduler import NORMAL_RANK, PRIORITY_RANKS, SchedulePolicy, priority_class
+from src.services.read_planner import ReadPlanSettings, load_read_plan_settings, plan_reads
+
+DEFAULT_POLLING_INTERVAL = 1000
+
+_PRIORITY_RANK = case(
+    *((AlarmDefinition.priority == name, rank) for name, rank in PRIORITY_RANKS.items()),
+    else_=NORMAL_RANK,
+)
+
+_COLUMNS = (
+    PLC.id.label("plc_id"),
+    PLC.name.label("plc_name"),
+    PLC.ip_address,
+    PLC.vlan_id,
+    PLC.protocol,
+    PLC.port,
+    PLC.unit_id,
+    PLC.rack_slot,
+    PLC.timeout,
+    PLC.polling_interval,
+    PLC.is_online,
+    PLC.status_changed_at,
+    PLC.retry_count,
+    Register.id.label("register_id"),
+    Register.name.label("register_name"),
+    Register.address,
+    Register.poll_rate,
+    Register.unit,
+    Register.normalized_address,
+    Register.data_type,
+    Register.length,
+    Register.error_count,
+    # Subconsultas correlacionadas: continuam a ser um único SELECT.
+    select(func.min(_PRIORITY_RANK))
+    .where(AlarmDefinition.register_id == Register.id, AlarmDefinition.is_active.is_(True))
+    .correlate(Register)
+    .scalar_subquery()
+    .label("priority_rank"),
+    exists()
+    .where(Alarm.register_id == Register.id, Alarm.state == "ACTIVE")
+    .correlate(Register)
+    .label("alarmed"),
+)
+
+
+def build_poller_config(
+    session=None,
+    *,
+    plan_settings: Optional[ReadPlanSettings] = None,
+    policy: Optional[SchedulePolicy] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Configuração completa do poller (``{"plcs": [...]}``) numa só consulta.
+
+    Cada CLP leva ``effective_interval``/``backoff_step`` e cada registrador
+    ``effective_interval``/``priority``/``alarmed`` calculados pela
+    :class:`~src.services.poll_scheduler.SchedulePolicy`; o plano de leituras
+    agrupa os registradores pelo intervalo efetivo.
+    """
+
+    session = session or db.session
+    plan_settings = plan_settings or load_read_plan_settings()
+    policy = policy or SchedulePolicy()
+    now = now or datetime.now(timezone.utc)
+    rows = (
+        session.query(*_COLUMNS)
+        .outerjoin(Register, and_(Register.plc_id == PLC.id, Register.is_active.is_(True)))
+        .filter(PLC.is_active.is_(True))
+        .order_by(PLC.id, Register.id)
+        .all()
+    )
+
+    plcs: List[Dict[str, Any]] = []
+    planning: List[List[Dict[str, Any]]] = []
+    current: Optional[Dict[str, Any]] = None
+    for row in rows:
+        if current is None or current["id"] != row.plc_id:
+            interval = row.polling_interval or DEFAULT_POLLING_INTERVAL
+            effective, step = policy.plc_interval(
+                row.plc_id,
+                interval,
+                online=row.is_online,
+                offline_since=row.status_changed_at,
+                retry_count=row.retry_count,
+                now=now,
+            )
+            current = {
+                "id": row.plc_id,
+                "name": row.plc_name,
+                "ip_address": row.ip_address,
+                "vlan_id": row.vlan_id,
+                "protocol": row.protocol,
+                "port": row.port,
+                "unit_id": row.unit_id,
+                "rack_slot": row.rack_slot,
+                "timeout": row.timeout,
+                "polling_interval": interval,
+                "effective_interval": effective,
+                "backoff_step": step,
+                "registers": [],
+            }
+            plcs.append(current)
+            planning.append([])
+        if row.register_id is None:
+            continue
+
+        priority = priority_class(row.priority_rank)
+        register = {
+            "id": row.register_id,
+            "name": row.register_name,
+            "address": row.address,
+            "poll_rate": row.poll_rate or row.polling_interval,
+            "unit": row.unit or "",
+            "data_type": row.data_type,
+            "priority": priority,
+            "alarmed": bool(row.alarmed),
+        }
+        register["effective_interval"] = policy.register_interval(
+            register["poll_rate"] or current["polling_interval"],
+            plc_interval_ms=current["effective_interval"],
+            plc_backoff=current["backoff_step"] > 0,
+            priority=priority,
+            alarmed=register["alarmed"],
+            error_count=row.error_count,
+            retry_count=row.retry_count,
+        )
+        current["registers"].append(register)
+        planning[-1].append(
+            {
+                **register,
+                "poll_rate": register["effective_interval"],
+                "normalized_address": row.normalized_address,
+                "length": row.length,
+            }
+        )
+
+    for plc, registers in zip(plcs, planning):
+        plc["read_plan"] = plan_reads(plc["protocol"], registers, settings=plan_settings)
+    return {"plcs": plcs}
+
+
+def _index(config: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    indexed = {}
+    for plc in config.get("plcs", []):
+        fields = {key: value for key, value in plc.items() if key != "registers"}
+        registers = {register["id"]: register for register in plc.get("registers", [])}
+        indexed[plc["id"]] = {"fields": fields, "registers": registers}
+    return indexed
+
+
+def diff_configs(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Dict[str, list]]:
+    """Diferenças entre duas configurações completas."""
+
+    before, after = _index(old), _index(new)
+    plcs: Dict[str, list] = {"added": [], "removed": [], "changed": []}
+    registers: Dict[str, list] = {"added": [], "removed": [], "changed": []}
+
+    for plc_id in sorted(before.keys() - after.keys()):
+        plcs["removed"].append(plc_id)
+
+    for plc_id, entry in after.items():
+        previous = before.get(plc_id)
+        if previous is None:
+            plcs["added"].append({**entry["fields"], "registers": list(entry["registers"].values())})
+            continue
+        if previous["fields"] != entry["fields"]:
+            plcs["changed"].append(entry["fields"])
+
+        old_regs, new_regs = previous["registers"], entry["registers"]
+        for reg_id in sorted(old_regs.keys() - new_regs.keys()):
+            registers["removed"].append({"plc_id": plc_id, "id": reg_id})
+        for reg_id, register in new_regs.items():
+            if reg_id not in old_regs:
+                registers["added"].append({"plc_id": plc_id, **register})
+            elif old_regs[reg_id] != register:
+                registers["changed"].append({"plc_id": plc_id, **register})
+
+    return {"plcs": plcs, "registers": registers}
+
+
+def delta_is_empty(delta: Dict[str, Any]) -> bool:
+    return not any(
+        delta[section][kind] for section in ("plcs", "registers") for kind in ("added", "removed", "changed")
+    )
+
+
+class PollerConfigState:
+    """Última configuração confirmada pelo poller e respetiva versão."""
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._config: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._config
+
+    def full(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Configuração completa com o número da próxima versão."""
+
+        with self._lock:
+            return {**config, "version": self.version + 1}
+
+    def diff(self, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """*Delta* para ``config`` ou ``None`` se nada mudou.
+
+        Sem configuração de base também devolve ``None``: é preciso um envio
+        completo (:meth:`full`).
+        """
+
+        with self._lock:
+            if self._config is None:
+                return None
+            changes = diff_configs(self._config, config)
+            if delta_is_empty(changes):
+                return None
+            return {"base_version": self.version, "version": self.version + 1, **changes}
+
+    def needs_full(self) -> bool:
+        with self._lock:
+            return self._config is None
+
+    def commit(self, config: Dict[str, Any], version: int) -> None:
+        """Regista ``config`` como aceite pelo poller na ``version`` indicada."""
+
+        snapshot = copy.deepcopy({key: value for key, value in config.items() if key != "version"})
+        with self._lock:
+            self._config = snapshot
+            self.version = version
+
+    def reset(self) -> None:
+        with self._lock:
+            self._config = None
+
+
+__all__ = [
+    "PollerConfigState",
+    "build_poller_config",
+    "delta_is_empty",
+    "diff_configs",
+]
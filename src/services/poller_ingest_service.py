@@ -12,6 +12,12 @@ from src.repository.Data_repository import DataLogRepo
 from src.repository.PLC_repository import PLCRepo
 from src.repository.Registers_repository import RegisterRepo
 from src.services.Alarms_service import AlarmService
+from src.services.connectivity_service import (
+    ConnectivityTracker,
+    apply_transition,
+    get_connectivity_tracker,
+    publish_transition,
+)
 
 
 class PollerIngestError(Exception):
@@ -75,7 +81,11 @@ def _log_exception(logger, message: str, *args: Any) -> None:
 
 
 def process_poller_payload(
-    payload: Dict[str, Any], *, session=None, logger=None
+    payload: Dict[str, Any],
+    *,
+    session=None,
+    logger=None,
+    tracker: Optional[ConnectivityTracker] = None,
 ) -> Dict[str, Any]:
     """Persists a polling payload produced by the Go runtime.
 
@@ -88,6 +98,9 @@ def process_poller_payload(
     logger:
         Logger used for diagnostic messages. Falls back to ``current_app.logger`` when
         executed inside an application context.
+    tracker:
+        Connectivity tracker fed with the reading status. Defaults to the process-wide
+        tracker; ``plc.is_online`` only changes on the transitions it reports.
     """
 
     if not isinstance(payload, dict):
@@ -136,6 +149,8 @@ def process_poller_payload(
     tags = payload.get("tags")
     error_message = payload.get("error")
 
+    tracker = tracker or get_connectivity_tracker()
+    transition = None
     plc_repo = PLCRepo(session=session)
     register_repo = RegisterRepo(session=session)
     data_repo = DataLogRepo(session=session)
@@ -152,7 +167,9 @@ def process_poller_payload(
         )
 
     try:
-        is_alarm = alarm_service.check_and_handle(plc_id, register_id, value_float)
+        is_alarm = alarm_service.check_and_handle(
+            plc_id, register_id, value_float, timestamp=timestamp
+        )
     except Exception as exc:  # pragma: no cover - defensive logging
         _log_exception(
             logger, "Erro ao avaliar alarmes para plc=%s reg=%s", plc_id, register_id
@@ -184,24 +201,35 @@ def process_poller_payload(
             register.error_count = (register.error_count or 0) + 1
             register.last_error = error_message or status
 
-        is_online = status == "online"
-        if plc.is_online != is_online:
-            plc.is_online = is_online
-            plc.status_changed_at = timestamp
-        if is_online:
+        interval = (plc.polling_interval or 0) / 1000.0 or None
+        transition = tracker.observe(
+            plc.id,
+            status == "online",
+            timestamp,
+            interval=interval,
+            current=plc.is_online,
+        )
+        if transition is not None:
+            apply_transition(plc, transition)
+        if status == "online" and tracker.last_seen_due(plc.id, timestamp):
             plc.last_seen = timestamp
-        elif status in {"offline", "error"}:
-            plc.last_seen = None
 
         session.commit()
     except PollerIngestError:
         session.rollback()
+        if transition is not None:
+            tracker.discard(transition)
         raise
     except Exception as exc:
         session.rollback()
+        if transition is not None:
+            tracker.discard(transition)
         context = {"plc_id": plc_id, "register_id": register_id}
         raise PollerIngestProcessingError(context=context) from exc
 
+    if transition is not None:
+        publish_transition(plc, transition)
+
     return {"is_alarm": is_alarm, "data_log_id": getattr(data_entry, "id", None)}
 
 
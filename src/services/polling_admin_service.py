@@ -1,8 +1,9 @@
 """Funções de apoio para gerir o estado de polling via interface administrativa."""
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
+from src.services.poller_config_service import build_poller_config
 from src.services.settings_service import set_polling_enabled
 
 
@@ -10,3 +11,42 @@ def update_polling_state(enabled: bool, *, actor: Optional[str] = None) -> None:
     """Actualiza a flag de polling persistida com metadados de auditoria."""
 
     set_polling_enabled(enabled, actor=actor)
+
+
+def polling_schedule_overview(runtime=None) -> List[Dict[str, Any]]:
+    """Agenda efetiva por CLP para a página de controlo do polling.
+
+    Usa a configuração já aceite pelo poller quando existe; caso contrário
+    calcula-a a partir da base de dados.
+    """
+
+    config = None
+    manager = getattr(runtime, "manager", None)
+    state = getattr(manager, "config_state", None)
+    if state is not None:
+        config = state.config
+    if config is None:
+        config = build_poller_config()
+
+    overview = []
+    for plc in config.get("plcs", []):
+        registers = plc.get("registers", [])
+        intervals = [register.get("effective_interval") for register in registers]
+        intervals = [value for value in intervals if value]
+        overview.append(
+            {
+                "id": plc["id"],
+                "name": plc["name"],
+                "protocol": plc.get("protocol"),
+                "polling_interval": plc.get("polling_interval"),
+                "effective_interval": plc.get("effective_interval", plc.get("polling_interval")),
+                "backoff_step": plc.get("backoff_step", 0),
+                "registers": len(registers),
+                "critical": sum(1 for register in registers if register.get("priority") == "critical"),
+                "high": sum(1 for register in registers if register.get("priority") == "high"),
+                "alarmed": sum(1 for register in registers if register.get("alarmed")),
+                "fastest_register": min(intervals) if intervals else None,
+                "blocks": len(plc.get("read_plan", [])),
+            }
+        )
+    return overview
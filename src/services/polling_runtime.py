@@ -4,25 +4,34 @@ import asyncio
 import threading
 from dataclasses import dataclass, field
 from queue import Queue
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
 from flask import Flask
 
 from src.app.settings import get_app_settings
+from src.utils.logs import logger
 
 
 @dataclass
 class PollingRuntime:
-    """Guarda o estado partilhado do serviço de polling baseado em Go."""
+    """Guarda o estado partilhado do serviço de polling.
 
-    manager: "GoPollingManager"
-    data_queue: Queue[str]
+    ``manager`` é o poller Go (:class:`GoPollingManager`/:class:`PollerPool`)
+    ou o :class:`AsyncPollingEngine`; este último entrega as leituras
+    diretamente ao processador e não usa ``data_queue``.
+    """
+
+    manager: "GoPollingManager | PollerPool | AsyncPollingEngine"
+    data_queue: Optional[Queue[str]] = None
     loop: Optional[asyncio.AbstractEventLoop] = None
     trigger: Optional[asyncio.Event] = None
     consumer_thread: Optional[threading.Thread] = None
     consumer_stop_event: threading.Event = field(default_factory=threading.Event)
+    config_builder: Optional[Callable[[], Dict[str, Any]]] = None
+    push_delay: float = 0.5
     _enabled: bool = True
     _lock: threading.Lock = field(default_factory=threading.Lock)
+    _push_timer: Optional[threading.Timer] = None
 
     def is_enabled(self) -> bool:
         with self._lock:
@@ -38,6 +47,49 @@ class PollingRuntime:
                 self.loop.call_soon_threadsafe(self.trigger.set)
             except RuntimeError:
                 pass
+        self.schedule_config_push()
+
+    def schedule_config_push(self) -> None:
+        """Agenda o envio da configuração ao poller, agrupando edições seguidas."""
+
+        if self.config_builder is None:
+            return
+        with self._lock:
+            if self._push_timer is not None:
+                self._push_timer.cancel()
+            timer = threading.Timer(self.push_delay, self.push_config)
+            timer.daemon = True
+            self._push_timer = timer
+        timer.start()
+
+    def start_config_refresh(self, interval: float) -> Optional[threading.Thread]:
+        """Reenvia a configuração a cada ``interval`` segundos.
+
+        O *backoff* dos CLPs offline depende do tempo decorrido, por isso a
+        agenda tem de ser recalculada mesmo sem edições no painel.
+        """
+
+        if self.config_builder is None or interval <= 0:
+            return None
+
+        def _refresh() -> None:
+            while not self.consumer_stop_event.wait(interval):
+                self.push_config()
+
+        thread = threading.Thread(target=_refresh, name="poller-config-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def push_config(self) -> Optional[str]:
+        """Reconstrói a configuração e envia ao poller apenas o que mudou."""
+
+        if self.config_builder is None:
+            return None
+        try:
+            return self.manager.apply_config(self.config_builder())
+        except Exception:
+            logger.exception("Falha ao sincronizar configuração com o poller.")
+            return None
 
     def ensure_trigger(self) -> asyncio.Event:
         if not self.trigger:
@@ -0,0 +1,224 @@
+"""Planeamento de leituras em bloco para o poller.
+
+Ler registrador a registrador custa um pedido de protocolo por registrador e
+por ciclo.  :func:`plan_reads` usa o ``normalized_address`` calculado pelo
+:class:`~src.services.address_mapping.AddressMappingEngine` para agrupar os
+registradores de um CLP por ``poll_rate`` e área de memória (função Modbus,
+DB Siemens) em leituras contíguas, aceitando pequenos buracos e respeitando o
+tamanho máximo de PDU de cada protocolo.
+
+Cada bloco do plano tem o formato::
+
+    {
+        "poll_rate": 1000,
+        "area": "holding",         # coils | discrete | input | holding | db
+        "function": 3,             # só Modbus: código de função da leitura
+        "db": 1,                   # só S7
+        "start": 100,              # endereço normalizado (Modbus) ou byte (S7)
+        "count": 12,               # palavras/bits (Modbus) ou bytes (S7)
+        "registers": [{"id": 7, "offset": 0, "count": 2, "bit": None}],
+    }
+
+Registradores sem endereço reconhecido (ou de protocolos sem leitura em
+bloco) ficam fora do plano e continuam a ser lidos individualmente, tal como
+os que sozinhos excedem o PDU (``length`` grande: *strings*, *arrays*) — um
+registrador nunca é repartido por vários blocos.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.services.address_mapping import AddressMappingEngine
+from src.utils.env import env_int
+
+MODBUS_PROTOCOLS = {"modbus", "modbus-tcp", "modbus-rtu"}
+SIEMENS_PROTOCOLS = {"siemens", "s7"}
+
+# Prefixo do endereço (0xxxx, 1xxxx, 3xxxx, 4xxxx) -> (área, função de leitura, é bit)
+_MODBUS_AREAS = {
+    0: ("coils", 1, True),
+    1: ("discrete", 2, True),
+    3: ("input", 4, False),
+    4: ("holding", 3, False),
+}
+
+_MODBUS_WORDS = {
+    "float": 2,
+    "float32": 2,
+    "real": 2,
+    "int32": 2,
+    "uint32": 2,
+    "dint": 2,
+    "udint": 2,
+    "dword": 2,
+    "double": 4,
+    "float64": 4,
+    "lreal": 4,
+    "int64": 4,
+    "uint64": 4,
+    "lint": 4,
+}
+
+_S7_AREA_BYTES = {"DBX": 1, "DBB": 1, "DBW": 2, "DBD": 4}
+_S7_WIDE_TYPES = {"double", "float64", "lreal", "int64", "lint", "uint64"}
+
+
+@dataclass(frozen=True)
+class ReadPlanSettings:
+    modbus_max_registers: int = 125
+    modbus_max_bits: int = 2000
+    modbus_max_gap: int = 8
+    s7_max_bytes: int = 222
+    s7_max_gap: int = 16
+
+
+def load_read_plan_settings() -> ReadPlanSettings:
+    """Lê as variáveis de ambiente ``READ_PLAN_*``."""
+
+    return ReadPlanSettings(
+        modbus_max_registers=min(max(env_int("READ_PLAN_MODBUS_MAX_REGISTERS", 125), 1), 125),
+        modbus_max_bits=min(max(env_int("READ_PLAN_MODBUS_MAX_BITS", 2000), 1), 2000),
+        modbus_max_gap=max(env_int("READ_PLAN_MODBUS_MAX_GAP", 8), 0),
+        s7_max_bytes=max(env_int("READ_PLAN_S7_MAX_BYTES", 222), 1),
+        s7_max_gap=max(env_int("READ_PLAN_S7_MAX_GAP", 16), 0),
+    )
+
+
+@dataclass(frozen=True)
+class _Item:
+    register_id: int
+    start: int
+    count: int
+    bit: Optional[int] = None
+
+    @property
+    def end(self) -> int:
+        return self.start + self.count
+
+
+_engine = AddressMappingEngine()
+
+
+def _normalized(protocol: str, register: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    normalized = register.get("normalized_address")
+    if normalized:
+        return normalized
+    try:
+        return _engine.normalize(protocol, register.get("address") or "")
+    except ValueError:
+        return None
+
+
+def _modbus_item(register: Dict[str, Any], normalized: Dict[str, Any]) -> Optional[Tuple[tuple, _Item, int]]:
+    area = _MODBUS_AREAS.get(normalized.get("function"))
+    address = normalized.get("address")
+    if area is None or not isinstance(address, int):
+        return None
+    name, function, is_bit = area
+    if is_bit:
+        count = 1
+    else:
+        width = _MODBUS_WORDS.get(str(register.get("data_type") or "").lower(), 1)
+        count = max(width, register.get("length") or 1)
+    return (name, function), _Item(register["id"], address, count), 1 if is_bit else 0
+
+
+def _s7_item(register: Dict[str, Any], normalized: Dict[str, Any]) -> Optional[Tuple[tuple, _Item, int]]:
+    db, area, byte = normalized.get("db"), normalized.get("area"), normalized.get("byte")
+    if not isinstance(db, int) or not isinstance(byte, int) or area not in _S7_AREA_BYTES:
+        return None
+    size = _S7_AREA_BYTES[area]
+    if str(register.get("data_type") or "").lower() in _S7_WIDE_TYPES:
+        size = 8
+    # ``length`` em bytes nas *strings* e *arrays*, como as palavras no Modbus.
+    size = max(size, register.get("length") or 1)
+    bit = normalized.get("bit") if area == "DBX" else None
+    return ("db", db), _Item(register["id"], byte, size, bit), 2
+
+
+def _merge(items: List[_Item], max_span: int, max_gap: int) -> List[List[_Item]]:
+    blocks: List[List[_Item]] = []
+    start = end = 0
+    for item in sorted(items, key=lambda entry: (entry.start, entry.count)):
+        if blocks and item.start - end <= max_gap and max(end, item.end) - start <= max_span:
+            blocks[-1].append(item)
+            end = max(end, item.end)
+            continue
+        blocks.append([item])
+        start, end = item.start, item.end
+    return blocks
+
+
+def plan_reads(
+    protocol: Optional[str],
+    registers: Iterable[Dict[str, Any]],
+    *,
+    settings: Optional[ReadPlanSettings] = None,
+) -> List[Dict[str, Any]]:
+    """Plano de leituras em bloco para os registradores de um CLP.
+
+    ``registers`` são dicionários com ``id``, ``address``, ``poll_rate`` e,
+    opcionalmente, ``normalized_address``, ``data_type`` e ``length``.
+    """
+
+    key = (protocol or "").lower()
+    if key in MODBUS_PROTOCOLS:
+        build = _modbus_item
+    elif key in SIEMENS_PROTOCOLS:
+        build = _s7_item
+    else:
+        return []
+    settings = settings or load_read_plan_settings()
+
+    groups: Dict[tuple, List[_Item]] = {}
+    kinds: Dict[tuple, int] = {}
+    for register in registers:
+        normalized = _normalized(key, register)
+        if not normalized:
+            continue
+        built = build(register, normalized)
+        if built is None:
+            continue
+        area, item, kind = built
+        group = (register.get("poll_rate") or 0, *area)
+        groups.setdefault(group, []).append(item)
+        kinds[group] = kind
+
+    plan: List[Dict[str, Any]] = []
+    for group in sorted(groups):
+        kind = kinds[group]
+        if kind == 2:
+            max_span, max_gap = settings.s7_max_bytes, settings.s7_max_gap
+        elif kind == 1:
+            max_span, max_gap = settings.modbus_max_bits, settings.modbus_max_gap
+        else:
+            max_span, max_gap = settings.modbus_max_registers, settings.modbus_max_gap
+
+        poll_rate, area, area_id = group
+        items = [item for item in groups[group] if item.count <= max_span]
+        for block in _merge(items, max_span, max_gap):
+            start = block[0].start
+            entry: Dict[str, Any] = {"poll_rate": poll_rate, "area": area}
+            if kind == 2:
+                entry["db"] = area_id
+            else:
+                entry["function"] = area_id
+            entry.update(
+                start=start,
+                count=max(item.end for item in block) - start,
+                registers=[
+                    {"id": item.register_id, "offset": item.start - start, "count": item.count, "bit": item.bit}
+                    for item in block
+                ],
+            )
+            plan.append(entry)
+    return plan
+
+
+__all__ = [
+    "ReadPlanSettings",
+    "load_read_plan_settings",
+    "plan_reads",
+]
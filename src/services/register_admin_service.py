@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from src.app import db
 from src.models.Registers import Register
 from src.repository.Registers_repository import RegisterRepo
+from src.services.alarm_kpi_service import AlarmKpiService
 
 
 def _get_repo(session: Optional[Session]) -> RegisterRepo:
@@ -44,6 +45,8 @@ def delete_register(register: Register, *, session: Optional[Session] = None) ->
     repo = _get_repo(session)
     repo.session.delete(repo.session.merge(register))
     repo.session.commit()
+    # Os alarmes associados são apagados em cascata: recalcula os KPIs.
+    AlarmKpiService(session=repo.session).rebuild()
 
 
 _REGISTER_MUTABLE_FIELDS: Iterable[str] = (
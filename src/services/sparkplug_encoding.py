@@ -0,0 +1,467 @@
+"""Codificação compacta no estilo Sparkplug B para a publicação MQTT.
+
+Cada CLP é publicado como um *device* Sparkplug do nó SCADA:
+
+* ``spBv1.0/<grupo>/NBIRTH/<nó>`` anuncia o nó (com ``bdSeq``);
+* ``spBv1.0/<grupo>/DBIRTH/<nó>/<clp>`` traz nome, metadados e o *alias*
+  numérico de cada registrador;
+* ``spBv1.0/<grupo>/DDATA/<nó>/<clp>`` leva apenas ``(alias, epoch-ms, valor)``.
+
+O *payload* segue o esquema protobuf ``org.eclipse.tahu.protobuf.Payload``.
+Como só é preciso um subconjunto pequeno das mensagens, a codificação do
+formato *wire* é feita aqui directamente, sem código gerado pelo ``protoc``.
+"""
+
+from __future__ import annotations
+
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NAMESPACE = "spBv1.0"
+
+# Tipos de dados Sparkplug B (``DataType`` no .proto).
+INT64 = 4
+DOUBLE = 10
+BOOLEAN = 11
+STRING = 12
+
+# Números de campo: Payload
+_PAYLOAD_TIMESTAMP = 1
+_PAYLOAD_METRICS = 2
+_PAYLOAD_SEQ = 3
+# Números de campo: Metric
+_METRIC_NAME = 1
+_METRIC_ALIAS = 2
+_METRIC_TIMESTAMP = 3
+_METRIC_DATATYPE = 4
+_METRIC_IS_NULL = 7
+_METRIC_PROPERTIES = 9
+_METRIC_LONG = 11
+_METRIC_DOUBLE = 13
+_METRIC_BOOLEAN = 14
+_METRIC_STRING = 15
+# PropertySet / PropertyValue
+_PROPSET_KEYS = 1
+_PROPSET_VALUES = 2
+_PROPVALUE_TYPE = 1
+_PROPVALUE_STRING = 8
+
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH = 2
+
+
+# ----------------------------------------------------------------------
+# Formato wire do protobuf
+# ----------------------------------------------------------------------
+def _varint(value: int) -> bytes:
+    if value < 0:
+        value += 1 << 64
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _key(field_number: int, wire_type: int) -> bytes:
+    return _varint((field_number << 3) | wire_type)
+
+
+def _field_varint(field_number: int, value: int) -> bytes:
+    return _key(field_number, _VARINT) + _varint(int(value))
+
+
+def _field_bytes(field_number: int, value: bytes) -> bytes:
+    return _key(field_number, _LENGTH) + _varint(len(value)) + value
+
+
+def _field_string(field_number: int, value: str) -> bytes:
+    return _field_bytes(field_number, value.encode("utf-8"))
+
+
+def _field_double(field_number: int, value: float) -> bytes:
+    return _key(field_number, _FIXED64) + struct.pack("<d", float(value))
+
+
+@dataclass(frozen=True)
+class Metric:
+    alias: int
+    value: Any
+    timestamp_ms: Optional[int] = None
+    name: Optional[str] = None
+    datatype: Optional[int] = None
+    properties: Tuple[Tuple[str, str], ...] = ()
+
+
+def _datatype_for(value: Any) -> int:
+    if isinstance(value, bool):
+        return BOOLEAN
+    if isinstance(value, int):
+        return INT64
+    if isinstance(value, str):
+        return STRING
+    return DOUBLE
+
+
+def _encode_properties(properties: Iterable[Tuple[str, str]]) -> bytes:
+    body = bytearray()
+    values = bytearray()
+    for key, value in properties:
+        body += _field_string(_PROPSET_KEYS, key)
+        prop = _field_varint(_PROPVALUE_TYPE, STRING) + _field_string(_PROPVALUE_STRING, str(value))
+        values += _field_bytes(_PROPSET_VALUES, prop)
+    return bytes(body + values)
+
+
+def _encode_metric(metric: Metric) -> bytes:
+    datatype = metric.datatype or _datatype_for(metric.value)
+    out = bytearray()
+    if metric.name:
+        out += _field_string(_METRIC_NAME, metric.name)
+    out += _field_varint(_METRIC_ALIAS, metric.alias)
+    if metric.timestamp_ms is not None:
+        out += _field_varint(_METRIC_TIMESTAMP, metric.timestamp_ms)
+    out += _field_varint(_METRIC_DATATYPE, datatype)
+    if metric.properties:
+        out += _field_bytes(_METRIC_PROPERTIES, _encode_properties(metric.properties))
+    value = metric.value
+    if value is None:
+        out += _field_varint(_METRIC_IS_NULL, 1)
+    elif datatype == BOOLEAN:
+        out += _field_varint(_METRIC_BOOLEAN, 1 if value else 0)
+    elif datatype == INT64:
+        out += _field_varint(_METRIC_LONG, int(value))
+    elif datatype == STRING:
+        out += _field_string(_METRIC_STRING, str(value))
+    else:
+        out += _field_double(_METRIC_DOUBLE, float(value))
+    return bytes(out)
+
+
+def encode_payload(metrics: Iterable[Metric], *, timestamp_ms: int, seq: Optional[int]) -> bytes:
+    out = bytearray(_field_varint(_PAYLOAD_TIMESTAMP, timestamp_ms))
+    for metric in metrics:
+        out += _field_bytes(_PAYLOAD_METRICS, _encode_metric(metric))
+    if seq is not None:
+        out += _field_varint(_PAYLOAD_SEQ, seq)
+    return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    shift = result = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _iter_fields(data: bytes):
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire_type = key >> 3, key & 0x7
+        if wire_type == _VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == _FIXED64:
+            value, pos = data[pos : pos + 8], pos + 8
+        elif wire_type == _LENGTH:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos : pos + length], pos + length
+        elif wire_type == 5:
+            value, pos = data[pos : pos + 4], pos + 4
+        else:
+            raise ValueError(f"Tipo wire protobuf não suportado: {wire_type}")
+        yield number, value
+
+
+def decode_payload(data: bytes) -> Dict[str, Any]:
+    """Descodifica o subconjunto produzido por :func:`encode_payload`."""
+
+    payload: Dict[str, Any] = {"timestamp": None, "seq": None, "metrics": []}
+    for number, value in _iter_fields(data):
+        if number == _PAYLOAD_TIMESTAMP:
+            payload["timestamp"] = value
+        elif number == _PAYLOAD_SEQ:
+            payload["seq"] = value
+        elif number == _PAYLOAD_METRICS:
+            metric: Dict[str, Any] = {"value": None}
+            for m_number, m_value in _iter_fields(value):
+                if m_number == _METRIC_NAME:
+                    metric["name"] = m_value.decode("utf-8")
+                elif m_number == _METRIC_ALIAS:
+                    metric["alias"] = m_value
+                elif m_number == _METRIC_TIMESTAMP:
+                    metric["timestamp"] = m_value
+                elif m_number == _METRIC_DATATYPE:
+                    metric["datatype"] = m_value
+                elif m_number == _METRIC_LONG:
+                    metric["value"] = m_value - (1 << 64) if m_value >= 1 << 63 else m_value
+                elif m_number == _METRIC_DOUBLE:
+                    metric["value"] = struct.unpack("<d", m_value)[0]
+                elif m_number == _METRIC_BOOLEAN:
+                    metric["value"] = bool(m_value)
+                elif m_number == _METRIC_STRING:
+                    metric["value"] = m_value.decode("utf-8")
+            payload["metrics"].append(metric)
+    return payload
+
+
+# ----------------------------------------------------------------------
+# Estado do nó: tabela de aliases e números de sequência
+# ----------------------------------------------------------------------
+def epoch_ms(value: Any = None) -> int:
+    if value is None:
+        return int(time.time() * 1000)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return epoch_ms(datetime.fromisoformat(str(value)))
+    except ValueError:
+        return int(time.time() * 1000)
+
+
+def measurement_value(measurement: Dict[str, Any]) -> Any:
+    for key in ("value_float", "value_int", "raw_value"):
+        value = measurement.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+@dataclass
+class _DeviceState:
+    name: str
+    metadata: Tuple[Tuple[str, str], ...]
+    registers: Dict[int, Tuple[Tuple[str, str], ...]] = field(default_factory=dict)
+    # Incrementada quando surge um registrador novo (obriga novo DBIRTH).
+    revision: int = 0
+    # ``(sessão, revisão)`` do último DBIRTH publicado.
+    born: Optional[Tuple[int, int]] = None
+
+
+class SparkplugEncoder:
+    """Mantém a tabela de *aliases* e gera as mensagens BIRTH/DATA.
+
+    O *alias* de cada métrica é o ``register_id`` (único no nó e estável entre
+    reinícios).  :meth:`encode_measurements` corre quando a mensagem entra na
+    fila e produz DDATA sem ``seq``; :meth:`stamp` corre no momento da
+    publicação, atribui o ``seq`` da sessão actual e troca o DDATA por um
+    DBIRTH quando o CLP ainda não foi anunciado nesta sessão (reconexão,
+    *outbox* reenviado após reinício ou registrador novo).
+    """
+
+    def __init__(self, group_id: str, node_id: str) -> None:
+        self.group_id = _topic_token(group_id) or "scada"
+        self.node_id = _topic_token(node_id) or "node"
+        self._lock = threading.Lock()
+        self._devices: Dict[int, _DeviceState] = {}
+        self._seq = 0
+        self._bd_seq = 0
+        self._connections = 0
+        self._session = 0
+
+    def _next_seq(self) -> int:
+        seq = self._seq
+        self._seq = (self._seq + 1) % 256
+        return seq
+
+    def topic(self, message_type: str, device_id: Optional[str] = None) -> str:
+        parts = [NAMESPACE, self.group_id, message_type, self.node_id]
+        if device_id:
+            parts.append(device_id)
+        return "/".join(parts)
+
+    @staticmethod
+    def device_id(plc_id: Any) -> str:
+        return f"plc-{plc_id}"
+
+    def alias_table(self) -> Dict[int, Dict[int, str]]:
+        with self._lock:
+            return {
+                plc_id: {alias: dict(meta).get("name", "") for alias, meta in device.registers.items()}
+                for plc_id, device in self._devices.items()
+            }
+
+    def describes(self, plc_id: Any, register_id: Any) -> bool:
+        """Indica se o CLP e o registrador já têm metadados para o DBIRTH."""
+
+        with self._lock:
+            device = self._devices.get(plc_id)
+            return bool(device and device.metadata and device.registers.get(int(register_id)))
+
+    def begin_connection(self) -> Tuple[str, bytes]:
+        """Avança o ``bdSeq`` para uma nova ligação e devolve o NDEATH (*Will*)."""
+
+        with self._lock:
+            if self._connections:
+                self._bd_seq = (self._bd_seq + 1) % 256
+            self._connections += 1
+        return self.node_death()
+
+    def node_birth(self) -> Tuple[str, bytes]:
+        """NBIRTH; abre uma sessão nova, reinicia a sequência e obriga novo DBIRTH."""
+
+        with self._lock:
+            self._seq = 0
+            self._session += 1
+            metric = Metric(alias=0, name="bdSeq", value=self._bd_seq, datatype=INT64)
+            payload = encode_payload([metric], timestamp_ms=epoch_ms(), seq=self._next_seq())
+            return self.topic("NBIRTH"), payload
+
+    def node_death(self) -> Tuple[str, bytes]:
+        metric = Metric(alias=0, name="bdSeq", value=self._bd_seq, datatype=INT64)
+        return self.topic("NDEATH"), encode_payload([metric], timestamp_ms=epoch_ms(), seq=None)
+
+    def _device(self, plc_id: Any, sample: Optional[Dict[str, Any]] = None) -> _DeviceState:
+        device = self._devices.get(plc_id)
+        if device is None or (sample and not device.metadata):
+            sample = sample or {}
+            state = _DeviceState(
+                name=str(sample.get("plc_name") or plc_id),
+                metadata=_properties(
+                    plc_name=sample.get("plc_name"),
+                    protocol=sample.get("protocol"),
+                    tags=",".join(sample.get("plc_tags") or []),
+                ),
+            )
+            if device is None:
+                device = self._devices[plc_id] = state
+            elif state.metadata:
+                device.name, device.metadata = state.name, state.metadata
+                device.revision += 1
+        return device
+
+    def encode_measurements(self, measurements: Iterable[Dict[str, Any]]) -> List[Tuple[str, bytes]]:
+        """Converte medições em DDATA sem ``seq`` (ver :meth:`stamp`)."""
+
+        by_plc: Dict[Any, List[Dict[str, Any]]] = {}
+        for measurement in measurements:
+            if measurement.get("plc_id") is None or measurement.get("register_id") is None:
+                continue
+            by_plc.setdefault(measurement["plc_id"], []).append(measurement)
+
+        messages: List[Tuple[str, bytes]] = []
+        now_ms = epoch_ms()
+        with self._lock:
+            for plc_id, items in by_plc.items():
+                device = self._device(plc_id, items[0])
+                for item in items:
+                    register_id = int(item["register_id"])
+                    if not device.registers.get(register_id):
+                        device.registers[register_id] = _properties(
+                            name=item.get("register_name"),
+                            tag=item.get("register_tag"),
+                            address=item.get("register_address"),
+                            unit=item.get("unit"),
+                        )
+                        device.revision += 1
+
+                metrics = [
+                    Metric(
+                        alias=int(item["register_id"]),
+                        value=measurement_value(item),
+                        timestamp_ms=epoch_ms(item.get("timestamp")),
+                    )
+                    for item in items
+                ]
+                messages.append(
+                    (
+                        self.topic("DDATA", self.device_id(plc_id)),
+                        encode_payload(metrics, timestamp_ms=now_ms, seq=None),
+                    )
+                )
+        return messages
+
+    def stamp(self, topic: str, payload: bytes) -> Tuple[str, bytes]:
+        """Prepara um DDATA para publicação na sessão actual.
+
+        Acrescenta o ``seq`` (a ordem dos campos protobuf é livre) ou, se o
+        CLP ainda não foi anunciado nesta sessão, devolve em vez dele o
+        DBIRTH com os mesmos valores.  Outros tópicos passam inalterados.
+        """
+
+        parts = topic.split("/")
+        if len(parts) != 5 or parts[2] != "DDATA" or not parts[4].startswith("plc-"):
+            return topic, payload
+        try:
+            plc_id: Any = int(parts[4][len("plc-") :])
+        except ValueError:
+            return topic, payload
+
+        with self._lock:
+            device = self._device(plc_id)
+            if device.born == (self._session, device.revision):
+                return topic, payload + _field_varint(_PAYLOAD_SEQ, self._next_seq())
+
+            decoded = decode_payload(payload)
+            metrics = [
+                Metric(alias=item["alias"], value=item.get("value"), timestamp_ms=item.get("timestamp"))
+                for item in decoded["metrics"]
+                if "alias" in item
+            ]
+            for metric in metrics:
+                if metric.alias not in device.registers:
+                    # CLP reenviado do *outbox* depois de um reinício: sem metadados.
+                    device.registers[metric.alias] = ()
+                    device.revision += 1
+            device.born = (self._session, device.revision)
+            return (
+                self.topic("DBIRTH", parts[4]),
+                self._device_birth(device, metrics, decoded.get("timestamp") or epoch_ms()),
+            )
+
+    def _device_birth(self, device: _DeviceState, current: List[Metric], now_ms: int) -> bytes:
+        latest = {metric.alias: metric for metric in current}
+        metrics = [
+            Metric(
+                alias=0,
+                name="Properties/name",
+                value=device.name,
+                datatype=STRING,
+                properties=device.metadata,
+            )
+        ]
+        for register_id, properties in device.registers.items():
+            sample = latest.get(register_id)
+            metrics.append(
+                Metric(
+                    alias=register_id,
+                    name=dict(properties).get("name") or f"register_{register_id}",
+                    value=sample.value if sample else None,
+                    timestamp_ms=sample.timestamp_ms if sample else now_ms,
+                    datatype=_datatype_for(sample.value) if sample and sample.value is not None else DOUBLE,
+                    properties=properties,
+                )
+            )
+        return encode_payload(metrics, timestamp_ms=now_ms, seq=self._next_seq())
+
+
+def _properties(**values: Any) -> Tuple[Tuple[str, str], ...]:
+    return tuple((key, str(value)) for key, value in values.items() if value not in (None, ""))
+
+
+def _topic_token(value: str) -> str:
+    return "".join(ch if ch not in "/+#" else "_" for ch in (value or "").strip("/"))
+
+
+__all__ = [
+    "NAMESPACE",
+    "Metric",
+    "SparkplugEncoder",
+    "decode_payload",
+    "encode_payload",
+    "epoch_ms",
+]
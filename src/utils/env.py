@@ -0,0 +1,44 @@
+"""Leitura tipada de variáveis de ambiente para as secções ``*Settings``.
+
+Os serviços que correm fora do contexto Flask (pollers, consumidores,
+descoberta) descrevem a sua configuração em *dataclasses* imutáveis
+preenchidas por ``load_*_settings()``; estas funções são a única forma de
+converter o texto do ambiente nesses campos.  Um valor ausente ou inválido
+devolve ``default``.
+"""
+
+from __future__ import annotations
+
+import os
+
+TRUE_VALUES = frozenset({"1", "true", "yes", "on"})
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in TRUE_VALUES
+
+
+def env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+__all__ = ["TRUE_VALUES", "env_bool", "env_float", "env_int"]
@@ -1,19 +1,31 @@
 """Utilidades para descoberta de rede."""
 
 from .enhanced_discovery import (
+    DISCOVERY_CACHE_FILE,
     DISCOVERY_DIR,
     DISCOVERY_FILE,
     DISCOVERY_SUMMARY_FILE,
     has_network_privileges,
     run_enhanced_discovery,
     run_full_discovery,
+    run_incremental_discovery,
 )
+from .discovery_cache import DiscoveryCache, diff_devices
+from .port_scanner import AsyncPortScanner, ScanSettings, load_scan_settings, scan_hosts
 
 __all__ = [
+    "AsyncPortScanner",
+    "DISCOVERY_CACHE_FILE",
     "DISCOVERY_DIR",
     "DISCOVERY_FILE",
     "DISCOVERY_SUMMARY_FILE",
+    "DiscoveryCache",
+    "ScanSettings",
+    "diff_devices",
     "has_network_privileges",
+    "load_scan_settings",
     "run_enhanced_discovery",
     "run_full_discovery",
+    "run_incremental_discovery",
+    "scan_hosts",
 ]
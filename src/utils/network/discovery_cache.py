@@ -0,0 +1,173 @@
+"""Cache de resultados da descoberta e diferenças entre execuções.
+
+Cada dispositivo sondado fica guardado com a chave ``(interface, ip)`` e o
+instante da última sondagem.  Numa execução incremental só voltam a ser
+sondados (ICMP + port scan) os hosts novos, os que mudaram de MAC e os que
+passaram do TTL (``DiscoveryConfig.CACHE_DURATION_SECONDS``); os restantes
+reaproveitam o resultado guardado.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from time import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.logs import logger
+
+CacheKey = Tuple[str, str]
+
+# Campos comparados para classificar um dispositivo como alterado.
+DIFF_FIELDS = ("mac", "open_ports", "device_type", "manufacturer", "model")
+
+
+def _int_keys(mapping: Dict[Any, Any]) -> Dict[Any, Any]:
+    """O JSON transforma as portas em texto; devolve-as a inteiros."""
+
+    converted: Dict[Any, Any] = {}
+    for key, value in mapping.items():
+        try:
+            converted[int(key)] = value
+        except (TypeError, ValueError):
+            converted[key] = value
+    return converted
+
+
+class DiscoveryCache:
+    """Resultados por ``(interface, ip)`` persistidos num ficheiro JSON."""
+
+    def __init__(self, path: Path, ttl: float) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self._entries: Dict[CacheKey, Dict[str, Any]] = {}
+
+    @staticmethod
+    def key(interface: Optional[str], ip: str) -> CacheKey:
+        return (interface or "", ip)
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+    def load(self) -> "DiscoveryCache":
+        try:
+            with self.path.open("r", encoding="utf-8") as handle:
+                raw = json.load(handle)
+        except FileNotFoundError:
+            return self
+        except Exception as exc:  # pragma: no cover - ficheiro corrompido
+            logger.warning("Cache de descoberta ignorada: %s", exc)
+            return self
+
+        for entry in raw.get("entries", []):
+            device = entry.get("device") or {}
+            device["open_ports"] = _int_keys(device.get("open_ports") or {})
+            device["services"] = _int_keys(device.get("services") or {})
+            self._entries[self.key(entry.get("interface"), entry["ip"])] = {
+                "device": device,
+                "probed_at": float(entry.get("probed_at", 0)),
+            }
+        return self
+
+    def save(self) -> None:
+        payload = {
+            "entries": [
+                {"interface": interface, "ip": ip, **entry}
+                for (interface, ip), entry in sorted(self._entries.items())
+            ]
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w",
+                delete=False,
+                dir=str(self.path.parent),
+                encoding="utf-8",
+            ) as temp_file:
+                json.dump(payload, temp_file, ensure_ascii=False)
+                temp_name = temp_file.name
+            os.replace(temp_name, self.path)
+        except Exception as exc:  # pragma: no cover - defensivo
+            logger.error("Erro ao guardar cache de descoberta: %s", exc)
+
+    # ------------------------------------------------------------------
+    # Consulta e actualização
+    # ------------------------------------------------------------------
+    def get(self, interface: Optional[str], ip: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(self.key(interface, ip))
+
+    def entries_for(self, interfaces: Iterable[str]) -> Dict[CacheKey, Dict[str, Any]]:
+        names = set(interfaces)
+        return {key: entry for key, entry in self._entries.items() if key[0] in names}
+
+    def is_fresh(self, entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        return (now if now is not None else time()) - entry["probed_at"] < self.ttl
+
+    def is_warm(self, interface: str, now: Optional[float] = None) -> bool:
+        """Indica se a interface tem pelo menos um resultado dentro do TTL."""
+
+        now = now if now is not None else time()
+        return any(key[0] == interface and self.is_fresh(entry, now) for key, entry in self._entries.items())
+
+    def put(self, device: Dict[str, Any], probed_at: Optional[float] = None) -> None:
+        self._entries[self.key(device.get("interface"), device["ip"])] = {
+            "device": device,
+            "probed_at": probed_at if probed_at is not None else time(),
+        }
+
+    def discard(self, interface: Optional[str], ip: str) -> None:
+        self._entries.pop(self.key(interface, ip), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ---------------------------------------------------------------------------
+# Diferenças entre execuções
+# ---------------------------------------------------------------------------
+def _diff_view(device: Dict[str, Any]) -> Dict[str, Any]:
+    industrial = device.get("industrial_device") or {}
+    return {
+        "mac": device.get("mac"),
+        "open_ports": sorted(device.get("open_ports") or {}),
+        "device_type": industrial.get("type", "unknown"),
+        "manufacturer": industrial.get("manufacturer", "unknown"),
+        "model": industrial.get("model"),
+    }
+
+
+def diff_devices(
+    previous: Iterable[Dict[str, Any]],
+    current: Iterable[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Compara duas listas de dispositivos pelo IP.
+
+    Devolve ``added``/``removed`` (dispositivos completos), ``changed`` (IP e,
+    por campo de :data:`DIFF_FIELDS`, o par ``[antes, depois]``) e o número de
+    dispositivos sem alterações.
+    """
+
+    before = {device["ip"]: device for device in previous}
+    after = {device["ip"]: device for device in current}
+
+    changed: List[Dict[str, Any]] = []
+    unchanged = 0
+    for ip in before.keys() & after.keys():
+        old, new = _diff_view(before[ip]), _diff_view(after[ip])
+        changes = {field: [old[field], new[field]] for field in DIFF_FIELDS if old[field] != new[field]}
+        if changes:
+            changed.append({"ip": ip, "changes": changes})
+        else:
+            unchanged += 1
+
+    return {
+        "added": [after[ip] for ip in sorted(after.keys() - before.keys())],
+        "removed": [before[ip] for ip in sorted(before.keys() - after.keys())],
+        "changed": sorted(changed, key=lambda item: item["ip"]),
+        "unchanged": unchanged,
+    }
+
+
+__all__ = ["DIFF_FIELDS", "DiscoveryCache", "diff_devices"]
@@ -2,12 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import ipaddress
 import json
 import socket
 import tempfile
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 from time import time
 from typing import Any, Dict, List, Optional, Set, Tuple, Union
@@ -34,6 +35,9 @@ from scapy.all import (
 )
 
 from src.utils.logs import logger
+from src.utils.network.discovery_cache import DiscoveryCache, diff_devices
+from src.utils.network.fingerprint import normalize_manufacturer
+from src.utils.network.port_scanner import AsyncPortScanner, load_scan_settings, scan_hosts
 
 # ---------------------------------------------------------------------------
 # Caminhos de saída e configuração base
@@ -42,6 +46,7 @@ PROJECT_ROOT = Path(__file__).resolve().parents[3]
 DISCOVERY_DIR = PROJECT_ROOT / "data" / "discovery"
 DISCOVERY_FILE = DISCOVERY_DIR / "enhanced_discovery.json"
 DISCOVERY_SUMMARY_FILE = DISCOVERY_DIR / "enhanced_discovery_summary.json"
+DISCOVERY_CACHE_FILE = DISCOVERY_DIR / "discovery_cache.json"
 
 
 def has_network_privileges() -> bool:
@@ -435,7 +440,17 @@ def discover_passively_all_interfaces(
 # ---------------------------------------------------------------------------
 # Detecção de dispositivos industriais
 # ---------------------------------------------------------------------------
-def detect_industrial_device(ip: str, open_ports: Dict[int, Any]) -> Dict[str, Any]:
+def detect_industrial_device(
+    ip: str,
+    open_ports: Dict[int, Any],
+    services: Optional[Dict[int, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    fingerprints = [
+        service["fingerprint"] for service in (services or {}).values() if service.get("fingerprint")
+    ]
+    if fingerprints:
+        return _device_from_fingerprints(fingerprints)
+
     device_info = {
         "type": "unknown",
         "manufacturer": "unknown",
@@ -494,6 +509,36 @@ def detect_industrial_device(ip: str, open_ports: Dict[int, Any]) -> Dict[str, A
     return device_info
 
 
+def _device_from_fingerprints(fingerprints: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Classifica o dispositivo pelas respostas das sondas de protocolo."""
+
+    protocols: List[str] = []
+    manufacturer = "unknown"
+    model = None
+    revision = None
+    for fingerprint in fingerprints:
+        if fingerprint["protocol"] not in protocols:
+            protocols.append(fingerprint["protocol"])
+        if manufacturer == "unknown" and fingerprint.get("vendor"):
+            manufacturer = normalize_manufacturer(fingerprint["vendor"])
+        model = model or fingerprint.get("model") or fingerprint.get("product_code")
+        revision = revision or fingerprint.get("revision")
+
+    identified = manufacturer != "unknown" or model is not None
+    device_type = f"{manufacturer}_plc" if manufacturer != "unknown" else "plc"
+    if "opcua" in protocols and len(protocols) == 1:
+        device_type = "opcua_server"
+    return {
+        "type": device_type,
+        "manufacturer": manufacturer,
+        "model": model,
+        "revision": revision,
+        "protocol": protocols,
+        "confidence": 95 if identified else 70,
+        "fingerprinted": True,
+    }
+
+
 # ---------------------------------------------------------------------------
 # Pipeline principal
 # ---------------------------------------------------------------------------
@@ -503,9 +548,40 @@ def run_enhanced_discovery(
     use_cache: bool = CONFIG.ENABLE_CACHE,
     save_detailed: bool = True,
 ) -> List[Dict[str, Any]]:
+    return run_incremental_discovery(
+        target_interfaces=target_interfaces,
+        passive_timeout=passive_timeout,
+        use_cache=use_cache,
+        save_detailed=save_detailed,
+    )["devices"]
+
+
+def run_incremental_discovery(
+    target_interfaces: Optional[List[str]] = None,
+    passive_timeout: Optional[int] = None,
+    use_cache: bool = CONFIG.ENABLE_CACHE,
+    save_detailed: bool = True,
+) -> Dict[str, Any]:
+    """Executa a descoberta e devolve os dispositivos e a diferença para a anterior.
+
+    Com ``use_cache`` só são sondados os hosts novos, com MAC diferente ou
+    fora do TTL; os restantes reaproveitam o resultado da cache e o sniff
+    passivo é saltado nas interfaces com resultados recentes.  Sem
+    ``use_cache`` todos os hosts são sondados, mas a cache é actualizada na
+    mesma.  O resultado tem ``devices``, ``diff`` (ver
+    :func:`~src.utils.network.discovery_cache.diff_devices`), ``probed`` e
+    ``reused``.
+    """
+
+    empty: Dict[str, Any] = {
+        "devices": [],
+        "diff": diff_devices([], []),
+        "probed": 0,
+        "reused": 0,
+    }
     if not has_network_privileges():
         logger.error("Permissões insuficientes - execute como root/administrador")
-        return []
+        return empty
 
     start_time = time()
     logger.info("=== INICIANDO DESCOBERTA AVANÇADA DE REDE ===")
@@ -516,7 +592,7 @@ def run_enhanced_discovery(
 
     if not all_interfaces:
         logger.error("Nenhuma interface de rede válida encontrada")
-        return []
+        return empty
 
     total_network_size = sum(
         ipaddress.ip_network(iface.network).num_addresses for iface in all_interfaces
@@ -527,9 +603,25 @@ def run_enhanced_discovery(
     logger.info("Tamanho total da rede: ~%d IPs possíveis", total_network_size)
     logger.info("Timeouts calculados: %s", timeouts)
 
-    passive_results = discover_passively_all_interfaces(
-        all_interfaces,
-        int(passive_timeout or timeouts["passive"]),
+    cache = DiscoveryCache(DISCOVERY_CACHE_FILE, CONFIG.CACHE_DURATION_SECONDS).load()
+    cached = cache.entries_for(iface.name for iface in all_interfaces)
+    interfaces_by_name = {iface.name: iface for iface in all_interfaces}
+
+    passive_interfaces = [
+        iface for iface in all_interfaces if not (use_cache and cache.is_warm(iface.name, start_time))
+    ]
+    if len(passive_interfaces) < len(all_interfaces):
+        logger.info(
+            "Sniff passivo saltado em %d interfaces com cache recente",
+            len(all_interfaces) - len(passive_interfaces),
+        )
+    passive_results = (
+        discover_passively_all_interfaces(
+            passive_interfaces,
+            int(passive_timeout or timeouts["passive"]),
+        )
+        if passive_interfaces
+        else {}
     )
 
     all_discovered_ips: Set[str] = set()
@@ -568,8 +660,40 @@ def run_enhanced_discovery(
         len(all_discovered_ips),
     )
 
+    # Hosts da cache não vistos nesta execução: os recentes são mantidos, os
+    # expirados voltam a ser sondados para confirmar que ainda existem.
+    reused: Dict[str, Dict[str, Any]] = {}
+    to_probe: Set[str] = set()
+    unconfirmed: Set[str] = set()
+    for (iface_name, ip), entry in cached.items():
+        if ip in all_discovered_ips:
+            continue
+        if use_cache and cache.is_fresh(entry, start_time):
+            reused[ip] = dict(entry["device"])
+        else:
+            to_probe.add(ip)
+            unconfirmed.add(ip)
+            interface_mapping.setdefault(ip, interfaces_by_name[iface_name])
+
+    for ip in all_discovered_ips:
+        iface = interface_mapping.get(ip)
+        entry = cache.get(iface.name if iface else None, ip)
+        mac = all_devices.get(ip, {}).get("mac")
+        previous_mac = entry["device"].get("mac") if entry else None
+        if (
+            use_cache
+            and entry is not None
+            and cache.is_fresh(entry, start_time)
+            and not (mac and previous_mac and mac != previous_mac)
+        ):
+            reused[ip] = {**entry["device"], **all_devices.get(ip, {})}
+        else:
+            to_probe.add(ip)
+
+    logger.info("Hosts a sondar: %d (reaproveitados da cache: %d)", len(to_probe), len(reused))
+
     alive_ips: Set[str] = set()
-    ip_list = list(all_discovered_ips)
+    ip_list = list(to_probe)
     ip_chunks = [ip_list[i : i + 50] for i in range(0, len(ip_list), 50)]
 
     with ThreadPoolExecutor(max_workers=8) as executor:
@@ -581,42 +705,56 @@ def run_enhanced_discovery(
             except Exception as exc:  # pragma: no cover - defensivo
                 logger.debug("Erro no ICMP sweep: %s", exc)
 
-    logger.info("Iniciando port scan em %d IPs...", len(all_discovered_ips))
-    with ThreadPoolExecutor(max_workers=CONFIG.MAX_TOTAL_WORKERS) as executor:
-        port_futures = {
-            executor.submit(_enhanced_port_scan, ip, timeouts): ip for ip in all_discovered_ips
-        }
-        for future in as_completed(port_futures):
-            ip = port_futures[future]
-            try:
-                port_results = future.result()
-                if ip not in all_devices:
-                    iface = interface_mapping.get(ip)
-                    all_devices[ip] = {
-                        "ip": ip,
-                        "mac": None,
-                        "interface": iface.name if iface else None,
-                        "network": iface.network if iface else None,
-                        "discovered_via": [],
-                    }
+    logger.info("Iniciando port scan em %d IPs...", len(to_probe))
+    try:
+        scan_results = scan_hosts(to_probe, CONFIG.COMMON_INDUSTRIAL_PORTS, timeouts["tcp"])
+    except Exception as exc:  # pragma: no cover - defensivo
+        logger.error("Erro no port scan: %s", exc)
+        scan_results = {}
 
-                all_devices[ip].update(port_results)
-                if port_results.get("open_ports"):
-                    industrial_info = detect_industrial_device(ip, port_results["open_ports"])
-                    all_devices[ip]["industrial_device"] = industrial_info
-            except Exception as exc:  # pragma: no cover - defensivo
-                logger.debug("Erro no port scan de %s: %s", ip, exc)
+    for ip in to_probe:
+        port_results = scan_results.get(ip, {})
+        if ip in unconfirmed and ip not in alive_ips and not port_results.get("open_ports"):
+            continue
+        if ip not in all_devices:
+            iface = interface_mapping.get(ip)
+            all_devices[ip] = {
+                "ip": ip,
+                "mac": None,
+                "interface": iface.name if iface else None,
+                "network": iface.network if iface else None,
+                "discovered_via": [],
+            }
+
+        all_devices[ip].update(port_results)
+        all_devices[ip]["responds_to_ping"] = ip in alive_ips
+        if port_results.get("open_ports"):
+            industrial_info = detect_industrial_device(
+                ip,
+                port_results["open_ports"],
+                port_results.get("services"),
+            )
+            all_devices[ip]["industrial_device"] = industrial_info
 
     final_devices: List[Dict[str, Any]] = []
-    for ip, device in all_devices.items():
-        device["responds_to_ping"] = ip in alive_ips
+    for ip in to_probe & all_devices.keys():
+        device = all_devices[ip]
         device.setdefault("discovered_via", [])
         device.setdefault("open_ports", {})
         device.setdefault("services", {})
         final_devices.append(device)
-
+        cache.put(device, start_time)
+    final_devices.extend(reused.values())
     final_devices = _safe_ip_sort(final_devices)
 
+    current_ips = {device["ip"] for device in final_devices}
+    for iface_name, ip in cached:
+        if ip not in current_ips:
+            cache.discard(iface_name, ip)
+    cache.save()
+
+    diff = diff_devices((entry["device"] for entry in cached.values()), final_devices)
+
     elapsed = time() - start_time
     logger.info("=== DESCOBERTA CONCLUÍDA ===")
     logger.info("Tempo total: %.2fs", elapsed)
@@ -625,9 +763,20 @@ def run_enhanced_discovery(
         "Dispositivos industriais: %d",
         sum(1 for device in final_devices if device.get("industrial_device", {}).get("confidence", 0) > 50),
     )
+    logger.info(
+        "Diferença para a execução anterior: +%d -%d ~%d",
+        len(diff["added"]),
+        len(diff["removed"]),
+        len(diff["changed"]),
+    )
 
     _save_discovery_results(final_devices, save_detailed)
-    return final_devices
+    return {
+        "devices": final_devices,
+        "diff": diff,
+        "probed": len(to_probe),
+        "reused": len(reused),
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -658,36 +807,7 @@ def _enhanced_arp_scan(interface: NetworkInterface, timeout: int) -> List[Dict[s
 
 
 def _enhanced_port_scan(ip: str, timeouts: Dict[str, Union[int, float]]) -> Dict[str, Any]:
-    result = {"open_ports": {}, "services": {}, "scan_time": time()}
-    quick_results = tcp_probe(ip, CONFIG.COMMON_INDUSTRIAL_PORTS, timeouts["tcp"])
-    open_ports = [port for port, is_open in quick_results.items() if is_open]
-
-    if open_ports:
-        result["open_ports"] = {port: {"state": "open", "method": "tcp_connect"} for port in open_ports}
-        for port in open_ports[:5]:
-            service_info = _identify_service(ip, port)
-            if service_info:
-                result["services"][port] = service_info
-
-    return result
-
-
-def _identify_service(ip: str, port: int) -> Optional[Dict[str, str]]:
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            sock.settimeout(2)
-            sock.connect((ip, port))
-            if port == 502:
-                return {"name": "modbus", "protocol": "tcp", "type": "industrial"}
-            if port == 102:
-                return {"name": "s7comm", "protocol": "tcp", "type": "industrial"}
-            if port in [80, 443, 8080]:
-                return {"name": "http", "protocol": "tcp", "type": "web"}
-            if port == 4840:
-                return {"name": "opcua", "protocol": "tcp", "type": "industrial"}
-            return {"name": "unknown", "protocol": "tcp", "type": "unknown"}
-    except Exception:  # pragma: no cover - dependente de SO
-        return None
+    return scan_hosts([ip], CONFIG.COMMON_INDUSTRIAL_PORTS, timeouts["tcp"])[ip]
 
 
 def _save_discovery_results(devices: List[Dict[str, Any]], detailed: bool = True) -> None:
@@ -722,6 +842,7 @@ def _save_discovery_results(devices: List[Dict[str, Any]], detailed: bool = True
                         "is_industrial": industrial.get("confidence", 0) > 50,
                         "device_type": industrial.get("type", "unknown"),
                         "manufacturer": industrial.get("manufacturer", "unknown"),
+                        "model": industrial.get("model"),
                     }
                 )
             with DISCOVERY_SUMMARY_FILE.open("w", encoding="utf-8") as handle:
@@ -753,16 +874,9 @@ def icmp_ping_sweep(ip_list: List[str], timeout: int = 2) -> Set[str]:
 
 
 def tcp_probe(ip: str, ports: List[int], timeout: float = 1.0) -> Dict[int, bool]:
-    results: Dict[int, bool] = {}
-    for port in ports:
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(timeout)
-                result = sock.connect_ex((ip, port))
-                results[port] = result == 0
-        except Exception:
-            results[port] = False
-    return results
+    settings = replace(load_scan_settings(timeout), banner_timeout=0.0)
+    open_ports = asyncio.run(AsyncPortScanner(settings, fingerprint_ports={}).scan({ip: ports}))[ip]
+    return {port: port in open_ports for port in ports}
 
 
 def run_full_discovery(**kwargs: Any) -> List[Dict[str, Any]]:
@@ -0,0 +1,235 @@
+"""Sondas activas de identificação de protocolos industriais.
+
+Cada sonda recebe a ligação já aberta pelo port scan
+(:class:`~src.utils.network.port_scanner.AsyncPortScanner`), troca o mínimo
+de mensagens para identificar o equipamento e devolve um dicionário com
+``protocol`` e, quando o protocolo o expõe, ``vendor``/``model``/
+``revision``.  Devolve ``None`` se a resposta não for do protocolo esperado.
+
+* Modbus/TCP: função 43/14 (*Read Device Identification*, objectos básicos);
+* S7comm: COTP CR, *Setup Communication* e leitura da SZL 0x0011
+  (identificação do módulo, com o número de encomenda);
+* EtherNet/IP: comando de encapsulamento ``ListIdentity``;
+* OPC UA: mensagem ``Hello`` do UA TCP, que o servidor confirma com ``ACK``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+Fingerprint = Dict[str, Any]
+Probe = Callable[[asyncio.StreamReader, asyncio.StreamWriter, str, int], Awaitable[Optional[Fingerprint]]]
+
+# Porta por omissão -> sonda a executar.
+FINGERPRINT_PORTS: Dict[int, str] = {
+    102: "s7",
+    502: "modbus",
+    1502: "modbus",
+    4840: "opcua",
+    44818: "ethernet_ip",
+    48400: "opcua",
+    48401: "opcua",
+    48402: "opcua",
+}
+
+# Identificadores de fabricante CIP mais comuns em campo.
+ENIP_VENDORS: Dict[int, str] = {
+    1: "Rockwell Automation/Allen-Bradley",
+    47: "OMRON Corporation",
+    243: "Schneider Electric",
+}
+
+MANUFACTURER_ALIASES = (
+    ("siemens", "siemens"),
+    ("schneider", "schneider"),
+    ("telemecanique", "schneider"),
+    ("rockwell", "rockwell"),
+    ("allen-bradley", "rockwell"),
+    ("omron", "omron"),
+    ("beckhoff", "beckhoff"),
+    ("wago", "wago"),
+    ("phoenix", "phoenix_contact"),
+)
+
+
+def normalize_manufacturer(vendor: Optional[str]) -> str:
+    """Converte o nome devolvido pelo equipamento no identificador usado na UI."""
+
+    if not vendor:
+        return "unknown"
+    lowered = vendor.lower()
+    for token, manufacturer in MANUFACTURER_ALIASES:
+        if token in lowered:
+            return manufacturer
+    return lowered.strip()
+
+
+async def _send(writer: asyncio.StreamWriter, data: bytes) -> None:
+    writer.write(data)
+    await writer.drain()
+
+
+# ---------------------------------------------------------------------------
+# Modbus/TCP
+# ---------------------------------------------------------------------------
+MODBUS_DEVICE_ID_OBJECTS = {0: "vendor", 1: "product_code", 2: "revision", 4: "model", 5: "model"}
+
+
+async def probe_modbus(reader, writer, host: str, port: int) -> Optional[Fingerprint]:
+    pdu = bytes([0x2B, 0x0E, 0x01, 0x00])
+    await _send(writer, struct.pack(">HHHB", 0x4D49, 0, len(pdu) + 1, 1) + pdu)
+
+    header = await reader.readexactly(7)
+    _, protocol_id, length, _ = struct.unpack(">HHHB", header)
+    if protocol_id != 0 or length < 2:
+        return None
+    body = await reader.readexactly(length - 1)
+
+    if body[0] == 0xAB:
+        return {"protocol": "modbus", "exception": body[1] if len(body) > 1 else None}
+    if body[:2] != b"\x2B\x0E" or len(body) < 7:
+        return None
+
+    fingerprint: Fingerprint = {"protocol": "modbus"}
+    offset = 7
+    for _ in range(body[6]):
+        if offset + 2 > len(body):
+            break
+        object_id, size = body[offset], body[offset + 1]
+        value = body[offset + 2 : offset + 2 + size].decode("latin-1").strip()
+        field = MODBUS_DEVICE_ID_OBJECTS.get(object_id)
+        if field and value:
+            fingerprint.setdefault(field, value)
+        offset += 2 + size
+    return fingerprint
+
+
+# ---------------------------------------------------------------------------
+# S7comm (ISO-on-TCP)
+# ---------------------------------------------------------------------------
+S7_COTP_CR = bytes.fromhex("0300001611e00000000100c0010ac1020100c2020102")
+S7_SETUP_COMM = bytes.fromhex("0300001902f08032010000000000080000f0000001000101e0")
+S7_SZL_MODULE_ID = bytes.fromhex("0300002102f080320700000000000800080001120411440100ff09000400110001")
+
+
+async def _read_tpkt(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(4)
+    if header[0] != 0x03:
+        raise ValueError("TPKT inválido")
+    (length,) = struct.unpack(">H", header[2:4])
+    return await reader.readexactly(length - 4)
+
+
+def _s7_data(frame: bytes) -> Optional[bytes]:
+    # COTP DT (3 bytes) seguido do cabeçalho S7.
+    s7 = frame[3:]
+    if len(s7) < 10 or s7[0] != 0x32:
+        return None
+    header_len = 12 if s7[1] in (2, 3) else 10
+    param_len, data_len = struct.unpack(">HH", s7[6:10])
+    start = header_len + param_len
+    return s7[start : start + data_len]
+
+
+async def probe_s7(reader, writer, host: str, port: int) -> Optional[Fingerprint]:
+    await _send(writer, S7_COTP_CR)
+    confirm = await _read_tpkt(reader)
+    if len(confirm) < 2 or confirm[1] != 0xD0:
+        return None
+
+    await _send(writer, S7_SETUP_COMM)
+    if _s7_data(await _read_tpkt(reader)) is None:
+        return None
+
+    fingerprint: Fingerprint = {"protocol": "s7", "vendor": "Siemens"}
+    await _send(writer, S7_SZL_MODULE_ID)
+    data = _s7_data(await _read_tpkt(reader))
+    if not data or data[0] != 0xFF or len(data) < 12:
+        return fingerprint
+
+    record_len, records = struct.unpack(">HH", data[8:12])
+    offset = 12
+    for _ in range(records):
+        record = data[offset : offset + record_len]
+        if len(record) >= 22 and struct.unpack(">H", record[:2])[0] == 1:
+            fingerprint["model"] = record[2:22].decode("latin-1").strip()
+        offset += record_len
+    return fingerprint
+
+
+# ---------------------------------------------------------------------------
+# EtherNet/IP
+# ---------------------------------------------------------------------------
+ENIP_LIST_IDENTITY = struct.pack("<HHII8sI", 0x0063, 0, 0, 0, b"scada-id", 0)
+
+
+async def probe_enip(reader, writer, host: str, port: int) -> Optional[Fingerprint]:
+    await _send(writer, ENIP_LIST_IDENTITY)
+    header = await reader.readexactly(24)
+    command, length = struct.unpack("<HH", header[:4])
+    if command != 0x0063:
+        return None
+    data = await reader.readexactly(length)
+    if len(data) < 6 or struct.unpack("<H", data[2:4])[0] != 0x000C:
+        return None
+
+    item = data[6:]
+    if len(item) < 33:
+        return {"protocol": "ethernet_ip"}
+    vendor_id, device_type, product_code = struct.unpack("<HHH", item[18:24])
+    major, minor = item[24], item[25]
+    (serial,) = struct.unpack("<I", item[28:32])
+    name = item[33 : 33 + item[32]].decode("latin-1").strip()
+    return {
+        "protocol": "ethernet_ip",
+        "vendor": ENIP_VENDORS.get(vendor_id, f"vendor {vendor_id}"),
+        "vendor_id": vendor_id,
+        "device_type": device_type,
+        "product_code": product_code,
+        "revision": f"{major}.{minor}",
+        "serial": f"{serial:08x}",
+        "model": name,
+    }
+
+
+# ---------------------------------------------------------------------------
+# OPC UA
+# ---------------------------------------------------------------------------
+def _opcua_hello(host: str, port: int) -> bytes:
+    url = f"opc.tcp://{host}:{port}".encode()
+    body = struct.pack("<IIIII", 0, 65536, 65536, 0, 0) + struct.pack("<i", len(url)) + url
+    return b"HELF" + struct.pack("<I", len(body) + 8) + body
+
+
+async def probe_opcua(reader, writer, host: str, port: int) -> Optional[Fingerprint]:
+    await _send(writer, _opcua_hello(host, port))
+    header = await reader.readexactly(8)
+    message_type = header[:3]
+    if message_type == b"ACK":
+        return {"protocol": "opcua"}
+    if message_type == b"ERR":
+        body = await reader.readexactly(min(struct.unpack("<I", header[4:8])[0] - 8, 4096))
+        return {"protocol": "opcua", "error": struct.unpack("<I", body[:4])[0] if len(body) >= 4 else None}
+    return None
+
+
+PROBES: Dict[str, Probe] = {
+    "ethernet_ip": probe_enip,
+    "modbus": probe_modbus,
+    "opcua": probe_opcua,
+    "s7": probe_s7,
+}
+
+
+__all__ = [
+    "ENIP_VENDORS",
+    "FINGERPRINT_PORTS",
+    "PROBES",
+    "normalize_manufacturer",
+    "probe_enip",
+    "probe_modbus",
+    "probe_opcua",
+    "probe_s7",
+]
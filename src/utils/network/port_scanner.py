@@ -0,0 +1,312 @@
+"""Varrimento TCP assíncrono das portas industriais.
+
+Substitui o ``connect_ex`` bloqueante porta a porta: todos os pares
+``(ip, porta)`` são tentados em paralelo num único *event loop*, com
+
+* um semáforo global (``DISCOVERY_SCAN_CONCURRENCY``) que limita as ligações
+  abertas em simultâneo;
+* um limite por host (``DISCOVERY_SCAN_PER_HOST``) e um ritmo máximo de
+  ligações novas por segundo a cada host (``DISCOVERY_SCAN_HOST_RATE``), para
+  não sobrecarregar CLPs com pilhas TCP pequenas.
+
+Cada porta aberta é identificada na mesma ligação do varrimento.  Nas portas
+industriais corre a sonda de :mod:`src.utils.network.fingerprint` (limitadas
+por ``DISCOVERY_FINGERPRINT_CONCURRENCY``); nas restantes lê-se o *banner*
+que o serviço envia (ou a resposta a um ``HEAD`` nas portas HTTP) e
+combina-se com o número da porta.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from itertools import chain, zip_longest
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.env import env_float, env_int
+from src.utils.logs import logger
+from src.utils.network.fingerprint import FINGERPRINT_PORTS, PROBES
+
+
+@dataclass(frozen=True)
+class ScanSettings:
+    concurrency: int = 512
+    per_host: int = 8
+    host_rate: float = 100.0
+    connect_timeout: float = 1.0
+    banner_timeout: float = 0.3
+    banner_bytes: int = 256
+    fingerprint_concurrency: int = 64
+    fingerprint_timeout: float = 1.0
+
+
+def load_scan_settings(connect_timeout: Optional[float] = None) -> ScanSettings:
+    """Lê as variáveis de ambiente ``DISCOVERY_SCAN_*``."""
+
+    defaults = ScanSettings()
+    return ScanSettings(
+        concurrency=max(env_int("DISCOVERY_SCAN_CONCURRENCY", defaults.concurrency), 1),
+        per_host=max(env_int("DISCOVERY_SCAN_PER_HOST", defaults.per_host), 1),
+        host_rate=max(env_float("DISCOVERY_SCAN_HOST_RATE", defaults.host_rate), 0.0),
+        connect_timeout=(
+            connect_timeout
+            if connect_timeout is not None
+            else max(env_float("DISCOVERY_SCAN_TIMEOUT", defaults.connect_timeout), 0.05)
+        ),
+        banner_timeout=max(env_float("DISCOVERY_BANNER_TIMEOUT", defaults.banner_timeout), 0.0),
+        banner_bytes=max(env_int("DISCOVERY_BANNER_BYTES", defaults.banner_bytes), 1),
+        fingerprint_concurrency=max(
+            env_int("DISCOVERY_FINGERPRINT_CONCURRENCY", defaults.fingerprint_concurrency), 1
+        ),
+        fingerprint_timeout=max(
+            env_float("DISCOVERY_FINGERPRINT_TIMEOUT", defaults.fingerprint_timeout), 0.05
+        ),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Identificação de serviços
+# ---------------------------------------------------------------------------
+SERVICE_PORTS: Dict[int, Tuple[str, str]] = {
+    21: ("ftp", "management"),
+    23: ("telnet", "management"),
+    80: ("http", "web"),
+    102: ("s7comm", "industrial"),
+    161: ("snmp", "management"),
+    162: ("snmp-trap", "management"),
+    443: ("https", "web"),
+    502: ("modbus", "industrial"),
+    1502: ("modbus", "industrial"),
+    2222: ("ethernet_ip-io", "industrial"),
+    4840: ("opcua", "industrial"),
+    8080: ("http", "web"),
+    20000: ("dnp3", "industrial"),
+    44818: ("ethernet_ip", "industrial"),
+    48400: ("opcua", "industrial"),
+    48401: ("opcua", "industrial"),
+    48402: ("opcua", "industrial"),
+}
+
+# Nome do serviço confirmado por cada sonda de identificação.
+FINGERPRINT_SERVICE_NAMES = {
+    "ethernet_ip": "ethernet_ip",
+    "modbus": "modbus",
+    "opcua": "opcua",
+    "s7": "s7comm",
+}
+
+HTTP_PORTS = frozenset({80, 8080})
+
+BANNER_SIGNATURES: Tuple[Tuple[bytes, str, str], ...] = (
+    (b"SSH-", "ssh", "management"),
+    (b"HTTP/", "http", "web"),
+    (b"220", "ftp", "management"),
+    (b"RFB ", "vnc", "management"),
+)
+
+
+def identify_service(port: int, banner: bytes = b"") -> Dict[str, Any]:
+    """Classifica o serviço de uma porta aberta pelo *banner* e pelo número."""
+
+    name, service_type = SERVICE_PORTS.get(port, ("unknown", "unknown"))
+    for prefix, banner_name, banner_type in BANNER_SIGNATURES:
+        if banner.startswith(prefix):
+            name, service_type = banner_name, banner_type
+            break
+
+    service: Dict[str, Any] = {"name": name, "protocol": "tcp", "type": service_type}
+    if banner:
+        service["banner"] = banner.split(b"\r\n", 1)[0][:120].decode("latin-1").strip()
+    return service
+
+
+# ---------------------------------------------------------------------------
+# Limites por host
+# ---------------------------------------------------------------------------
+class _HostLimiter:
+    """Limita ligações simultâneas e o ritmo de ligações novas a um host."""
+
+    def __init__(self, per_host: int, rate: float) -> None:
+        self._semaphore = asyncio.Semaphore(per_host)
+        self._spacing = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def __aenter__(self) -> None:
+        await self._semaphore.acquire()
+        if self._spacing:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self._spacing
+            if slot > now:
+                await asyncio.sleep(slot - now)
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._semaphore.release()
+
+
+# ---------------------------------------------------------------------------
+# Scanner
+# ---------------------------------------------------------------------------
+class AsyncPortScanner:
+    """Tenta todos os pares ``(ip, porta)`` em paralelo num *event loop*."""
+
+    def __init__(
+        self,
+        settings: Optional[ScanSettings] = None,
+        fingerprint_ports: Optional[Dict[int, str]] = None,
+    ) -> None:
+        self.settings = settings or load_scan_settings()
+        self.fingerprint_ports = FINGERPRINT_PORTS if fingerprint_ports is None else fingerprint_ports
+
+    async def scan(self, targets: Dict[str, Iterable[int]]) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        """Devolve, por IP, as portas abertas com o serviço identificado."""
+
+        self._global = asyncio.Semaphore(self.settings.concurrency)
+        self._fingerprints = asyncio.Semaphore(self.settings.fingerprint_concurrency)
+        self._hosts = {ip: _HostLimiter(self.settings.per_host, self.settings.host_rate) for ip in targets}
+        pairs = self._interleave(targets)
+        outcomes = await asyncio.gather(*(self._probe(ip, port) for ip, port in pairs))
+
+        results: Dict[str, Dict[int, Dict[str, Any]]] = {ip: {} for ip in targets}
+        for (ip, port), service in zip(pairs, outcomes):
+            if service is not None:
+                results[ip][port] = service
+        return results
+
+    @staticmethod
+    def _interleave(targets: Dict[str, Iterable[int]]) -> List[Tuple[str, int]]:
+        """Pares ``(ip, porta)`` alternando os hosts (``a1, b1, a2, b2, ...``).
+
+        As corrotinas esperam pelos semáforos por ordem de criação; alternar
+        os hosts evita que as primeiras vagas globais fiquem todas com um só
+        host à espera do seu limite.
+        """
+
+        per_host = [[(ip, port) for port in sorted(set(ports))] for ip, ports in targets.items()]
+        return [pair for pair in chain.from_iterable(zip_longest(*per_host)) if pair is not None]
+
+    async def _probe(self, ip: str, port: int) -> Optional[Dict[str, Any]]:
+        # O limite do host vem primeiro: uma vaga global só é ocupada por
+        # quem já pode ligar, e fica presa até a ligação fechar.
+        async with AsyncExitStack() as stack:
+            async with self._hosts[ip]:
+                await stack.enter_async_context(self._global)
+                try:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(ip, port),
+                        self.settings.connect_timeout,
+                    )
+                except (OSError, asyncio.TimeoutError):
+                    return None
+            try:
+                return await self._identify(ip, port, reader, writer)
+            except (OSError, asyncio.TimeoutError) as exc:
+                logger.debug("Erro a identificar %s:%d: %s", ip, port, exc)
+                return identify_service(port)
+            finally:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (OSError, asyncio.TimeoutError):
+                    pass
+
+    async def _identify(
+        self,
+        ip: str,
+        port: int,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> Dict[str, Any]:
+        probe_name = self.fingerprint_ports.get(port)
+        if probe_name:
+            service = identify_service(port)
+            fingerprint = await self._fingerprint(probe_name, ip, port, reader, writer)
+            if fingerprint:
+                service.update(
+                    name=FINGERPRINT_SERVICE_NAMES.get(fingerprint["protocol"], service["name"]),
+                    type="industrial",
+                    fingerprint=fingerprint,
+                )
+            return service
+
+        if port in HTTP_PORTS:
+            writer.write(b"HEAD / HTTP/1.0\r\n\r\n")
+            await writer.drain()
+        banner = await self._read_banner(reader)
+        return identify_service(port, banner)
+
+    async def _fingerprint(
+        self,
+        probe_name: str,
+        ip: str,
+        port: int,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> Optional[Dict[str, Any]]:
+        async with self._fingerprints:
+            try:
+                return await asyncio.wait_for(
+                    PROBES[probe_name](reader, writer, ip, port),
+                    self.settings.fingerprint_timeout,
+                )
+            except (OSError, ValueError, struct.error, asyncio.IncompleteReadError, asyncio.TimeoutError) as exc:
+                logger.debug("Sonda %s sem resposta em %s:%d: %s", probe_name, ip, port, exc)
+                return None
+
+    async def _read_banner(self, reader: asyncio.StreamReader) -> bytes:
+        if self.settings.banner_timeout <= 0:
+            return b""
+        try:
+            return await asyncio.wait_for(reader.read(self.settings.banner_bytes), self.settings.banner_timeout)
+        except asyncio.TimeoutError:
+            return b""
+
+
+def scan_hosts(
+    ips: Iterable[str],
+    ports: Iterable[int],
+    timeout: Optional[float] = None,
+    settings: Optional[ScanSettings] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Varre ``ports`` em todos os ``ips`` e devolve o resultado por host.
+
+    O formato de cada entrada (``open_ports``/``services``/``scan_time``) é o
+    que :func:`~src.utils.network.enhanced_discovery.run_enhanced_discovery`
+    junta a cada dispositivo.
+    """
+
+    port_list: List[int] = list(ports)
+    targets = {ip: port_list for ip in ips}
+    if not targets:
+        return {}
+
+    scanner = AsyncPortScanner(settings or load_scan_settings(timeout))
+    started = time.time()
+    found = asyncio.run(scanner.scan(targets))
+    logger.info(
+        "Port scan assíncrono: %d pares em %.2fs, %d portas abertas",
+        len(targets) * len(port_list),
+        time.time() - started,
+        sum(len(services) for services in found.values()),
+    )
+
+    return {
+        ip: {
+            "open_ports": {port: {"state": "open", "method": "tcp_connect"} for port in services},
+            "services": services,
+            "scan_time": started,
+        }
+        for ip, services in found.items()
+    }
+
+
+__all__ = [
+    "AsyncPortScanner",
+    "ScanSettings",
+    "identify_service",
+    "load_scan_settings",
+    "scan_hosts",
+]
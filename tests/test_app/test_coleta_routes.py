@@ -0,0 +1,68 @@
+import pytest
+
+from src.models.Users import User, UserRole
+from src.services import discovery_service
+
+
+@pytest.fixture
+def engineer(db):
+    user = User(username="eng", email="eng@example.com", role=UserRole.ENGINEER)
+    user.set_password("secret")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def login(client, username="eng", password="secret"):
+    return client.post(
+        "/login",
+        data={"username": username, "password": password},
+        follow_redirects=True,
+    )
+
+
+def test_run_scan_flashes_the_diff_against_the_previous_scan(client, engineer, monkeypatch):
+    monkeypatch.setattr(discovery_service, "has_network_privileges", lambda: True)
+    monkeypatch.setattr(
+        discovery_service,
+        "run_incremental_discovery",
+        lambda **kwargs: {
+            "devices": [{"ip": "10.0.0.5"}, {"ip": "10.0.0.6"}],
+            "diff": {
+                "added": [{"ip": "10.0.0.6"}],
+                "removed": [{"ip": "10.0.0.9"}],
+                "changed": [{"ip": "10.0.0.5", "changes": {"mac": ("a", "b")}}],
+                "unchanged": 0,
+            },
+            "probed": 1,
+            "reused": 1,
+        },
+    )
+    discovery_service.set_discovery_enabled(True)
+    login(client)
+
+    response = client.post("/coleta/", data={"enabled": "y", "run_scan": "1"}, follow_redirects=True)
+
+    page = response.get_data(as_text=True)
+    assert "2 dispositivos identificados (1 sondados, 1 da cache)" in page
+    assert "Novos: 10.0.0.6." in page
+    assert "Removidos: 10.0.0.9." in page
+    assert "Alterados: 10.0.0.5." in page
+    assert discovery_service.get_last_run_time() is not None
+
+
+def test_promote_redirects_to_the_filtered_list_not_the_referrer(client, engineer):
+    login(client)
+
+    response = client.post(
+        "/coleta/promover?q=10.0&industrial=1&page=2&next=x",
+        data={"submit": "1"},
+        headers={"Referer": "https://evil.example/phish"},
+    )
+
+    assert response.status_code == 302
+    location = response.headers["Location"]
+    assert location.startswith("/coleta/?")
+    assert "evil.example" not in location
+    assert "q=10.0" in location and "industrial=1" in location and "page=2" in location
+    assert "next=" not in location
@@ -1,5 +1,9 @@
+import csv
+import io
 from datetime import datetime, timezone
+from types import SimpleNamespace
 
+from src.consumers.reading_batch import DB_COLUMNS, ReadingBatch, timestamp_ns
 from src.repository.Data_repository import DataLogRepo
 from src.models.PLCs import PLC
 from src.models.Registers import Register
@@ -42,3 +46,56 @@ def test_bulk_insert_triggers_cleanup(monkeypatch, datalog_repo, plc_repo, regis
 
     recent = datalog_repo.list_recent(plc.id, register.id, limit=5)
     assert len(recent) == len(records)
+
+
+class _CopyCursor:
+    def __init__(self):
+        self.statements = []
+        self.closed = False
+
+    def copy_expert(self, sql, file):
+        self.statements.append((sql, file.read()))
+
+    def close(self):
+        self.closed = True
+
+
+class _PostgresSession:
+    """Sessão mínima com dialecto ``postgresql`` e cursor DBAPI falso."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.executed = []
+        self.committed = False
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    def connection(self):
+        return SimpleNamespace(connection=SimpleNamespace(cursor=lambda: self.cursor))
+
+    def execute(self, statement, params=None):
+        self.executed.append(params)
+
+    def commit(self):
+        self.committed = True
+
+
+def test_bulk_insert_columns_copies_csv_on_postgresql():
+    batch = ReadingBatch()
+    stamp = timestamp_ns(datetime(2024, 5, 1, 12, 0, 0, 250000, tzinfo=timezone.utc), 0)
+    batch.append(1, 7, stamp, 21.5, {"quality": "good", "unit": "°C", "tags": {"area": "a, b"}})
+    batch.append(1, 8, stamp, None, {"raw_value": "0x01"})
+    cursor = _CopyCursor()
+    session = _PostgresSession(cursor)
+
+    assert DataLogRepo(session=session).bulk_insert_columns(batch) == 2
+
+    [(sql, content)] = cursor.statements
+    assert sql == f"COPY data_log ({', '.join(DB_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    assert list(csv.reader(io.StringIO(content))) == [
+        ["1", "7", "2024-05-01T12:00:00.250000+00:00", "21.5", "False", "", "", "good", "°C", '{"area": "a, b"}'],
+        ["1", "8", "2024-05-01T12:00:00.250000+00:00", "", "False", "0x01", "", "", "", ""],
+    ]
+    assert cursor.closed and session.committed
+    assert session.executed == [{"keys": ((1, 7), (1, 8))}]
@@ -0,0 +1,74 @@
+from src.models.Discovery import DiscoveredDevice, DiscoveredPort
+from src.repository.Discovery_repository import DiscoveredDeviceRepo
+
+
+def _device(ip, ports=(), confidence=0, manufacturer="unknown", mac=None, interface="eth0"):
+    return {
+        "ip": ip,
+        "mac": mac,
+        "interface": interface,
+        "open_ports": {port: {"state": "open"} for port in ports},
+        "services": {port: {"name": "modbus" if port == 502 else "http", "type": "industrial"} for port in ports},
+        "industrial_device": {"type": "plc", "manufacturer": manufacturer, "protocol": ["modbus"], "confidence": confidence},
+    }
+
+
+def test_sync_scan_keeps_identity_and_replaces_ports(db):
+    repo = DiscoveredDeviceRepo(session=db.session)
+    stats = repo.sync_scan([_device("10.0.0.5", (502, 80), 80), _device("10.0.0.6")])
+    assert stats == {"inserted": 2, "updated": 0, "removed": 0, "ports": 2}
+
+    first = repo.first_by(ip="10.0.0.5")
+    first_id, first_seen = first.id, first.first_seen
+
+    stats = repo.sync_scan([_device("10.0.0.5", (502,), 80, mac="aa:bb"), _device("10.0.0.7", (80,))])
+    assert stats == {"inserted": 1, "updated": 1, "removed": 1, "ports": 2}
+
+    db.session.expire_all()
+    device = repo.first_by(ip="10.0.0.5")
+    assert (device.id, device.first_seen, device.mac) == (first_id, first_seen, "aa:bb")
+    assert [port.port for port in device.ports] == [502]
+    assert repo.first_by(ip="10.0.0.6") is None
+    assert db.session.query(DiscoveredPort).count() == 2
+
+
+def test_sync_scan_limits_removals_to_scanned_interfaces(db):
+    repo = DiscoveredDeviceRepo(session=db.session)
+    repo.sync_scan(
+        [_device("10.0.0.5"), _device("192.168.1.5", interface="eth1"), _device("172.16.0.5", interface=None)]
+    )
+    stats = repo.sync_scan([], interfaces=["eth1"])
+    # Sem interface conhecida, o registo é tratado como parte de qualquer varredura.
+    assert stats["removed"] == 2
+    assert [device.ip for device in db.session.query(DiscoveredDevice)] == ["10.0.0.5"]
+
+
+def test_sync_scan_truncates_long_device_type(db):
+    repo = DiscoveredDeviceRepo(session=db.session)
+    device = _device("10.0.0.5")
+    device["industrial_device"]["type"] = f"{'x' * 60}_plc"
+    repo.sync_scan([device])
+    assert len(repo.first_by(ip="10.0.0.5").device_type) == 50
+
+
+def test_paginate_filters_and_counts(db):
+    repo = DiscoveredDeviceRepo(session=db.session)
+    devices = [_device(f"10.0.{block}.{host}", (502,), 80 if host % 3 == 0 else 10, "siemens" if host % 2 else "unknown")
+               for block in range(2) for host in range(1, 31)]
+    repo.sync_scan(devices)
+
+    items, total = repo.paginate(1, 25)
+    assert total == 60 and len(items) == 25
+    # Industriais primeiro.
+    assert all(item.is_industrial for item in items[:20]) and not items[20].is_industrial
+
+    items, total = repo.paginate(2, 15, industrial=True)
+    assert total == 20 and len(items) == 5
+
+    _, total = repo.paginate(search="10.0.1.", manufacturer="siemens")
+    assert total == 15
+    _, total = repo.paginate(port=80)
+    assert total == 0
+
+    assert repo.counts() == {"total": 60, "industrial": 20, "promoted": 0}
+    assert repo.manufacturers() == ["siemens"]
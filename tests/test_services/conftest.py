@@ -0,0 +1,47 @@
+import pytest
+
+from src.consumers.data_processor import DirectSubscriber, PLCDataProcessor
+
+
+@pytest.fixture
+def make_processor(app):
+    """Cria um ``PLCDataProcessor`` com alarmes e MQTT falsos, sem conexão à fila."""
+
+    created = []
+
+    def check_batch(alarms, batch):
+        for row, args in enumerate(
+            zip(batch.plc_id.tolist(), batch.register_id.tolist(), batch.values())
+        ):
+            if alarms.check and alarms.check(*args):
+                batch.is_alarm[row] = True
+
+    def factory(subscriber=None, *, batch_size=2, check=None, max_inflight_flushes=2, mqtt=None):
+        alarms = type(
+            "Alarms",
+            (),
+            {
+                "check": staticmethod(check) if check else None,
+                "check_batch": check_batch,
+                "close_quiet_storms": lambda self: None,
+                "flush_pending_alarms": lambda self: None,
+            },
+        )()
+        processor = PLCDataProcessor(
+            app=app,
+            batch_size=batch_size,
+            flush_interval=60.0,
+            subscriber=subscriber or DirectSubscriber(),
+            alarm_service=alarms,
+            mqtt=mqtt or type("Mqtt", (), {"publish_measurements": lambda self, payloads: None})(),
+            max_inflight_flushes=max_inflight_flushes,
+        )
+        created.append(processor)
+        return processor
+
+    yield factory
+
+    for processor in reversed(created):
+        processor._alarm_executor.shutdown(wait=True)
+        processor._db_executor.shutdown(wait=True)
+        processor.shutdown()
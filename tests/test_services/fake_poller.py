@@ -0,0 +1,76 @@
+"""Poller gRPC mínimo em Python para testar o GoPollingManager.
+
+Segue o contrato do binário Go: escuta em ``POLLER_LISTEN_ADDR`` (TCP ou
+``unix:``), anuncia ``POLLER_READY <rede> <endereço>`` no stdout e guarda uma
+medição numerada por CLP a cada configuração recebida; ``StreamData`` envia-as
+a partir de ``from_seq``.  Com ``FAKE_POLLER_DROP_AFTER=N`` a primeira
+chamada a ``StreamData`` termina depois de ``N`` mensagens, simulando uma
+ligação perdida.
+"""
+
+import json
+import os
+import sys
+import threading
+import uuid
+from concurrent import futures
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import grpc  # noqa: E402
+
+from src.grpc_generated import polling_pb2, polling_pb2_grpc  # noqa: E402
+
+
+class FakePoller(polling_pb2_grpc.PollingServiceServicer):
+    def __init__(self, drop_after=0):
+        self.stream_id = uuid.uuid4().hex
+        self.replay = []
+        self.changed = threading.Condition()
+        self.drop_after = drop_after
+
+    def UpdateConfig(self, request, context):
+        config = json.loads(request.json_config)
+        with self.changed:
+            for plc in config.get("plcs", []):
+                self.replay.append(json.dumps({"plc_id": plc["id"], "status": "online"}))
+            self.changed.notify_all()
+        return polling_pb2.StatusResponse(success=True, message="configuration updated")
+
+    def StreamData(self, request, context):
+        seq = request.from_seq if request.stream_id == self.stream_id else 0
+        seq = max(seq, 1)
+        drop_after, self.drop_after = self.drop_after, 0
+        sent = 0
+        while context.is_active():
+            with self.changed:
+                if seq > len(self.replay):
+                    self.changed.wait(0.1)
+                    continue
+                data = self.replay[seq - 1]
+            yield polling_pb2.DataPayload(json_data=data, seq=seq, stream_id=self.stream_id)
+            seq += 1
+            sent += 1
+            if drop_after and sent >= drop_after:
+                return
+
+
+def main():
+    listen = os.environ.get("POLLER_LISTEN_ADDR", ":50051")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    drop_after = int(os.environ.get("FAKE_POLLER_DROP_AFTER", "0"))
+    polling_pb2_grpc.add_PollingServiceServicer_to_server(FakePoller(drop_after), server)
+    if listen.startswith("unix:"):
+        server.add_insecure_port(listen)
+        ready = f"unix {listen[len('unix:'):]}"
+    else:
+        port = server.add_insecure_port(f"[::]:{listen.rsplit(':', 1)[-1]}")
+        ready = f"tcp [::]:{port}"
+    server.start()
+    print(f"POLLER_READY {ready}", flush=True)
+    server.wait_for_termination()
+
+
+if __name__ == "__main__":
+    main()
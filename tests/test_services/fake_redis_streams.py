@@ -0,0 +1,115 @@
+"""Subconjunto em memória dos comandos Redis Streams usados pelo processador.
+
+Implementa ``XADD``, ``XGROUP CREATE``, ``XREADGROUP`` (``>`` e a própria
+lista de pendentes), ``XACK``, ``XAUTOCLAIM`` e o resumo de ``XPENDING`` com a
+semântica de *consumer groups* do Redis e a assinatura do ``redis.asyncio``,
+para que o :class:`~src.consumers.data_processor.RedisStreamSubscriber` seja
+testado sem servidor nem ``fakeredis``.
+"""
+
+import asyncio
+import time
+
+
+def _key(entry_id):
+    millis, _, seq = str(entry_id).partition("-")
+    return int(millis), int(seq or 0)
+
+
+class _Group:
+    def __init__(self, last_id):
+        self.last_id = last_id
+        # id -> [consumidor, instante da última entrega (monotonic)]
+        self.pending = {}
+
+
+class FakeStreamRedis:
+    def __init__(self):
+        self._streams = {}
+        self._groups = {}
+        self._sequence = 0
+
+    async def xadd(self, stream, fields):
+        self._sequence += 1
+        entry_id = f"{self._sequence}-0"
+        self._streams.setdefault(stream, []).append((entry_id, dict(fields)))
+        return entry_id
+
+    async def xgroup_create(self, stream, group, id="$", mkstream=False):
+        if stream not in self._streams:
+            if not mkstream:
+                raise RuntimeError("ERR The XGROUP subcommand requires the key to exist")
+            self._streams[stream] = []
+        if (stream, group) in self._groups:
+            raise RuntimeError("BUSYGROUP Consumer Group name already exists")
+        entries = self._streams[stream]
+        last_id = entries[-1][0] if id == "$" and entries else ("0-0" if id == "$" else id)
+        self._groups[(stream, group)] = _Group(last_id)
+        return True
+
+    def _entry(self, stream, entry_id):
+        for current_id, fields in self._streams.get(stream, []):
+            if current_id == entry_id:
+                return current_id, fields
+        return entry_id, None
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        response = []
+        for stream, start in streams.items():
+            state = self._groups[(stream, group)]
+            if start == ">":
+                entries = [
+                    entry for entry in self._streams[stream] if _key(entry[0]) > _key(state.last_id)
+                ][:count]
+                now = time.monotonic()
+                for entry_id, _ in entries:
+                    state.pending[entry_id] = [consumer, now]
+                    state.last_id = entry_id
+            else:
+                own = sorted(
+                    (entry_id for entry_id, (owner, _) in state.pending.items() if owner == consumer),
+                    key=_key,
+                )
+                entries = [self._entry(stream, entry_id) for entry_id in own if _key(entry_id) > _key(start)]
+                entries = entries[:count]
+            if entries or start != ">":
+                response.append([stream, entries])
+        if not any(entries for _, entries in response) and block:
+            await asyncio.sleep(block / 1000.0)
+        return response
+
+    async def xack(self, stream, group, *entry_ids):
+        pending = self._groups[(stream, group)].pending
+        return sum(1 for entry_id in entry_ids if pending.pop(entry_id, None) is not None)
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, start_id="0-0", count=100):
+        state = self._groups[(stream, group)]
+        now = time.monotonic()
+        candidates = sorted(
+            (entry_id for entry_id in state.pending if _key(entry_id) >= _key(start_id)), key=_key
+        )
+        claimed, next_id = [], "0-0"
+        for entry_id in candidates:
+            if len(claimed) == count:
+                next_id = entry_id
+                break
+            if (now - state.pending[entry_id][1]) * 1000 >= min_idle_time:
+                state.pending[entry_id] = [consumer, now]
+                claimed.append(self._entry(stream, entry_id))
+        return [next_id, claimed, []]
+
+    async def xpending(self, stream, group):
+        pending = self._groups[(stream, group)].pending
+        ids = sorted(pending, key=_key)
+        consumers = {}
+        for owner, _ in pending.values():
+            consumers[owner] = consumers.get(owner, 0) + 1
+        return {
+            "pending": len(ids),
+            "min": ids[0] if ids else None,
+            "max": ids[-1] if ids else None,
+            "consumers": [{"name": name, "pending": total} for name, total in consumers.items()],
+        }
+
+    async def close(self):
+        return None
@@ -0,0 +1,104 @@
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.models.Alarms import Alarm, AlarmDefinition
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.Alarms_service import AlarmService, evaluate_alarm
+from src.services.alarm_conditions import AlarmConditionEngine, RollingWindow
+
+
+def test_rolling_window_matches_brute_force_statistics():
+    rng = random.Random(42)
+    window = RollingWindow(5)
+    history = []
+    for step in range(200):
+        value = rng.uniform(-100, 100)
+        window.push(float(step), value)
+        history.append(value)
+        tail = history[-5:]
+        assert window.maximum == max(tail)
+        assert window.minimum == min(tail)
+        assert abs(window.mean - sum(tail) / len(tail)) < 1e-9
+        if len(tail) >= 2:
+            expected_rate = (tail[-1] - tail[0]) / (len(tail) - 1)
+            assert abs(window.rate - expected_rate) < 1e-9
+
+
+def test_windowed_condition_waits_for_full_window():
+    definition = SimpleNamespace(
+        condition_type="average_above",
+        setpoint=10.0,
+        threshold_low=None,
+        threshold_high=None,
+        deadband=1.0,
+    )
+    window = RollingWindow(3)
+    for ts, value in enumerate((20.0, 20.0)):
+        window.push(float(ts), value)
+        assert evaluate_alarm(definition, value, None, window)[0] == "none"
+
+    window.push(2.0, 20.0)
+    action, info = evaluate_alarm(definition, 20.0, None, window)
+    assert action == "trigger"
+    assert "Média móvel" in info["message"]
+
+    active = SimpleNamespace(state="ACTIVE")
+    for ts in (3.0, 4.0, 5.0):
+        window.push(ts, 0.0)
+    assert evaluate_alarm(definition, 0.0, active, window)[0] == "clear"
+
+
+def _create_definition(db, **fields):
+    plc = PLC(name="PLC Cond", ip_address="10.2.2.2", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    register = Register(
+        plc_id=plc.id, name="Nivel", address="1", register_type="holding", data_type="float"
+    )
+    db.session.add(register)
+    db.session.flush()
+    definition = AlarmDefinition(plc_id=plc.id, register_id=register.id, name="Cond", **fields)
+    db.session.add(definition)
+    db.session.commit()
+    return plc, register
+
+
+def test_rate_of_change_with_on_delay(db):
+    plc, register = _create_definition(
+        db, condition_type="rate_above", setpoint=1.0, window_size=2, on_delay_seconds=2.0
+    )
+    service = AlarmService(session=db.session, condition_engine=AlarmConditionEngine())
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    readings = [0.0, 5.0, 10.0, 15.0]
+    results = [
+        service.check_and_handle(plc.id, register.id, value, timestamp=start + timedelta(seconds=index))
+        for index, value in enumerate(readings)
+    ]
+
+    # Taxa de 5/s a partir da segunda leitura; o alarme só dispara após 2 s.
+    assert results == [False, False, False, True]
+    alarm = db.session.query(Alarm).one()
+    assert alarm.state == "ACTIVE"
+    assert "Taxa de variação" in alarm.message
+
+
+def test_delay_state_is_dropped_once_the_timers_settle():
+    engine = AlarmConditionEngine()
+    definitions = [SimpleNamespace(id=index, on_delay_seconds=2.0, off_delay_seconds=1.0) for index in range(50)]
+
+    for definition in definitions:
+        assert engine.gate(definition, "trigger", 0.0) == "none"
+    assert len(engine._delays) == 50
+
+    for definition in definitions:
+        assert engine.gate(definition, "trigger", 2.0) == "trigger"
+    assert engine._delays == {}
+
+    engine.gate(definitions[0], "clear", 3.0)
+    engine.gate(definitions[1], "clear", 3.0)
+    engine.gate(definitions[0], "none", 3.5)
+    engine.forget_definition(definitions[1].id)
+    assert engine._delays == {}
@@ -0,0 +1,180 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from src.models.Alarms import Alarm, AlarmDefinition, AlarmStorm
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.Alarms_service import AlarmService, is_shelved, start_pending_alarm_flusher
+from src.services.alarm_flood_service import AlarmFloodManager, FloodRule, FloodSettings, load_flood_settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.value = 1000.0
+
+    def __call__(self):
+        return self.value
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def flood(clock):
+    settings = FloodSettings(
+        enabled=True,
+        rules=(FloodRule(name="plc_flood", scope="plc", max_alarms=3, window_seconds=5.0, quiet_seconds=10.0),),
+        bulk_flush_size=100,
+        bulk_flush_interval=60.0,
+        chatter_max_triggers=3,
+        chatter_window_seconds=60.0,
+        chatter_shelve_seconds=300.0,
+    )
+    return AlarmFloodManager(settings, clock=clock)
+
+
+def _create_plc_with_definitions(db, count):
+    plc = PLC(name="PLC Flood", ip_address="10.1.1.1", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    registers = []
+    for index in range(count):
+        register = Register(
+            plc_id=plc.id,
+            name=f"Reg {index}",
+            address=str(index),
+            register_type="holding",
+            data_type="float",
+        )
+        db.session.add(register)
+        db.session.flush()
+        db.session.add(
+            AlarmDefinition(
+                plc_id=plc.id,
+                register_id=register.id,
+                name=f"High {index}",
+                condition_type="above",
+                setpoint=10.0,
+                email_enabled=True,
+            )
+        )
+        registers.append(register)
+    db.session.commit()
+    return plc, registers
+
+
+def test_flood_collapses_alarms_into_single_storm(db, flood, clock, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        "src.services.Alarms_service.send_email",
+        lambda subject, body, recipients, **kwargs: sent.append(subject),
+    )
+    monkeypatch.setattr(AlarmService, "_resolve_recipients", lambda self, defn: ["ops@example.com"])
+    plc, registers = _create_plc_with_definitions(db, 10)
+    service = AlarmService(session=db.session, flood_manager=flood)
+
+    for register in registers:
+        assert service.check_and_handle(plc.id, register.id, 50.0) is True
+
+    storms = db.session.query(AlarmStorm).all()
+    assert len(storms) == 1
+    # 3 alarmes individuais + 1 notificação da tempestade
+    assert len(sent) == 4
+    assert db.session.query(Alarm).count() == 3
+    assert flood.pending_count() == 7
+
+    assert service.flush_pending_alarms() == 7
+    assert db.session.query(Alarm).filter(Alarm.storm_id == storms[0].id).count() == 7
+    assert db.session.get(AlarmStorm, storms[0].id).alarm_count == 7
+
+    clock.value += 11.0
+    assert service.close_quiet_storms() == 1
+    storm = db.session.get(AlarmStorm, storms[0].id)
+    assert storm.state == "ENDED"
+    assert storm.ended_at is not None
+
+
+def test_pending_storm_alarm_is_not_retriggered(db, flood, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, registers = _create_plc_with_definitions(db, 5)
+    service = AlarmService(session=db.session, flood_manager=flood)
+
+    for register in registers:
+        service.check_and_handle(plc.id, register.id, 50.0)
+    pending_before = flood.pending_count()
+    service.check_and_handle(plc.id, registers[-1].id, 60.0)
+
+    assert flood.pending_count() == pending_before
+    service.flush_pending_alarms()
+    assert db.session.query(Alarm).filter(Alarm.state == "ACTIVE").count() == 5
+
+
+def test_chattering_definition_is_shelved_and_skipped(db, flood, clock, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, registers = _create_plc_with_definitions(db, 1)
+    register = registers[0]
+    service = AlarmService(session=db.session, flood_manager=flood)
+
+    for _ in range(3):
+        service.check_and_handle(plc.id, register.id, 50.0)
+        service.check_and_handle(plc.id, register.id, 0.0)
+        clock.value += 6.0
+
+    definition = db.session.query(AlarmDefinition).one()
+    assert is_shelved(definition, datetime.now(timezone.utc))
+    alarm_count = db.session.query(Alarm).count()
+
+    assert service.check_and_handle(plc.id, register.id, 50.0) is False
+    assert db.session.query(Alarm).count() == alarm_count
+
+    service.unshelve_definition(definition)
+    service.check_and_handle(plc.id, register.id, 0.0)
+    assert service.check_and_handle(plc.id, register.id, 50.0) is True
+
+
+def test_critical_chattering_definition_is_not_shelved(db, flood, clock, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, registers = _create_plc_with_definitions(db, 1)
+    definition = db.session.query(AlarmDefinition).one()
+    definition.priority = "CRITICAL"
+    db.session.commit()
+    service = AlarmService(session=db.session, flood_manager=flood)
+
+    for _ in range(4):
+        service.check_and_handle(plc.id, registers[0].id, 50.0)
+        service.check_and_handle(plc.id, registers[0].id, 0.0)
+        clock.value += 6.0
+
+    assert not is_shelved(definition, datetime.now(timezone.utc))
+    assert service.check_and_handle(plc.id, registers[0].id, 50.0) is True
+
+
+def test_flood_handling_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("ALARM_FLOOD_ENABLED", raising=False)
+    settings = load_flood_settings()
+    assert settings.enabled is False
+    assert settings.chatter_exempt_priorities == ("CRITICAL", "HIGH")
+
+
+def test_flusher_writes_storm_alarms_without_new_readings(app, db, flood, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, registers = _create_plc_with_definitions(db, 6)
+    service = AlarmService(session=db.session, flood_manager=flood)
+    for register in registers:
+        service.check_and_handle(plc.id, register.id, 50.0)
+    assert flood.pending_count() == 3
+
+    thread, stop = start_pending_alarm_flusher(app, interval=0.05, flood_manager=flood)
+    deadline = time.monotonic() + 5
+    while flood.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    stop.set()
+    thread.join(5)
+
+    db.session.expire_all()
+    assert flood.pending_count() == 0
+    assert db.session.query(Alarm).count() == 6
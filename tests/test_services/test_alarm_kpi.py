@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.models.Alarms import Alarm, AlarmDefinition, AlarmKpiCounter
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.Alarms_service import AlarmService
+from src.services.alarm_kpi_service import AlarmKpiService, kpi_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_kpi_cache():
+    kpi_cache.clear()
+    yield
+    kpi_cache.clear()
+
+
+def _create_definition(db):
+    plc = PLC(name="PLC KPI", ip_address="10.3.3.3", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    register = Register(
+        plc_id=plc.id, name="Pressao", address="1", register_type="holding", data_type="float"
+    )
+    db.session.add(register)
+    db.session.flush()
+    db.session.add(
+        AlarmDefinition(
+            plc_id=plc.id,
+            register_id=register.id,
+            name="Pressao alta",
+            condition_type="above",
+            setpoint=10.0,
+            priority="HIGH",
+        )
+    )
+    db.session.commit()
+    return plc, register
+
+
+def test_transitions_update_counters(db, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, register = _create_definition(db)
+    service = AlarmService(session=db.session)
+    kpis = AlarmKpiService(session=db.session)
+
+    assert service.check_and_handle(plc.id, register.id, 50.0) is True
+    assert kpis.active_total() == 1
+    assert kpis.active_by_plc() == {plc.id: 1}
+    assert kpis.active_by_register() == {register.id: 1}
+    assert kpis.active_by_priority() == {"HIGH": 1}
+    assert kpis.daily_triggers(days=1)[0]["count"] == 1
+
+    alarm = db.session.query(Alarm).one()
+    service.acknowledge_alarm(alarm, actor="operador")
+    service.acknowledge_alarm(alarm, actor="operador")
+    counters = kpis.counters_for("plc", plc.id)
+    assert counters["ack_count"] == 1
+    assert counters["unacknowledged_count"] == 0
+
+    service.check_and_handle(plc.id, register.id, 0.0)
+    assert kpis.active_total() == 0
+    assert kpis.active_by_plc() == {}
+    counters = kpis.counters_for("register", register.id)
+    assert counters["trigger_count"] == 1
+    assert counters["clear_count"] == 1
+    assert counters["time_in_alarm_seconds"] >= 0.0
+    assert counters["mtba_seconds"] is None
+
+
+def test_rebuild_matches_alarm_table(db):
+    plc, register = _create_definition(db)
+    definition = db.session.query(AlarmDefinition).one()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for index in range(3):
+        db.session.add(
+            Alarm(
+                alarm_definition_id=definition.id,
+                plc_id=plc.id,
+                register_id=register.id,
+                state="CLEARED" if index < 2 else "ACTIVE",
+                priority="HIGH",
+                message="Value 50 > setpoint 10",
+                triggered_at=start + timedelta(minutes=10 * index),
+                cleared_at=start + timedelta(minutes=10 * index, seconds=30) if index < 2 else None,
+            )
+        )
+    db.session.commit()
+
+    kpis = AlarmKpiService(session=db.session)
+    # Contadores vazios: a primeira leitura reconstrói a partir de ``alarm``.
+    assert kpis.active_by_plc() == {plc.id: 1}
+
+    counters = kpis.counters_for("plc", plc.id)
+    assert counters["trigger_count"] == 3
+    assert counters["clear_count"] == 2
+    assert counters["time_in_alarm_seconds"] == pytest.approx(60.0)
+    assert counters["mtba_seconds"] == pytest.approx(600.0)
+
+    kpis.rebuild()
+    kpi_cache.clear()
+    assert db.session.query(AlarmKpiCounter).filter_by(scope="plc").one().trigger_count == 3
+    assert kpis.active_total() == 1
+
+
+def test_first_transition_after_upgrade_counts_existing_alarms(db, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, register = _create_definition(db)
+    definition = db.session.query(AlarmDefinition).one()
+    # Alarme activo gravado antes de existirem contadores.
+    db.session.add(
+        Alarm(
+            alarm_definition_id=definition.id,
+            plc_id=plc.id,
+            register_id=register.id,
+            state="ACTIVE",
+            priority="HIGH",
+            message="Value 50 > setpoint 10",
+            triggered_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        )
+    )
+    db.session.commit()
+
+    service = AlarmService(session=db.session)
+    service.acknowledge_alarm(db.session.query(Alarm).one(), actor="operador")
+
+    kpis = AlarmKpiService(session=db.session)
+    assert kpis.active_total() == 1
+    counters = kpis.counters_for("plc", plc.id)
+    assert counters["trigger_count"] == 1
+    assert counters["ack_count"] == 1
+    assert counters["unacknowledged_count"] == 0
+
+
+def test_cascade_deletes_rebuild_counters(db, monkeypatch):
+    from src.services.plc_admin_service import delete_plc
+    from src.services.register_admin_service import delete_register
+
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, register = _create_definition(db)
+    AlarmService(session=db.session).check_and_handle(plc.id, register.id, 50.0)
+    kpis = AlarmKpiService(session=db.session)
+    assert kpis.active_total() == 1
+
+    delete_register(register, session=db.session)
+    kpi_cache.clear()
+    assert kpis.active_by_register() == {}
+    assert kpis.active_total() == db.session.query(Alarm).filter_by(state="ACTIVE").count()
+
+    delete_plc(db.session.get(PLC, plc.id), session=db.session)
+    kpi_cache.clear()
+    assert kpis.active_by_plc() == {}
+    assert kpis.active_total() == db.session.query(Alarm).filter_by(state="ACTIVE").count()
+
+
+def test_counter_conflict_does_not_lose_the_alarm(db, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc, register = _create_definition(db)
+    kpis = AlarmKpiService(session=db.session)
+    kpis.ensure_initialised()
+    original = AlarmKpiService._apply_deltas
+    conflicts = []
+
+    def racing(self):
+        if not conflicts:
+            # Outro *worker* gravou a mesma linha (dia, CLP, prioridade) primeiro.
+            conflicts.append(True)
+            raise IntegrityError("INSERT INTO alarm_kpi_daily", {}, Exception("duplicate key"))
+        original(self)
+
+    monkeypatch.setattr(AlarmKpiService, "_apply_deltas", racing)
+    service = AlarmService(session=db.session)
+
+    assert service.check_and_handle(plc.id, register.id, 50.0) is True
+    assert conflicts == [True]
+    db.session.expire_all()
+    assert db.session.query(Alarm).filter_by(state="ACTIVE").count() == 1
+    assert kpis.active_total() == 1
+    assert kpis.daily_triggers(days=1)[0]["count"] == 1
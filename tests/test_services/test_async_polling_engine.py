@@ -0,0 +1,227 @@
+import asyncio
+import struct
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from src.consumers import data_processor
+from src.manager.async_polling_engine import AsyncEngineSettings, AsyncPollingEngine
+from src.manager.protocol_clients import PLCClient, decode_bytes, decode_words, protocol_family
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+
+SETTINGS = AsyncEngineSettings(reconnect_min=0.05, reconnect_max=0.1, min_interval_ms=10)
+
+
+def _plc(plc_id, protocol="modbus-sim", intervals=(100,)):
+    registers = [
+        {"id": plc_id * 100 + index, "address": f"4000{index + 1}", "data_type": "float", "effective_interval": interval}
+        for index, interval in enumerate(intervals)
+    ]
+    return {"id": plc_id, "ip_address": f"10.0.0.{plc_id}", "protocol": protocol, "registers": registers, "read_plan": []}
+
+
+class Collector:
+    def __init__(self):
+        self.readings = []
+        self.lock = threading.Lock()
+
+    async def __call__(self, payload):
+        with self.lock:
+            self.readings.extend(payload["values"])
+
+    def counts(self):
+        with self.lock:
+            return Counter(reading["register_id"] for reading in self.readings)
+
+
+class FakeClient(PLCClient):
+    active = Counter()
+    peak = Counter()
+    instances = []
+
+    def __init__(self, plc):
+        super().__init__(plc)
+        self.family = protocol_family(plc["protocol"])
+        self.connected_flag = False
+        self.closed = False
+        FakeClient.instances.append(self)
+
+    @property
+    def connected(self):
+        return self.connected_flag
+
+    async def connect(self):
+        self.connected_flag = True
+
+    async def close(self):
+        self.connected_flag = False
+        self.closed = True
+
+    async def read_registers(self, registers):
+        FakeClient.active[self.family] += 1
+        FakeClient.peak[self.family] = max(FakeClient.peak[self.family], FakeClient.active[self.family])
+        await asyncio.sleep(0.02)
+        FakeClient.active[self.family] -= 1
+        return {register["id"]: 1.5 for register in registers}
+
+
+def _fake_engine(sink, settings=SETTINGS):
+    FakeClient.active.clear()
+    FakeClient.peak.clear()
+    FakeClient.instances.clear()
+    return AsyncPollingEngine(sink, settings=settings, client_factory=FakeClient)
+
+
+def test_simulated_plc_polls_each_register_at_its_rate():
+    sink = Collector()
+    engine = AsyncPollingEngine(sink, settings=SETTINGS)
+    engine.start({"plcs": [_plc(1, intervals=(50, 400))]})
+    try:
+        time.sleep(0.6)
+    finally:
+        engine.stop()
+
+    counts = sink.counts()
+    assert counts[100] >= 8
+    assert 1 <= counts[101] <= 3
+    reading = sink.readings[0]
+    assert reading["plc_id"] == 1 and reading["quality"] == "good"
+    assert isinstance(reading["value_float"], float)
+
+
+def test_concurrency_is_limited_per_protocol():
+    sink = Collector()
+    settings = AsyncEngineSettings(modbus_concurrency=2, s7_concurrency=1, min_interval_ms=10)
+    engine = _fake_engine(sink, settings)
+    plcs = [_plc(plc_id, "modbus", (20,)) for plc_id in range(1, 7)]
+    plcs += [_plc(plc_id, "s7", (20,)) for plc_id in range(7, 10)]
+    engine.start({"plcs": plcs})
+    try:
+        time.sleep(0.4)
+    finally:
+        engine.stop()
+
+    assert FakeClient.peak["modbus"] == 2
+    assert FakeClient.peak["s7"] == 1
+    assert set(sink.counts()) == {plc["registers"][0]["id"] for plc in plcs}
+    # Uma ligação persistente por CLP, fechada só no fim.
+    assert len(FakeClient.instances) == 9
+    assert all(client.closed for client in FakeClient.instances)
+
+
+def test_apply_config_only_touches_changed_plcs():
+    engine = _fake_engine(Collector())
+    config = {"plcs": [_plc(1), _plc(2)]}
+    engine.start(config)
+    try:
+        first, second = engine.workers[1], engine.workers[2]
+        assert engine.apply_config(config) is None
+
+        changed = _plc(1, intervals=(30,))
+        assert engine.apply_config({"plcs": [changed]}) == "delta"
+        time.sleep(0.1)
+
+        assert list(engine.workers) == [1]
+        assert engine.workers[1] is first and first.connects == 1
+        assert first.client.connected and second.client is None
+
+        moved = {**changed, "ip_address": "10.0.0.99"}
+        assert engine.apply_config({"plcs": [moved]}) == "delta"
+        assert engine.workers[1] is not first
+    finally:
+        engine.stop()
+    assert not engine.is_running()
+
+
+def test_engine_feeds_batch_processor(make_processor, monkeypatch):
+    inserted = []
+    monkeypatch.setattr(
+        data_processor.DataRepo,
+        "bulk_insert_columns",
+        staticmethod(lambda batch: inserted.extend(batch.register_id[: len(batch)].tolist())),
+    )
+    processor = make_processor(data_processor.DirectSubscriber(), batch_size=4)
+    engine = AsyncPollingEngine(processor.ingest, settings=SETTINGS, companions=(processor.start,))
+    engine.start({"plcs": [_plc(1, intervals=(20, 20))]})
+    try:
+        time.sleep(0.3)
+    finally:
+        engine.stop()
+
+    assert Counter(inserted)[100] >= 4 and Counter(inserted)[101] >= 4
+
+
+class FailingClient(FakeClient):
+    """Liga uma vez, falha a primeira leitura e depois recusa ligações."""
+
+    async def connect(self):
+        if len(FakeClient.instances) > 1:
+            raise OSError("connection refused")
+        self.connected_flag = True
+
+    async def read_registers(self, registers):
+        self.connected_flag = False
+        raise OSError("timed out")
+
+
+def test_failures_emit_offline_readings():
+    sink = Collector()
+    FakeClient.instances.clear()
+    engine = AsyncPollingEngine(sink, settings=SETTINGS, client_factory=FailingClient)
+    engine.start({"plcs": [_plc(1, intervals=(20,))]})
+    try:
+        time.sleep(0.3)
+    finally:
+        engine.stop()
+
+    # Como no poller Go: sem valor, com ``status`` e a causa da falha.
+    errors = [reading["error"] for reading in sink.readings]
+    assert errors[0] == "timed out" and "falha de ligação" in errors[1:]
+    assert all(reading["status"] == "offline" and "value_float" not in reading for reading in sink.readings)
+    assert {reading["register_id"] for reading in sink.readings} == {100}
+
+
+def test_processor_flush_updates_register_status(db, make_processor, monkeypatch):
+    monkeypatch.setattr(data_processor.DataRepo, "bulk_insert_columns", staticmethod(lambda batch: None))
+    plc = PLC(name="CLP motor", ip_address="10.0.0.1", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    recovering, failing = (
+        Register(plc_id=plc.id, name=name, address=address, register_type="holding", data_type="float", error_count=3)
+        for name, address in (("a", "40001"), ("b", "40002"))
+    )
+    db.session.add_all([recovering, failing])
+    db.session.commit()
+    processor = make_processor(batch_size=100)
+
+    def offline(register, stamp):
+        return {"plc_id": plc.id, "register_id": register.id, "timestamp": stamp, "status": "offline", "error": "timed out"}
+
+    readings = [
+        offline(recovering, 1.0),
+        {"plc_id": plc.id, "register_id": recovering.id, "timestamp": 2.0, "raw_value": "21.5", "value_float": 21.5},
+        offline(failing, 1.0),
+        offline(failing, 2.0),
+    ]
+
+    async def scenario():
+        await processor.ingest({"values": readings})
+        await processor.flush(force=True)
+        await processor.wait_for_flushes()
+
+    asyncio.run(scenario())
+
+    db.session.expire_all()
+    assert (recovering.last_value, recovering.error_count, recovering.last_error) == ("21.5", 0, None)
+    assert recovering.last_read.replace(tzinfo=timezone.utc) == datetime.fromtimestamp(2.0, tz=timezone.utc)
+    assert (failing.last_value, failing.error_count, failing.last_error) == (None, 5, "timed out")
+
+
+def test_decoders_follow_big_endian_layout():
+    words = struct.unpack(">HH", struct.pack(">f", 21.5))
+    assert decode_words(list(words), "float") == 21.5
+    assert decode_words([0xFFFF], "int16") == -1
+    assert decode_bytes(b"\x00\x19", "int16") == 25
+    assert decode_bytes(b"\x04", "bool", bit=2) is True
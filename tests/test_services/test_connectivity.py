@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services import connectivity_service
+from src.services.connectivity_service import (
+    ConnectivitySettings,
+    ConnectivityTracker,
+    record_readings,
+    sweep_stale_plcs,
+)
+from src.services.poller_ingest_service import process_poller_payload
+
+START = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+SETTINGS = ConnectivitySettings(offline_after_cycles=3, online_after_cycles=2, stale_seconds=10.0)
+
+
+def _feed(tracker, cycles, *, plc_id=1, current=True):
+    """``cycles`` é uma lista de listas de status booleanos (um por registrador)."""
+
+    transitions = []
+    for index, statuses in enumerate(cycles):
+        for offset, ok in enumerate(statuses):
+            stamp = START + timedelta(seconds=index, milliseconds=offset)
+            transition = tracker.observe(plc_id, ok, stamp, interval=1.0, current=current)
+            if transition is not None:
+                transitions.append((index, transition.state))
+    return transitions
+
+
+def test_flaky_register_does_not_flap():
+    tracker = ConnectivityTracker(SETTINGS)
+    cycles = [[True, True, True, index % 2 == 0] for index in range(10)]
+
+    assert _feed(tracker, cycles) == []
+    assert tracker.state(1) is True
+
+
+def test_transitions_need_consecutive_cycles():
+    tracker = ConnectivityTracker(SETTINGS)
+    down, up = [False, False], [True, True]
+    cycles = [up, down, down, up, down, down, down, down, up, up, up, up]
+
+    # A transição é emitida pela primeira leitura do ciclo seguinte.
+    assert _feed(tracker, cycles) == [(7, "offline"), (10, "online")]
+
+
+def test_sweep_marks_silent_plc_offline(db, monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        connectivity_service, "publish_transition", lambda plc, transition: events.append(transition.state)
+    )
+    plc = PLC(
+        name="CLP mudo",
+        ip_address="10.6.6.6",
+        protocol="modbus",
+        port=502,
+        is_online=True,
+        last_seen=START.replace(tzinfo=None),
+    )
+    db.session.add(plc)
+    db.session.commit()
+    tracker = ConnectivityTracker(SETTINGS)
+    tracker.observe(plc.id, True, START, current=True)
+
+    assert sweep_stale_plcs(session=db.session, tracker=tracker) == 0
+    tracker._states[plc.id].last_received -= 60
+    assert sweep_stale_plcs(session=db.session, tracker=tracker) == 1
+    assert sweep_stale_plcs(session=db.session, tracker=tracker) == 0
+
+    assert events == ["offline"]
+    assert plc.is_online is False
+    # A última leitura boa continua visível com o CLP offline.
+    assert plc.last_seen == START.replace(tzinfo=None)
+
+
+def test_ingest_writes_plc_state_only_on_transitions(db, monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        "src.services.poller_ingest_service.publish_transition",
+        lambda plc, transition: events.append((plc.id, transition.state)),
+    )
+    plc = PLC(name="CLP hist", ip_address="10.7.7.7", protocol="modbus", port=502, polling_interval=1000)
+    db.session.add(plc)
+    db.session.flush()
+    registers = [
+        Register(plc_id=plc.id, name=f"R{index}", address=str(index), register_type="holding", data_type="float")
+        for index in range(2)
+    ]
+    db.session.add_all(registers)
+    db.session.commit()
+
+    tracker = ConnectivityTracker(SETTINGS)
+    changes = []
+    for cycle in range(4):
+        for offset, register in enumerate(registers):
+            stamp = START + timedelta(seconds=cycle, milliseconds=offset)
+            process_poller_payload(
+                {
+                    "plc_id": plc.id,
+                    "register_id": register.id,
+                    "value": 1,
+                    "timestamp": stamp.isoformat(),
+                    "status": "online" if offset == 0 or cycle % 2 else "error",
+                },
+                session=db.session,
+                tracker=tracker,
+            )
+            changes.append(plc.status_changed_at)
+
+    assert events == [(plc.id, "online")]
+    assert plc.is_online is True
+    assert len({value for value in changes if value is not None}) == 1
+
+
+def test_record_readings_updates_last_seen_and_transitions(db, monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        connectivity_service, "publish_transition", lambda plc, transition: events.append(transition.state)
+    )
+    plc = PLC(name="CLP lote", ip_address="10.8.8.8", protocol="modbus", port=502, polling_interval=1000)
+    db.session.add(plc)
+    db.session.commit()
+    tracker = ConnectivityTracker(SETTINGS)
+
+    def cycle(index, ok):
+        stamp = START + timedelta(seconds=index)
+        return record_readings([(plc.id, ok, stamp), (plc.id, ok, stamp)], session=db.session, tracker=tracker)
+
+    assert [cycle(index, True) for index in range(3)] == [0, 0, 1]
+    assert events == ["online"] and plc.is_online is True
+    assert plc.last_seen == (START + timedelta(seconds=2)).replace(tzinfo=None)
+    # Fora das transições, ``last_seen`` avança no máximo a cada 10 s.
+    cycle(9, True)
+    assert plc.last_seen == (START + timedelta(seconds=2)).replace(tzinfo=None)
+    cycle(11, True)
+    assert plc.last_seen == (START + timedelta(seconds=11)).replace(tzinfo=None)
+
+    for index in range(12, 16):
+        cycle(index, False)
+    assert events == ["online", "offline"] and plc.is_online is False
+    assert plc.last_seen == (START + timedelta(seconds=11)).replace(tzinfo=None)
+
+
+def test_processor_feeds_reading_status_to_tracker(make_processor, monkeypatch):
+    from src.consumers import data_processor
+
+    seen = []
+    monkeypatch.setattr(data_processor, "record_readings", lambda readings: seen.extend(readings))
+    processor = make_processor()
+    processor._process_payload(
+        {
+            "values": [
+                {"plc_id": 3, "register_id": 1, "value": 2.0, "timestamp": START.isoformat()},
+                {"plc_id": 3, "register_id": 2, "status": "offline", "timestamp": START.isoformat()},
+            ]
+        }
+    )
+    assert seen == [(3, True, START), (3, False, START)]
@@ -0,0 +1,46 @@
+import asyncio
+import json
+import threading
+
+from src.consumers import data_processor
+
+
+def _message(register_id):
+    return json.dumps({"values": [{"plc_id": 1, "register_id": register_id, "value": 1.0}]})
+
+
+def test_slow_flush_does_not_block_alarm_evaluation(make_processor, monkeypatch):
+    checked = []
+    inserted = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def bulk_insert(batch):
+        started.set()
+        assert release.wait(5)
+        inserted.append(batch.register_id[: len(batch)].tolist())
+
+    monkeypatch.setattr(data_processor.DataRepo, "bulk_insert_columns", staticmethod(bulk_insert))
+    processor = make_processor(
+        batch_size=1,
+        check=lambda plc_id, register_id, value: checked.append(register_id),
+        max_inflight_flushes=1,
+    )
+
+    async def scenario():
+        await processor._on_message(_message(1))
+        assert await asyncio.to_thread(started.wait, 5)
+
+        second = asyncio.create_task(processor._on_message(_message(2)))
+        await asyncio.sleep(0.1)
+        # A leitura seguinte já foi avaliada, mas o segundo lote espera vaga.
+        assert checked == [1, 2]
+        assert not second.done()
+
+        release.set()
+        await second
+        await processor.wait_for_flushes()
+
+    asyncio.run(scenario())
+
+    assert inserted == [[1], [2]]
@@ -0,0 +1,132 @@
+import pytest
+
+from src.utils.network import enhanced_discovery as discovery
+from src.utils.network.discovery_cache import DiscoveryCache, diff_devices
+
+IFACE = discovery.NetworkInterface(
+    name="eth0",
+    ip="10.0.0.1",
+    netmask="255.255.255.0",
+    network="10.0.0.0/24",
+    broadcast=None,
+    mac=None,
+    is_up=True,
+    is_physical=True,
+    interface_type="ethernet",
+    mtu=None,
+)
+
+
+class FakeNetwork:
+    """Substitui sniff/ARP/ICMP/port scan por uma rede em memória."""
+
+    def __init__(self, monkeypatch, tmp_path):
+        self.hosts = {}
+        self.passive_runs = 0
+        self.probed = []
+        monkeypatch.setattr(discovery, "DISCOVERY_CACHE_FILE", tmp_path / "cache.json")
+        monkeypatch.setattr(discovery, "has_network_privileges", lambda: True)
+        monkeypatch.setattr(discovery, "get_all_network_interfaces", lambda: [IFACE])
+        monkeypatch.setattr(discovery, "discover_passively_all_interfaces", self.passive)
+        monkeypatch.setattr(discovery, "_enhanced_arp_scan", self.arp)
+        monkeypatch.setattr(discovery, "icmp_ping_sweep", lambda ips, timeout: set(ips) & set(self.hosts))
+        monkeypatch.setattr(discovery, "scan_hosts", self.scan)
+        monkeypatch.setattr(discovery, "_save_discovery_results", lambda devices, detailed: None)
+
+    def passive(self, interfaces, timeout):
+        self.passive_runs += 1
+        return {}
+
+    def arp(self, interface, timeout):
+        return [
+            {"ip": ip, "mac": host["mac"], "interface": interface.name, "network": interface.network, "discovered_via": ["arp"]}
+            for ip, host in self.hosts.items()
+        ]
+
+    def scan(self, ips, ports, timeout):
+        ips = sorted(ips)
+        self.probed.append(ips)
+        return {
+            ip: {
+                "open_ports": {port: {"state": "open"} for port in self.hosts.get(ip, {}).get("ports", [])},
+                "services": {},
+                "scan_time": 0,
+            }
+            for ip in ips
+        }
+
+
+@pytest.fixture
+def network(monkeypatch, tmp_path):
+    return FakeNetwork(monkeypatch, tmp_path)
+
+
+def test_incremental_rescan_only_probes_new_and_changed_hosts(network):
+    network.hosts = {
+        "10.0.0.5": {"mac": "aa:00", "ports": [502]},
+        "10.0.0.6": {"mac": "aa:01", "ports": [102, 80]},
+    }
+    first = discovery.run_incremental_discovery()
+    assert network.probed == [["10.0.0.5", "10.0.0.6"]]
+    assert [device["ip"] for device in first["diff"]["added"]] == ["10.0.0.5", "10.0.0.6"]
+    assert network.passive_runs == 1
+
+    network.hosts["10.0.0.6"]["mac"] = "bb:01"
+    network.hosts["10.0.0.7"] = {"mac": "aa:02", "ports": []}
+    del network.hosts["10.0.0.5"]
+    second = discovery.run_incremental_discovery()
+
+    # Sem sniff passivo com a cache recente; 10.0.0.5 ainda dentro do TTL.
+    assert network.passive_runs == 1
+    assert network.probed[-1] == ["10.0.0.6", "10.0.0.7"]
+    assert second["reused"] == 1
+    assert [device["ip"] for device in second["diff"]["added"]] == ["10.0.0.7"]
+    assert second["diff"]["changed"] == [{"ip": "10.0.0.6", "changes": {"mac": ["aa:01", "bb:01"]}}]
+    assert second["diff"]["unchanged"] == 1
+    assert {device["ip"] for device in second["devices"]} == {"10.0.0.5", "10.0.0.6", "10.0.0.7"}
+    reused = next(device for device in second["devices"] if device["ip"] == "10.0.0.5")
+    assert reused["open_ports"] == {502: {"state": "open"}}
+
+
+def test_expired_hosts_are_reprobed_and_removed_when_gone(network, monkeypatch):
+    network.hosts = {"10.0.0.5": {"mac": "aa:00", "ports": [502]}, "10.0.0.6": {"mac": "aa:01", "ports": [80]}}
+    discovery.run_incremental_discovery()
+
+    monkeypatch.setattr(discovery.CONFIG, "CACHE_DURATION_SECONDS", 0)
+    del network.hosts["10.0.0.6"]
+    result = discovery.run_incremental_discovery()
+
+    assert network.passive_runs == 2
+    assert network.probed[-1] == ["10.0.0.5", "10.0.0.6"]
+    assert [device["ip"] for device in result["diff"]["removed"]] == ["10.0.0.6"]
+    assert [device["ip"] for device in result["devices"]] == ["10.0.0.5"]
+    cache = DiscoveryCache(discovery.DISCOVERY_CACHE_FILE, 60).load()
+    assert len(cache) == 1 and cache.get("eth0", "10.0.0.5")["device"]["open_ports"] == {502: {"state": "open"}}
+
+
+def test_use_cache_false_probes_everything_but_refreshes_cache(network):
+    network.hosts = {"10.0.0.5": {"mac": "aa:00", "ports": [502]}}
+    discovery.run_enhanced_discovery()
+    devices = discovery.run_enhanced_discovery(use_cache=False)
+
+    assert network.passive_runs == 2
+    assert network.probed == [["10.0.0.5"], ["10.0.0.5"]]
+    assert devices[0]["industrial_device"]["protocol"] == ["modbus"]
+    assert len(DiscoveryCache(discovery.DISCOVERY_CACHE_FILE, 60).load()) == 1
+
+
+def test_diff_devices_compares_ports_and_classification():
+    before = [{"ip": "10.0.0.5", "mac": "aa", "open_ports": {502: {}}}]
+    after = [
+        {
+            "ip": "10.0.0.5",
+            "mac": "aa",
+            "open_ports": {502: {}, 80: {}},
+            "industrial_device": {"type": "modbus_plc", "manufacturer": "unknown"},
+        }
+    ]
+    diff = diff_devices(before, after)
+    assert diff["changed"] == [
+        {"ip": "10.0.0.5", "changes": {"open_ports": [[502], [80, 502]], "device_type": ["unknown", "modbus_plc"]}}
+    ]
+    assert diff["added"] == diff["removed"] == []
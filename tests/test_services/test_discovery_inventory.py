@@ -0,0 +1,53 @@
+from src.models.PLCs import PLC
+from src.services import discovery_service
+
+
+def _device(ip, service, port, confidence=90):
+    return {
+        "ip": ip,
+        "mac": "00:1b:1b:00:00:01",
+        "interface": "eth0",
+        "open_ports": {port: {"state": "open"}},
+        "services": {port: {"name": service, "type": "industrial"}},
+        "industrial_device": {
+            "type": "siemens_plc",
+            "manufacturer": "siemens",
+            "model": "6ES7 315-2EH14-0AB0",
+            "protocol": [service],
+            "confidence": confidence,
+        },
+    }
+
+
+def test_promote_to_plcs_bulk_creates_and_links(db):
+    db.session.add(PLC(name="Existente", ip_address="10.0.0.7", protocol="modbus", port=502))
+    db.session.commit()
+    discovery_service.store_discovery_results(
+        [
+            _device("10.0.0.5", "s7comm", 102),
+            _device("10.0.0.6", "modbus", 1502),
+            _device("10.0.0.7", "modbus", 502),
+            _device("10.0.0.8", "http", 80, confidence=10),
+        ]
+    )
+    ids = [item["id"] for item in discovery_service.list_discovered_devices()["items"]]
+
+    created = discovery_service.promote_to_plcs(ids, actor="eng")
+
+    assert {(plc.ip_address, plc.protocol, plc.port) for plc in created} == {
+        ("10.0.0.5", "s7", 102),
+        ("10.0.0.6", "modbus", 1502),
+    }
+    s7 = next(plc for plc in created if plc.protocol == "s7")
+    assert s7.manufacturer == "siemens" and s7.model == "6ES7 315-2EH14-0AB0"
+    assert s7.activation_source == "discovery" and s7.last_state_change_by == "eng"
+
+    counts = discovery_service.discovery_counts()
+    assert counts == {"total": 4, "industrial": 3, "promoted": 3}
+    # Uma segunda promoção não duplica CLPs.
+    assert discovery_service.promote_to_plcs(ids) == []
+    assert db.session.query(PLC).count() == 3
+
+    page = discovery_service.list_discovered_devices(per_page=2, promoted=False)
+    assert [item["ip"] for item in page["items"]] == ["10.0.0.8"]
+    assert page["pagination"]["total_items"] == 1
@@ -0,0 +1,14 @@
+from src.utils.env import env_bool, env_float, env_int
+
+
+def test_env_helpers_parse_values_and_fall_back_to_default(monkeypatch):
+    monkeypatch.setenv("CLP_TEST_INT", "12")
+    monkeypatch.setenv("CLP_TEST_FLOAT", "abc")
+    monkeypatch.setenv("CLP_TEST_BOOL", " Yes ")
+    monkeypatch.delenv("CLP_TEST_MISSING", raising=False)
+
+    assert env_int("CLP_TEST_INT", 1) == 12
+    assert env_float("CLP_TEST_FLOAT", 2.5) == 2.5
+    assert env_int("CLP_TEST_MISSING", 7) == 7
+    assert env_bool("CLP_TEST_BOOL") is True
+    assert env_bool("CLP_TEST_MISSING", default=True) is True
@@ -0,0 +1,149 @@
+import asyncio
+import socket
+import struct
+
+from asyncua import Server
+from pymodbus.datastore import ModbusServerContext, ModbusSlaveContext
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.server import ModbusTcpServer
+
+from src.utils.network.enhanced_discovery import detect_industrial_device
+from src.utils.network.port_scanner import AsyncPortScanner, ScanSettings
+
+SETTINGS = ScanSettings(connect_timeout=1.0, fingerprint_timeout=2.0)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _canned_server(replies, read_frame):
+    """Servidor que responde a cada pedido com a próxima resposta da lista."""
+
+    async def handle(reader, writer):
+        for reply in replies:
+            await read_frame(reader)
+            writer.write(reply)
+            await writer.drain()
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def _read_tpkt(reader):
+    header = await reader.readexactly(4)
+    await reader.readexactly(struct.unpack(">H", header[2:4])[0] - 4)
+
+
+async def _read_enip(reader):
+    header = await reader.readexactly(24)
+    await reader.readexactly(struct.unpack("<H", header[2:4])[0])
+
+
+def _tpkt(payload):
+    return struct.pack(">BBH", 3, 0, len(payload) + 4) + payload
+
+
+def _s7_replies():
+    confirm = _tpkt(bytes.fromhex("11d00001000100c0010ac1020100c2020102"))
+    setup = _tpkt(bytes.fromhex("02f080" "32030000000000080000" "0000" "f0000001000100f0"))
+    record = struct.pack(">H20sHHH", 1, b"6ES7 315-2EH14-0AB0 ", 0xC000, 1, 1)
+    szl = bytes.fromhex("ff09") + struct.pack(">HHHHH", len(record) + 8, 0x0011, 0x0001, len(record), 1) + record
+    params = bytes.fromhex("000112088412010000000000")
+    userdata = _tpkt(bytes.fromhex("02f080") + struct.pack(">BBHHHH", 0x32, 7, 0, 0, len(params), len(szl)) + params + szl)
+    return [confirm, setup, userdata]
+
+
+def _enip_reply():
+    name = b"1756-L71/B LOGIX5571"
+    identity = (
+        struct.pack("<H", 1)
+        + struct.pack(">HHI8x", 2, 44818, 0x7F000001)
+        + struct.pack("<HHHBBHI", 1, 14, 54, 20, 11, 0x0030, 0xC0FFEE01)
+        + bytes([len(name)])
+        + name
+        + b"\x03"
+    )
+    data = struct.pack("<HHH", 1, 0x000C, len(identity)) + identity
+    return struct.pack("<HHII8sI", 0x0063, len(data), 0, 0, b"scada-id", 0) + data
+
+
+def test_probes_identify_local_simulators():
+    async def scenario():
+        identity = ModbusDeviceIdentification(
+            info_name={"VendorName": "Schneider Electric", "ProductCode": "BMX P34 2020", "MajorMinorRevision": "3.10"}
+        )
+        modbus = ModbusTcpServer(
+            ModbusServerContext(slaves=ModbusSlaveContext(), single=True),
+            identity=identity,
+            address=("127.0.0.1", 0),
+        )
+        await modbus.listen()
+        modbus_port = modbus.transport.sockets[0].getsockname()[1]
+
+        opcua_port = _free_port()
+        opcua = Server()
+        await opcua.init()
+        opcua.set_endpoint(f"opc.tcp://127.0.0.1:{opcua_port}/")
+
+        s7, s7_port = await _canned_server(_s7_replies(), _read_tpkt)
+        enip, enip_port = await _canned_server([_enip_reply()], _read_enip)
+        probes = {modbus_port: "modbus", opcua_port: "opcua", s7_port: "s7", enip_port: "ethernet_ip"}
+        try:
+            async with opcua:
+                scanner = AsyncPortScanner(SETTINGS, fingerprint_ports=probes)
+                found = await scanner.scan({"127.0.0.1": list(probes)})
+        finally:
+            await modbus.shutdown()
+            s7.close()
+            enip.close()
+        return found["127.0.0.1"], probes
+
+    services, probes = asyncio.run(scenario())
+    by_protocol = {probes[port]: service for port, service in services.items()}
+
+    assert by_protocol["modbus"]["name"] == "modbus"
+    assert by_protocol["modbus"]["fingerprint"] == {
+        "protocol": "modbus",
+        "vendor": "Schneider Electric",
+        "product_code": "BMX P34 2020",
+        "revision": "3.10",
+    }
+    assert by_protocol["s7"]["fingerprint"] == {"protocol": "s7", "vendor": "Siemens", "model": "6ES7 315-2EH14-0AB0"}
+    enip = by_protocol["ethernet_ip"]["fingerprint"]
+    assert enip["vendor"] == "Rockwell Automation/Allen-Bradley"
+    assert enip["model"] == "1756-L71/B LOGIX5571" and enip["revision"] == "20.11"
+    assert by_protocol["opcua"]["fingerprint"] == {"protocol": "opcua"}
+
+
+def test_probe_without_answer_falls_back_to_port_guess():
+    async def scenario():
+        server = await asyncio.start_server(lambda reader, writer: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        settings = ScanSettings(connect_timeout=1.0, fingerprint_timeout=0.2)
+        try:
+            return port, await AsyncPortScanner(settings, fingerprint_ports={port: "modbus"}).scan({"127.0.0.1": [port]})
+        finally:
+            server.close()
+
+    port, found = asyncio.run(scenario())
+    assert found["127.0.0.1"][port] == {"name": "unknown", "protocol": "tcp", "type": "unknown"}
+
+
+def test_fingerprints_drive_device_classification():
+    services = {
+        102: {"name": "s7comm", "fingerprint": {"protocol": "s7", "vendor": "Siemens", "model": "6ES7 315-2EH14-0AB0"}},
+        80: {"name": "http"},
+    }
+    device = detect_industrial_device("10.0.0.5", {102: {}, 80: {}}, services)
+    assert device["manufacturer"] == "siemens"
+    assert device["type"] == "siemens_plc"
+    assert device["model"] == "6ES7 315-2EH14-0AB0"
+    assert device["protocol"] == ["s7"] and device["confidence"] > 90
+
+    # Sem sondas continua a heurística por número de porta.
+    assert detect_industrial_device("10.0.0.6", {502: {}})["protocol"] == ["modbus"]
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from dataclasses import replace
+from types import SimpleNamespace
+
+from src.services.mqtt_service import MqttPublisherService, load_mqtt_settings
+
+
+class BrokerStub:
+    """Cliente compatível com o Paho que guarda as mensagens em memória."""
+
+    def __init__(self):
+        self.messages = []
+        self.on_connect = None
+        self.on_disconnect = None
+        self._lock = threading.Lock()
+
+    def connect(self, host, port, keepalive):
+        self.on_connect(self, None, {}, 0)
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        with self._lock:
+            self.messages.append((topic, payload))
+        return SimpleNamespace(rc=0)
+
+    def measurement_count(self):
+        with self._lock:
+            return sum(
+                len(json.loads(payload)["measurements"])
+                for topic, payload in self.messages
+                if topic.endswith("telemetry/process")
+            )
+
+
+def _settings(**overrides):
+    return replace(load_mqtt_settings(), client_id="test", **overrides)
+
+
+def _measurement(index):
+    return {"plc_id": 1, "register_id": index, "value_float": float(index)}
+
+
+def test_consecutive_batches_are_merged_until_other_message():
+    service = MqttPublisherService(_settings(enabled=False, batch_max_messages=10))
+    data_topic = service.settings.data_topic
+    for index in range(3):
+        service._queue.put(
+            (data_topic, {"type": "measurement_batch", "measurements": [_measurement(index)]})
+        )
+    service._queue.put(("telemetry/alarms", {"type": "alarm_event"}))
+    service._queue.put((data_topic, {"type": "measurement_batch", "measurements": [_measurement(9)]}))
+
+    messages = service._collect_messages(service._queue.get())
+
+    assert [topic for topic, _ in messages] == [data_topic, "telemetry/alarms"]
+    merged = json.loads(messages[0][1])
+    assert merged["type"] == "measurement_batch"
+    assert [item["register_id"] for item in merged["measurements"]] == [0, 1, 2]
+    assert service._queue.qsize() == 1
+
+
+def test_merged_payload_respects_byte_limit():
+    service = MqttPublisherService(
+        _settings(enabled=False, batch_max_messages=100, batch_max_bytes=1024)
+    )
+    batches = [
+        {"type": "measurement_batch", "measurements": [_measurement(index)] * 4}
+        for index in range(20)
+    ]
+
+    merged = service._merge_measurement_batches(batches)
+
+    assert len(merged) > 1
+    assert all(len(payload) <= 1024 for payload in merged)
+    total = sum(len(json.loads(payload)["measurements"]) for payload in merged)
+    assert total == 80
+
+
+def test_worker_publishes_fewer_packets_than_batches():
+    broker = BrokerStub()
+    service = MqttPublisherService(
+        _settings(enabled=True, batch_max_messages=50, batch_max_wait_ms=20),
+        client=broker,
+    )
+    try:
+        for index in range(200):
+            service.publish_measurements([_measurement(index)])
+        deadline = time.monotonic() + 5.0
+        while broker.measurement_count() < 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        service.shutdown()
+
+    assert broker.measurement_count() == 200
+    assert service.packets_sent < 200
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from dataclasses import replace
+from types import SimpleNamespace
+
+from src.consumers import data_processor
+from src.services.mqtt_service import MqttPublisherService, load_mqtt_settings
+
+
+def _service(published):
+    settings = replace(
+        load_mqtt_settings(), enabled=False, base_topic="scada", last_value_topics=True, retain=False
+    )
+    service = MqttPublisherService(settings)
+    service._active = True
+    service._connected = True
+    service._client = SimpleNamespace(
+        publish=lambda topic, payload=None, qos=0, retain=False: published.append(
+            (topic, json.loads(payload), retain)
+        )
+        or SimpleNamespace(rc=0)
+    )
+    return service
+
+
+def _flush(service):
+    while not service._queue.empty():
+        service._publish_now(*service._queue.get_nowait())
+
+
+def test_last_value_topics_are_retained_and_deduplicated():
+    published = []
+    service = _service(published)
+
+    service.publish_measurements(
+        [
+            {"plc_id": 1, "register_id": 10, "value_float": 1.5, "quality": "good"},
+            {"plc_id": 1, "register_id": 11, "value_float": 2.0, "quality": "good"},
+        ]
+    )
+    service.publish_measurements(
+        [
+            {"plc_id": 1, "register_id": 10, "value_float": 1.5, "quality": "good"},
+            {"plc_id": 1, "register_id": 11, "value_float": 3.0, "quality": "good"},
+        ]
+    )
+    _flush(service)
+
+    retained = [(topic, payload["value"]) for topic, payload, retain in published if retain]
+    assert retained == [("scada/1/10", 1.5), ("scada/1/11", 2.0), ("scada/1/11", 3.0)]
+    batches = [topic for topic, _, retain in published if not retain]
+    assert batches == ["scada/telemetry/process", "scada/telemetry/process"]
+
+
+def test_processor_readings_reach_last_value_and_batch_topics(db, make_processor, monkeypatch):
+    monkeypatch.setattr(data_processor.DataRepo, "bulk_insert_columns", staticmethod(lambda batch: None))
+    published = []
+    service = _service(published)
+    processor = make_processor(batch_size=10, mqtt=service)
+
+    async def scenario():
+        for value in (4.0, 4.0, 5.5):
+            await processor.ingest({"values": [{"plc_id": 1, "register_id": 10, "value": value, "quality": "good"}]})
+
+    asyncio.run(scenario())
+    _flush(service)
+
+    retained = [(topic, payload["value"]) for topic, payload, retain in published if retain]
+    assert retained == [("scada/1/10", 4.0), ("scada/1/10", 5.5)]
+    batches = [payload["measurements"][0]["value_float"] for _, payload, retain in published if not retain]
+    assert batches == [4.0, 4.0, 5.5]
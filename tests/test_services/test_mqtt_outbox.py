@@ -0,0 +1,109 @@
+import json
+from dataclasses import replace
+from types import SimpleNamespace
+
+from src.services.mqtt_outbox import DiskOutbox
+from src.services.mqtt_service import MqttPublisherService, load_mqtt_settings
+
+
+def test_outbox_survives_reopen_and_keeps_order(tmp_path):
+    outbox = DiskOutbox(str(tmp_path))
+    for index in range(5):
+        outbox.append("telemetry/process", f"msg-{index}")
+
+    first = outbox.read(2)
+    assert [payload for _, payload, _, _, _ in first] == [b"msg-0", b"msg-1"]
+    outbox.commit(*first[-1][3:], len(first))
+    outbox.close()
+
+    reopened = DiskOutbox(str(tmp_path))
+    assert len(reopened) == 3
+    rest = reopened.read(10)
+    assert [payload for _, payload, _, _, _ in rest] == [b"msg-2", b"msg-3", b"msg-4"]
+    assert reopened.metrics()["oldest_age_seconds"] >= 0
+
+    reopened.commit(*rest[-1][3:], len(rest))
+    assert len(reopened) == 0
+    assert reopened.backlog_bytes() == 0
+    reopened.append("telemetry/process", "msg-5")
+    assert [payload for _, payload, _, _, _ in reopened.read(10)] == [b"msg-5"]
+
+
+def test_outbox_drops_oldest_segments_over_budget(tmp_path):
+    outbox = DiskOutbox(str(tmp_path), segment_bytes=1024, max_bytes=2048)
+    for index in range(100):
+        outbox.append("t", "x" * 100 + str(index))
+
+    assert outbox.dropped_records > 0
+    assert len(outbox) + outbox.dropped_records == 100
+    assert outbox.backlog_bytes() <= 2048 + 1024
+    payloads = [payload for _, payload, _, _, _ in outbox.read(1000)]
+    assert payloads[-1].endswith(b"99")
+
+
+def test_commit_after_budget_drop_keeps_unsent_records(tmp_path):
+    outbox = DiskOutbox(str(tmp_path), segment_bytes=1024, max_bytes=2048)
+    for index in range(20):
+        outbox.append("t", "x" * 100 + str(index))
+    batch = outbox.read(5)
+
+    # O orçamento descarta o segmento em reenvio antes do ``commit``.
+    for index in range(20, 40):
+        outbox.append("t", "x" * 100 + str(index))
+    assert batch[-1][3] not in outbox._sizes
+    pending = len(outbox)
+    assert outbox.dropped_records + pending == 40
+
+    outbox.commit(*batch[-1][3:], len(batch))
+    assert len(outbox) == pending
+    payloads = [payload for _, payload, _, _, _ in outbox.read(1000)]
+    assert len(payloads) == pending and payloads[-1].endswith(b"39")
+
+    # Lote que atravessa um segmento descartado: só conta o que sobreviveu.
+    batch = outbox.read(3)
+    for index in range(40, 50):
+        outbox.append("t", "x" * 100 + str(index))
+    outbox.commit(*batch[-1][3:], len(batch))
+    assert len(outbox) == len(outbox.read(1000)) > 0
+
+
+def test_outbox_persists_retain_flag(tmp_path):
+    outbox = DiskOutbox(str(tmp_path))
+    outbox.append("telemetry/process", "batch")
+    outbox.append("1/7", "last-value", retain=True)
+    outbox.close()
+
+    records = DiskOutbox(str(tmp_path)).read(10)
+    assert [(topic, retain) for topic, _, retain, _, _ in records] == [
+        ("telemetry/process", False),
+        ("1/7", True),
+    ]
+
+
+def test_publisher_spills_while_disconnected_and_drains_in_order(tmp_path):
+    published = []
+    client = SimpleNamespace(
+        publish=lambda topic, payload=None, qos=0, retain=False: published.append(payload)
+        or SimpleNamespace(rc=0)
+    )
+    settings = replace(
+        load_mqtt_settings(), enabled=False, outbox_dir=str(tmp_path), outbox_drain_rate=0
+    )
+    service = MqttPublisherService(settings)
+    service._active = True
+    service._client = client
+    service._outbox = DiskOutbox(str(tmp_path))
+
+    for index in range(3):
+        service.publish_measurements([{"plc_id": 1, "register_id": index}])
+    assert service._queue.empty()
+    assert service.outbox_metrics()["records"] == 3
+
+    service._connected = True
+    # Com backlog pendente, novas mensagens continuam a ir para o disco.
+    service.publish_measurements([{"plc_id": 1, "register_id": 3}])
+    assert service._drain_outbox() == 4
+
+    registers = [json.loads(payload)["measurements"][0]["register_id"] for payload in published]
+    assert registers == [0, 1, 2, 3]
+    assert service.outbox_metrics()["records"] == 0
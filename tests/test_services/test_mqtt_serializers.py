@@ -0,0 +1,92 @@
+import json
+import zlib
+from dataclasses import replace
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.mqtt_serializers import MsgpackSerializer, Serializer, available_serializers
+from src.services.mqtt_service import MqttPublisherService, load_mqtt_settings
+
+FIELDS = {"type": "measurement_batch", "source": "test"}
+STAMP = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("serializer", available_serializers(), ids=lambda s: s.name)
+def test_envelope_matches_plain_encoding(serializer):
+    if isinstance(serializer, MsgpackSerializer):
+        pytest.skip("coberto em test_msgpack_envelope")
+    batches = [[{"id": 1, "ts": STAMP}], [{"id": 2, "ts": STAMP}, {"id": 3, "ts": None}]]
+    fragments = [serializer.items(batch) for batch in batches]
+
+    merged = json.loads(serializer.envelope(FIELDS, "measurements", fragments, 3))
+
+    assert merged["type"] == "measurement_batch"
+    assert [item["id"] for item in merged["measurements"]] == [1, 2, 3]
+    assert merged["measurements"][0]["ts"] == "2024-01-01T12:00:00+00:00"
+
+
+def test_msgpack_envelope():
+    msgpack = pytest.importorskip("msgpack")
+    serializer = MsgpackSerializer()
+    batches = [[{"id": index}] for index in range(20)]
+    fragments = [serializer.items(batch) for batch in batches]
+
+    merged = msgpack.unpackb(serializer.envelope(FIELDS, "measurements", fragments, 20))
+
+    assert [item["id"] for item in merged["measurements"]] == list(range(20))
+
+
+def test_large_payloads_are_compressed_under_topic_suffix():
+    published = []
+    settings = replace(
+        load_mqtt_settings(), enabled=False, base_topic="scada", compress_threshold=1024
+    )
+    service = MqttPublisherService(settings)
+    service._serializer = Serializer()
+    service._active = True
+    service._connected = True
+    service._client = SimpleNamespace(
+        publish=lambda topic, payload=None, qos=0, retain=False: published.append((topic, payload))
+        or SimpleNamespace(rc=0)
+    )
+
+    service.publish_measurements([{"plc_id": 1, "register_id": 1, "timestamp": STAMP}])
+    service.publish_measurements(
+        [{"plc_id": 1, "register_id": index, "timestamp": STAMP} for index in range(50)]
+    )
+    while not service._queue.empty():
+        service._publish_now(*service._queue.get_nowait())
+
+    small, large = published
+    assert small[0] == "scada/telemetry/process"
+    assert large[0] == "scada/telemetry/process/zlib"
+    decoded = json.loads(zlib.decompress(large[1]))
+    assert len(decoded["measurements"]) == 50
+    assert decoded["measurements"][0]["timestamp"] == "2024-01-01T12:00:00+00:00"
+
+
+def test_binary_format_is_marked_on_the_topic():
+    published = []
+    settings = replace(
+        load_mqtt_settings(), enabled=False, base_topic="scada", compress_threshold=1024
+    )
+    service = MqttPublisherService(settings)
+    # Mesmo sufixo que o ``MsgpackSerializer``, sem depender do pacote msgpack.
+    service._serializer = type("Binary", (Serializer,), {"topic_suffix": MsgpackSerializer.topic_suffix})()
+    service._active = True
+    service._connected = True
+    service._client = SimpleNamespace(
+        publish=lambda topic, payload=None, qos=0, retain=False: published.append(topic)
+        or SimpleNamespace(rc=0)
+    )
+
+    service.publish_measurements([{"plc_id": 1, "register_id": 1, "timestamp": STAMP}])
+    service.publish_measurements(
+        [{"plc_id": 1, "register_id": index, "timestamp": STAMP} for index in range(50)]
+    )
+    while not service._queue.empty():
+        service._publish_now(*service._queue.get_nowait())
+
+    assert published == ["scada/telemetry/process/msgpack", "scada/telemetry/process/msgpack/zlib"]
@@ -0,0 +1,258 @@
+import asyncio
+import socket
+import struct
+import threading
+from dataclasses import replace
+
+import pytest
+
+from src.consumers.mqtt_subscriber import (
+    MqttSubscriber,
+    TopicMapper,
+    load_mqtt_ingest_settings,
+    mqtt,
+    parse_message_value,
+)
+from src.models.Data import DataLog
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+
+pytestmark = pytest.mark.skipif(mqtt is None, reason="paho-mqtt não instalado")
+
+
+class LoopbackBroker:
+    """Broker MQTT 3.1.1 mínimo (QoS 0/1, curingas ``+``) em 127.0.0.1."""
+
+    def __init__(self):
+        self._server = socket.socket()
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self.subscribed = threading.Event()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self._server.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _read_exact(conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def _read_packet(self, conn):
+        header = self._read_exact(conn, 1)[0]
+        length, shift = 0, 0
+        while True:
+            byte = self._read_exact(conn, 1)[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        return header, self._read_exact(conn, length)
+
+    @staticmethod
+    def _matches(pattern, topic):
+        levels, parts = pattern.split("/"), topic.split("/")
+        return len(levels) == len(parts) and all(l in ("+", p) for l, p in zip(levels, parts))
+
+    def _forward(self, topic, payload):
+        body = struct.pack(">H", len(topic)) + topic.encode() + payload
+        packet = bytes([0x30]) + self._encode_length(len(body)) + body
+        with self._lock:
+            targets = [conn for conn, pattern in self._subscribers if self._matches(pattern, topic)]
+        for conn in targets:
+            conn.sendall(packet)
+
+    @staticmethod
+    def _encode_length(length):
+        encoded = bytearray()
+        while True:
+            byte, length = length % 128, length // 128
+            encoded.append(byte | (0x80 if length else 0))
+            if not length:
+                return bytes(encoded)
+
+    def _serve(self, conn):
+        try:
+            while True:
+                header, body = self._read_packet(conn)
+                kind = header >> 4
+                if kind == 1:  # CONNECT
+                    conn.sendall(b"\x20\x02\x00\x00")
+                elif kind == 8:  # SUBSCRIBE
+                    message_id, pos, granted = body[:2], 2, b""
+                    while pos < len(body):
+                        (size,) = struct.unpack(">H", body[pos : pos + 2])
+                        pattern = body[pos + 2 : pos + 2 + size].decode()
+                        pos += 2 + size + 1
+                        granted += b"\x00"
+                        with self._lock:
+                            self._subscribers.append((conn, pattern))
+                    conn.sendall(b"\x90" + bytes([2 + len(granted)]) + message_id + granted)
+                    self.subscribed.set()
+                elif kind == 3:  # PUBLISH
+                    (size,) = struct.unpack(">H", body[:2])
+                    topic, rest = body[2 : 2 + size].decode(), body[2 + size :]
+                    if (header >> 1) & 0x03:
+                        conn.sendall(b"\x40\x02" + rest[:2])
+                        rest = rest[2:]
+                    self._forward(topic, rest)
+                elif kind == 12:  # PINGREQ
+                    conn.sendall(b"\xd0\x00")
+                elif kind == 14:  # DISCONNECT
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
+
+
+@pytest.fixture
+def broker():
+    instance = LoopbackBroker()
+    yield instance
+    instance.close()
+
+
+def _create_registers(db):
+    plc = PLC(name="Forno", ip_address="10.9.9.9", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    registers = [
+        Register(plc_id=plc.id, name=name, tag=tag, address=str(index), register_type="holding", data_type="float")
+        for index, (name, tag) in enumerate([("Temperatura", "TT-01"), ("Pressao", "PT-01")])
+    ]
+    db.session.add_all(registers)
+    db.session.commit()
+    return plc, registers
+
+
+def test_parse_message_value_variants():
+    assert parse_message_value(b"12.5") == {"value": 12.5}
+    assert parse_message_value(b"true") == {"value": 1.0}
+    parsed = parse_message_value(b'{"value": 3, "quality": "good", "ts": 1700000000}')
+    assert parsed["value"] == 3.0
+    assert parsed["quality"] == "good"
+    assert parsed["timestamp"] == 1700000000
+    assert parse_message_value(b"ligado") == {"raw_value": "ligado"}
+
+
+def test_topic_mapper_caches_lookups(db):
+    plc, (temperature, pressure) = _create_registers(db)
+    calls = []
+    from src.consumers import mqtt_subscriber
+
+    def lookup(fields):
+        calls.append(fields)
+        return mqtt_subscriber._db_lookup(fields)
+
+    mapper = TopicMapper(
+        ["fabrica/{plc_name}/{register_tag}", "gw/{plc_id}/{register_id}"], lookup=lookup
+    )
+
+    assert mapper.subscriptions == ["fabrica/+/+", "gw/+/+"]
+    assert mapper.resolve("fabrica/Forno/TT-01") == (plc.id, temperature.id)
+    assert mapper.resolve("fabrica/Forno/TT-01") == (plc.id, temperature.id)
+    assert mapper.resolve(f"gw/{plc.id}/{pressure.id}") == (plc.id, pressure.id)
+    assert mapper.resolve("fabrica/Forno/XX-99") is None
+    assert mapper.resolve("fabrica/Forno/XX-99") is None
+    assert mapper.resolve("outro/topico") is None
+    assert len(calls) == 3
+
+
+def test_messages_flow_through_processor_batch(db, broker, make_processor):
+    plc, (temperature, pressure) = _create_registers(db)
+    settings = replace(
+        load_mqtt_ingest_settings(),
+        host="127.0.0.1",
+        port=broker.port,
+        qos=0,
+        patterns=("fabrica/{plc_name}/{register_tag}",),
+    )
+    subscriber = MqttSubscriber(settings)
+
+    checked = []
+    processor = make_processor(subscriber, batch_size=3, check=lambda *args: checked.append(args))
+
+    publisher = mqtt.Client(client_id="test-publisher")
+    publisher.connect("127.0.0.1", broker.port)
+    publisher.loop_start()
+
+    async def scenario():
+        await subscriber.connect()
+        assert await asyncio.to_thread(broker.subscribed.wait, 5)
+        for topic, body in [
+            ("fabrica/Forno/TT-01", b"80.5"),
+            ("fabrica/Forno/PT-01", b'{"value": 2.5, "quality": "good"}'),
+            ("fabrica/Forno/DESCONHECIDO", b"1"),
+            ("fabrica/Forno/TT-01", b"81"),
+        ]:
+            publisher.publish(topic, body).wait_for_publish()
+
+        async def handler(payload):
+            await processor._on_message(payload)
+            if len(checked) >= 3:
+                subscriber.stop()
+
+        await asyncio.wait_for(subscriber.listen(handler), timeout=5)
+        await processor.wait_for_flushes()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        publisher.loop_stop()
+        publisher.disconnect()
+
+    assert [args[:3] for args in checked] == [
+        (plc.id, temperature.id, 80.5),
+        (plc.id, pressure.id, 2.5),
+        (plc.id, temperature.id, 81.0),
+    ]
+    assert subscriber.unmatched_messages == 1
+    rows = db.session.query(DataLog).order_by(DataLog.id).all()
+    assert [(row.register_id, row.value_float) for row in rows] == [
+        (temperature.id, 80.5),
+        (pressure.id, 2.5),
+        (temperature.id, 81.0),
+    ]
+
+
+def test_topic_misses_are_resolved_off_the_event_loop():
+    threads = []
+
+    def lookup(fields):
+        threads.append(threading.current_thread())
+        return (1, int(fields["register_id"]))
+
+    subscriber = MqttSubscriber(
+        replace(load_mqtt_ingest_settings(), patterns=("gw/{plc_id}/{register_id}",)),
+        mapper=TopicMapper(["gw/{plc_id}/{register_id}"], lookup=lookup),
+    )
+
+    async def scenario():
+        items = [("gw/1/5", b"1", 0.0), ("gw/1/6", b"2", 0.0), ("gw/1/5", b"3", 0.0)]
+        await subscriber.resolve_topics(topic for topic, _, _ in items)
+        resolved = len(threads)
+        payload = subscriber.build_payload(items)
+        await subscriber.close()
+        return resolved, payload
+
+    resolved, payload = asyncio.run(scenario())
+    assert resolved == 2 and len(threads) == 2
+    assert all(thread is not threading.main_thread() for thread in threads)
+    assert [item["register_id"] for item in payload["values"]] == [5, 6, 5]
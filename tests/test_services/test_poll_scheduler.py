@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+
+from src.models.Alarms import Alarm, AlarmDefinition
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.poll_scheduler import SchedulePolicy, SchedulePolicySettings
+from src.services.poller_config_service import build_poller_config
+from src.services.polling_admin_service import polling_schedule_overview
+
+NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+SETTINGS = SchedulePolicySettings(max_interval_ms=60_000, jitter=0.1)
+
+
+def test_offline_plc_backs_off_in_steps():
+    policy = SchedulePolicy(SETTINGS)
+
+    def interval(offline_seconds):
+        return policy.plc_interval(
+            7,
+            1000,
+            online=False,
+            offline_since=NOW - timedelta(seconds=offline_seconds),
+            retry_count=3,
+            now=NOW,
+        )
+
+    assert policy.plc_interval(7, 1000, online=True, now=NOW) == (1000, 0)
+    assert interval(1) == (1000, 0)
+    steps = [interval(seconds)[1] for seconds in (3, 5, 9, 21, 45, 10_000)]
+    assert steps == [1, 1, 2, 3, 4, 11]
+
+    backoff, step = interval(9)
+    assert step == 2 and 3600 <= backoff <= 4400
+    # O jitter é estável por CLP: reconstruir a configuração não muda o valor.
+    assert interval(9) == (backoff, step)
+    assert interval(10_000)[0] == 60_000
+
+
+def test_register_priority_alarm_and_errors():
+    policy = SchedulePolicy(SETTINGS)
+
+    assert policy.register_interval(1000, plc_interval_ms=1000) == 1000
+    assert policy.register_interval(1000, plc_interval_ms=1000, priority="critical") == 500
+    assert policy.register_interval(1000, plc_interval_ms=1000, priority="high", alarmed=True) == 375
+    assert policy.register_interval(1000, plc_interval_ms=1000, error_count=12, retry_count=3) == 4000
+    # Com o CLP em backoff nenhum registrador é lido mais depressa do que o CLP.
+    assert policy.register_interval(1000, plc_interval_ms=8000, plc_backoff=True, priority="critical") == 8000
+
+
+def test_config_carries_effective_schedule(db):
+    online = PLC(name="CLP ok", ip_address="10.10.0.1", protocol="modbus", port=502, is_online=True)
+    dead = PLC(
+        name="CLP morto",
+        ip_address="10.10.0.2",
+        protocol="modbus",
+        port=502,
+        is_online=False,
+        status_changed_at=NOW - timedelta(minutes=10),
+    )
+    db.session.add_all([online, dead])
+    db.session.flush()
+    registers = [
+        Register(plc_id=plc.id, name=name, address=address, register_type="holding", data_type="int16")
+        for plc, name, address in [
+            (online, "Pressao", "40001"),
+            (online, "Nivel", "40002"),
+            (online, "Vazao", "40003"),
+            (dead, "Temp", "40001"),
+        ]
+    ]
+    db.session.add_all(registers)
+    db.session.flush()
+    pressure, level = registers[:2]
+    for priority in ("LOW", "CRITICAL"):
+        db.session.add(
+            AlarmDefinition(plc_id=online.id, register_id=pressure.id, name=f"P {priority}", priority=priority)
+        )
+    db.session.add(
+        Alarm(plc_id=online.id, register_id=level.id, state="ACTIVE", priority="HIGH", message="Nivel alto")
+    )
+    db.session.commit()
+
+    config = build_poller_config(session=db.session, policy=SchedulePolicy(SETTINGS), now=NOW)
+    first, second = config["plcs"]
+
+    assert [
+        (register["name"], register["priority"], register["alarmed"], register["effective_interval"])
+        for register in first["registers"]
+    ] == [("Pressao", "critical", False, 500), ("Nivel", "normal", True, 500), ("Vazao", "normal", False, 1000)]
+    assert [(block["poll_rate"], block["start"], block["count"]) for block in first["read_plan"]] == [
+        (500, 1, 2),
+        (1000, 3, 1),
+    ]
+    assert second["backoff_step"] > 0
+    assert second["registers"][0]["effective_interval"] == second["effective_interval"] > 1000
+
+    overview = polling_schedule_overview()
+    assert [(entry["name"], entry["critical"], entry["alarmed"], entry["blocks"]) for entry in overview] == [
+        ("CLP ok", 1, 1, 2),
+        ("CLP morto", 0, 0, 1),
+    ]
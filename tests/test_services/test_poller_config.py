@@ -0,0 +1,154 @@
+from queue import Queue
+from types import SimpleNamespace
+
+import grpc
+from sqlalchemy import event
+
+from src.manager.go_polling_manager import GoPollingManager
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.poller_config_service import PollerConfigState, build_poller_config, diff_configs
+
+
+def _plc(db, name, ip, *, registers=2, active=True):
+    plc = PLC(name=name, ip_address=ip, protocol="modbus", port=502, polling_interval=500, is_active=active)
+    db.session.add(plc)
+    db.session.flush()
+    db.session.add_all(
+        Register(
+            plc_id=plc.id,
+            name=f"{name}-R{index}",
+            address=str(index),
+            register_type="holding",
+            data_type="float",
+            unit="bar" if index else None,
+        )
+        for index in range(registers)
+    )
+    db.session.commit()
+    return plc
+
+
+def test_build_uses_single_query(db):
+    first = _plc(db, "CLP A", "10.8.0.1")
+    _plc(db, "CLP B", "10.8.0.2", registers=0)
+    _plc(db, "CLP C", "10.8.0.3", active=False)
+    db.session.query(Register).filter_by(plc_id=first.id, address="1").update({"is_active": False})
+    db.session.commit()
+
+    statements = []
+    engine = db.session.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        config = build_poller_config(session=db.session)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert [plc["name"] for plc in config["plcs"]] == ["CLP A", "CLP B"]
+    (register,) = config["plcs"][0]["registers"]
+    assert {key: register[key] for key in ("name", "address", "poll_rate", "unit")} == {
+        "name": "CLP A-R0",
+        "address": "0",
+        "poll_rate": 1000,
+        "unit": "",
+    }
+    assert config["plcs"][1]["registers"] == []
+
+
+def test_diff_reports_only_changes():
+    register = {"id": 10, "name": "R", "address": "0", "poll_rate": 1000, "unit": ""}
+    old = {
+        "plcs": [
+            {"id": 1, "name": "A", "polling_interval": 500, "registers": [register, {**register, "id": 11}]},
+            {"id": 2, "name": "B", "polling_interval": 500, "registers": []},
+        ]
+    }
+    new = {
+        "plcs": [
+            {
+                "id": 1,
+                "name": "A2",
+                "polling_interval": 500,
+                "registers": [{**register, "unit": "bar"}, {**register, "id": 12}],
+            },
+            {"id": 3, "name": "C", "polling_interval": 500, "registers": [register]},
+        ]
+    }
+
+    delta = diff_configs(old, new)
+
+    assert delta["plcs"] == {
+        "added": [{"id": 3, "name": "C", "polling_interval": 500, "registers": [register]}],
+        "removed": [2],
+        "changed": [{"id": 1, "name": "A2", "polling_interval": 500}],
+    }
+    assert delta["registers"] == {
+        "added": [{"plc_id": 1, **register, "id": 12}],
+        "removed": [{"plc_id": 1, "id": 11}],
+        "changed": [{"plc_id": 1, **register, "unit": "bar"}],
+    }
+
+
+def test_state_versions_deltas():
+    state = PollerConfigState()
+    config = {"plcs": [{"id": 1, "name": "A", "registers": []}]}
+
+    assert state.needs_full()
+    assert state.full(config)["version"] == 1
+    state.commit(config, 1)
+    assert state.diff(config) is None
+
+    delta = state.diff({"plcs": []})
+    assert (delta["base_version"], delta["version"], delta["plcs"]["removed"]) == (1, 2, [1])
+
+
+class _FakeStub:
+    def __init__(self, *, delta_error=None, delta_success=True):
+        self.calls = []
+        self.delta_error = delta_error
+        self.delta_success = delta_success
+
+    def UpdateConfig(self, request):
+        self.calls.append(("full", request.json_config))
+        return SimpleNamespace(success=True, message="")
+
+    def ApplyConfigDelta(self, request):
+        self.calls.append(("delta", request.json_config))
+        if self.delta_error is not None:
+            raise self.delta_error
+        return SimpleNamespace(success=self.delta_success, message="version mismatch")
+
+
+class _Unimplemented(grpc.RpcError):
+    def code(self):
+        return grpc.StatusCode.UNIMPLEMENTED
+
+
+def _manager(stub):
+    manager = GoPollingManager(Queue(), go_command=["true"])
+    manager.stub = stub
+    return manager
+
+
+def test_manager_pushes_deltas_after_first_full_config():
+    stub = _FakeStub()
+    manager = _manager(stub)
+    config = {"plcs": [{"id": 1, "name": "A", "registers": []}]}
+
+    assert manager.apply_config(config) == "full"
+    assert manager.apply_config(config) is None
+    assert manager.apply_config({"plcs": []}) == "delta"
+    assert [kind for kind, _ in stub.calls] == ["full", "delta"]
+    assert manager.config_state.version == 2
+
+
+def test_manager_falls_back_to_full_config():
+    for stub in (_FakeStub(delta_error=_Unimplemented()), _FakeStub(delta_success=False)):
+        manager = _manager(stub)
+        manager.update_config({"plcs": []})
+
+        assert manager.apply_config({"plcs": [{"id": 1, "name": "A", "registers": []}]}) == "full"
+        assert [kind for kind, _ in stub.calls] == ["full", "delta", "full"]
+        assert manager.config_state.version == 2
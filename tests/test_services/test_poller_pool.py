@@ -0,0 +1,172 @@
+import threading
+from collections import Counter
+from queue import Queue
+
+from src.manager.poller_pool import ConsistentHashRing, PollerPool, PollerPoolSettings
+
+
+class FakeShard:
+    def __init__(self, name, data_queue):
+        self.name = name
+        self.data_queue = data_queue
+        self.running = False
+        self.config = None
+        self.starts = 0
+        self.pushes = []
+
+    def start(self, config):
+        self.running = True
+        self.starts += 1
+        self.config = config
+        for plc in config["plcs"]:
+            self.data_queue.put(f"{self.name}:{plc['id']}")
+
+    def stop(self):
+        self.running = False
+
+    def is_running(self):
+        return self.running
+
+    def update_config(self, config):
+        self.config = config
+        self.pushes.append("full")
+
+    def apply_config(self, config):
+        if config == self.config:
+            return None
+        self.config = config
+        self.pushes.append("delta")
+        return "delta"
+
+
+def _pool(shards=3):
+    data_queue = Queue()
+    created = {}
+
+    def factory(name, index):
+        created[name] = FakeShard(name, data_queue)
+        return created[name]
+
+    pool = PollerPool(
+        data_queue,
+        settings=PollerPoolSettings(shards=shards, monitor_seconds=0),
+        manager_factory=factory,
+    )
+    return pool, created, data_queue
+
+
+def _config(count):
+    return {"plcs": [{"id": plc_id, "name": f"CLP {plc_id}", "registers": []} for plc_id in range(1, count + 1)]}
+
+
+def test_ring_moves_few_keys_when_a_node_is_added():
+    ring = ConsistentHashRing([f"poller-{index}" for index in range(4)])
+    before = {key: ring.node_for(key) for key in range(2000)}
+
+    assert min(Counter(before.values()).values()) > 300
+
+    ring.add("poller-4")
+    moved = [key for key in before if ring.node_for(key) != before[key]]
+    assert all(ring.node_for(key) == "poller-4" for key in moved)
+    assert 250 < len(moved) < 600
+
+
+def test_pool_splits_config_and_multiplexes_streams():
+    pool, shards, data_queue = _pool()
+    pool.start(_config(30))
+
+    assigned = {name: [plc["id"] for plc in shard.config["plcs"]] for name, shard in shards.items()}
+    assert sorted(plc_id for ids in assigned.values() for plc_id in ids) == list(range(1, 31))
+    assert all(ids for ids in assigned.values())
+
+    received = set()
+    while not data_queue.empty():
+        received.add(data_queue.get())
+    assert {item.split(":")[0] for item in received} == set(shards)
+    assert len(received) == 30
+
+
+def test_crashed_shard_restarts_alone():
+    pool, shards, _ = _pool()
+    pool.start(_config(12))
+    crashed = shards["poller-1"]
+    assigned = crashed.config
+    crashed.running = False
+
+    assert pool.check_shards() == ["poller-1"]
+    assert crashed.starts == 2 and crashed.config == assigned
+    assert [shard.starts for name, shard in shards.items() if name != "poller-1"] == [1, 1]
+    assert pool.check_shards() == []
+
+
+def test_resize_rebalances_with_deltas():
+    pool, shards, _ = _pool(shards=3)
+    config = _config(60)
+    pool.start(config)
+    owners = {plc["id"]: pool.shard_for(plc["id"]) for plc in config["plcs"]}
+
+    pool.resize(4)
+
+    moved = [plc_id for plc_id, owner in owners.items() if pool.shard_for(plc_id) != owner]
+    assert moved and len(moved) < 30
+    assert {pool.shard_for(plc_id) for plc_id in moved} == {"poller-3"}
+    assert [plc["id"] for plc in shards["poller-3"].config["plcs"]] == sorted(moved)
+    assert all(push == "delta" for shard in shards.values() for push in shard.pushes)
+
+    pool.resize(3)
+    assert "poller-3" not in pool.shards and shards["poller-3"].running is False
+    assert {pool.shard_for(plc_id) for plc_id in owners} == {"poller-0", "poller-1", "poller-2"}
+    assert {plc_id: pool.shard_for(plc_id) for plc_id in owners} == owners
+
+
+def test_failing_shard_does_not_block_the_others_and_restarts_with_its_new_part():
+    pool, shards, _ = _pool()
+    pool.start(_config(12))
+    version = pool.config_state.version
+    broken = shards["poller-1"]
+
+    def crash(config):
+        broken.running = False
+        raise RuntimeError("gRPC client not initialised.")
+
+    broken.apply_config = crash
+    new_config = _config(30)
+
+    pool.apply_config(new_config)
+
+    parts = pool.split(new_config)
+    assert all(shards[name].config == parts[name] for name in shards if name != "poller-1")
+    assert pool.config_state.version == version + 1
+
+    assert pool.check_shards() == ["poller-1"]
+    assert broken.config == parts["poller-1"]
+
+
+def test_restart_runs_outside_the_lock():
+    pool, shards, _ = _pool()
+    pool.start(_config(12))
+    crashed = shards["poller-1"]
+    crashed.running = False
+    starting, release = threading.Event(), threading.Event()
+    original_start = crashed.start
+
+    def slow_start(config):
+        starting.set()
+        release.wait(5)
+        original_start(config)
+
+    crashed.start = slow_start
+    monitor = threading.Thread(target=pool.check_shards)
+    monitor.start()
+    assert starting.wait(5)
+
+    new_config = _config(30)
+    applied = threading.Thread(target=pool.apply_config, args=(new_config,))
+    applied.start()
+    applied.join(2)
+    assert not applied.is_alive()
+
+    release.set()
+    monitor.join(5)
+    assert crashed.config == pool.split(new_config)["poller-1"]
+    assert pool.restarts == {"poller-1": 1}
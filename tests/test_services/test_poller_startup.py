@@ -0,0 +1,85 @@
+import json
+import sys
+import time
+from pathlib import Path
+from queue import Queue
+
+import pytest
+
+from src.manager.go_polling_manager import GoPollingManager
+from src.manager.poller_pool import PollerPool, PollerPoolSettings
+
+FAKE_POLLER = [sys.executable, str(Path(__file__).with_name("fake_poller.py"))]
+CONFIG = {"plcs": [{"id": 1, "name": "CLP 1", "registers": []}]}
+
+
+@pytest.fixture
+def managers():
+    created = []
+    yield created
+    for manager in created:
+        manager.stop()
+
+
+def _manager(managers, address, command=FAKE_POLLER):
+    manager = GoPollingManager(Queue(), go_command=command, address=address, name=f"fake-{len(managers)}")
+    managers.append(manager)
+    return manager
+
+
+def test_unix_socket_startup_is_fast(managers, tmp_path):
+    manager = _manager(managers, f"unix:{tmp_path / 'poller.sock'}")
+
+    started = time.monotonic()
+    manager.start(CONFIG)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    assert manager.address == f"unix:{tmp_path / 'poller.sock'}"
+    assert json.loads(manager.data_queue.get(timeout=2)) == {"plc_id": 1, "status": "online"}
+
+    manager.stop()
+    assert not (tmp_path / "poller.sock").exists()
+
+
+def test_instances_run_side_by_side_on_ephemeral_ports(managers):
+    first = _manager(managers, "localhost:0")
+    second = _manager(managers, "localhost:0")
+
+    first.start(CONFIG)
+    second.start(CONFIG)
+
+    assert first.address != second.address
+    assert not first.address.endswith(":0") and not second.address.endswith(":0")
+    assert first.data_queue.get(timeout=2) and second.data_queue.get(timeout=2)
+
+
+def test_poller_dying_during_startup_fails_fast(managers):
+    manager = _manager(managers, "localhost:0", command=[sys.executable, "-c", "raise SystemExit(3)"])
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="código 3"):
+        manager.start(CONFIG)
+    assert time.monotonic() - started < 2.0
+    assert not manager.is_running()
+
+
+def test_pool_shards_get_distinct_sockets(tmp_path):
+    data_queue = Queue()
+    pool = PollerPool(
+        data_queue,
+        settings=PollerPoolSettings(shards=2, transport="unix", socket_dir=str(tmp_path), monitor_seconds=0),
+        manager_factory=lambda name, index: GoPollingManager(
+            data_queue, go_command=FAKE_POLLER, address=pool.shard_address(index), name=name
+        ),
+    )
+    config = {"plcs": [{"id": plc_id, "name": f"CLP {plc_id}", "registers": []} for plc_id in range(1, 9)]}
+    try:
+        pool.start(config)
+        addresses = {shard.address for shard in pool.shards.values()}
+        received = {json.loads(data_queue.get(timeout=2))["plc_id"] for _ in range(8)}
+    finally:
+        pool.stop()
+
+    assert len(addresses) == 2 and all(address.startswith("unix:") for address in addresses)
+    assert received == set(range(1, 9))
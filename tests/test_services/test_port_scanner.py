@@ -0,0 +1,130 @@
+import asyncio
+import socket
+import threading
+import time
+
+from src.utils.network import enhanced_discovery
+from src.utils.network.port_scanner import AsyncPortScanner, ScanSettings, identify_service, scan_hosts
+
+
+class Listener:
+    """Servidor TCP local que opcionalmente envia um *banner* ao aceitar."""
+
+    def __init__(self, banner=b"", host="127.0.0.1"):
+        self.banner = banner
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, 0))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self.accepted = 0
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            if self.banner:
+                conn.sendall(self.banner)
+            threading.Timer(0.5, conn.close).start()
+
+    def close(self):
+        self.sock.close()
+
+
+def _closed_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_scan_hosts_reports_open_ports_and_banners():
+    ssh, silent = Listener(b"SSH-2.0-OpenSSH_9.6\r\n"), Listener()
+    closed = _closed_port()
+    try:
+        result = scan_hosts(
+            ["127.0.0.1"],
+            [ssh.port, silent.port, closed],
+            settings=ScanSettings(connect_timeout=0.5, banner_timeout=0.2),
+        )["127.0.0.1"]
+    finally:
+        ssh.close()
+        silent.close()
+
+    assert set(result["open_ports"]) == {ssh.port, silent.port}
+    assert result["services"][ssh.port]["name"] == "ssh"
+    assert result["services"][ssh.port]["banner"] == "SSH-2.0-OpenSSH_9.6"
+    assert result["services"][silent.port]["name"] == "unknown"
+    assert ssh.accepted == 1
+
+
+def test_global_and_per_host_limits_are_respected():
+    active = peak = 0
+    lock = threading.Lock()
+
+    class CountingScanner(AsyncPortScanner):
+        async def _identify(self, ip, port, reader, writer):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            with lock:
+                active -= 1
+            return identify_service(port)
+
+    listeners = [Listener() for _ in range(12)]
+    try:
+        settings = ScanSettings(concurrency=3, per_host=8, host_rate=0, connect_timeout=0.5)
+        found = asyncio.run(CountingScanner(settings).scan({"127.0.0.1": [item.port for item in listeners]}))
+        assert len(found["127.0.0.1"]) == 12
+        assert peak == 3
+
+        # 10 ligações/s ao mesmo host: 4 portas demoram pelo menos 0,3 s.
+        started = time.monotonic()
+        settings = ScanSettings(concurrency=50, per_host=8, host_rate=10, connect_timeout=0.5, banner_timeout=0)
+        asyncio.run(AsyncPortScanner(settings).scan({"127.0.0.1": [item.port for item in listeners[:4]]}))
+        assert time.monotonic() - started >= 0.3
+    finally:
+        for item in listeners:
+            item.close()
+
+
+def test_rate_limited_host_does_not_hold_the_global_slots():
+    first_seen = {}
+
+    class TimingScanner(AsyncPortScanner):
+        async def _identify(self, ip, port, reader, writer):
+            first_seen.setdefault(ip, time.monotonic())
+            return identify_service(port)
+
+    slow = [Listener() for _ in range(4)]
+    fast = Listener(host="127.0.0.2")
+    try:
+        # 5 ligações/s ao primeiro host: as suas 4 portas levam ~0,6 s.
+        settings = ScanSettings(concurrency=2, per_host=4, host_rate=5, connect_timeout=0.5, banner_timeout=0)
+        started = time.monotonic()
+        found = asyncio.run(
+            TimingScanner(settings).scan(
+                {"127.0.0.1": [item.port for item in slow], "127.0.0.2": [fast.port]}
+            )
+        )
+    finally:
+        for item in [*slow, fast]:
+            item.close()
+
+    assert len(found["127.0.0.1"]) == 4 and list(found["127.0.0.2"]) == [fast.port]
+    assert first_seen["127.0.0.2"] - started < 0.15
+
+
+def test_tcp_probe_keeps_boolean_contract():
+    listener = Listener()
+    closed = _closed_port()
+    try:
+        result = enhanced_discovery.tcp_probe("127.0.0.1", [listener.port, closed], timeout=0.5)
+    finally:
+        listener.close()
+    assert result == {listener.port: True, closed: False}
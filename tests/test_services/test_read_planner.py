@@ -0,0 +1,105 @@
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.poller_config_service import build_poller_config
+from src.services.read_planner import ReadPlanSettings, plan_reads
+
+SETTINGS = ReadPlanSettings(modbus_max_registers=10, modbus_max_gap=2, s7_max_bytes=16, s7_max_gap=4)
+
+
+def _reg(reg_id, address, *, data_type="int16", poll_rate=1000, **extra):
+    return {"id": reg_id, "address": address, "data_type": data_type, "poll_rate": poll_rate, **extra}
+
+
+def test_modbus_registers_merge_into_blocks():
+    registers = [
+        _reg(1, "40001"),
+        _reg(2, "40002", data_type="float"),
+        _reg(3, "40005"),  # buraco de 1 palavra: mesmo bloco
+        _reg(4, "40009"),  # buraco de 3 palavras: novo bloco
+        _reg(5, "40020", data_type="lreal"),
+        _reg(6, "40024"),  # logo a seguir ao LREAL: mesmo bloco
+        _reg(7, "30001"),  # outra área
+        _reg(8, "40002", poll_rate=5000),  # outra cadência
+        _reg(9, "XPTO"),  # fora do plano
+    ]
+
+    plan = plan_reads("modbus", registers, settings=SETTINGS)
+
+    summary = [(block["poll_rate"], block["area"], block["start"], block["count"]) for block in plan]
+    assert summary == [
+        (1000, "holding", 1, 5),
+        (1000, "holding", 9, 1),
+        (1000, "holding", 20, 5),
+        (1000, "input", 1, 1),
+        (5000, "holding", 2, 1),
+    ]
+    assert plan[0]["function"] == 3 and plan[3]["function"] == 4
+    assert plan[0]["registers"] == [
+        {"id": 1, "offset": 0, "count": 1, "bit": None},
+        {"id": 2, "offset": 1, "count": 2, "bit": None},
+        {"id": 3, "offset": 4, "count": 1, "bit": None},
+    ]
+
+
+def test_modbus_blocks_respect_max_pdu():
+    registers = [_reg(index, f"4{index + 1:04d}") for index in range(25)]
+
+    plan = plan_reads("modbus-tcp", registers, settings=SETTINGS)
+
+    assert [(block["start"], block["count"]) for block in plan] == [(1, 10), (11, 10), (21, 5)]
+
+
+def test_items_wider_than_the_pdu_stay_out_of_the_plan():
+    registers = [
+        _reg(1, "40001"),
+        _reg(2, "40002", length=11),  # 11 palavras > 10: leitura individual
+        _reg(3, "40013"),
+        _reg(4, "DB1.DBB0", data_type="string", length=20),
+        _reg(5, "DB1.DBW30"),
+    ]
+
+    modbus = plan_reads("modbus", registers[:3], settings=SETTINGS)
+    s7 = plan_reads("s7", registers[3:], settings=SETTINGS)
+
+    assert [(block["start"], block["count"]) for block in modbus] == [(1, 1), (13, 1)]
+    assert [(block["start"], block["count"]) for block in s7] == [(30, 2)]
+    assert all(block["count"] <= 10 for block in modbus) and all(block["count"] <= 16 for block in s7)
+
+
+def test_s7_bits_and_words_share_db_block():
+    registers = [
+        _reg(1, "DB1.DBX0.0", data_type="bool"),
+        _reg(2, "DB1.DBX0.7", data_type="bool"),
+        _reg(3, "DB1.DBD2", data_type="real"),
+        _reg(4, "DB1.DBD20", data_type="real"),
+        _reg(5, "DB2.DBW0", normalized_address={"db": 2, "area": "DBW", "byte": 0, "bit": None}),
+    ]
+
+    plan = plan_reads("siemens", registers, settings=SETTINGS)
+
+    assert [(block["db"], block["start"], block["count"]) for block in plan] == [(1, 0, 6), (1, 20, 4), (2, 0, 2)]
+    assert [(entry["id"], entry["offset"], entry["bit"]) for entry in plan[0]["registers"]] == [
+        (1, 0, 0),
+        (2, 0, 7),
+        (3, 2, None),
+    ]
+
+
+def test_unplannable_protocols_have_no_plan():
+    assert plan_reads("opcua", [_reg(1, "ns=2;s=X")], settings=SETTINGS) == []
+
+
+def test_config_carries_read_plan(db):
+    plc = PLC(name="CLP plano", ip_address="10.9.0.1", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    db.session.add_all(
+        Register(plc_id=plc.id, name=f"R{index}", address=f"4000{index + 1}", register_type="holding", data_type="int16")
+        for index in range(3)
+    )
+    db.session.commit()
+
+    (entry,) = build_poller_config(session=db.session, plan_settings=SETTINGS)["plcs"]
+
+    assert [(block["start"], block["count"]) for block in entry["read_plan"]] == [(1, 3)]
+    assert [item["id"] for item in entry["read_plan"][0]["registers"]] == [reg["id"] for reg in entry["registers"]]
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+from src.consumers.reading_batch import ReadingBatch, timestamp_ns
+from src.models.Alarms import AlarmDefinition
+from src.models.Data import DataLog
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.repository.Data_repository import DataLogRepo
+from src.services.Alarms_service import AlarmService
+
+STAMP = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_batch_grows_and_keeps_rare_fields():
+    batch = ReadingBatch(capacity=2)
+    for index in range(5):
+        batch.append(1, index, timestamp_ns(STAMP, 0), float(index) if index != 3 else None)
+    batch.append(2, 9, timestamp_ns("2024-01-01T12:00:00Z", 0), 7.0, {"quality": "bad", "tags": ["a"]})
+
+    other = ReadingBatch()
+    other.extend(batch)
+
+    assert len(other) == 6
+    assert other.values() == [0.0, 1.0, 2.0, None, 4.0, 7.0]
+    assert other.rare_values("quality") == [None] * 5 + ["bad"]
+    assert other.keys() == [(1, 0), (1, 1), (1, 2), (1, 3), (1, 4), (2, 9)]
+    assert other.rows_with_values([(1, 3), (1, 4), (2, 9)]) == [4, 5]
+    measurement = other.measurements()[-1]
+    assert measurement["timestamp"] == "2024-01-01T12:00:00.000000+00:00"
+    assert measurement["tags"] == ["a"]
+    assert other.datetimes([0]) == [STAMP]
+
+
+def test_columns_are_loaded_and_alarms_marked(db, monkeypatch):
+    monkeypatch.setattr("src.services.Alarms_service.send_email", lambda *args, **kwargs: True)
+    plc = PLC(name="PLC lote", ip_address="10.4.4.4", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    watched, plain = (
+        Register(plc_id=plc.id, name=name, address=str(index), register_type="holding", data_type="float")
+        for index, name in enumerate(["Nivel", "Vazao"])
+    )
+    db.session.add_all([watched, plain])
+    db.session.flush()
+    db.session.add(
+        AlarmDefinition(
+            plc_id=plc.id,
+            register_id=watched.id,
+            name="Nivel alto",
+            condition_type="above",
+            setpoint=10.0,
+            priority="HIGH",
+        )
+    )
+    db.session.commit()
+
+    batch = ReadingBatch()
+    batch.append(plc.id, plain.id, timestamp_ns(STAMP, 0), 99.0, {"unit": "m3/h"})
+    batch.append(plc.id, watched.id, timestamp_ns(STAMP, 0), 50.0)
+
+    checked = []
+    service = AlarmService(session=db.session)
+    original = service.check_and_handle
+    monkeypatch.setattr(
+        service, "check_and_handle", lambda *args, **kwargs: checked.append(args[:2]) or original(*args, **kwargs)
+    )
+
+    assert service.check_batch(batch) == 1
+    assert checked == [(plc.id, watched.id)]
+    assert batch.is_alarm[:2].tolist() == [False, True]
+
+    assert DataLogRepo(session=db.session).bulk_insert_columns(batch) == 2
+    rows = db.session.query(DataLog).order_by(DataLog.id).all()
+    assert [(row.register_id, row.value_float, row.unit, row.is_alarm) for row in rows] == [
+        (plain.id, 99.0, "m3/h", False),
+        (watched.id, 50.0, None, True),
+    ]
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from src.consumers import data_processor
+from src.consumers.data_processor import RedisStreamSubscriber
+
+from fake_redis_streams import FakeStreamRedis
+
+
+class AckRecorder:
+    def __init__(self):
+        self.acked = []
+
+    async def ack(self, message_ids):
+        self.acked.extend(message_ids)
+
+    def stop(self):
+        pass
+
+
+def _message(register_id):
+    return json.dumps({"values": [{"plc_id": 1, "register_id": register_id, "value": 1.0}]})
+
+
+def test_entries_are_acked_only_after_successful_flush(make_processor, monkeypatch):
+    subscriber = AckRecorder()
+    processor = make_processor(subscriber)
+    inserted = []
+    failures = [True]
+
+    def bulk_insert(batch):
+        if failures.pop() if failures else False:
+            raise RuntimeError("db indisponível")
+        inserted.extend(batch.register_id[: len(batch)].tolist())
+
+    monkeypatch.setattr(data_processor.DataRepo, "bulk_insert_columns", staticmethod(bulk_insert))
+
+    async def scenario():
+        await processor._on_message(_message(10), "1-0")
+        assert subscriber.acked == []
+        await processor._on_message(_message(11), "2-0")  # flush falha
+        await processor.wait_for_flushes()
+        assert subscriber.acked == []
+        assert processor._pending_acks == ["1-0", "2-0"]
+        await processor._on_message("inválido", "3-0")  # descartado: ACK imediato
+        await processor.flush(force=True)
+        await processor.wait_for_flushes()
+
+    asyncio.run(scenario())
+
+    assert subscriber.acked == ["3-0", "1-0", "2-0"]
+    assert inserted == [10, 11]
+    assert processor._pending_acks == []
+
+
+def test_consumer_group_delivers_and_reclaims(make_processor, monkeypatch):
+    client = FakeStreamRedis()
+    monkeypatch.setattr(data_processor.DataRepo, "bulk_insert_columns", staticmethod(lambda batch: None))
+
+    async def scenario():
+        for register_id in range(4):
+            await client.xadd("plc.data", {"data": _message(register_id)})
+
+        crashed = RedisStreamSubscriber("plc.data", group="g", consumer="a", client=client)
+        await crashed.connect()
+        # Consumidor "a" lê duas entradas e cai sem confirmar.
+        await client.xreadgroup("g", "a", {"plc.data": ">"}, count=2)
+
+        survivor = RedisStreamSubscriber(
+            "plc.data", group="g", consumer="b", client=client, claim_idle_ms=1, block_ms=10
+        )
+        await survivor.connect()
+        processor = make_processor(survivor, batch_size=1)
+        seen = []
+
+        async def handler(payload, message_id):
+            seen.append(json.loads(payload)["values"][0]["register_id"])
+            await processor._on_message(payload, message_id)
+            if len(seen) == 4:
+                survivor.stop()
+
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(survivor.listen(handler), timeout=5)
+        await processor.wait_for_flushes()
+        pending = await client.xpending("plc.data", "g")
+        return seen, pending["pending"]
+
+    seen, pending = asyncio.run(scenario())
+    assert sorted(seen) == [0, 1, 2, 3]
+    assert pending == 0
@@ -0,0 +1,197 @@
+import asyncio
+from dataclasses import replace
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+from src.consumers import data_processor
+from src.models.PLCs import PLC
+from src.models.Registers import Register
+from src.services.mqtt_service import MqttPublisherService, load_mqtt_settings
+from src.services.sparkplug_encoding import SparkplugEncoder, decode_payload
+
+
+def _measurement(register_id, value, **extra):
+    return {
+        "plc_id": 7,
+        "plc_name": "CLP Forno",
+        "protocol": "modbus",
+        "register_id": register_id,
+        "register_name": f"Temp {register_id}",
+        "register_address": str(40000 + register_id),
+        "timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "value_float": value,
+        **extra,
+    }
+
+
+def _tahu_payload_class():
+    """Subconjunto do ``sparkplug_b.proto`` construído em tempo de execução."""
+
+    proto = descriptor_pb2.FileDescriptorProto(
+        name="sparkplug_subset.proto", package="tahu", syntax="proto2"
+    )
+    metric = proto.message_type.add(name="Metric")
+    optional = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    types = descriptor_pb2.FieldDescriptorProto
+    for name, number, kind in (
+        ("name", 1, types.TYPE_STRING),
+        ("alias", 2, types.TYPE_UINT64),
+        ("timestamp", 3, types.TYPE_UINT64),
+        ("datatype", 4, types.TYPE_UINT32),
+        ("is_null", 7, types.TYPE_BOOL),
+        ("long_value", 11, types.TYPE_UINT64),
+        ("double_value", 13, types.TYPE_DOUBLE),
+        ("string_value", 15, types.TYPE_STRING),
+    ):
+        metric.field.add(name=name, number=number, type=kind, label=optional)
+    payload = proto.message_type.add(name="Payload")
+    payload.field.add(name="timestamp", number=1, type=types.TYPE_UINT64, label=optional)
+    payload.field.add(
+        name="metrics",
+        number=2,
+        type=types.TYPE_MESSAGE,
+        type_name=".tahu.Metric",
+        label=descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED,
+    )
+    payload.field.add(name="seq", number=3, type=types.TYPE_UINT64, label=optional)
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(proto)
+    return message_factory.GetMessageClass(pool.FindMessageTypeByName("tahu.Payload"))
+
+
+def _publish(encoder, measurements):
+    return [encoder.stamp(topic, payload) for topic, payload in encoder.encode_measurements(measurements)]
+
+
+def test_birth_then_alias_only_data():
+    encoder = SparkplugEncoder("clp_tcc3", "scada-1")
+    encoder.node_birth()
+
+    birth = _publish(encoder, [_measurement(1, 20.5), _measurement(2, 30.0)])
+    assert [topic for topic, _ in birth] == ["spBv1.0/clp_tcc3/DBIRTH/scada-1/plc-7"]
+    metrics = decode_payload(birth[0][1])["metrics"]
+    assert {metric.get("name") for metric in metrics} >= {"Temp 1", "Temp 2"}
+
+    data = _publish(encoder, [_measurement(1, 21.0)])
+    assert [topic for topic, _ in data] == ["spBv1.0/clp_tcc3/DDATA/scada-1/plc-7"]
+    decoded = decode_payload(data[0][1])
+    assert decoded["seq"] == 2
+    assert decoded["metrics"] == [
+        {"alias": 1, "timestamp": 1704067200000, "datatype": 10, "value": 21.0}
+    ]
+    assert encoder.alias_table() == {7: {1: "Temp 1", 2: "Temp 2"}}
+
+    rebirth = _publish(encoder, [_measurement(3, 5.0)])
+    assert rebirth[0][0].split("/")[2] == "DBIRTH"
+
+
+def test_seq_and_rebirth_follow_publish_session():
+    encoder = SparkplugEncoder("clp_tcc3", "scada-1")
+    bd_seqs = []
+    for _ in range(2):
+        _, death = encoder.begin_connection()
+        _, birth = encoder.node_birth()
+        assert decode_payload(death)["metrics"][0]["value"] == decode_payload(birth)["metrics"][0]["value"]
+        bd_seqs.append(decode_payload(birth)["metrics"][0]["value"])
+        _publish(encoder, [_measurement(1, 1.0)])
+    assert bd_seqs == [0, 1]
+
+    # DDATA codificado na sessão anterior e publicado depois do novo NBIRTH.
+    queued = encoder.encode_measurements([_measurement(1, 2.0)])
+    encoder.begin_connection()
+    encoder.node_birth()
+    topic, payload = encoder.stamp(*queued[0])
+    assert topic.split("/")[2] == "DBIRTH"
+    decoded = decode_payload(payload)
+    assert decoded["seq"] == 1
+    assert {metric.get("alias"): metric["value"] for metric in decoded["metrics"]}[1] == 2.0
+    _, payload = _publish(encoder, [_measurement(1, 3.0)])[0]
+    assert decode_payload(payload)["seq"] == 2
+
+    # Reinício: DDATA do *outbox* de um CLP desconhecido gera DBIRTH primeiro.
+    restarted = SparkplugEncoder("clp_tcc3", "scada-1")
+    restarted.node_birth()
+    topic, payload = restarted.stamp(*queued[0])
+    assert topic == "spBv1.0/clp_tcc3/DBIRTH/scada-1/plc-7"
+    assert [metric.get("name") for metric in decode_payload(payload)["metrics"]] == ["Properties/name", "register_1"]
+    assert restarted.stamp(*queued[0])[0].split("/")[2] == "DDATA"
+
+
+def test_payload_is_valid_protobuf():
+    encoder = SparkplugEncoder("clp_tcc3", "scada-1")
+    _publish(encoder, [_measurement(1, 1.0)])
+    _, payload = _publish(encoder, [_measurement(1, 42.25)])[0]
+
+    message = _tahu_payload_class().FromString(payload)
+    assert message.seq == 1
+    assert message.metrics[0].alias == 1
+    assert message.metrics[0].double_value == 42.25
+    assert not message.metrics[0].HasField("name")
+
+
+def test_publisher_sparkplug_mode_is_smaller_than_json():
+    published = []
+
+    def publish(topic, payload=None, qos=0, retain=False):
+        published.append((topic, payload))
+        return SimpleNamespace(rc=0)
+
+    client = SimpleNamespace(publish=publish)
+    sizes = {}
+    for encoding in ("json", "sparkplug"):
+        settings = replace(load_mqtt_settings(), enabled=False, encoding=encoding)
+        service = MqttPublisherService(settings, metadata_lookup=lambda register_ids: {})
+        service._active = True
+        service._client = client
+        service._connected = True
+        for round_ in range(2):
+            service.publish_measurements([_measurement(index, float(round_)) for index in range(1, 20)])
+        published.clear()
+        while not service._queue.empty():
+            service._publish_now(*service._queue.get_nowait())
+        sizes[encoding] = len(published[-1][1])
+
+    assert sizes["sparkplug"] * 3 < sizes["json"]
+
+
+def test_processor_readings_birth_with_names_and_values(db, make_processor, monkeypatch):
+    monkeypatch.setattr(data_processor.DataRepo, "bulk_insert_columns", staticmethod(lambda batch: None))
+    plc = PLC(name="CLP Caldeira", ip_address="10.9.9.9", protocol="modbus", port=502)
+    db.session.add(plc)
+    db.session.flush()
+    register = Register(
+        plc_id=plc.id, name="Pressão", address="40001", register_type="holding", data_type="float", unit="bar"
+    )
+    db.session.add(register)
+    db.session.commit()
+
+    published = []
+    settings = replace(load_mqtt_settings(), enabled=False, encoding="sparkplug")
+    service = MqttPublisherService(settings)
+    service._active = True
+    service._connected = True
+    service._client = SimpleNamespace(
+        publish=lambda topic, payload=None, qos=0, retain=False: published.append((topic, payload))
+        or SimpleNamespace(rc=0)
+    )
+    service._sparkplug.node_birth()
+    processor = make_processor(batch_size=10, mqtt=service)
+
+    async def scenario():
+        for value in (3.5, 4.25):
+            reading = {"plc_id": plc.id, "register_id": register.id, "value": value}
+            await processor.ingest({"values": [reading]})
+
+    asyncio.run(scenario())
+    while not service._queue.empty():
+        service._publish_now(*service._queue.get_nowait())
+
+    (birth_topic, birth), (data_topic, data) = published
+    assert birth_topic.split("/")[2:] == ["DBIRTH", service.settings.client_id, f"plc-{plc.id}"]
+    metrics = {metric.get("name"): metric["value"] for metric in decode_payload(birth)["metrics"]}
+    assert metrics == {"Properties/name": "CLP Caldeira", "Pressão": 3.5}
+    assert b"bar" in birth
+    assert data_topic.split("/")[2] == "DDATA"
+    assert [(metric["alias"], metric["value"]) for metric in decode_payload(data)["metrics"]] == [(register.id, 4.25)]
@@ -0,0 +1,68 @@
+import json
+import sys
+from pathlib import Path
+from queue import Empty, Queue
+
+from src.grpc_generated import polling_pb2
+from src.manager.go_polling_manager import GoPollingManager
+
+FAKE_POLLER = [sys.executable, str(Path(__file__).with_name("fake_poller.py"))]
+
+
+def _payload(seq, stream_id="a", data=None):
+    return polling_pb2.DataPayload(json_data=data or json.dumps({"seq": seq}), seq=seq, stream_id=stream_id)
+
+
+def _drain(queue):
+    items = []
+    while True:
+        try:
+            items.append(json.loads(queue.get(timeout=0.5)))
+        except Empty:
+            return items
+
+
+def test_duplicates_are_dropped_and_gaps_counted():
+    manager = GoPollingManager(Queue(), go_command=["true"])
+
+    accepted = [manager._accept(_payload(seq)) for seq in (1, 2, 2, 1, 3, 6)]
+
+    assert accepted == [True, True, False, False, True, True]
+    assert manager.duplicates_dropped == 2
+    assert manager.lost_messages == 2
+    assert manager._stream_request().from_seq == 7
+    assert manager._stream_request().stream_id == "a"
+
+
+def test_new_stream_id_resets_high_water_mark():
+    manager = GoPollingManager(Queue(), go_command=["true"])
+    for seq in (1, 2, 3):
+        manager._accept(_payload(seq, stream_id="a"))
+
+    assert manager._accept(_payload(1, stream_id="b"))
+    assert manager._stream_request() == polling_pb2.StreamRequest(from_seq=2, stream_id="b")
+    assert manager.duplicates_dropped == 0
+
+
+def test_payloads_without_sequence_pass_through():
+    manager = GoPollingManager(Queue(), go_command=["true"])
+
+    assert manager._accept(polling_pb2.DataPayload(json_data="{}"))
+    assert manager._accept(polling_pb2.DataPayload(json_data="{}"))
+    assert manager._stream_request().from_seq == 0
+
+
+def test_stream_resumes_after_disconnect_without_loss(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAKE_POLLER_DROP_AFTER", "2")
+    manager = GoPollingManager(Queue(), go_command=FAKE_POLLER, address=f"unix:{tmp_path / 'poller.sock'}")
+    config = {"plcs": [{"id": plc_id, "name": f"CLP {plc_id}", "registers": []} for plc_id in range(1, 6)]}
+    try:
+        manager.start(config)
+        received = _drain(manager.data_queue)
+    finally:
+        manager.stop()
+
+    assert [item["plc_id"] for item in received] == [1, 2, 3, 4, 5]
+    assert manager.duplicates_dropped == 0
+    assert manager.lost_messages == 0
+